@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_app'
+
+    def ready(self):
+        # Registra los receptores de señales (invalidación de cachés)
+        from . import signals  # noqa: F401
+        # Firma de tokens con claves rotativas (ver utils.claves_jwt)
+        from .utils.claves_jwt import instalar_backend
+        instalar_backend()
@@ -0,0 +1,133 @@
+import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .utils.cache_local import CacheLRU
+from .utils.revocacion import registro as registro_revocados
+from .utils.versiones import obtener_version
+
+ESPACIO_USUARIOS = 'usuario'
+CLAIM_VERSION = 'version_auth'
+
+_usuarios = CacheLRU(
+    max_elementos=getattr(settings, 'AUTH_CACHE_USUARIOS_MAX', 1024),
+    ttl=getattr(settings, 'AUTH_CACHE_USUARIOS_TTL', 60),
+)
+
+
+def descartar_usuario_local(id_usuario):
+    """Elimina de la caché de este proceso todas las versiones de un usuario."""
+    _usuarios.descartar(lambda clave: clave[0] == id_usuario)
+
+
+class JWTAuthenticationCacheada(JWTAuthentication):
+    """
+    Autenticación JWT que resuelve el usuario desde una caché LRU del proceso.
+
+    La entrada se identifica por el id del usuario y su versión de
+    autenticación en la caché compartida (ver utils.versiones). Cualquier
+    guardado o eliminación del usuario incrementa esa versión, por lo que los
+    demás procesos dejan de usar su copia en la siguiente petición. Así cada
+    petición autenticada cuesta una lectura de caché en lugar de una consulta.
+
+    Las validaciones de usuario activo y de contraseña cambiada se aplican
+    sobre la copia en caché igual que sobre un usuario recién consultado.
+    """
+
+    def get_user(self, validated_token):
+        """
+        Retorna una copia del usuario del token, consultándolo solo si no está en caché.
+
+        Raises:
+            InvalidToken: Si el token no identifica a un usuario
+            AuthenticationFailed: Si el usuario no existe, está inactivo o cambió su contraseña
+        """
+        try:
+            id_usuario = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        clave = (id_usuario, obtener_version(ESPACIO_USUARIOS, id_usuario))
+        usuario = _usuarios.obtener(clave)
+        if usuario is None:
+            try:
+                usuario = self.user_model.objects.select_related('rol').get(
+                    **{api_settings.USER_ID_FIELD: id_usuario}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            _usuarios.guardar(clave, usuario)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not usuario.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(usuario.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        # Copia por petición: los cambios sobre request.user no alteran la caché
+        return copy.copy(usuario)
+
+
+def version_autenticacion(id_usuario):
+    """Retorna la versión de autenticación vigente de un usuario como lista serializable en JWT."""
+    return list(obtener_version(ESPACIO_USUARIOS, id_usuario))
+
+
+class UsuarioToken(TokenUser):
+    """
+    Usuario sin estado construido a partir de los claims del token de acceso.
+
+    Expone los mismos atributos de autorización que Usuario (is_staff,
+    is_superuser y rol_nombre) sin consultar la base de datos. No sirve para
+    asignarse a una llave foránea ni para serializarse como Usuario.
+    """
+
+    @property
+    def rol_nombre(self):
+        return self.token.get('rol')
+
+
+class JWTAutenticacionPorClaims(JWTAuthenticationCacheada):
+    """
+    Autenticación que, en peticiones de solo lectura, autoriza con los claims
+    del token (rol, is_staff, is_superuser) sin cargar el usuario.
+
+    Solo se usa el token si su claim de versión coincide con la versión de
+    autenticación vigente del usuario; si el usuario cambió (rol, estado o
+    contraseña) desde que se emitió el token, o la petición modifica datos,
+    se resuelve el usuario completo como en JWTAuthenticationCacheada.
+
+    Las vistas la activan con authentication_classes cuando sus métodos de
+    lectura no usan request.user como instancia del modelo.
+    """
+
+    def authenticate(self, request):
+        self._solo_lectura = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if getattr(self, '_solo_lectura', False) and CLAIM_VERSION in validated_token:
+            id_usuario = validated_token.get(api_settings.USER_ID_CLAIM)
+            if id_usuario is not None and validated_token[CLAIM_VERSION] == version_autenticacion(id_usuario):
+                return UsuarioToken(validated_token)
+        return super().get_user(validated_token)
+
+
+class RefreshTokenFiltrado(RefreshToken):
+    """
+    Refresh token que consulta la lista negra a través del filtro en memoria
+    (ver utils.revocacion) en lugar de consultar BlacklistedToken cada vez.
+    """
+
+    def check_blacklist(self):
+        if registro_revocados.esta_revocado(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
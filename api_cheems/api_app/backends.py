@@ -0,0 +1,64 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+
+from .models import Usuario
+from .utils import hashing
+
+_hash_ficticio = None
+
+
+def _obtener_hash_ficticio():
+    """
+    Retorna un hash del hasher preferido para verificar contra él cuando el
+    correo no existe, de modo que la respuesta tarde lo mismo que con un
+    correo válido y una contraseña incorrecta.
+    """
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        _hash_ficticio = make_password('contrasena-ficticia')
+    return _hash_ficticio
+
+
+class CorreoElectronicoBackend(ModelBackend):
+    """
+    Backend de autenticación por correo electrónico y contraseña.
+
+    Carga el usuario con su rol en una sola consulta (select_related) y, si el
+    correo no existe, verifica la contraseña contra un hash ficticio para que
+    el tiempo de respuesta no revele qué correos están registrados.
+    """
+
+    def authenticate(self, request, correo_electronico=None, password=None, **kwargs):
+        """
+        Autentica un usuario por correo electrónico.
+
+        Args:
+            request: Request del intento de inicio de sesión
+            correo_electronico (str): Correo del usuario (también se acepta username)
+            password (str): Contraseña en texto plano
+
+        Returns:
+            Usuario: El usuario autenticado, o None si las credenciales no son válidas
+        """
+        if correo_electronico is None:
+            correo_electronico = kwargs.get('username')
+        if correo_electronico is None or password is None:
+            return None
+
+        try:
+            usuario = Usuario.objects.select_related('rol').get(correo_electronico=correo_electronico)
+        except Usuario.DoesNotExist:
+            hashing.verificar_contrasena(password, _obtener_hash_ficticio())
+            return None
+
+        if usuario.check_password(password) and self.user_can_authenticate(usuario):
+            return usuario
+        return None
+
+    def get_user(self, user_id):
+        """Retorna el usuario activo con su rol, o None si no existe."""
+        try:
+            usuario = Usuario.objects.select_related('rol').get(pk=user_id)
+        except Usuario.DoesNotExist:
+            return None
+        return usuario if self.user_can_authenticate(usuario) else None
@@ -0,0 +1,24 @@
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import METODOS_LECTURA, CamposDinamicosMixin
+
+
+class CamposSolicitadosFilter(BaseFilterBackend):
+    """
+    Ajusta la consulta de las vistas genéricas a los campos que su
+    serializador va a devolver.
+
+    Con ?fields= y ?expand= el serializador omite campos (ver
+    CamposDinamicosMixin); este filtro deriva de esos mismos campos los
+    select_related, prefetch_related y only() de la consulta, de modo que no
+    se hacen joins ni se leen columnas que la respuesta no incluye. Solo se
+    aplica en lecturas.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if request.method not in METODOS_LECTURA or not hasattr(view, 'get_serializer'):
+            return queryset
+        serializer = view.get_serializer()
+        if not isinstance(serializer, CamposDinamicosMixin) or serializer.Meta.model is not queryset.model:
+            return queryset
+        return serializer.optimizar_queryset(queryset)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from api_app.utils.hashing import hilos_configurados, medir_hashers_configurados
+
+
+class Command(BaseCommand):
+    """
+    Mide los hashes por segundo de cada hasher de PASSWORD_HASHERS en este
+    equipo, con un hilo y con el tamaño del pool de hashing, para ajustar las
+    iteraciones según el presupuesto de latencia del inicio de sesión.
+    """
+    help = 'Mide el rendimiento de los hashers de contraseña configurados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--segundos', type=float, default=1.0, help='Duración de cada medición')
+        parser.add_argument(
+            '--hilos', type=int, default=None,
+            help='Hashes en paralelo para la segunda medición (por defecto, el tamaño del pool)',
+        )
+
+    def handle(self, *args, **options):
+        hilos = options['hilos'] or hilos_configurados()
+        secuencial = medir_hashers_configurados(options['segundos'], 1)
+        paralelo = medir_hashers_configurados(options['segundos'], hilos) if hilos > 1 else secuencial
+
+        self.stdout.write(f"{'hasher':<24}{'ms/hash':>10}{'hash/s':>10}{f'hash/s x{hilos}':>14}")
+        for uno, varios in zip(secuencial, paralelo):
+            nombre = uno['algorithm'] + (' *' if uno['preferido'] else '')
+            if 'error' in uno:
+                self.stdout.write(f"{nombre:<24}  no disponible: {uno['error']}")
+                continue
+            self.stdout.write(
+                f"{nombre:<24}{uno['ms_por_hash']:>10.1f}"
+                f"{uno['hashes_por_segundo']:>10.1f}{varios['hashes_por_segundo']:>14.1f}"
+            )
+        self.stdout.write('* hasher preferido (primero de PASSWORD_HASHERS)')
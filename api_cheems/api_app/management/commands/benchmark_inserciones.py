@@ -0,0 +1,77 @@
+import secrets
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+
+from api_app.models import Conductor, GuardadoConRestriccionesMixin, Usuario, Vehiculo
+
+
+class Command(BaseCommand):
+    """
+    Compara el rendimiento de inserción de Usuario, Vehiculo y Conductor con
+    la ruta de guardado anterior (full_clean() más la consulta exists() de
+    clean()) y con la actual, que solo valida en memoria y confía en las
+    restricciones de la base de datos.
+
+    Mide el guardado del modelo, como en un comando o una importación: en la
+    API los UniqueValidator de los serializers agregan su propia consulta.
+    Los registros se insertan en modo autocommit y se eliminan al terminar.
+    """
+    help = 'Mide inserciones por segundo y consultas por inserción antes y después de GuardadoConRestriccionesMixin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=200, help='Inserciones por modelo y modo')
+
+    def handle(self, *args, **options):
+        cantidad = options['cantidad']
+        prefijo = secrets.token_hex(3)
+        licencia_base = (Conductor.objects.aggregate(maximo=Max('licencia_conduccion'))['maximo'] or 0) + 1
+        vehiculo = Vehiculo.objects.create(placa=f'BM{prefijo}', empresa=1)
+        casos = [
+            ('Usuario', 'correo_electronico', lambda i, modo: Usuario(
+                correo_electronico=f'benchmark-{prefijo}-{modo}-{i}@example.com',
+                nombre='Benchmark', password='!benchmark',
+            )),
+            ('Vehiculo', 'placa', lambda i, modo: Vehiculo(
+                placa=f'B{prefijo}{modo[:2]}{i}', empresa=1,
+            )),
+            ('Conductor', 'licencia_conduccion', lambda i, modo: Conductor(
+                id_vehiculos=vehiculo, nombre='Benchmark',
+                licencia_conduccion=licencia_base + i + (cantidad if modo == 'actual' else 0),
+            )),
+        ]
+
+        self.stdout.write(f"{'modelo':<12}{'modo':<10}{'ins/s':>10}{'consultas/ins':>15}")
+        creados = {Vehiculo: [vehiculo.pk]}
+        try:
+            for nombre, campo_unico, construir in casos:
+                for modo in ('anterior', 'actual'):
+                    instancias = [construir(i, modo) for i in range(cantidad)]
+                    with CaptureQueriesContext(connection) as consultas:
+                        inicio = time.perf_counter()
+                        for instancia in instancias:
+                            if modo == 'anterior':
+                                self._guardar_anterior(instancia, campo_unico)
+                            else:
+                                instancia.save()
+                        transcurrido = time.perf_counter() - inicio
+                    creados.setdefault(type(instancias[0]), []).extend(i.pk for i in instancias)
+                    self.stdout.write(
+                        f"{nombre:<12}{modo:<10}{cantidad / transcurrido:>10.1f}"
+                        f"{len(consultas) / cantidad:>15.1f}"
+                    )
+        finally:
+            for modelo in (Conductor, Vehiculo, Usuario):
+                modelo.objects.filter(pk__in=creados.get(modelo, [])).delete()
+
+    @staticmethod
+    def _guardar_anterior(instancia, campo_unico):
+        """Reproduce el guardado previo: full_clean(), exists() por el campo único y save()."""
+        instancia.full_clean()
+        type(instancia).objects.filter(
+            **{campo_unico: getattr(instancia, campo_unico)}
+        ).exclude(pk=instancia.pk).exists()
+        super(GuardadoConRestriccionesMixin, instancia).save()
@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api_app.models import Ruta
+from api_app.utils import planificador
+from api_app.utils.kilometraje import distancias_rutas, guardar_kilometros
+
+
+def _procesar_dias(dias, empresas, cerrar_conexiones):
+    """Guarda los kilómetros de cada día del lote; retorna (día, {empresa: km})."""
+    try:
+        return [(dia, guardar_kilometros(dia, empresas)) for dia in dias]
+    finally:
+        if cerrar_conexiones:
+            connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    Calcula los kilómetros recorridos por empresa y los guarda en
+    EstadisticaEmpresa para un rango de fechas.
+
+    Los días se reparten en lotes que se procesan en paralelo, cada uno con
+    su propia conexión a la base de datos. Con --rutas recalcula antes la
+    distancia de todas las rutas con coordenadas.
+    """
+    help = 'Calcula y guarda los kilómetros recorridos por empresa en un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día a calcular (AAAA-MM-DD). Por defecto, ayer')
+        parser.add_argument('--hasta', help='Último día a calcular (AAAA-MM-DD). Por defecto, --desde')
+        parser.add_argument(
+            '--empresa', type=int, action='append', dest='empresas',
+            help='Empresa a calcular; puede repetirse. Por defecto, todas',
+        )
+        parser.add_argument('--dias-por-lote', type=int, default=7, help='Días que procesa cada tarea')
+        parser.add_argument('--procesos', type=int, default=4, help='Lotes que se procesan en paralelo')
+        parser.add_argument('--rutas', action='store_true', help='Recalcula primero la distancia de las rutas')
+
+    def handle(self, *args, **options):
+        desde = self._fecha(options['desde']) if options['desde'] else timezone.localdate() - timedelta(days=1)
+        hasta = self._fecha(options['hasta']) if options['hasta'] else desde
+        if hasta < desde:
+            raise CommandError('--hasta no puede ser anterior a --desde')
+        if options['dias_por_lote'] < 1 or options['procesos'] < 1:
+            raise CommandError('--dias-por-lote y --procesos deben ser mayores que cero')
+
+        if options['rutas']:
+            self._actualizar_rutas()
+
+        dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+        lotes = [dias[i:i + options['dias_por_lote']] for i in range(0, len(dias), options['dias_por_lote'])]
+        procesos = min(options['procesos'], len(lotes))
+
+        if procesos == 1:
+            resultados = [_procesar_dias(lote, options['empresas'], False) for lote in lotes]
+        else:
+            with ThreadPoolExecutor(max_workers=procesos) as ejecutor:
+                resultados = list(ejecutor.map(
+                    lambda lote: _procesar_dias(lote, options['empresas'], True), lotes,
+                ))
+
+        filas = 0
+        for dia, totales in (resultado for lote in resultados for resultado in lote):
+            filas += len(totales)
+            if options['verbosity'] > 1:
+                for id_empresa, kilometros in sorted(totales.items()):
+                    self.stdout.write(f'{dia} empresa {id_empresa}: {kilometros} km')
+        self.stdout.write(self.style.SUCCESS(f'{len(dias)} días calculados, {filas} estadísticas actualizadas'))
+
+    def _actualizar_rutas(self):
+        """Recalcula distancia_km de las rutas con coordenadas en una sola operación vectorizada."""
+        rutas = list(Ruta.objects.filter(
+            latitud_origen__isnull=False, longitud_origen__isnull=False,
+            latitud_destino__isnull=False, longitud_destino__isnull=False,
+        ).only('latitud_origen', 'longitud_origen', 'latitud_destino', 'longitud_destino', 'distancia_km'))
+        for ruta, distancia in zip(rutas, distancias_rutas(rutas)):
+            ruta.distancia_km = distancia
+        Ruta.objects.bulk_update(rutas, ['distancia_km'], batch_size=500)
+        # bulk_update no envía señales y la distancia estima la duración de las rutas sin duracion_minutos
+        planificador.invalidar()
+        self.stdout.write(f'{len(rutas)} rutas actualizadas')
+
+    @staticmethod
+    def _fecha(valor):
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise CommandError(f'Fecha inválida: {valor}')
+        return fecha
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api_app.models import Usuario
+from api_app.utils.correos import encolar_correos
+from api_app.utils.vencimientos import PLAZOS, correos_resumen
+
+
+class Command(BaseCommand):
+    """
+    Encola el resumen diario de documentos de conductores por vencer.
+
+    Genera un correo por empresa con vencimientos en el periodo y por
+    destinatario, y los registra todos con un solo INSERT en la bandeja de
+    salida; el trabajador procesar_correos los envía por lotes sobre una
+    misma conexión SMTP. Pensado para ejecutarse una vez al día (cron).
+    """
+    help = 'Encola los resúmenes por empresa de documentos de conductores por vencer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, choices=PLAZOS, default=PLAZOS[-1])
+        parser.add_argument(
+            '--destinatario', action='append', dest='destinatarios',
+            help='Correo que recibe los resúmenes; puede repetirse. '
+                 'Por defecto, VENCIMIENTOS_DESTINATARIOS o el staff activo',
+        )
+
+    def handle(self, *args, **options):
+        destinatarios = (
+            options['destinatarios']
+            or getattr(settings, 'VENCIMIENTOS_DESTINATARIOS', None)
+            or list(Usuario.objects.filter(is_staff=True, is_active=True).values_list('correo_electronico', flat=True))
+        )
+        if not destinatarios:
+            self.stdout.write(self.style.WARNING('No hay destinatarios para los resúmenes'))
+            return
+
+        correos = correos_resumen(destinatarios, dias=options['dias'])
+        encolar_correos(correos)
+        self.stdout.write(self.style.SUCCESS(f'{len(correos)} resúmenes encolados'))
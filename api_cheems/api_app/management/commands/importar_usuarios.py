@@ -0,0 +1,47 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api_app.utils.importacion_usuarios import ImportadorUsuarios, formato_por_nombre, leer_filas
+
+
+class Command(BaseCommand):
+    """
+    Importa usuarios desde un archivo CSV o NDJSON con las columnas
+    correo_electronico, nombre, contrasena y, opcionalmente, rol.
+
+    Escribe en la salida una línea JSON por fila con su resultado, a medida
+    que se procesa cada lote.
+    """
+    help = 'Importa usuarios por lotes desde un archivo CSV o NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo a importar')
+        parser.add_argument('--formato', choices=['csv', 'ndjson'], help='Por defecto, según la extensión')
+        parser.add_argument('--lote', type=int, default=None, help='Filas por transacción')
+        parser.add_argument(
+            '--procesos', type=int, default=None,
+            help='Procesos para calcular los hashes. Por defecto, IMPORTACION_USUARIOS_PROCESOS o uno por CPU',
+        )
+        parser.add_argument('--rol', default='Pasajero', help='Rol de las filas sin columna rol')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or formato_por_nombre(options['archivo'])
+        if formato is None:
+            raise CommandError('No se pudo deducir el formato; use --formato')
+
+        procesos = options['procesos'] or getattr(settings, 'IMPORTACION_USUARIOS_PROCESOS', None) or os.cpu_count() or 1
+        creados = errores = 0
+        with open(options['archivo'], 'rb') as archivo, ImportadorUsuarios(
+            tamano_lote=options['lote'], procesos=procesos, rol_por_defecto=options['rol'],
+        ) as importador:
+            for resultado in importador.importar(leer_filas(archivo, formato)):
+                if resultado['estado'] == 'creado':
+                    creados += 1
+                else:
+                    errores += 1
+                self.stdout.write(json.dumps(resultado, ensure_ascii=False))
+
+        self.stdout.write(self.style.SUCCESS(f'{creados} usuarios creados, {errores} filas con errores'))
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api_app.utils.correos import InterruptorCircuito, procesar_lote
+
+
+class Command(BaseCommand):
+    """
+    Trabajador que envía los correos de la bandeja de salida.
+
+    Cada lote reutiliza una conexión SMTP; los envíos fallidos se reintentan
+    con espera exponencial y un interruptor de circuito deja de intentar
+    mientras el servidor de correo falla de forma continua.
+    """
+    help = 'Envía los correos pendientes de la bandeja de salida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=getattr(settings, 'CORREOS_LOTE', 50))
+        parser.add_argument(
+            '--intervalo', type=float, default=5,
+            help='Segundos de espera cuando no hay correos pendientes',
+        )
+        parser.add_argument('--una-vez', action='store_true', help='Procesa lo pendiente y termina')
+
+    def handle(self, *args, **options):
+        interruptor = InterruptorCircuito(
+            umbral=getattr(settings, 'CORREOS_UMBRAL_CIRCUITO', 5),
+            enfriamiento=getattr(settings, 'CORREOS_ENFRIAMIENTO_CIRCUITO', 60),
+        )
+        total_enviados = total_fallidos = 0
+        while True:
+            enviados, fallidos = procesar_lote(interruptor, tamano=options['lote'])
+            total_enviados += enviados
+            total_fallidos += fallidos
+            if enviados or fallidos:
+                continue
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
+            close_old_connections()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_enviados} correos enviados, {total_fallidos} fallidos'
+        ))
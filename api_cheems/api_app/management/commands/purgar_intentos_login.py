@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api_app.models import IntentoLogin
+from api_app.utils import particiones
+
+
+class Command(BaseCommand):
+    """
+    Aplica la retención de la tabla de intentos de inicio de sesión.
+
+    En PostgreSQL crea por adelantado las particiones de los próximos meses y
+    elimina completas las particiones cuyo mes quedó fuera de la retención.
+    Las filas vencidas que queden en la partición del mes límite, en la
+    partición por defecto o en una tabla sin particionar (SQLite) se borran
+    en lotes acotados.
+    """
+    help = 'Elimina los intentos de inicio de sesión anteriores al periodo de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int,
+            default=getattr(settings, 'LOGIN_AUDITORIA_RETENCION_DIAS', 90),
+            help='Días de intentos que se conservan',
+        )
+        parser.add_argument('--lote', type=int, default=5000, help='Filas máximas por DELETE')
+        parser.add_argument('--pausa', type=float, default=0, help='Segundos de espera entre lotes')
+        parser.add_argument(
+            '--meses-adelante', type=int, default=2,
+            help='Particiones futuras que se crean por adelantado (solo PostgreSQL)',
+        )
+
+    def handle(self, *args, **options):
+        tabla = IntentoLogin._meta.db_table
+        limite = timezone.now() - timedelta(days=options['dias'])
+        eliminadas = 0
+
+        if particiones.esta_particionada(connection, tabla):
+            with transaction.atomic():
+                creadas = particiones.asegurar_particiones(
+                    connection, tabla, 'fecha_intento', timezone.now(), options['meses_adelante']
+                )
+            self.stdout.write(f'{creadas} particiones creadas')
+
+            for nombre, mes in particiones.listar_particiones(connection, tabla):
+                fin_mes = particiones.sumar_meses(mes, 1)
+                if fin_mes <= limite.date():
+                    with transaction.atomic():
+                        particiones.eliminar_particion(connection, tabla, nombre)
+                    eliminadas += 1
+            self.stdout.write(f'{eliminadas} particiones eliminadas')
+
+        pausa = (lambda: time.sleep(options['pausa'])) if options['pausa'] else None
+        borradas = particiones.borrar_por_lotes(
+            connection, tabla, 'fecha_intento', 'id_intento', limite, options['lote'], pausa
+        )
+        self.stdout.write(self.style.SUCCESS(f'{borradas} intentos eliminados por lotes'))
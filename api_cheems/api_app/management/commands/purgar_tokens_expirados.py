@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from api_app.utils.revocacion import anunciar_purga
+
+
+class Command(BaseCommand):
+    """
+    Elimina en lotes los tokens emitidos que ya expiraron, junto con sus
+    entradas en la lista negra, y avisa a los procesos para que reconstruyan
+    su filtro de tokens revocados.
+    """
+    help = 'Elimina por lotes los OutstandingToken expirados y sus BlacklistedToken'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Tokens eliminados por sentencia')
+        parser.add_argument('--pausa', type=float, default=0, help='Segundos de espera entre lotes')
+
+    def handle(self, *args, **options):
+        expirados = OutstandingToken.objects.filter(expires_at__lt=timezone.now())
+        total = 0
+        while True:
+            ids = list(expirados.order_by('id').values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+            OutstandingToken.objects.filter(id__in=ids).delete()
+            total += len(ids)
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        if total:
+            anunciar_purga()
+        self.stdout.write(self.style.SUCCESS(f'{total} tokens expirados eliminados'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from api_app.utils.disponibilidad import recalcular
+
+
+class Command(BaseCommand):
+    """
+    Recalcula los contadores de DisponibilidadEmpresa a partir de la flota.
+
+    Los contadores se mantienen con las señales de los modelos; este comando
+    corrige las desviaciones que dejan las operaciones sin señales
+    (update() o bulk_create() sobre querysets, SQL directo) y muestra cada
+    contador corregido.
+    """
+    help = 'Recalcula los contadores de flota por empresa'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empresa', type=int, action='append', dest='empresas',
+            help='Empresa a recalcular; puede repetirse. Por defecto, todas',
+        )
+
+    def handle(self, *args, **options):
+        diferencias = recalcular(options['empresas'])
+        for id_empresa, cambios in diferencias:
+            detalle = ', '.join(f'{campo}: {anterior} -> {actual}' for campo, (anterior, actual) in cambios.items())
+            self.stdout.write(f'Empresa {id_empresa}: {detalle}')
+        self.stdout.write(self.style.SUCCESS(f'{len(diferencias)} empresas corregidas'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api_app.utils.auditoria_login import obtener_escritor
+
+
+class Command(BaseCommand):
+    """
+    Reintenta escribir los intentos de inicio de sesión que quedaron en el
+    archivo de respaldo cuando la base de datos no estaba disponible.
+    """
+    help = 'Reprocesa el archivo de respaldo de la auditoría de inicios de sesión'
+
+    def handle(self, *args, **options):
+        escritor = obtener_escritor()
+        total = escritor.reprocesar_respaldo()
+        self.stdout.write(self.style.SUCCESS(f'{total} intentos reprocesados'))
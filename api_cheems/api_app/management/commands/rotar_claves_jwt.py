@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api_app.utils.claves_jwt import retencion_por_defecto, rotar_claves
+
+
+class Command(BaseCommand):
+    """
+    Genera una nueva clave de firma de tokens y deja la anterior solo para
+    verificación. Las claves que dejaron de firmar hace más del periodo de
+    retención (por defecto, la vida del refresh token) se retiran del JWKS.
+    """
+    help = 'Rota la clave asimétrica con que se firman los tokens JWT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algoritmo', choices=['RS256', 'EdDSA'], default='RS256')
+        parser.add_argument(
+            '--retencion-horas', type=float, default=None,
+            help='Horas que una clave sigue verificando tras dejar de firmar',
+        )
+
+    def handle(self, *args, **options):
+        if options['retencion_horas'] is None:
+            retencion = retencion_por_defecto()
+        else:
+            retencion = timedelta(hours=options['retencion_horas'])
+        nueva, retiradas = rotar_claves(options['algoritmo'], retencion)
+        self.stdout.write(self.style.SUCCESS(
+            f'Nueva clave {nueva.kid} ({nueva.algoritmo}); {retiradas} claves retiradas'
+        ))
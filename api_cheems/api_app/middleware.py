@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import math
+import random
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from .utils.limite_tasa import correo_en_cuerpo, ip_cliente, obtener_almacen
+from .utils.presupuesto_consultas import (
+    PresupuestoConsultasExcedido, describir, presupuesto_de, registrar_consultas,
+)
+
+logger = logging.getLogger('api_app.consultas')
+
+
+class LimiteTasaMiddleware:
+    """
+    Middleware que limita la tasa de solicitudes con token buckets.
+
+    Cada vista declara sus límites en el atributo de clase `limites_tasa`,
+    una lista de tuplas (clave, capacidad, periodo_en_segundos):
+
+    - 'ip': un bucket por dirección IP del cliente
+    - 'correo': un bucket por el campo correo_electronico del cuerpo
+    - 'ruta': un único bucket para la ruta, compartido por todos los clientes
+
+    Un bucket admite ráfagas de hasta `capacidad` solicitudes y se recarga a
+    razón de capacidad / periodo tokens por segundo. Los límites pueden
+    ajustarse sin tocar el código con settings.LIMITES_TASA_VISTAS, un
+    diccionario nombre_de_clase -> lista de tuplas.
+
+    Los límites se evalúan en process_view, antes de que DRF autentique o
+    parsee el cuerpo. Los buckets por IP y por ruta se revisan primero; el
+    cuerpo solo se lee (si es pequeño) para el bucket por correo.
+    Si algún bucket está vacío se responde 429 con Retry-After.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(settings, 'LIMITE_TASA_ACTIVO', True):
+            return None
+        limites = self._limites(view_func)
+        if not limites:
+            return None
+
+        ruta = request.resolver_match.view_name if request.resolver_match else request.path
+        almacen = obtener_almacen()
+        # El bucket por correo requiere leer el cuerpo, así que se evalúa al final
+        for tipo, capacidad, periodo in sorted(limites, key=lambda limite: limite[0] == 'correo'):
+            valor = self._valor(tipo, request)
+            if valor is None:
+                continue
+            clave = f'tasa:{ruta}:{tipo}:{valor}'
+            permitido, espera = almacen.consumir(clave, capacidad, capacidad / periodo)
+            if not permitido:
+                return self._respuesta_limite(espera)
+        return None
+
+    @staticmethod
+    def _limites(view_func):
+        """Retorna los límites de la vista (clase de DRF o de Django) o None."""
+        clase = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if clase is None:
+            return None
+        configurados = getattr(settings, 'LIMITES_TASA_VISTAS', {})
+        if clase.__name__ in configurados:
+            return configurados[clase.__name__]
+        return getattr(clase, 'limites_tasa', None)
+
+    @staticmethod
+    def _valor(tipo, request):
+        """Identificador del cliente para el tipo de bucket, resumido con SHA-256."""
+        if tipo == 'ruta':
+            return ''
+        if tipo == 'ip':
+            valor = ip_cliente(request)
+        elif tipo == 'correo':
+            valor = correo_en_cuerpo(request, getattr(settings, 'LIMITE_TASA_MAX_CUERPO', 4096))
+        else:
+            raise ValueError(f'Tipo de límite de tasa no soportado: {tipo}')
+        if not valor:
+            return None
+        return hashlib.sha256(valor.encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def _respuesta_limite(espera):
+        segundos = max(1, math.ceil(espera))
+        respuesta = JsonResponse(
+            {'error': f'Demasiadas solicitudes. Intente nuevamente en {segundos} segundos.'},
+            status=429,
+        )
+        respuesta['Retry-After'] = str(segundos)
+        return respuesta
+
+
+class PresupuestoConsultasMiddleware:
+    """
+    Middleware que mide las consultas de cada solicitud y las compara con el
+    presupuesto de la vista.
+
+    Cada vista puede declarar en `presupuesto_consultas` cuántas consultas
+    admite (un entero, o un diccionario por método HTTP). Las consultas con
+    la misma forma ejecutadas PRESUPUESTO_CONSULTAS_REPETICIONES veces o más
+    se reportan como posible patrón N+1.
+
+    - En modo estricto (PRESUPUESTO_CONSULTAS_ESTRICTO, activo en las
+      pruebas) se miden todas las solicitudes y exceder el presupuesto lanza
+      PresupuestoConsultasExcedido, lo que hace fallar la prueba.
+    - En producción solo se mide la fracción PRESUPUESTO_CONSULTAS_MUESTREO
+      de las solicitudes y los excesos y repeticiones se registran en el
+      logger api_app.consultas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        estricto = getattr(settings, 'PRESUPUESTO_CONSULTAS_ESTRICTO', False)
+        if not estricto and random.random() >= getattr(settings, 'PRESUPUESTO_CONSULTAS_MUESTREO', 0.0):
+            return self.get_response(request)
+
+        with registrar_consultas() as registro:
+            response = self.get_response(request)
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = None
+        if coincidencia is not None:
+            vista = getattr(coincidencia.func, 'cls', None) or getattr(coincidencia.func, 'view_class', None)
+        presupuesto = presupuesto_de(vista, request.method) if vista is not None else None
+        umbral = getattr(settings, 'PRESUPUESTO_CONSULTAS_REPETICIONES', 5)
+        nombre = f'{request.method} {vista.__name__ if vista is not None else request.path}'
+
+        if presupuesto is not None and registro.total > presupuesto:
+            mensaje = f'{nombre} excedió su presupuesto de {presupuesto} consultas: {describir(registro, umbral)}'
+            if estricto:
+                raise PresupuestoConsultasExcedido(mensaje)
+            logger.warning(mensaje)
+        elif registro.repetidas(umbral):
+            logger.warning('%s repite consultas: %s', nombre, describir(registro, umbral))
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0016_merge_20250605_1444'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='intentologin',
+            name='fecha_intento',
+            field=models.DateTimeField(db_column='fecha_intento', default=django.utils.timezone.now),
+        ),
+    ]
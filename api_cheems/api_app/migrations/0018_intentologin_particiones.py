@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:48
+
+from django.db import migrations, models
+
+from api_app.utils.particiones import convertir_a_particionada, revertir_particionada
+
+INDICES = [('intento_correo_fecha_idx', '"correo_electronico", "fecha_intento" DESC')]
+
+
+def particionar_intentos(apps, schema_editor):
+    """En PostgreSQL convierte IntentosLogin en una tabla particionada por mes."""
+    convertir_a_particionada(schema_editor, 'IntentosLogin', 'fecha_intento', 'id_intento', INDICES)
+
+
+def desparticionar_intentos(apps, schema_editor):
+    revertir_particionada(schema_editor, 'IntentosLogin', 'fecha_intento', 'id_intento', INDICES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0017_intentologin_fecha_intento_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='intentologin',
+            index=models.Index(fields=['correo_electronico', '-fecha_intento'], name='intento_correo_fecha_idx'),
+        ),
+        migrations.RunPython(particionar_intentos, desparticionar_intentos),
+    ]
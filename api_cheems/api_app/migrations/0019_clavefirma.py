@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0018_intentologin_particiones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveFirma',
+            fields=[
+                ('id_clave', models.AutoField(db_column='id_clave', primary_key=True, serialize=False)),
+                ('kid', models.CharField(db_column='kid', max_length=64, unique=True)),
+                ('algoritmo', models.CharField(choices=[('RS256', 'RSA SHA-256'), ('EdDSA', 'Ed25519')], db_column='algoritmo', max_length=10)),
+                ('clave_privada', models.TextField(db_column='clave_privada')),
+                ('clave_publica', models.TextField(db_column='clave_publica')),
+                ('estado', models.CharField(choices=[('activa', 'Activa'), ('verificacion', 'Solo verificación'), ('retirada', 'Retirada')], db_column='estado', default='activa', max_length=20)),
+                ('fecha_creacion', models.DateTimeField(db_column='fecha_creacion', default=django.utils.timezone.now)),
+                ('fecha_retiro', models.DateTimeField(blank=True, db_column='fecha_retiro', null=True)),
+            ],
+            options={
+                'verbose_name': 'Clave de Firma',
+                'verbose_name_plural': 'Claves de Firma',
+                'db_table': 'ClavesFirma',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0019_clavefirma'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoPendiente',
+            fields=[
+                ('id_correo', models.AutoField(db_column='id_correo', primary_key=True, serialize=False)),
+                ('destinatario', models.EmailField(db_column='destinatario', max_length=254)),
+                ('remitente', models.CharField(db_column='remitente', max_length=254)),
+                ('asunto', models.CharField(db_column='asunto', max_length=255)),
+                ('mensaje', models.TextField(db_column='mensaje')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], db_column='estado', default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(db_column='intentos', default=0)),
+                ('proximo_intento', models.DateTimeField(db_column='proximo_intento', default=django.utils.timezone.now)),
+                ('fecha_creacion', models.DateTimeField(db_column='fecha_creacion', default=django.utils.timezone.now)),
+                ('fecha_envio', models.DateTimeField(blank=True, db_column='fecha_envio', null=True)),
+                ('ultimo_error', models.TextField(blank=True, db_column='ultimo_error', default='')),
+            ],
+            options={
+                'verbose_name': 'Correo Pendiente',
+                'verbose_name_plural': 'Correos Pendientes',
+                'db_table': 'CorreosPendientes',
+                'ordering': ['proximo_intento'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='correo_estado_proximo_idx')],
+            },
+        ),
+    ]
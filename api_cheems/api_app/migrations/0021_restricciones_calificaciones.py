@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:55
+
+from django.db import migrations, models
+
+
+def verificar_calificaciones(apps, schema_editor):
+    """
+    Detiene la migración si hay calificaciones fuera del rango 1-5.
+
+    No se corrigen automáticamente: llevarlas al extremo más cercano
+    cambiaría en silencio el promedio de rutas y conductores. El error
+    lista las filas para revisarlas a mano antes de volver a migrar.
+    """
+    invalidas = []
+    for nombre in ('Calificacion', 'CalificacionConductor'):
+        modelo = apps.get_model('api_app', nombre)
+        fuera_de_rango = modelo.objects.filter(models.Q(calificacion__lt=1) | models.Q(calificacion__gt=5))
+        for pk, calificacion in fuera_de_rango.order_by('pk').values_list('pk', 'calificacion'):
+            invalidas.append(f'{nombre} {pk}: {calificacion}')
+    if invalidas:
+        raise ValueError(
+            'Hay calificaciones fuera del rango 1-5; corríjalas antes de crear las restricciones:\n'
+            + '\n'.join(invalidas)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0020_correopendiente'),
+    ]
+
+    operations = [
+        migrations.RunPython(verificar_calificaciones, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='calificacion',
+            constraint=models.CheckConstraint(condition=models.Q(('calificacion__gte', 1), ('calificacion__lte', 5)), name='calificacion_rango'),
+        ),
+        migrations.AddConstraint(
+            model_name='calificacionconductor',
+            constraint=models.CheckConstraint(condition=models.Q(('calificacion__gte', 1), ('calificacion__lte', 5)), name='calificacion_conductor_rango'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0021_restricciones_calificaciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calificacionconductor',
+            index=models.Index(fields=['-fecha', '-id_calificacion_conductor'], name='cal_conductor_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calificacionconductor',
+            index=models.Index(fields=['id_conductor', '-fecha', '-id_calificacion_conductor'], name='cal_conductor_cond_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pqrs',
+            index=models.Index(fields=['id_usuario', '-fecha_creacion', '-id_pqrs'], name='pqrs_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pqrs',
+            index=models.Index(fields=['-fecha_creacion', '-id_pqrs'], name='pqrs_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pqrs',
+            index=models.Index(fields=['estado', '-fecha_creacion', '-id_pqrs'], name='pqrs_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rutafavorita',
+            index=models.Index(fields=['id_usuario', '-fecha_agregada', '-id_ruta_favorita'], name='favorita_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='versionsistema',
+            index=models.Index(fields=['-fecha_lanzamiento', '-id_version'], name='version_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='viaje',
+            index=models.Index(fields=['id_usuario', '-fecha_viaje', '-id_viaje'], name='viaje_usuario_fecha_idx'),
+        ),
+    ]
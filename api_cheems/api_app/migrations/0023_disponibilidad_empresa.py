@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:18
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def calcular_disponibilidad(apps, schema_editor):
+    """Crea los contadores de las empresas a partir de la flota existente."""
+    Vehiculo = apps.get_model('api_app', 'Vehiculo')
+    Conductor = apps.get_model('api_app', 'Conductor')
+    Ruta = apps.get_model('api_app', 'Ruta')
+    DisponibilidadEmpresa = apps.get_model('api_app', 'DisponibilidadEmpresa')
+
+    contadores = {
+        fila['empresa']: DisponibilidadEmpresa(
+            id_empresa=fila['empresa'], total_vehiculos=fila['total'], vehiculos_disponibles=fila['disponibles'],
+        )
+        for fila in Vehiculo.objects.values('empresa').annotate(
+            total=Count('pk'), disponibles=Count('pk', filter=Q(disponibilidad=True)),
+        ).order_by()
+    }
+    for fila in Conductor.objects.values('id_vehiculos__empresa').annotate(total=Count('pk')).order_by():
+        contadores[fila['id_vehiculos__empresa']].total_conductores = fila['total']
+    for fila in Ruta.objects.values('id_vehiculos__empresa').annotate(total=Count('pk')).order_by():
+        contadores[fila['id_vehiculos__empresa']].total_rutas = fila['total']
+    DisponibilidadEmpresa.objects.bulk_create(contadores.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0022_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisponibilidadEmpresa',
+            fields=[
+                ('id_empresa', models.IntegerField(db_column='id_empresa', primary_key=True, serialize=False)),
+                ('total_vehiculos', models.IntegerField(db_column='total_vehiculos', default=0)),
+                ('vehiculos_disponibles', models.IntegerField(db_column='vehiculos_disponibles', default=0)),
+                ('total_conductores', models.IntegerField(db_column='total_conductores', default=0)),
+                ('total_rutas', models.IntegerField(db_column='total_rutas', default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, db_column='fecha_actualizacion')),
+            ],
+            options={
+                'verbose_name': 'Disponibilidad de Empresa',
+                'verbose_name_plural': 'Disponibilidad de Empresas',
+                'db_table': 'DisponibilidadEmpresas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['empresa', 'disponibilidad'], name='vehiculo_empresa_disp_idx'),
+        ),
+        migrations.RunPython(calcular_disponibilidad, migrations.RunPython.noop),
+    ]
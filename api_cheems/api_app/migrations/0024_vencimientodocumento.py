@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def llenar_calendario(apps, schema_editor):
+    """Crea las filas del calendario a partir de las fechas de los conductores existentes."""
+    Conductor = apps.get_model('api_app', 'Conductor')
+    VencimientoDocumento = apps.get_model('api_app', 'VencimientoDocumento')
+    campos = {
+        'licencia': 'fecha_vencimiento_licencia',
+        'soat': 'fecha_vencimiento_soat',
+        'tecnomecanica': 'fecha_vencimiento_tecnomecanica',
+    }
+    VencimientoDocumento.objects.bulk_create(
+        [
+            VencimientoDocumento(id_conductor_id=fila['pk'], documento=documento, fecha_vencimiento=fila[campo])
+            for fila in Conductor.objects.values('pk', *campos.values()).iterator()
+            for documento, campo in campos.items() if fila[campo]
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0023_disponibilidad_empresa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VencimientoDocumento',
+            fields=[
+                ('id_vencimiento', models.AutoField(db_column='id_vencimiento', primary_key=True, serialize=False)),
+                ('documento', models.CharField(choices=[('licencia', 'Licencia de conducción'), ('soat', 'SOAT'), ('tecnomecanica', 'Tecnomecánica')], db_column='documento', max_length=20)),
+                ('fecha_vencimiento', models.DateField(db_column='fecha_vencimiento')),
+                ('id_conductor', models.ForeignKey(db_column='Conductores_id_conductor', on_delete=django.db.models.deletion.CASCADE, related_name='vencimientos', to='api_app.conductor')),
+            ],
+            options={
+                'verbose_name': 'Vencimiento de Documento',
+                'verbose_name_plural': 'Vencimientos de Documentos',
+                'db_table': 'VencimientosDocumentos',
+                'indexes': [models.Index(fields=['fecha_vencimiento', 'id_conductor'], name='vencimiento_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('id_conductor', 'documento'), name='vencimiento_conductor_documento')],
+            },
+        ),
+        migrations.RunPython(llenar_calendario, migrations.RunPython.noop),
+    ]
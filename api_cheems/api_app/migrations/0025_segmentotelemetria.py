@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0024_vencimientodocumento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentoTelemetria',
+            fields=[
+                ('id_segmento', models.BigAutoField(db_column='id_segmento', primary_key=True, serialize=False)),
+                ('inicio', models.DateTimeField(db_column='inicio')),
+                ('fin', models.DateTimeField(db_column='fin')),
+                ('cantidad', models.PositiveIntegerField(db_column='cantidad')),
+                ('distancia_km', models.FloatField(db_column='distancia_km', default=0)),
+                ('tiempos', models.BinaryField(db_column='tiempos')),
+                ('latitudes', models.BinaryField(db_column='latitudes')),
+                ('longitudes', models.BinaryField(db_column='longitudes')),
+                ('velocidades', models.BinaryField(db_column='velocidades')),
+                ('id_vehiculos', models.ForeignKey(db_column='Vehiculos_id_vehiculos', on_delete=django.db.models.deletion.CASCADE, to='api_app.vehiculo')),
+            ],
+            options={
+                'verbose_name': 'Segmento de Telemetría',
+                'verbose_name_plural': 'Segmentos de Telemetría',
+                'db_table': 'SegmentosTelemetria',
+                'indexes': [models.Index(fields=['id_vehiculos', 'inicio'], name='segmento_vehiculo_inicio_idx'), models.Index(fields=['id_vehiculos', '-fin'], name='segmento_vehiculo_fin_idx')],
+            },
+        ),
+    ]
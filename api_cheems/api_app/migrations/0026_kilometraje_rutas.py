@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0025_segmentotelemetria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ruta',
+            name='distancia_km',
+            field=models.FloatField(blank=True, db_column='distancia_km', null=True),
+        ),
+        migrations.AddField(
+            model_name='ruta',
+            name='latitud_destino',
+            field=models.FloatField(blank=True, db_column='latitud_destino', null=True),
+        ),
+        migrations.AddField(
+            model_name='ruta',
+            name='latitud_origen',
+            field=models.FloatField(blank=True, db_column='latitud_origen', null=True),
+        ),
+        migrations.AddField(
+            model_name='ruta',
+            name='longitud_destino',
+            field=models.FloatField(blank=True, db_column='longitud_destino', null=True),
+        ),
+        migrations.AddField(
+            model_name='ruta',
+            name='longitud_origen',
+            field=models.FloatField(blank=True, db_column='longitud_origen', null=True),
+        ),
+        migrations.AlterField(
+            model_name='estadisticaempresa',
+            name='fecha',
+            field=models.DateField(db_column='fecha', default=django.utils.timezone.localdate),
+        ),
+    ]
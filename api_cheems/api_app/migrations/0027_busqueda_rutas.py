@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:40
+
+from django.db import migrations, models
+
+from api_app.utils.busqueda_rutas import normalizar
+from api_app.utils.particiones import es_postgresql
+
+INDICES_TRIGRAMAS = [
+    ('ruta_origen_trgm_idx', 'origen_normalizado'),
+    ('ruta_destino_trgm_idx', 'destino_normalizado'),
+]
+
+
+def normalizar_rutas(apps, schema_editor):
+    """Llena origen_normalizado y destino_normalizado de las rutas existentes."""
+    Ruta = apps.get_model('api_app', 'Ruta')
+    rutas = list(Ruta.objects.only('origen', 'destino'))
+    for ruta in rutas:
+        ruta.origen_normalizado = normalizar(ruta.origen)
+        ruta.destino_normalizado = normalizar(ruta.destino)
+    Ruta.objects.bulk_update(rutas, ['origen_normalizado', 'destino_normalizado'], batch_size=500)
+
+
+def crear_indices_trigramas(apps, schema_editor):
+    """En PostgreSQL crea índices GIN de pg_trgm, que sirven LIKE '%texto%' y similarity()."""
+    if not es_postgresql(schema_editor.connection):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for nombre, columna in INDICES_TRIGRAMAS:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{nombre}" ON "Rutas" USING gin ("{columna}" gin_trgm_ops)')
+
+
+def eliminar_indices_trigramas(apps, schema_editor):
+    if not es_postgresql(schema_editor.connection):
+        return
+    for nombre, _ in INDICES_TRIGRAMAS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{nombre}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0026_kilometraje_rutas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ruta',
+            name='destino_normalizado',
+            field=models.CharField(db_column='destino_normalizado', default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='ruta',
+            name='origen_normalizado',
+            field=models.CharField(db_column='origen_normalizado', default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(normalizar_rutas, migrations.RunPython.noop),
+        migrations.RunPython(crear_indices_trigramas, eliminar_indices_trigramas),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_app', '0027_busqueda_rutas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ruta',
+            name='duracion_minutos',
+            field=models.PositiveIntegerField(blank=True, db_column='duracion_minutos', null=True),
+        ),
+    ]
@@ -1,6 +1,107 @@
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.core.exceptions import ValidationError
+from .utils import hashing
+
+
+class GuardadoConRestriccionesMixin:
+    """
+    Guardado que deja a la base de datos las validaciones que requieren
+    consultas.
+
+    save() ejecuta full_clean() sin validate_unique, sin validate_constraints
+    y sin validar las llaves foráneas, es decir, solo las validaciones en
+    memoria (formato, choices, max_length, requeridos y clean()). Los
+    duplicados, los valores fuera de rango y las referencias inexistentes
+    los rechazan las restricciones de la base de datos. El IntegrityError
+    resultante se traduce a un ValidationError por campo con los mensajes
+    de `mensajes_integridad`, una lista de tuplas (marcador, campo, mensaje)
+    donde el marcador es el nombre de la columna o de la restricción que
+    aparece en el error de la base de datos.
+
+    Así los guardados fuera de la API (comandos, importaciones, señales) no
+    hacen una consulta exists() por campo único. En la API los
+    UniqueValidator de los serializers siguen consultando antes de guardar.
+    Los modelos con `validar_campos = False` solo ejecutan clean().
+
+    Dentro de una transacción el INSERT/UPDATE se hace en un savepoint para
+    que un error de integridad no invalide la transacción externa; fuera de
+    ella no se agrega ninguna consulta.
+    """
+    mensajes_integridad = []
+    validar_campos = True
+
+    def save(self, *args, **kwargs):
+        """
+        Guarda el modelo tras las validaciones en memoria.
+
+        Raises:
+            ValidationError: Si un campo no es válido o la base de datos
+                rechaza el registro por una restricción conocida
+        """
+        if self.validar_campos:
+            self.full_clean(
+                exclude=[campo.name for campo in self._meta.fields if campo.is_relation],
+                validate_unique=False,
+                validate_constraints=False,
+            )
+        else:
+            self.clean()
+        using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        try:
+            if connections[using].in_atomic_block:
+                with transaction.atomic(using=using):
+                    super().save(*args, **kwargs)
+            else:
+                super().save(*args, **kwargs)
+        except IntegrityError as error:
+            raise self._traducir_integridad(error) from error
+
+    def _traducir_integridad(self, error):
+        """Retorna el ValidationError del primer marcador presente en el error, o el error original."""
+        texto = str(error)
+        for marcador, campo, mensaje in self.mensajes_integridad:
+            if marcador in texto:
+                return ValidationError({campo: mensaje})
+        return error
+
+
+class ContadoresEmpresaMixin:
+    """
+    Modelos que alimentan los contadores de DisponibilidadEmpresa.
+
+    Los receptores de post_save y post_delete (ver signals.py) ajustan los
+    contadores de la empresa del registro. Para que el ajuste se confirme o
+    se revierta junto con el registro, save() se ejecuta en una transacción
+    (delete() ya lo hace). Los valores de `campos_contadores` leídos de la
+    base de datos se guardan en `_valores_cargados`, así los receptores
+    saben qué cambió sin volver a consultar.
+    """
+    campos_contadores = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._registrar_valores_cargados()
+        return instancia
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._registrar_valores_cargados()
+
+    def _registrar_valores_cargados(self):
+        """Guarda los valores actuales de los campos contados que estén cargados."""
+        self._valores_cargados = {
+            campo: self.__dict__[campo] for campo in self.campos_contadores if campo in self.__dict__
+        }
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
 
 class Rol(models.Model):
     """
@@ -87,7 +188,7 @@ class UsuarioManager(BaseUserManager):
         return self.create_user(correo_electronico, contrasena, **extra_fields)
 
 # modificación del modelo Usuario enlazado a AbstractBaseUser
-class Usuario(AbstractBaseUser):
+class Usuario(GuardadoConRestriccionesMixin, AbstractBaseUser):
     """
     Modelo personalizado de Usuario.
     
@@ -116,6 +217,10 @@ class Usuario(AbstractBaseUser):
     USERNAME_FIELD = 'correo_electronico'
     REQUIRED_FIELDS = ['nombre']
 
+    mensajes_integridad = [
+        ('correo_electronico', 'correo_electronico', 'Este correo electrónico ya está registrado'),
+    ]
+
     def clean(self):
         """Valida los campos del modelo antes de guardar."""
         super().clean()
@@ -123,13 +228,53 @@ class Usuario(AbstractBaseUser):
             raise ValidationError({'correo_electronico': 'El correo electrónico es requerido'})
         if not self.nombre:
             raise ValidationError({'nombre': 'El nombre es requerido'})
-        if Usuario.objects.filter(correo_electronico=self.correo_electronico).exclude(pk=self.pk).exists():
-            raise ValidationError({'correo_electronico': 'Este correo electrónico ya está registrado'})
 
-    def save(self, *args, **kwargs):
-        """Guarda el modelo después de validar los campos."""
-        self.full_clean()
-        super().save(*args, **kwargs)
+    @property
+    def rol_nombre(self):
+        """Nombre del rol del usuario, igual al claim 'rol' de su token."""
+        return self.rol.nombre if self.rol_id else None
+
+    def set_password(self, raw_password):
+        """Calcula el hash de la contraseña en el pool de hashing (ver utils.hashing)."""
+        self.password = hashing.generar_hash(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """
+        Verifica la contraseña en el pool de hashing.
+
+        Si el hash usa un hasher o un número de iteraciones distinto al
+        configurado, se recalcula y se guarda con un UPDATE de la sola
+        columna password, sin pasar por save() ni full_clean().
+        """
+        valida, actualizar = hashing.verificar_contrasena(raw_password, self.password)
+        if valida and actualizar:
+            self._actualizar_hash(hashing.generar_hash(raw_password))
+        return valida
+
+    async def acheck_password(self, raw_password):
+        """Versión asíncrona de check_password."""
+        valida, actualizar = await hashing.averificar_contrasena(raw_password, self.password)
+        if valida and actualizar:
+            nuevo = await hashing.agenerar_hash(raw_password)
+            await sync_to_async(self._actualizar_hash)(nuevo)
+        return valida
+
+    def cambiar_contrasena(self, raw_password):
+        """Guarda una nueva contraseña actualizando solo la columna password."""
+        self._actualizar_hash(hashing.generar_hash(raw_password))
+
+    def _actualizar_hash(self, nuevo):
+        """
+        Reemplaza el hash almacenado con un UPDATE de la sola columna.
+
+        Como update() no emite post_save, se invalida aquí la copia del
+        usuario en la caché de autenticación.
+        """
+        from .signals import invalidar_usuario
+        Usuario.objects.filter(pk=self.pk).update(password=nuevo)
+        self.password = nuevo
+        invalidar_usuario(Usuario, self)
 
     def __str__(self):
         """Retorna el nombre del usuario como representación en string."""
@@ -142,7 +287,7 @@ class Usuario(AbstractBaseUser):
         verbose_name_plural = 'Usuarios'
 
 
-class Vehiculo(models.Model):
+class Vehiculo(GuardadoConRestriccionesMixin, ContadoresEmpresaMixin, models.Model):
     """
     Modelo para representar vehículos en el sistema.
     
@@ -157,6 +302,11 @@ class Vehiculo(models.Model):
     empresa = models.IntegerField(db_column='empresa')
     disponibilidad = models.BooleanField(default=True, db_column='disponibilidad')
 
+    campos_contadores = ('empresa', 'disponibilidad')
+    mensajes_integridad = [
+        ('placa', 'placa', 'Esta placa ya está registrada'),
+    ]
+
     def clean(self):
         """Valida los campos del modelo antes de guardar."""
         super().clean()
@@ -164,13 +314,6 @@ class Vehiculo(models.Model):
             raise ValidationError({'placa': 'La placa es requerida'})
         if not self.empresa:
             raise ValidationError({'empresa': 'La empresa es requerida'})
-        if Vehiculo.objects.filter(placa=self.placa).exclude(pk=self.pk).exists():
-            raise ValidationError({'placa': 'Esta placa ya está registrada'})
-
-    def save(self, *args, **kwargs):
-        """Guarda el modelo después de validar los campos."""
-        self.full_clean()
-        super().save(*args, **kwargs)
 
     def __str__(self):
         """Retorna la placa del vehículo como representación en string."""
@@ -181,9 +324,12 @@ class Vehiculo(models.Model):
         db_table = 'Vehiculos'
         verbose_name = 'Vehículo'
         verbose_name_plural = 'Vehículos'
+        indexes = [
+            models.Index(fields=['empresa', 'disponibilidad'], name='vehiculo_empresa_disp_idx'),
+        ]
 
 
-class Conductor(models.Model):
+class Conductor(GuardadoConRestriccionesMixin, ContadoresEmpresaMixin, models.Model):
     """
     Modelo para representar conductores en el sistema.
     
@@ -204,6 +350,12 @@ class Conductor(models.Model):
     fecha_vencimiento_soat = models.DateField(db_column='fecha_vencimiento_soat', null=True, blank=True)
     fecha_vencimiento_tecnomecanica = models.DateField(db_column='fecha_vencimiento_tecnomecanica', null=True, blank=True)
 
+    campos_contadores = ('id_vehiculos_id',)
+    mensajes_integridad = [
+        ('licencia_conduccion', 'licencia_conduccion', 'Esta licencia ya está registrada'),
+        ('Vehiculos_id_vehiculos', 'id_vehiculos', 'El vehículo no existe'),
+    ]
+
     def clean(self):
         """Valida los campos del modelo antes de guardar."""
         super().clean()
@@ -211,15 +363,8 @@ class Conductor(models.Model):
             raise ValidationError({'nombre': 'El nombre es requerido'})
         if not self.licencia_conduccion:
             raise ValidationError({'licencia_conduccion': 'La licencia de conducción es requerida'})
-        if not self.id_vehiculos:
+        if self.id_vehiculos_id is None:
             raise ValidationError({'id_vehiculos': 'El vehículo es requerido'})
-        if Conductor.objects.filter(licencia_conduccion=self.licencia_conduccion).exclude(pk=self.pk).exists():
-            raise ValidationError({'licencia_conduccion': 'Esta licencia ya está registrada'})
-
-    def save(self, *args, **kwargs):
-        """Guarda el modelo después de validar los campos."""
-        self.full_clean()
-        super().save(*args, **kwargs)
 
     def __str__(self):
         """Retorna el nombre del conductor como representación en string."""
@@ -232,7 +377,59 @@ class Conductor(models.Model):
         verbose_name_plural = 'Conductores'
 
 
-class Ruta(models.Model):
+class VencimientoDocumento(models.Model):
+    """
+    Calendario de vencimientos de los documentos de los conductores.
+
+    Una fila por conductor y documento con fecha de vencimiento, mantenida
+    al guardar el conductor (ver signals.py). El índice por fecha permite
+    consultar los vencimientos de un rango sin recorrer la tabla de
+    conductores ni sus tres columnas de fechas.
+
+    Campos:
+        id_vencimiento: Identificador único del vencimiento
+        id_conductor: Conductor dueño del documento
+        documento: Documento que vence (licencia, soat, tecnomecanica)
+        fecha_vencimiento: Fecha de vencimiento del documento
+    """
+    DOCUMENTOS = [
+        ('licencia', 'Licencia de conducción'),
+        ('soat', 'SOAT'),
+        ('tecnomecanica', 'Tecnomecánica'),
+    ]
+
+    # Campo de Conductor del que se toma la fecha de cada documento
+    CAMPOS_CONDUCTOR = {
+        'licencia': 'fecha_vencimiento_licencia',
+        'soat': 'fecha_vencimiento_soat',
+        'tecnomecanica': 'fecha_vencimiento_tecnomecanica',
+    }
+
+    id_vencimiento = models.AutoField(primary_key=True, db_column='id_vencimiento')
+    id_conductor = models.ForeignKey(
+        Conductor, on_delete=models.CASCADE, related_name='vencimientos', db_column='Conductores_id_conductor'
+    )
+    documento = models.CharField(max_length=20, choices=DOCUMENTOS, db_column='documento')
+    fecha_vencimiento = models.DateField(db_column='fecha_vencimiento')
+
+    def __str__(self):
+        """Retorna la descripción del vencimiento como representación en string."""
+        return f"{self.get_documento_display()} de {self.id_conductor_id} - {self.fecha_vencimiento}"
+
+    class Meta:
+        """Metadatos del modelo VencimientoDocumento."""
+        db_table = 'VencimientosDocumentos'
+        verbose_name = 'Vencimiento de Documento'
+        verbose_name_plural = 'Vencimientos de Documentos'
+        constraints = [
+            models.UniqueConstraint(fields=['id_conductor', 'documento'], name='vencimiento_conductor_documento'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha_vencimiento', 'id_conductor'], name='vencimiento_fecha_idx'),
+        ]
+
+
+class Ruta(ContadoresEmpresaMixin, models.Model):
     """
     Modelo para representar rutas en el sistema.
     
@@ -243,6 +440,14 @@ class Ruta(models.Model):
         origen: Punto de origen de la ruta
         destino: Punto de destino de la ruta
         horario: Horario programado de la ruta
+        latitud_origen, longitud_origen: Coordenadas del origen (opcionales)
+        latitud_destino, longitud_destino: Coordenadas del destino (opcionales)
+        distancia_km: Distancia en línea recta entre origen y destino,
+            calculada al guardar cuando hay coordenadas
+        duracion_minutos: Duración del recorrido (opcional; el planificador
+            la estima con distancia_km si falta)
+        origen_normalizado, destino_normalizado: Origen y destino en
+            minúsculas y sin tildes, para la búsqueda (ver utils.busqueda_rutas)
     """
     id_ruta = models.AutoField(primary_key=True, db_column='id_ruta')
     id_vehiculos = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, db_column='Vehiculos_id_vehiculos')
@@ -250,6 +455,29 @@ class Ruta(models.Model):
     origen = models.CharField(max_length=100, db_column='origen')         
     destino = models.CharField(max_length=100, db_column='destino')         
     horario = models.TimeField(db_column='horario')
+    latitud_origen = models.FloatField(db_column='latitud_origen', null=True, blank=True)
+    longitud_origen = models.FloatField(db_column='longitud_origen', null=True, blank=True)
+    latitud_destino = models.FloatField(db_column='latitud_destino', null=True, blank=True)
+    longitud_destino = models.FloatField(db_column='longitud_destino', null=True, blank=True)
+    distancia_km = models.FloatField(db_column='distancia_km', null=True, blank=True)
+    duracion_minutos = models.PositiveIntegerField(db_column='duracion_minutos', null=True, blank=True)
+    origen_normalizado = models.CharField(max_length=100, db_column='origen_normalizado', default='', editable=False)
+    destino_normalizado = models.CharField(max_length=100, db_column='destino_normalizado', default='', editable=False)
+
+    campos_contadores = ('id_vehiculos_id',)
+
+    def save(self, *args, **kwargs):
+        """Calcula distancia_km y los campos de búsqueda normalizados antes de guardar."""
+        from .utils.busqueda_rutas import normalizar
+        from .utils.kilometraje import distancias_rutas
+
+        self.distancia_km, = distancias_rutas([self])
+        self.origen_normalizado = normalizar(self.origen)
+        self.destino_normalizado = normalizar(self.destino)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'distancia_km', 'origen_normalizado', 'destino_normalizado'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         """Retorna el nombre de la ruta como representación en string."""
@@ -262,7 +490,7 @@ class Ruta(models.Model):
         verbose_name_plural = 'Rutas'
 
 
-class Calificacion(models.Model):
+class Calificacion(GuardadoConRestriccionesMixin, models.Model):
     """
     Modelo para representar calificaciones de rutas.
     
@@ -281,6 +509,13 @@ class Calificacion(models.Model):
     comentario = models.TextField(db_column='comentario')
     fecha = models.DateField(db_column='fecha', auto_now_add=True)
 
+    mensajes_integridad = [
+        ('calificacion_rango', 'calificacion', 'La calificación debe estar entre 1 y 5'),
+    ]
+    # Las calificaciones nunca validaron sus campos al guardar (el comentario puede
+    # quedar vacío fuera de la API); el rango lo garantiza la restricción
+    validar_campos = False
+
     def __str__(self):
         """Retorna la calificación y el usuario como representación en string."""
         return f"{self.calificacion} - {self.id_usuario}"
@@ -290,6 +525,12 @@ class Calificacion(models.Model):
         db_table = 'Calificaciones'
         verbose_name = 'Calificación'
         verbose_name_plural = 'Calificaciones'
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(calificacion__gte=1, calificacion__lte=5),
+                name='calificacion_rango',
+            ),
+        ]
 
 class Zona(models.Model):
     """
@@ -387,6 +628,10 @@ class Viaje(models.Model):
         verbose_name = 'Viaje'
         verbose_name_plural = 'Viajes'
         ordering = ['-fecha_viaje']
+        indexes = [
+            # Paginación por cursor de los viajes de cada usuario
+            models.Index(fields=['id_usuario', '-fecha_viaje', '-id_viaje'], name='viaje_usuario_fecha_idx'),
+        ]
 
 class RutaFavorita(models.Model):
     """
@@ -414,8 +659,14 @@ class RutaFavorita(models.Model):
         verbose_name_plural = 'Rutas Favoritas'
         unique_together = ['id_usuario', 'id_ruta']
         ordering = ['-fecha_agregada']
+        indexes = [
+            # Paginación por cursor de las favoritas de cada usuario
+            models.Index(
+                fields=['id_usuario', '-fecha_agregada', '-id_ruta_favorita'], name='favorita_usuario_fecha_idx'
+            ),
+        ]
 
-class CalificacionConductor(models.Model):
+class CalificacionConductor(GuardadoConRestriccionesMixin, models.Model):
     """
     Modelo para representar las calificaciones de conductores.
     
@@ -436,6 +687,16 @@ class CalificacionConductor(models.Model):
     comentario = models.TextField(db_column='comentario')
     fecha = models.DateTimeField(db_column='fecha', auto_now_add=True)
 
+    mensajes_integridad = [
+        ('calificacion_conductor_rango', 'calificacion', 'La calificación debe estar entre 1 y 5'),
+        # Restricción de unique_together: SQLite no la nombra; PostgreSQL la termina en _uniq
+        ('UNIQUE constraint failed', '__all__', 'Ya calificaste a este conductor en este viaje'),
+        ('_uniq', '__all__', 'Ya calificaste a este conductor en este viaje'),
+    ]
+    # Las calificaciones nunca validaron sus campos al guardar (el comentario puede
+    # quedar vacío fuera de la API); el rango lo garantiza la restricción
+    validar_campos = False
+
     def __str__(self):
         """Retorna la descripción de la calificación como representación en string."""
         return f"Calificación de {self.id_usuario.nombre} a {self.id_conductor.nombre}: {self.calificacion}"
@@ -447,6 +708,19 @@ class CalificacionConductor(models.Model):
         verbose_name_plural = 'Calificaciones de Conductores'
         unique_together = ['id_viaje', 'id_usuario', 'id_conductor']
         ordering = ['-fecha']
+        indexes = [
+            # Paginación por cursor del listado general y por conductor
+            models.Index(fields=['-fecha', '-id_calificacion_conductor'], name='cal_conductor_fecha_idx'),
+            models.Index(
+                fields=['id_conductor', '-fecha', '-id_calificacion_conductor'], name='cal_conductor_cond_fecha_idx'
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(calificacion__gte=1, calificacion__lte=5),
+                name='calificacion_conductor_rango',
+            ),
+        ]
 
 class EstadisticaEmpresa(models.Model):
     """
@@ -466,7 +740,7 @@ class EstadisticaEmpresa(models.Model):
     """
     id_estadistica = models.AutoField(primary_key=True, db_column='id_estadistica')
     id_empresa = models.IntegerField(db_column='id_empresa')
-    fecha = models.DateField(db_column='fecha', auto_now_add=True)
+    fecha = models.DateField(db_column='fecha', default=timezone.localdate)
     total_viajes = models.IntegerField(db_column='total_viajes', default=0)
     viajes_completados = models.IntegerField(db_column='viajes_completados', default=0)
     viajes_cancelados = models.IntegerField(db_column='viajes_cancelados', default=0)
@@ -487,6 +761,42 @@ class EstadisticaEmpresa(models.Model):
         ordering = ['-fecha']
         unique_together = ['id_empresa', 'fecha']
 
+
+class DisponibilidadEmpresa(models.Model):
+    """
+    Contadores de la flota de cada empresa, mantenidos de forma incremental.
+
+    Las señales de Vehiculo, Conductor y Ruta ajustan la fila de la empresa
+    en la misma transacción que el cambio (ver utils.disponibilidad), así que
+    el dashboard lee una fila en lugar de contar la flota. Las operaciones
+    que no envían señales (update() y bulk_create() sobre querysets, SQL
+    directo) se corrigen con el comando reconciliar_disponibilidad.
+
+    Campos:
+        id_empresa: ID de la empresa
+        total_vehiculos: Número de vehículos de la empresa
+        vehiculos_disponibles: Número de vehículos disponibles
+        total_conductores: Número de conductores asignados a sus vehículos
+        total_rutas: Número de rutas asignadas a sus vehículos
+        fecha_actualizacion: Fecha del último ajuste
+    """
+    id_empresa = models.IntegerField(primary_key=True, db_column='id_empresa')
+    total_vehiculos = models.IntegerField(db_column='total_vehiculos', default=0)
+    vehiculos_disponibles = models.IntegerField(db_column='vehiculos_disponibles', default=0)
+    total_conductores = models.IntegerField(db_column='total_conductores', default=0)
+    total_rutas = models.IntegerField(db_column='total_rutas', default=0)
+    fecha_actualizacion = models.DateTimeField(db_column='fecha_actualizacion', auto_now=True)
+
+    def __str__(self):
+        """Retorna la descripción de los contadores como representación en string."""
+        return f"Disponibilidad de Empresa {self.id_empresa}"
+
+    class Meta:
+        """Metadatos del modelo DisponibilidadEmpresa."""
+        db_table = 'DisponibilidadEmpresas'
+        verbose_name = 'Disponibilidad de Empresa'
+        verbose_name_plural = 'Disponibilidad de Empresas'
+
 class VersionSistema(models.Model):
     """
     Modelo para registrar el historial de versiones y cambios del sistema.
@@ -532,6 +842,38 @@ class VersionSistema(models.Model):
         verbose_name = 'Versión del Sistema'
         verbose_name_plural = 'Versiones del Sistema'
         ordering = ['-fecha_lanzamiento']
+        indexes = [
+            # Paginación por cursor de las versiones
+            models.Index(fields=['-fecha_lanzamiento', '-id_version'], name='version_fecha_idx'),
+        ]
+
+class IntentoLoginQuerySet(models.QuerySet):
+    """
+    QuerySet de IntentoLogin con consultas acotadas por fecha.
+
+    Filtrar siempre por rango de fecha_intento permite que PostgreSQL descarte
+    las particiones mensuales que no intersectan el rango.
+    """
+    def recientes(self, correo_electronico=None, minutos=30):
+        """
+        Retorna los intentos de los últimos `minutos`, opcionalmente de un correo.
+
+        Args:
+            correo_electronico (str): Correo a filtrar, o None para todos
+            minutos (int): Tamaño de la ventana hacia atrás desde ahora
+
+        Returns:
+            QuerySet: Intentos ordenados del más reciente al más antiguo
+        """
+        consulta = self.filter(fecha_intento__gte=timezone.now() - timedelta(minutes=minutos))
+        if correo_electronico is not None:
+            consulta = consulta.filter(correo_electronico=correo_electronico)
+        return consulta.order_by('-fecha_intento')
+
+    def anteriores_a(self, fecha):
+        """Retorna los intentos registrados antes de la fecha dada."""
+        return self.filter(fecha_intento__lt=fecha)
+
 
 class IntentoLogin(models.Model):
     """
@@ -540,7 +882,8 @@ class IntentoLogin(models.Model):
     Campos:
         id_intento: Identificador único del intento
         correo_electronico: Correo electrónico utilizado en el intento
-        fecha_intento: Fecha y hora del intento
+        fecha_intento: Fecha y hora del intento (se asigna al recibir el intento,
+            no al escribir el lote de auditoría)
         ip_address: Dirección IP desde donde se realizó el intento
         exitoso: Indica si el intento fue exitoso
         bloqueado: Indica si la cuenta está bloqueada
@@ -548,12 +891,14 @@ class IntentoLogin(models.Model):
     """
     id_intento = models.AutoField(primary_key=True, db_column='id_intento')
     correo_electronico = models.EmailField(db_column='correo_electronico')
-    fecha_intento = models.DateTimeField(db_column='fecha_intento', auto_now_add=True)
+    fecha_intento = models.DateTimeField(db_column='fecha_intento', default=timezone.now)
     ip_address = models.GenericIPAddressField(db_column='ip_address')
     exito = models.BooleanField(db_column='exito', default=False)
     bloqueado = models.BooleanField(db_column='bloqueado', default=False)
     fecha_desbloqueo = models.DateTimeField(db_column='fecha_desbloqueo', null=True, blank=True)
 
+    objects = IntentoLoginQuerySet.as_manager()
+
     def __str__(self):
         """Retorna la descripción del intento como representación en string."""
         return f"Intento de {self.correo_electronico} - {'Exitoso' if self.exito else 'Fallido'}"
@@ -564,6 +909,10 @@ class IntentoLogin(models.Model):
         verbose_name = 'Intento de Login'
         verbose_name_plural = 'Intentos de Login'
         ordering = ['-fecha_intento']
+        indexes = [
+            # Búsqueda de intentos recientes por correo (ventana de bloqueo)
+            models.Index(fields=['correo_electronico', '-fecha_intento'], name='intento_correo_fecha_idx'),
+        ]
 
 class PQRS(models.Model):
     """
@@ -616,3 +965,195 @@ class PQRS(models.Model):
         verbose_name = 'PQRS'
         verbose_name_plural = 'PQRS'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Paginación por cursor: PQRS del usuario, listado de administración y filtro por estado
+            models.Index(fields=['id_usuario', '-fecha_creacion', '-id_pqrs'], name='pqrs_usuario_fecha_idx'),
+            models.Index(fields=['-fecha_creacion', '-id_pqrs'], name='pqrs_fecha_idx'),
+            models.Index(fields=['estado', '-fecha_creacion', '-id_pqrs'], name='pqrs_estado_fecha_idx'),
+        ]
+
+class ClaveFirma(models.Model):
+    """
+    Modelo para las claves asimétricas con que se firman los tokens JWT.
+
+    Solo la clave activa más reciente firma tokens nuevos; las claves en
+    verificación ya no firman, pero se siguen publicando en el JWKS para
+    validar los tokens que emitieron hasta que expiren.
+
+    Campos:
+        id_clave: Identificador único de la clave
+        kid: Identificador publicado en el encabezado de los tokens y en el JWKS
+        algoritmo: Algoritmo de firma (RS256 o EdDSA)
+        clave_privada: Clave privada en formato PEM (PKCS#8)
+        clave_publica: Clave pública en formato PEM
+        estado: activa, verificacion o retirada
+        fecha_creacion: Fecha de creación de la clave
+        fecha_retiro: Fecha en que la clave dejó de firmar
+    """
+    ALGORITMOS = [
+        ('RS256', 'RSA SHA-256'),
+        ('EdDSA', 'Ed25519'),
+    ]
+
+    ESTADOS = [
+        ('activa', 'Activa'),
+        ('verificacion', 'Solo verificación'),
+        ('retirada', 'Retirada'),
+    ]
+
+    id_clave = models.AutoField(primary_key=True, db_column='id_clave')
+    kid = models.CharField(max_length=64, unique=True, db_column='kid')
+    algoritmo = models.CharField(max_length=10, choices=ALGORITMOS, db_column='algoritmo')
+    clave_privada = models.TextField(db_column='clave_privada')
+    clave_publica = models.TextField(db_column='clave_publica')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='activa', db_column='estado')
+    fecha_creacion = models.DateTimeField(db_column='fecha_creacion', default=timezone.now)
+    fecha_retiro = models.DateTimeField(db_column='fecha_retiro', null=True, blank=True)
+
+    def __str__(self):
+        """Retorna el kid y el algoritmo como representación en string."""
+        return f"{self.kid} ({self.algoritmo}, {self.estado})"
+
+    class Meta:
+        """Metadatos del modelo ClaveFirma."""
+        db_table = 'ClavesFirma'
+        verbose_name = 'Clave de Firma'
+        verbose_name_plural = 'Claves de Firma'
+        ordering = ['-fecha_creacion']
+
+class CorreoPendiente(models.Model):
+    """
+    Modelo para la bandeja de salida de correos.
+
+    Las vistas registran aquí los correos dentro de la misma transacción que
+    la operación que los origina; el comando procesar_correos los envía en
+    segundo plano.
+
+    Campos:
+        id_correo: Identificador único del correo
+        destinatario: Correo electrónico del destinatario
+        remitente: Correo electrónico del remitente
+        asunto: Asunto del correo
+        mensaje: Cuerpo del correo en texto plano
+        estado: pendiente, enviado o fallido
+        intentos: Número de intentos de envío realizados
+        proximo_intento: Fecha a partir de la cual puede intentarse el envío
+        fecha_creacion: Fecha en que se registró el correo
+        fecha_envio: Fecha en que se envió el correo
+        ultimo_error: Mensaje del último error de envío
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    id_correo = models.AutoField(primary_key=True, db_column='id_correo')
+    destinatario = models.EmailField(db_column='destinatario')
+    remitente = models.CharField(max_length=254, db_column='remitente')
+    asunto = models.CharField(max_length=255, db_column='asunto')
+    mensaje = models.TextField(db_column='mensaje')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', db_column='estado')
+    intentos = models.PositiveIntegerField(default=0, db_column='intentos')
+    proximo_intento = models.DateTimeField(default=timezone.now, db_column='proximo_intento')
+    fecha_creacion = models.DateTimeField(default=timezone.now, db_column='fecha_creacion')
+    fecha_envio = models.DateTimeField(null=True, blank=True, db_column='fecha_envio')
+    ultimo_error = models.TextField(blank=True, default='', db_column='ultimo_error')
+
+    def __str__(self):
+        """Retorna el asunto y el destinatario como representación en string."""
+        return f"{self.asunto} -> {self.destinatario} ({self.estado})"
+
+    class Meta:
+        """Metadatos del modelo CorreoPendiente."""
+        db_table = 'CorreosPendientes'
+        verbose_name = 'Correo Pendiente'
+        verbose_name_plural = 'Correos Pendientes'
+        ordering = ['proximo_intento']
+        indexes = [
+            # Selección de los correos listos para enviar
+            models.Index(fields=['estado', 'proximo_intento'], name='correo_estado_proximo_idx'),
+        ]
+
+
+class SegmentoTelemetria(models.Model):
+    """
+    Tramo de posiciones GPS consecutivas de un vehículo.
+
+    Las posiciones no se guardan una por fila: cada segmento agrupa las que
+    llegaron en un mismo lote de escritura, en columnas binarias empaquetadas
+    (tiempos en int64, coordenadas y velocidad en float32; ver
+    utils.telemetria). Un segmento de cien posiciones ocupa unos 1.6 KB y
+    una sola fila del índice.
+
+    Campos:
+        id_segmento: Identificador único del segmento
+        id_vehiculos: Vehículo al que pertenecen las posiciones
+        inicio: Fecha de la primera posición
+        fin: Fecha de la última posición
+        cantidad: Número de posiciones
+        distancia_km: Longitud del recorrido dentro del segmento
+        tiempos: Milisegundos desde la época de cada posición (int64)
+        latitudes: Latitudes (float32)
+        longitudes: Longitudes (float32)
+        velocidades: Velocidades en km/h, NaN si se desconoce (float32)
+    """
+    id_segmento = models.BigAutoField(primary_key=True, db_column='id_segmento')
+    id_vehiculos = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, db_column='Vehiculos_id_vehiculos')
+    inicio = models.DateTimeField(db_column='inicio')
+    fin = models.DateTimeField(db_column='fin')
+    cantidad = models.PositiveIntegerField(db_column='cantidad')
+    distancia_km = models.FloatField(db_column='distancia_km', default=0)
+    tiempos = models.BinaryField(db_column='tiempos')
+    latitudes = models.BinaryField(db_column='latitudes')
+    longitudes = models.BinaryField(db_column='longitudes')
+    velocidades = models.BinaryField(db_column='velocidades')
+
+    @classmethod
+    def desde_posiciones(cls, id_vehiculos, posiciones):
+        """
+        Crea un segmento (sin guardar) a partir de posiciones en cualquier orden.
+
+        Args:
+            id_vehiculos (int): ID del vehículo
+            posiciones (list): Tuplas (tiempo_ms, latitud, longitud, velocidad)
+        """
+        from .utils import kilometraje, telemetria
+
+        tiempos, latitudes, longitudes, velocidades = zip(*sorted(posiciones))
+        return cls(
+            id_vehiculos_id=id_vehiculos,
+            inicio=telemetria.fecha_desde_ms(tiempos[0]),
+            fin=telemetria.fecha_desde_ms(tiempos[-1]),
+            cantidad=len(tiempos),
+            distancia_km=kilometraje.longitud_km(latitudes, longitudes),
+            tiempos=telemetria.empaquetar(telemetria.TIPO_TIEMPO, tiempos),
+            latitudes=telemetria.empaquetar(telemetria.TIPO_VALOR, latitudes),
+            longitudes=telemetria.empaquetar(telemetria.TIPO_VALOR, longitudes),
+            velocidades=telemetria.empaquetar(telemetria.TIPO_VALOR, velocidades),
+        )
+
+    def posiciones(self):
+        """Retorna las posiciones del segmento como tuplas (tiempo_ms, latitud, longitud, velocidad)."""
+        from .utils import telemetria
+
+        return list(zip(
+            telemetria.desempaquetar(telemetria.TIPO_TIEMPO, self.tiempos),
+            telemetria.desempaquetar(telemetria.TIPO_VALOR, self.latitudes),
+            telemetria.desempaquetar(telemetria.TIPO_VALOR, self.longitudes),
+            telemetria.desempaquetar(telemetria.TIPO_VALOR, self.velocidades),
+        ))
+
+    def __str__(self):
+        """Retorna la descripción del segmento como representación en string."""
+        return f"Segmento de {self.id_vehiculos_id}: {self.cantidad} posiciones desde {self.inicio}"
+
+    class Meta:
+        """Metadatos del modelo SegmentoTelemetria."""
+        db_table = 'SegmentosTelemetria'
+        verbose_name = 'Segmento de Telemetría'
+        verbose_name_plural = 'Segmentos de Telemetría'
+        indexes = [
+            models.Index(fields=['id_vehiculos', 'inicio'], name='segmento_vehiculo_inicio_idx'),
+            models.Index(fields=['id_vehiculos', '-fin'], name='segmento_vehiculo_fin_idx'),
+        ]
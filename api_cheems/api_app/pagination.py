@@ -0,0 +1,146 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, LimitOffsetPagination
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Paginación por cursor (keyset) ordenada según el propio queryset.
+
+    El orden se toma, en este orden de prioridad, del atributo `ordering` de
+    la vista, del order_by explícito del queryset o del Meta.ordering del
+    modelo; si no hay ninguno se ordena por llave primaria. Se agrega la
+    llave primaria como desempate para que el orden sea total.
+
+    A diferencia de CursorPagination, que solo filtra por el primer campo
+    del orden y salta con un desplazamiento los empates (hasta
+    offset_cutoff), la posición del cursor guarda los valores de todos los
+    campos del orden y cada página continúa con una comparación compuesta
+    (a > x) OR (a = x AND pk > y). Así su costo no depende de la
+    profundidad ni de cuántas filas comparten el primer valor, y los
+    registros insertados mientras el cliente pagina no desplazan ni repiten
+    filas. Los campos del orden no deben admitir nulos.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        orden = getattr(view, 'ordering', None) or queryset.query.order_by or queryset.model._meta.ordering or ['pk']
+        orden = [orden] if isinstance(orden, str) else list(orden)
+        nombres_pk = {'pk', queryset.model._meta.pk.name}
+        if not any(campo.lstrip('-') in nombres_pk for campo in orden):
+            orden.append('-pk' if orden[0].startswith('-') else 'pk')
+        return tuple(orden)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, posicion = 0, False, None
+        else:
+            offset, reverse, posicion = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*(
+                campo[1:] if campo.startswith('-') else f'-{campo}' for campo in self.ordering
+            ))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if posicion is not None:
+            queryset = queryset.filter(self._filtro_posicion(posicion, reverse))
+
+        # Con posiciones únicas los enlaces no llevan desplazamiento; se
+        # respeta el de los cursores emitidos por CursorPagination
+        try:
+            resultados = list(queryset[offset:offset + self.page_size + 1])
+        except (ValidationError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        self.page = resultados[:self.page_size]
+        siguiente = (
+            self._get_position_from_instance(resultados[-1], self.ordering)
+            if len(resultados) > len(self.page) else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = posicion is not None or offset > 0
+            self.has_previous = siguiente is not None
+            self.next_position, self.previous_position = posicion, siguiente
+        else:
+            self.has_next = siguiente is not None
+            self.has_previous = posicion is not None or offset > 0
+            self.next_position, self.previous_position = siguiente, posicion
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _filtro_posicion(self, posicion, reverse):
+        """Filtro de las filas posteriores a la posición en el sentido de la página."""
+        try:
+            valores = json.loads(posicion)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(valores, list) or len(valores) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        filtro = Q()
+        iguales = Q()
+        for campo, valor in zip(self.ordering, valores):
+            nombre = campo.lstrip('-')
+            operador = 'lt' if reverse != campo.startswith('-') else 'gt'
+            filtro |= iguales & Q(**{f'{nombre}__{operador}': valor})
+            iguales &= Q(**{nombre: valor})
+        return filtro
+
+    def _get_position_from_instance(self, instance, ordering):
+        valores = []
+        for campo in ordering:
+            nombre = campo.lstrip('-')
+            valor = instance[nombre] if isinstance(instance, dict) else instance.serializable_value(nombre)
+            valores.append(str(valor))
+        return json.dumps(valores, separators=(',', ':'))
+
+
+class PaginacionHibrida(BasePagination):
+    """
+    Paginación por cursor con opción de paginación por desplazamiento.
+
+    Por defecto se pagina por cursor (ver PaginacionCursor): la respuesta
+    tiene next, previous y results. Los clientes que necesitan saltar a una
+    posición o conocer el total pueden enviar ?offset= (y opcionalmente
+    ?limit=) para usar LimitOffsetPagination, cuya respuesta agrega count.
+    """
+
+    def __init__(self):
+        self._delegado = PaginacionCursor()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if LimitOffsetPagination.offset_query_param in request.query_params:
+            self._delegado = LimitOffsetPagination()
+            self._delegado.max_limit = PaginacionCursor.max_page_size
+        return self._delegado.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self._delegado.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self._delegado.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            PaginacionCursor().get_schema_operation_parameters(view)
+            + LimitOffsetPagination().get_schema_operation_parameters(view)
+        )
+
+    def to_html(self):
+        return self._delegado.to_html()
@@ -0,0 +1,34 @@
+from rest_framework.permissions import BasePermission
+
+
+class EsStaff(BasePermission):
+    """
+    Permite el acceso solo a usuarios del staff.
+
+    Equivale a IsAdminUser, pero funciona igual con Usuario y con UsuarioToken
+    porque solo lee el atributo is_staff (claim del token o columna del modelo).
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_staff)
+
+
+class TieneRol(BasePermission):
+    """
+    Permite el acceso a los usuarios cuyo rol está en `roles_permitidos`.
+
+    Se usa creando una subclase o con TieneRol.de('Administrador', ...).
+    """
+    roles_permitidos = ()
+
+    @classmethod
+    def de(cls, *roles):
+        """Retorna una clase de permiso para los roles indicados."""
+        return type(f'TieneRol({", ".join(roles)})', (cls,), {'roles_permitidos': roles})
+
+    def has_permission(self, request, view):
+        usuario = request.user
+        return bool(
+            usuario and usuario.is_authenticated
+            and getattr(usuario, 'rol_nombre', None) in self.roles_permitidos
+        )
@@ -1,8 +1,154 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
-from .models import Usuario, Vehiculo, Conductor, Ruta, Calificacion, Zona, Tarifa, Rol, Viaje, RutaFavorita, CalificacionConductor, EstadisticaEmpresa, VersionSistema, IntentoLogin, PQRS
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .models import Usuario, Vehiculo, Conductor, Ruta, Calificacion, Zona, Tarifa, Rol, Viaje, RutaFavorita, CalificacionConductor, EstadisticaEmpresa, VencimientoDocumento, VersionSistema, IntentoLogin, PQRS
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .authentication import CLAIM_VERSION, RefreshTokenFiltrado, version_autenticacion
 
-class RolSerializer(serializers.ModelSerializer):
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _arbol(valor):
+    """
+    Convierte una lista separada por comas de rutas con puntos en un árbol.
+
+    Ejemplo: 'id_viaje,viaje_detalle.ruta_detalle' ->
+    {'id_viaje': {}, 'viaje_detalle': {'ruta_detalle': {}}}
+    """
+    arbol = {}
+    for ruta in (valor or '').split(','):
+        nodo = arbol
+        for parte in filter(None, (p.strip() for p in ruta.split('.'))):
+            nodo = nodo.setdefault(parte, {})
+    return arbol
+
+
+class CamposDinamicosMixin:
+    """
+    Permite elegir los campos de la respuesta con ?fields= y ?expand=.
+
+    - fields: lista separada por comas de los campos a incluir; los campos
+      de un serializador anidado se indican con punto (ruta_detalle.origen).
+      Solo se aplica en lecturas, para no omitir campos en las escrituras.
+    - expand: campos anidados listados en Meta.expandibles que deben
+      incluirse; por defecto se omiten. Nombrar un campo expandible en
+      fields también lo incluye.
+
+    La consulta se ajusta a los campos solicitados con optimizar_queryset
+    (lo aplica CamposSolicitadosFilter a todas las vistas genéricas).
+    """
+
+    def _solicitud(self):
+        """
+        Retorna (campos, expandir) para este serializador.
+
+        campos es None si se incluyen todos; si no, un árbol de nombres.
+        El serializador raíz los lee de la solicitud; los anidados, del
+        subárbol que les corresponde en el serializador padre.
+        """
+        if hasattr(self, '_solicitud_cache'):
+            return self._solicitud_cache
+
+        padre, nombre = self.parent, self.field_name
+        if isinstance(padre, serializers.ListSerializer):
+            padre, nombre = padre.parent, padre.field_name
+        if padre is None:
+            request = self.context.get('request')
+            parametros = request.query_params if request is not None else {}
+            campos = None
+            if request is not None and request.method in METODOS_LECTURA and parametros.get('fields'):
+                campos = _arbol(parametros['fields'])
+            resultado = (campos, _arbol(parametros.get('expand')))
+        elif isinstance(padre, CamposDinamicosMixin):
+            campos_padre, expandir_padre = padre._solicitud()
+            subcampos = (campos_padre or {}).get(nombre) or None
+            resultado = (subcampos, expandir_padre.get(nombre, {}))
+        else:
+            resultado = (None, {})
+        self._solicitud_cache = resultado
+        return resultado
+
+    def get_fields(self):
+        campos = super().get_fields()
+        solicitados, expandir = self._solicitud()
+        for nombre in getattr(self.Meta, 'expandibles', ()):
+            if nombre not in expandir and nombre not in (solicitados or {}):
+                campos.pop(nombre, None)
+        if solicitados is not None:
+            for nombre in list(campos):
+                if nombre not in solicitados:
+                    campos.pop(nombre)
+        return campos
+
+    def optimizar_queryset(self, queryset):
+        """
+        Ajusta select_related, prefetch_related y only() a los campos que
+        este serializador va a leer.
+
+        Si algún campo no puede resolverse a columnas (por ejemplo un
+        SerializerMethodField o una propiedad del modelo) no se aplica only()
+        y se cargan todas las columnas; las relaciones se siguen agregando.
+
+        Args:
+            queryset (QuerySet): Consulta del modelo de Meta.model
+
+        Returns:
+            QuerySet: Consulta ajustada
+        """
+        seleccion, precarga, columnas = set(), set(), set()
+        completo = self._recolectar(queryset.model, '', seleccion, precarga, columnas)
+        if not completo:
+            return queryset.select_related(*seleccion).prefetch_related(*precarga)
+
+        # El orden de la consulta y el cursor de paginación leen estos campos;
+        # las anotaciones (p. ej. una relevancia) no son columnas del modelo
+        for campo in queryset.query.order_by or queryset.model._meta.ordering:
+            if isinstance(campo, str) and '__' not in campo and campo.lstrip('-') not in queryset.query.annotations:
+                columnas.add(campo.lstrip('-'))
+        return (
+            queryset.select_related(None).select_related(*seleccion)
+            .prefetch_related(None).prefetch_related(*precarga)
+            .only(*columnas)
+        )
+
+    def _recolectar(self, modelo, prefijo, seleccion, precarga, columnas):
+        """Recorre los campos legibles; retorna False si alguno no se resolvió."""
+        completo = True
+        for campo in self.fields.values():
+            if campo.write_only:
+                continue
+            if campo.source == '*':
+                completo = False
+                continue
+            partes = campo.source.split('.')
+            actual, ruta = modelo, prefijo
+            try:
+                for parte in partes[:-1]:
+                    relacion = actual._meta.get_field(parte)
+                    if not (relacion.many_to_one or relacion.one_to_one) or not relacion.concrete:
+                        raise FieldDoesNotExist(parte)
+                    columnas.add(ruta + parte)
+                    ruta = f'{ruta}{parte}__'
+                    seleccion.add(ruta[:-2])
+                    actual = relacion.related_model
+                final = actual._meta.get_field(partes[-1])
+            except FieldDoesNotExist:
+                completo = False
+                continue
+
+            if final.many_to_many or final.one_to_many or not final.concrete:
+                precarga.add(ruta + partes[-1])
+                continue
+            columnas.add(ruta + partes[-1])
+            hijo = campo.child if isinstance(campo, serializers.ListSerializer) else campo
+            if isinstance(hijo, CamposDinamicosMixin) and final.is_relation:
+                seleccion.add(ruta + partes[-1])
+                completo &= hijo._recolectar(
+                    final.related_model, f'{ruta}{partes[-1]}__', seleccion, precarga, columnas
+                )
+        return completo
+
+
+class RolSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Rol.
     
@@ -19,7 +165,7 @@ class RolSerializer(serializers.ModelSerializer):
         fields = ['id_rol', 'nombre', 'descripcion']
         read_only_fields = ['id_rol']
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Usuario.
     
@@ -70,6 +216,10 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     
     El mapeo se realiza en el método to_internal_value para asegurar que el campo
     password esté disponible antes de la validación.
+
+    La autenticación la resuelve CorreoElectronicoBackend, que carga el usuario
+    una sola vez y responde igual (y en el mismo tiempo) a un correo
+    inexistente que a una contraseña incorrecta.
     
     Campos esperados:
         correo_electronico: Correo electrónico del usuario
@@ -96,13 +246,32 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             data['password'] = data.pop('contrasena')
         return super().to_internal_value(data)
 
-    def validate(self, attrs):
-        correo_electronico = attrs.get('correo_electronico')
-        if not Usuario.objects.filter(correo_electronico=correo_electronico).exists():
-            raise serializers.ValidationError({'correo_electronico': 'Usuario no encontrado'})
-        return super().validate(attrs)
+    @classmethod
+    def get_token(cls, user):
+        """
+        Agrega al token los claims de autorización del usuario.
 
-class VehiculoSerializer(serializers.ModelSerializer):
+        rol, is_staff e is_superuser permiten autorizar lecturas sin consultar
+        el usuario (ver JWTAutenticacionPorClaims); version_auth invalida esos
+        claims cuando el usuario cambia antes de que el token expire.
+        """
+        token = super().get_token(user)
+        token['rol'] = user.rol_nombre
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token[CLAIM_VERSION] = version_autenticacion(user.pk)
+        return token
+
+class TokenRefreshConFiltroSerializer(TokenRefreshSerializer):
+    """
+    Serializador para renovar el token de acceso.
+
+    Igual al de simplejwt, pero la verificación de lista negra del refresh
+    token se resuelve con el filtro de tokens revocados en memoria.
+    """
+    token_class = RefreshTokenFiltrado
+
+class VehiculoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Vehiculo.
     
@@ -120,7 +289,7 @@ class VehiculoSerializer(serializers.ModelSerializer):
         fields = ['id_vehiculos', 'placa', 'empresa', 'disponibilidad']
         read_only_fields = ['id_vehiculos']
 
-class ConductorSerializer(serializers.ModelSerializer):
+class ConductorSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Conductor.
     
@@ -138,7 +307,35 @@ class ConductorSerializer(serializers.ModelSerializer):
         fields = ['id_conductor', 'id_vehiculos', 'nombre', 'licencia_conduccion']
         read_only_fields = ['id_conductor']
 
-class RutaSerializer(serializers.ModelSerializer):
+class VencimientoDocumentoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    """
+    Serializador para el modelo VencimientoDocumento.
+
+    Incluye el nombre y el vehículo del conductor y los días que faltan para
+    el vencimiento, contados desde la fecha 'hoy' del contexto.
+
+    Campos:
+        id_conductor: Conductor dueño del documento
+        conductor_nombre: Nombre del conductor
+        id_vehiculos: Vehículo asignado al conductor
+        documento: Documento que vence
+        fecha_vencimiento: Fecha de vencimiento
+        dias_restantes: Días que faltan para el vencimiento
+    """
+    conductor_nombre = serializers.CharField(source='id_conductor.nombre', read_only=True)
+    id_vehiculos = serializers.IntegerField(source='id_conductor.id_vehiculos_id', read_only=True)
+    dias_restantes = serializers.SerializerMethodField()
+
+    class Meta:
+        model = VencimientoDocumento
+        fields = ['id_conductor', 'conductor_nombre', 'id_vehiculos', 'documento', 'fecha_vencimiento', 'dias_restantes']
+        read_only_fields = fields
+
+    def get_dias_restantes(self, obj):
+        """Días entre la fecha de referencia del contexto y el vencimiento."""
+        return (obj.fecha_vencimiento - self.context['hoy']).days
+
+class RutaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Ruta.
     
@@ -152,13 +349,25 @@ class RutaSerializer(serializers.ModelSerializer):
         origen: Punto de origen
         destino: Punto de destino
         horario: Horario programado
+        latitud_origen, longitud_origen: Coordenadas del origen
+        latitud_destino, longitud_destino: Coordenadas del destino
+        distancia_km: Distancia calculada entre origen y destino
+        duracion_minutos: Duración del recorrido
     """
     class Meta:
         model = Ruta
-        fields = ['id_ruta', 'id_vehiculos', 'nombre_ruta', 'origen', 'destino', 'horario']
-        read_only_fields = ['id_ruta']
+        fields = ['id_ruta', 'id_vehiculos', 'nombre_ruta', 'origen', 'destino', 'horario',
+                 'latitud_origen', 'longitud_origen', 'latitud_destino', 'longitud_destino', 'distancia_km',
+                 'duracion_minutos']
+        read_only_fields = ['id_ruta', 'distancia_km']
+        extra_kwargs = {
+            'latitud_origen': {'min_value': -90, 'max_value': 90},
+            'latitud_destino': {'min_value': -90, 'max_value': 90},
+            'longitud_origen': {'min_value': -180, 'max_value': 180},
+            'longitud_destino': {'min_value': -180, 'max_value': 180},
+        }
 
-class CalificacionSerializer(serializers.ModelSerializer):
+class CalificacionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Calificacion.
     
@@ -195,7 +404,7 @@ class CalificacionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("La calificación debe estar entre 1 y 5")
         return value
 
-class ZonaSerializer(serializers.ModelSerializer):
+class ZonaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Zona.
     
@@ -213,7 +422,7 @@ class ZonaSerializer(serializers.ModelSerializer):
         fields = ['id_zona', 'nombre', 'descripcion', 'activa']
         read_only_fields = ['id_zona']
 
-class TarifaSerializer(serializers.ModelSerializer):
+class TarifaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Tarifa.
     
@@ -257,7 +466,7 @@ class TarifaSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("La zona de origen y destino no pueden ser la misma")
         return data
 
-class ViajeSerializer(serializers.ModelSerializer):
+class ViajeSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Viaje.
     
@@ -274,6 +483,9 @@ class ViajeSerializer(serializers.ModelSerializer):
         calificacion: Referencia a la calificación del viaje
         ruta_detalle: Detalles de la ruta (nombre, origen, destino, horario)
         usuario_nombre: Nombre del pasajero
+        calificacion_detalle: Detalles de la calificación
+
+    ruta_detalle y calificacion_detalle solo se incluyen con ?expand=.
     """
     ruta_detalle = RutaSerializer(source='id_ruta', read_only=True)
     usuario_nombre = serializers.CharField(source='id_usuario.nombre', read_only=True)
@@ -285,8 +497,9 @@ class ViajeSerializer(serializers.ModelSerializer):
                  'precio_final', 'calificacion', 'ruta_detalle', 'usuario_nombre',
                  'calificacion_detalle']
         read_only_fields = ['id_viaje', 'fecha_viaje', 'calificacion']
+        expandibles = ['ruta_detalle', 'calificacion_detalle']
 
-class RutaFavoritaSerializer(serializers.ModelSerializer):
+class RutaFavoritaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo RutaFavorita.
     
@@ -300,6 +513,8 @@ class RutaFavoritaSerializer(serializers.ModelSerializer):
         fecha_agregada: Fecha en que se marcó la ruta como favorita
         ruta_detalle: Detalles de la ruta (nombre, origen, destino, horario)
         usuario_nombre: Nombre del usuario
+
+    ruta_detalle solo se incluye con ?expand=ruta_detalle.
     """
     ruta_detalle = RutaSerializer(source='id_ruta', read_only=True)
     usuario_nombre = serializers.CharField(source='id_usuario.nombre', read_only=True)
@@ -309,8 +524,9 @@ class RutaFavoritaSerializer(serializers.ModelSerializer):
         fields = ['id_ruta_favorita', 'id_usuario', 'id_ruta', 'fecha_agregada', 
                  'ruta_detalle', 'usuario_nombre']
         read_only_fields = ['id_ruta_favorita', 'fecha_agregada', 'id_usuario']
+        expandibles = ['ruta_detalle']
 
-class CalificacionConductorSerializer(serializers.ModelSerializer):
+class CalificacionConductorSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo CalificacionConductor.
     
@@ -328,6 +544,9 @@ class CalificacionConductorSerializer(serializers.ModelSerializer):
         viaje_detalle: Detalles del viaje
         usuario_nombre: Nombre del pasajero
         conductor_nombre: Nombre del conductor
+
+    viaje_detalle solo se incluye con ?expand=viaje_detalle; sus propios
+    detalles se expanden con ?expand=viaje_detalle.ruta_detalle.
     """
     viaje_detalle = ViajeSerializer(source='id_viaje', read_only=True)
     usuario_nombre = serializers.CharField(source='id_usuario.nombre', read_only=True)
@@ -339,6 +558,7 @@ class CalificacionConductorSerializer(serializers.ModelSerializer):
                  'calificacion', 'comentario', 'fecha', 'viaje_detalle', 'usuario_nombre',
                  'conductor_nombre']
         read_only_fields = ['id_calificacion_conductor', 'fecha', 'id_usuario']
+        expandibles = ['viaje_detalle']
 
     def validate_calificacion(self, value):
         """
@@ -357,7 +577,7 @@ class CalificacionConductorSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("La calificación debe estar entre 1 y 5")
         return value
 
-class EstadisticaEmpresaSerializer(serializers.ModelSerializer):
+class EstadisticaEmpresaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo EstadisticaEmpresa.
     
@@ -367,7 +587,7 @@ class EstadisticaEmpresaSerializer(serializers.ModelSerializer):
     Campos:
         id_estadistica: Identificador único de la estadística
         id_empresa: ID de la empresa
-        fecha: Fecha de la estadística
+        fecha: Fecha de la estadística (por defecto, la fecha local)
         total_viajes: Número total de viajes
         viajes_completados: Número de viajes completados
         viajes_cancelados: Número de viajes cancelados
@@ -381,7 +601,7 @@ class EstadisticaEmpresaSerializer(serializers.ModelSerializer):
         fields = ['id_estadistica', 'id_empresa', 'fecha', 'total_viajes',
                  'viajes_completados', 'viajes_cancelados', 'ingresos_totales',
                  'calificacion_promedio', 'pasajeros_transportados', 'kilometros_recorridos']
-        read_only_fields = ['id_estadistica', 'fecha']
+        read_only_fields = ['id_estadistica']
 
     def validate(self, data):
         """
@@ -400,7 +620,7 @@ class EstadisticaEmpresaSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("La suma de viajes completados y cancelados no puede ser mayor al total de viajes")
         return data
 
-class VersionSistemaSerializer(serializers.ModelSerializer):
+class VersionSistemaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo VersionSistema.
     
@@ -471,7 +691,7 @@ class VersionSistemaSerializer(serializers.ModelSerializer):
                 )
         return value
 
-class IntentoLoginSerializer(serializers.ModelSerializer):
+class IntentoLoginSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo IntentoLogin.
     
@@ -493,7 +713,7 @@ class IntentoLoginSerializer(serializers.ModelSerializer):
                  'exito', 'bloqueado', 'fecha_desbloqueo']
         read_only_fields = ['id_intento', 'fecha_intento', 'bloqueado', 'fecha_desbloqueo']
 
-class PQRSSerializer(serializers.ModelSerializer):
+class PQRSSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo PQRS.
     
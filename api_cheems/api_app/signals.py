@@ -0,0 +1,131 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import ESPACIO_USUARIOS, descartar_usuario_local
+from .models import Conductor, Rol, Ruta, Usuario, Vehiculo
+from .utils import autocompletado, busqueda_rutas, disponibilidad, horarios, planificador, telemetria, vencimientos
+from .utils.revocacion import anunciar_revocacion
+from .utils.versiones import incrementar_version
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_usuario(sender, instance, **kwargs):
+    """Invalida las copias en caché del usuario en todos los procesos."""
+    incrementar_version(ESPACIO_USUARIOS, instance.pk)
+    descartar_usuario_local(instance.pk)
+
+
+@receiver(post_save, sender=Rol)
+@receiver(post_delete, sender=Rol)
+def invalidar_usuarios_por_rol(sender, instance, **kwargs):
+    """Un cambio de rol afecta a los usuarios en caché que lo tienen cargado."""
+    incrementar_version(ESPACIO_USUARIOS)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def registrar_revocacion(sender, instance, created, **kwargs):
+    """
+    Agrega el token revocado al filtro del proceso y avisa a los demás.
+
+    El proceso local lo agrega de inmediato y no al confirmar la
+    transacción: si esta se revierte, el peor caso es rechazar un token
+    válido hasta la siguiente reconstrucción del filtro. Los demás procesos
+    reciben el aviso también al confirmar (ver anunciar_revocacion).
+    """
+    if created:
+        anunciar_revocacion(instance.token.jti)
+
+
+@receiver(post_save, sender=Vehiculo)
+def contar_vehiculo(sender, instance, created, raw=False, **kwargs):
+    """
+    Ajusta los contadores de la empresa del vehículo guardado.
+
+    Cambiar de empresa mueve también sus conductores y rutas, así que en ese
+    caso (o si no se conocen los valores anteriores) se recalculan las
+    empresas afectadas.
+    """
+    if raw:
+        return
+    anterior = getattr(instance, '_valores_cargados', {})
+    if created:
+        disponibilidad.ajustar(
+            instance.empresa, total_vehiculos=1, vehiculos_disponibles=int(instance.disponibilidad),
+        )
+    elif len(anterior) < len(Vehiculo.campos_contadores) or anterior['empresa'] != instance.empresa:
+        disponibilidad.recalcular({anterior.get('empresa'), instance.empresa} - {None})
+    elif anterior['disponibilidad'] != instance.disponibilidad:
+        disponibilidad.ajustar(instance.empresa, vehiculos_disponibles=1 if instance.disponibilidad else -1)
+    instance._registrar_valores_cargados()
+
+
+@receiver(post_delete, sender=Vehiculo)
+def descontar_vehiculo(sender, instance, **kwargs):
+    """Descuenta el vehículo eliminado; sus conductores y rutas se descuentan en sus propias señales."""
+    disponibilidad.ajustar(
+        instance.empresa, total_vehiculos=-1, vehiculos_disponibles=-int(instance.disponibilidad),
+    )
+    telemetria.olvidar_vehiculo(instance.pk)
+
+
+@receiver(post_save, sender=Conductor)
+@receiver(post_save, sender=Ruta)
+def contar_asignacion(sender, instance, created, raw=False, **kwargs):
+    """Ajusta el contador de conductores o rutas de la empresa del vehículo asignado."""
+    if raw:
+        return
+    contador = 'total_conductores' if sender is Conductor else 'total_rutas'
+    anterior = getattr(instance, '_valores_cargados', {}).get('id_vehiculos_id')
+    if created:
+        disponibilidad.ajustar_por_vehiculo(instance.id_vehiculos_id, **{contador: 1})
+    elif anterior is None:
+        disponibilidad.recalcular(
+            Vehiculo.objects.filter(pk=instance.id_vehiculos_id).values_list('empresa', flat=True)
+        )
+    elif anterior != instance.id_vehiculos_id:
+        disponibilidad.ajustar_por_vehiculo(anterior, **{contador: -1})
+        disponibilidad.ajustar_por_vehiculo(instance.id_vehiculos_id, **{contador: 1})
+    instance._registrar_valores_cargados()
+
+
+@receiver(post_delete, sender=Conductor)
+@receiver(post_delete, sender=Ruta)
+def descontar_asignacion(sender, instance, **kwargs):
+    """
+    Descuenta el conductor o la ruta eliminada.
+
+    En un borrado en cascada desde el vehículo, los dependientes se eliminan
+    antes que él, así que la subconsulta aún encuentra su empresa.
+    """
+    contador = 'total_conductores' if sender is Conductor else 'total_rutas'
+    disponibilidad.ajustar_por_vehiculo(instance.id_vehiculos_id, **{contador: -1})
+
+
+@receiver(post_save, sender=Ruta)
+def indexar_ruta(sender, instance, raw=False, **kwargs):
+    """Actualiza los índices de búsqueda, autocompletado, horarios y viajes con la ruta guardada."""
+    if raw:
+        return
+    busqueda_rutas.indexar(instance)
+    autocompletado.indexar(instance)
+    horarios.invalidar()
+    planificador.registrar_cambio(instance)
+
+
+@receiver(post_delete, sender=Ruta)
+def desindexar_ruta(sender, instance, **kwargs):
+    """Quita la ruta eliminada de los índices de búsqueda, autocompletado, horarios y viajes."""
+    busqueda_rutas.desindexar(instance.pk)
+    autocompletado.desindexar(instance.pk)
+    horarios.invalidar()
+    planificador.registrar_baja(instance.pk)
+
+
+@receiver(post_save, sender=Conductor)
+def sincronizar_vencimientos(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Mantiene el calendario de vencimientos con las fechas del conductor guardado."""
+    if raw:
+        return
+    vencimientos.sincronizar(instance, creado=created, update_fields=update_fields)
@@ -1,11 +1,13 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Usuario, Vehiculo, Conductor, Ruta, Calificacion, Zona, Tarifa, Rol, Viaje, VersionSistema, PQRS
+from .models import Usuario, Vehiculo, Conductor, Ruta, Calificacion, Zona, Tarifa, Rol, Viaje, VersionSistema, PQRS, IntentoLogin, CorreoPendiente, CalificacionConductor, DisponibilidadEmpresa, VencimientoDocumento, SegmentoTelemetria, EstadisticaEmpresa
 from django.utils import timezone
-from datetime import time, date
+from datetime import datetime, time, date, timedelta
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from .utils.auditoria_login import EscritorAuditoriaLogin
 
 
 class UsuarioTests(TestCase):
@@ -94,7 +96,7 @@ class UsuarioTests(TestCase):
         url = reverse('usuario-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)  # superuser + 2 usuarios creados
+        self.assertEqual(len(response.data['results']), 3)  # superuser + 2 usuarios creados
 
     def test_actualizar_usuario(self):
         """
@@ -243,7 +245,7 @@ class VehiculoTests(TestCase):
         url = reverse('vehiculo-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # 2 vehículos creados
+        self.assertEqual(len(response.data['results']), 2)  # 2 vehículos creados
 
     def test_actualizar_vehiculo(self):
         """
@@ -404,7 +406,7 @@ class ConductorTests(TestCase):
         url = reverse('conductor-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # 2 conductores creados
+        self.assertEqual(len(response.data['results']), 2)  # 2 conductores creados
 
     def test_actualizar_conductor(self):
         """
@@ -665,6 +667,27 @@ class RecuperacionContrasenaTests(TestCase):
         response = self.client.post(self.recuperar_url, data)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_restablecer_contrasena(self):
+        """
+        Prueba el restablecimiento de contraseña con un token válido.
+        Verifica que:
+        - Se acepte el token generado para el correo
+        - La nueva contraseña quede guardada con hash
+        """
+        from .utils.token import generar_token
+        token = generar_token('arevaloerik2705@gmail.com')
+        response = self.client.post(f'{self.restablecer_url}?token={token}', {'nueva_contrasena': 'NuevaClave123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.check_password('NuevaClave123'))
+
+    def test_restablecer_contrasena_token_invalido(self):
+        """
+        Prueba el restablecimiento con un token inválido.
+        """
+        response = self.client.post(f'{self.restablecer_url}?token=invalido', {'nueva_contrasena': 'NuevaClave123'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 # Agregar después de las clases existentes
 
 class RolTests(TestCase):
@@ -746,7 +769,7 @@ class ZonaTests(TestCase):
         url = reverse('zona-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_actualizar_zona(self):
         """
@@ -886,7 +909,7 @@ class TarifaTests(TestCase):
         url = reverse('tarifa-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_actualizar_tarifa(self):
         """
@@ -1249,15 +1272,15 @@ class VersionSistemaTests(TestCase):
         url = reverse('version-sistema-list') + '?tipo_cambio=mayor'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['numero_version'], '1.0.0')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['numero_version'], '1.0.0')
 
         # Filtrar por estado
         url = reverse('version-sistema-list') + '?estado=produccion'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['numero_version'], '1.0.1')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['numero_version'], '1.0.1')
 
 class PQRSTests(TestCase):
     """
@@ -1308,6 +1331,7 @@ class PQRSTests(TestCase):
         self.assertEqual(PQRS.objects.count(), 1)
         self.assertEqual(PQRS.objects.get().asunto, 'Solicitud de información')
         self.assertEqual(PQRS.objects.get().estado, 'pendiente')
+        self.assertEqual(CorreoPendiente.objects.get().destinatario, 'usuario@test.com')
 
     def test_validar_tipo_pqrs(self):
         """
@@ -1391,8 +1415,8 @@ class PQRSTests(TestCase):
         url = reverse('pqrs-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['asunto'], 'Test 1')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['asunto'], 'Test 1')
 
     def test_listar_pqrs_admin(self):
         """
@@ -1424,12 +1448,2186 @@ class PQRSTests(TestCase):
         url = reverse('pqrs-admin-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
         # Filtrar por estado
         url = reverse('pqrs-admin-list') + '?estado=pendiente'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['estado'], 'pendiente')
-        
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['estado'], 'pendiente')
+
+
+class BloqueoLoginTests(TestCase):
+    """
+    Suite de pruebas para el bloqueo de inicio de sesión.
+    
+    Esta clase contiene pruebas para:
+    - Conteo de intentos fallidos por correo
+    - Bloqueo de la cuenta tras 5 fallos
+    - Bloqueo por IP
+    - Registro de auditoría en IntentoLogin
+    """
+    def setUp(self):
+        """
+        Configuración inicial para las pruebas de bloqueo.
+        Limpia la caché de contadores y crea un usuario de prueba.
+        """
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('token_obtain_pair')
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico='bloqueo@test.com',
+            contrasena='clave-correcta',
+            nombre='Usuario Bloqueo'
+        )
+
+    def _login(self, contrasena, correo='bloqueo@test.com', ip='10.0.0.1'):
+        return self.client.post(
+            self.url,
+            {'correo_electronico': correo, 'contrasena': contrasena},
+            format='json',
+            REMOTE_ADDR=ip
+        )
+
+    def test_intentos_restantes(self):
+        """
+        Verifica que cada fallo descuente un intento y quede auditado.
+        """
+        response = self._login('incorrecta')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['intentos_restantes'], 4)
+        self.assertEqual(IntentoLogin.objects.filter(exito=False).count(), 1)
+
+    def test_bloqueo_tras_cinco_fallos(self):
+        """
+        Verifica que el quinto fallo bloquee la cuenta incluso con la
+        contraseña correcta en el intento siguiente.
+        """
+        for _ in range(4):
+            self.assertEqual(self._login('incorrecta').status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self._login('incorrecta')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(IntentoLogin.objects.filter(bloqueado=True).exists())
+
+        response = self._login('clave-correcta')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn('Cuenta bloqueada', response.data['error'])
+
+    def test_exito_reinicia_contador(self):
+        """
+        Verifica que un inicio de sesión exitoso reinicie los fallos del correo.
+        """
+        self._login('incorrecta')
+        self.assertEqual(self._login('clave-correcta').status_code, status.HTTP_200_OK)
+        response = self._login('incorrecta')
+        self.assertEqual(response.data['intentos_restantes'], 4)
+        self.assertTrue(IntentoLogin.objects.filter(exito=True).exists())
+
+    def test_bloqueo_por_ip(self):
+        """
+        Verifica que una IP con demasiados fallos quede bloqueada aunque
+        pruebe correos distintos.
+        """
+        with self.settings(LOGIN_MAX_INTENTOS_IP=3, LOGIN_BLOQUEO_MINUTOS=15):
+            for i in range(3):
+                response = self._login('incorrecta', correo=f'otro{i}@test.com', ip='10.0.0.9')
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+            self.assertIn('IP bloqueada por 15 minutos', response.data['error'])
+            self.assertNotIn('Cuenta', response.data['error'])
+
+            response = self._login('clave-correcta', ip='10.0.0.9')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn('IP', response.data['error'])
+        self.assertIn('15 minutos', response.data['error'])
+
+
+class EscritorAuditoriaTests(TestCase):
+    """
+    Suite de pruebas para la escritura por lotes de IntentoLogin.
+
+    Esta clase contiene pruebas para:
+    - Agrupación de registros en un único INSERT por lote
+    - Respaldo en archivo cuando la base de datos falla
+    - Reprocesamiento del archivo de respaldo, incluso tras una interrupción
+    - Vaciado al terminar el proceso registrado una sola vez
+    """
+    def setUp(self):
+        """
+        Crea un escritor asíncrono sin iniciar su hilo; las pruebas
+        llaman a vaciar() directamente.
+        """
+        import tempfile
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.respaldo = f'{self.directorio.name}/intentos.jsonl'
+        self.escritor = EscritorAuditoriaLogin(
+            'pruebas', tamano_lote=3, archivo_respaldo=self.respaldo, sincrono=False
+        )
+        self.escritor._asegurar_hilo = lambda: None
+
+    def _registro(self, i):
+        return {
+            'correo_electronico': f'usuario{i}@test.com',
+            'fecha_intento': timezone.now(),
+            'ip_address': '127.0.0.1',
+            'exito': False,
+            'bloqueado': False,
+            'fecha_desbloqueo': None,
+        }
+
+    def test_escritura_por_lotes(self):
+        """
+        Verifica que los registros se acumulen y se escriban en lotes.
+        """
+        for i in range(4):
+            self.escritor.registrar(self._registro(i))
+        self.assertEqual(IntentoLogin.objects.count(), 0)
+        self.assertEqual(self.escritor.pendientes(), 4)
+
+        with self.assertNumQueries(2):
+            self.escritor.vaciar()
+        self.assertEqual(IntentoLogin.objects.count(), 4)
+        self.assertEqual(self.escritor.pendientes(), 0)
+
+    def test_respaldo_y_reprocesamiento(self):
+        """
+        Verifica que un lote fallido se guarde en el archivo de respaldo
+        y que pueda reprocesarse conservando la fecha del intento.
+        """
+        import os
+        from unittest import mock
+        from django.db import DatabaseError
+
+        registro = self._registro(1)
+        self.escritor.registrar(registro)
+        with mock.patch.object(IntentoLogin.objects, 'bulk_create', side_effect=DatabaseError):
+            self.escritor.vaciar()
+        self.assertEqual(IntentoLogin.objects.count(), 0)
+        self.assertTrue(os.path.exists(self.respaldo))
+
+        self.assertEqual(self.escritor.reprocesar_respaldo(), 1)
+        self.assertFalse(os.path.exists(self.respaldo))
+        intento = IntentoLogin.objects.get()
+        self.assertEqual(intento.correo_electronico, 'usuario1@test.com')
+        self.assertEqual(intento.fecha_intento, registro['fecha_intento'])
+
+    def test_reprocesamiento_interrumpido(self):
+        """
+        Verifica que el archivo de una ejecución interrumpida se reprocese
+        en lugar de sobrescribirse con el respaldo nuevo.
+        """
+        import os
+
+        self.escritor._respaldar([self._registro(1)])
+        os.replace(self.respaldo, f'{self.respaldo}.procesando')
+        self.escritor._respaldar([self._registro(2)])
+
+        self.assertEqual(self.escritor.reprocesar_respaldo(), 2)
+        self.assertFalse(os.path.exists(f'{self.respaldo}.procesando'))
+        self.assertEqual(
+            sorted(IntentoLogin.objects.values_list('correo_electronico', flat=True)),
+            ['usuario1@test.com', 'usuario2@test.com'],
+        )
+
+    def test_vaciado_al_salir_registrado_una_vez(self):
+        """
+        Verifica que reiniciar el hilo no registre de nuevo detener() al salir.
+        """
+        from unittest import mock
+
+        escritor = EscritorAuditoriaLogin('pruebas-hilo', intervalo=0.01, sincrono=False)
+        with mock.patch('api_app.utils.escritor_lotes.atexit.register') as registrar:
+            for _ in range(2):
+                escritor._asegurar_hilo()
+                escritor.detener()
+        registrar.assert_called_once_with(escritor.detener)
+
+
+class RetencionIntentosLoginTests(TestCase):
+    """
+    Suite de pruebas para la consulta acotada y la purga de IntentoLogin.
+
+    Esta clase contiene pruebas para:
+    - Consulta de intentos recientes por correo
+    - Purga por lotes de intentos vencidos
+    """
+    def setUp(self):
+        """
+        Crea intentos recientes y antiguos para dos correos.
+        """
+        ahora = timezone.now()
+        IntentoLogin.objects.bulk_create(
+            [IntentoLogin(correo_electronico='a@test.com', ip_address='127.0.0.1',
+                          fecha_intento=ahora - timedelta(days=200 + i)) for i in range(5)]
+            + [IntentoLogin(correo_electronico='a@test.com', ip_address='127.0.0.1',
+                            fecha_intento=ahora - timedelta(minutes=5)),
+               IntentoLogin(correo_electronico='b@test.com', ip_address='127.0.0.1',
+                            fecha_intento=ahora - timedelta(minutes=10))]
+        )
+
+    def test_intentos_recientes(self):
+        """
+        Verifica que recientes() solo incluya intentos dentro de la ventana.
+        """
+        self.assertEqual(IntentoLogin.objects.recientes('a@test.com').count(), 1)
+        self.assertEqual(IntentoLogin.objects.recientes(minutos=30).count(), 2)
+
+    def test_purgar_por_lotes(self):
+        """
+        Verifica que el comando de purga elimine los intentos vencidos en lotes.
+        """
+        from io import StringIO
+        from django.core.management import call_command
+
+        salida = StringIO()
+        call_command('purgar_intentos_login', dias=90, lote=2, stdout=salida)
+        self.assertIn('5 intentos eliminados', salida.getvalue())
+        self.assertEqual(IntentoLogin.objects.count(), 2)
+
+
+class HashingContrasenaTests(TestCase):
+    """
+    Suite de pruebas para el hashing de contraseñas en el pool de hilos.
+
+    Esta clase contiene pruebas para:
+    - Verificación síncrona y asíncrona
+    - Actualización del hash al iniciar sesión
+    - Comando de medición de hashers
+    """
+    def setUp(self):
+        """
+        Crea un usuario cuyo hash usa un hasher distinto al preferido.
+        """
+        from django.contrib.auth.hashers import make_password
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico='hash@test.com',
+            contrasena='clave-correcta',
+            nombre='Usuario Hash'
+        )
+        Usuario.objects.filter(pk=self.usuario.pk).update(
+            password=make_password('clave-correcta', hasher='pbkdf2_sha1')
+        )
+
+    def test_actualiza_hash_al_iniciar_sesion(self):
+        """
+        Verifica que un inicio de sesión exitoso migre el hash al hasher preferido.
+        """
+        response = APIClient().post(
+            reverse('token_obtain_pair'),
+            {'correo_electronico': 'hash@test.com', 'contrasena': 'clave-correcta'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.password.startswith('pbkdf2_sha256$'))
+
+    def test_verificacion_asincrona(self):
+        """
+        Verifica acheck_password contra contraseñas válidas e inválidas.
+        """
+        from asgiref.sync import async_to_sync
+        self.usuario.refresh_from_db()
+        self.assertFalse(async_to_sync(self.usuario.acheck_password)('incorrecta'))
+        self.assertTrue(async_to_sync(self.usuario.acheck_password)('clave-correcta'))
+        self.assertTrue(self.usuario.password.startswith('pbkdf2_sha256$'))
+
+    def test_benchmark_hashers(self):
+        """
+        Verifica que el comando reporte el hasher preferido con el tamaño de pool indicado o configurado.
+        """
+        from io import StringIO
+        from django.core.management import call_command
+
+        salida = StringIO()
+        call_command('benchmark_hashers', segundos=0.05, hilos=2, stdout=salida)
+        self.assertIn('pbkdf2_sha256 *', salida.getvalue())
+
+        # Sin --hilos se usa el tamaño configurado del pool de hashing
+        salida = StringIO()
+        with self.settings(HASH_MAX_HILOS=3):
+            call_command('benchmark_hashers', segundos=0.05, stdout=salida)
+        self.assertIn('hash/s x3', salida.getvalue())
+
+
+class AutenticacionCorreoTests(TestCase):
+    """
+    Suite de pruebas para el backend de autenticación por correo electrónico.
+
+    Esta clase contiene pruebas para:
+    - Carga del usuario con su rol en una sola consulta
+    - Verificación contra un hash ficticio para correos inexistentes
+    """
+    def setUp(self):
+        """
+        Crea un usuario con rol de pasajero.
+        """
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico='backend@test.com',
+            contrasena='clave-correcta',
+            nombre='Usuario Backend',
+            rol=Rol.objects.get(nombre='Pasajero')
+        )
+
+    def test_una_consulta_por_autenticacion(self):
+        """
+        Verifica que el serializador de login lea el usuario una sola vez.
+        """
+        from .serializers import CustomTokenObtainPairSerializer
+        from .utils.claves_jwt import obtener_conjunto
+        serializer = CustomTokenObtainPairSerializer(
+            data={'correo_electronico': 'backend@test.com', 'contrasena': 'clave-correcta'}
+        )
+        # Las claves de firma se cargan una vez por proceso, no por login
+        obtener_conjunto()
+        # Un SELECT del usuario con su rol y el INSERT del refresh token en la lista negra
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.user.rol.nombre, 'Pasajero')
+
+    def test_correo_inexistente_verifica_hash(self):
+        """
+        Verifica que un correo inexistente también verifique una contraseña,
+        para que el tiempo de respuesta no revele si el correo está registrado.
+        """
+        from unittest import mock
+        from django.contrib.auth import authenticate
+
+        with mock.patch('api_app.backends.hashing.verificar_contrasena') as verificar:
+            with self.assertNumQueries(1):
+                self.assertIsNone(authenticate(correo_electronico='nadie@test.com', password='x'))
+        verificar.assert_called_once()
+
+
+class CacheAutenticacionTests(TestCase):
+    """
+    Suite de pruebas para la caché de usuarios de JWTAuthenticationCacheada.
+
+    Esta clase contiene pruebas para:
+    - Resolución del usuario sin consultar la base de datos
+    - Invalidación al desactivar el usuario o cambiar su contraseña
+    """
+    def setUp(self):
+        """
+        Crea un usuario y configura el cliente con su token de acceso.
+        """
+        from rest_framework_simplejwt.tokens import RefreshToken
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico='cache@test.com',
+            contrasena='clave-correcta',
+            nombre='Usuario Cache'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.usuario).access_token}')
+        self.url = reverse('usuario-actual')
+
+    def test_usuario_desde_cache(self):
+        """
+        Verifica que la segunda petición no consulte el usuario.
+        """
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['correo_electronico'], 'cache@test.com')
+
+    def test_desactivar_invalida_cache(self):
+        """
+        Verifica que desactivar el usuario invalide su entrada en caché.
+        """
+        self.client.get(self.url)
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cambiar_contrasena_invalida_cache(self):
+        """
+        Verifica que un cambio de contraseña por UPDATE también invalide la caché.
+        """
+        self.client.get(self.url)
+        self.usuario.cambiar_contrasena('otra-clave')
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+
+class ClaimsTokenTests(TestCase):
+    """
+    Suite de pruebas para la autorización con claims del token de acceso.
+
+    Esta clase contiene pruebas para:
+    - Claims de rol y staff en el token emitido al iniciar sesión
+    - Lecturas autorizadas sin consultar el usuario
+    - Invalidación de los claims cuando el usuario cambia
+    """
+    def setUp(self):
+        """
+        Crea un administrador e inicia sesión con él.
+        """
+        cache.clear()
+        self.admin = Usuario.objects.create_user(
+            correo_electronico='claims@test.com',
+            contrasena='clave-correcta',
+            nombre='Admin Claims',
+            rol=Rol.objects.get(nombre='Administrador'),
+            is_staff=True
+        )
+        response = APIClient().post(
+            reverse('token_obtain_pair'),
+            {'correo_electronico': 'claims@test.com', 'contrasena': 'clave-correcta'},
+            format='json'
+        )
+        self.access = response.data['access']
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def test_claims_en_token(self):
+        """
+        Verifica que el token de acceso incluya rol, is_staff e is_superuser.
+        """
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = AccessToken(self.access)
+        self.assertEqual(token['rol'], 'Administrador')
+        self.assertTrue(token['is_staff'])
+        self.assertFalse(token['is_superuser'])
+
+    def test_lectura_sin_consultar_usuario(self):
+        """
+        Verifica que una lectura de administrador solo consulte los roles.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('rol-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cambio_de_usuario_invalida_claims(self):
+        """
+        Verifica que quitar is_staff invalide los claims del token ya emitido.
+        """
+        self.admin.is_staff = False
+        self.admin.save()
+        response = self.client.get(reverse('rol-list'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_claims_revocados_tras_vaciar_cache(self):
+        """
+        Verifica que vaciar la caché compartida no vuelva a validar los claims
+        de un token emitido cuando las versiones aún no existían.
+        """
+        cache.clear()
+        response = APIClient().post(
+            reverse('token_obtain_pair'),
+            {'correo_electronico': 'claims@test.com', 'contrasena': 'clave-correcta'},
+            format='json'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.admin.is_staff = False
+        self.admin.save()
+        self.assertEqual(self.client.get(reverse('rol-list')).status_code, status.HTTP_403_FORBIDDEN)
+
+        from .utils import claves_jwt
+        cache.clear()
+        # Recarga las claves de firma fuera del presupuesto de la petición
+        claves_jwt.obtener_conjunto()
+        response = self.client.get(reverse('rol-list'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_permiso_por_rol(self):
+        """
+        Verifica TieneRol con el usuario construido desde el token.
+        """
+        from rest_framework_simplejwt.tokens import AccessToken
+        from .authentication import UsuarioToken
+        from .permissions import TieneRol
+
+        request = type('Request', (), {'user': UsuarioToken(AccessToken(self.access))})()
+        self.assertTrue(TieneRol.de('Administrador')().has_permission(request, None))
+        self.assertFalse(TieneRol.de('Conductor')().has_permission(request, None))
+
+
+class ClavesJWTTests(TestCase):
+    """
+    Suite de pruebas para la firma asimétrica de tokens y el JWKS.
+
+    Esta clase contiene pruebas para:
+    - Firma con la clave activa e identificador kid
+    - Validez de tokens emitidos antes de una rotación
+    - Publicación de las claves en /.well-known/jwks.json
+    """
+    def setUp(self):
+        """
+        Crea un usuario y limpia las claves cargadas por otras pruebas.
+        """
+        from .utils import claves_jwt
+        cache.clear()
+        claves_jwt.invalidar_conjunto_local()
+        self.addCleanup(claves_jwt.invalidar_conjunto_local)
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico='jwks@test.com',
+            contrasena='clave-correcta',
+            nombre='Usuario JWKS'
+        )
+
+    def _token(self):
+        response = APIClient().post(
+            reverse('token_obtain_pair'),
+            {'correo_electronico': 'jwks@test.com', 'contrasena': 'clave-correcta'},
+            format='json'
+        )
+        return response.data['access']
+
+    def _me(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client.get(reverse('usuario-actual'))
+
+    def test_sin_claves_usa_hs256(self):
+        """
+        Verifica que sin claves registradas se firme con HS256.
+        """
+        import jwt
+        self.assertEqual(jwt.get_unverified_header(self._token())['alg'], 'HS256')
+
+    def test_rotacion_conserva_tokens_emitidos(self):
+        """
+        Verifica la firma RS256 con kid y que un token siga siendo válido
+        después de rotar a una clave EdDSA.
+        """
+        import jwt
+        from io import StringIO
+        from django.core.management import call_command
+
+        call_command('rotar_claves_jwt', stdout=StringIO())
+        anterior = self._token()
+        encabezado = jwt.get_unverified_header(anterior)
+        self.assertEqual(encabezado['alg'], 'RS256')
+
+        call_command('rotar_claves_jwt', algoritmo='EdDSA', stdout=StringIO())
+        nuevo = self._token()
+        self.assertEqual(jwt.get_unverified_header(nuevo)['alg'], 'EdDSA')
+        self.assertNotEqual(jwt.get_unverified_header(nuevo)['kid'], encabezado['kid'])
+
+        self.assertEqual(self._me(anterior).status_code, status.HTTP_200_OK)
+        self.assertEqual(self._me(nuevo).status_code, status.HTTP_200_OK)
+
+    def test_tokens_sin_kid_vencen_tras_activar_rotacion(self):
+        """
+        Verifica que los tokens HS256 se acepten tras crear la primera clave
+        solo mientras duran los emitidos antes de ella.
+        """
+        from rest_framework_simplejwt.settings import api_settings
+        from .models import ClaveFirma
+        from .utils.claves_jwt import invalidar_conjunto_local, rotar_claves
+
+        hs256 = self._token()
+        clave, _ = rotar_claves('RS256')
+        self.assertEqual(self._me(hs256).status_code, status.HTTP_200_OK)
+
+        vida = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        ClaveFirma.objects.filter(pk=clave.pk).update(fecha_creacion=timezone.now() - vida)
+        invalidar_conjunto_local()
+        self.assertEqual(self._me(hs256).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._me(self._token()).status_code, status.HTTP_200_OK)
+
+    def test_jwks(self):
+        """
+        Verifica que el JWKS publique las claves vigentes sin partes privadas.
+        """
+        from .utils.claves_jwt import rotar_claves
+        primera, _ = rotar_claves('RS256')
+        segunda, _ = rotar_claves('EdDSA', retencion=timedelta(hours=1))
+
+        response = APIClient().get(reverse('jwks'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('max-age', response['Cache-Control'])
+        claves = {clave['kid']: clave for clave in response.data['keys']}
+        self.assertEqual(set(claves), {primera.kid, segunda.kid})
+        self.assertEqual(claves[primera.kid]['kty'], 'RSA')
+        self.assertNotIn('d', claves[primera.kid])
+        self.assertEqual(claves[segunda.kid]['crv'], 'Ed25519')
+
+
+class TokensRevocadosTests(TestCase):
+    """
+    Suite de pruebas para el filtro en memoria de tokens revocados.
+
+    Esta clase contiene pruebas para:
+    - Filtro de Bloom sin falsos negativos
+    - Renovación rechazada para tokens en la lista negra
+    - Renovación sin consultar la lista negra en la base de datos
+    - Reconstrucción del filtro sin dejar de ver los tokens revocados
+    - Revocaciones confirmadas en distinto orden que sus ids
+    - Purga por lotes de tokens expirados
+    """
+    def setUp(self):
+        """
+        Reinicia el filtro del proceso y emite un refresh token.
+        """
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from .utils.revocacion import registro
+        cache.clear()
+        registro.reiniciar()
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico='revocado@test.com',
+            contrasena='clave-correcta',
+            nombre='Usuario Revocado'
+        )
+        self.refresh = RefreshToken.for_user(self.usuario)
+        self.url = reverse('token_refresh')
+
+    def test_filtro_bloom(self):
+        """
+        Verifica que todos los valores agregados estén en el filtro.
+        """
+        from .utils.revocacion import FiltroBloom
+        filtro = FiltroBloom(1000, 0.01)
+        valores = [f'jti-{i}' for i in range(1000)]
+        for valor in valores:
+            filtro.agregar(valor)
+        self.assertTrue(all(valor in filtro for valor in valores))
+        falsos = sum(f'otro-{i}' in filtro for i in range(10000))
+        self.assertLess(falsos, 300)
+
+    def test_token_revocado(self):
+        """
+        Verifica que un refresh token en la lista negra no pueda renovarse.
+        """
+        self.refresh.blacklist()
+        response = self.client.post(self.url, {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocacion_en_otro_proceso(self):
+        """
+        Verifica que una revocación anunciada por otro proceso se sincronice.
+        """
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from .utils.revocacion import ESPACIO_REVOCADOS, registro
+        from .utils.versiones import incrementar_version
+
+        self.assertFalse(registro.esta_revocado(str(self.refresh['jti'])))
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token=OutstandingToken.objects.get(jti=self.refresh['jti']))]
+        )
+        incrementar_version(ESPACIO_REVOCADOS, 'filtro')
+        self.assertTrue(registro.esta_revocado(str(self.refresh['jti'])))
+
+    def test_revocacion_confirmada_fuera_de_orden(self):
+        """
+        Verifica que una revocación con id menor confirmada después de otra
+        con id mayor se sincronice igualmente.
+        """
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from .utils.revocacion import ESPACIO_REVOCADOS, registro
+        from .utils.versiones import incrementar_version
+
+        otro = RefreshToken.for_user(self.usuario)
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(id=50, token=OutstandingToken.objects.get(jti=otro['jti']))]
+        )
+        incrementar_version(ESPACIO_REVOCADOS, 'filtro')
+        self.assertTrue(registro.esta_revocado(str(otro['jti'])))
+
+        # La fila con id 40 se confirma después de haber sincronizado la de id 50
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(id=40, token=OutstandingToken.objects.get(jti=self.refresh['jti']))]
+        )
+        incrementar_version(ESPACIO_REVOCADOS, 'filtro')
+        self.assertTrue(registro.esta_revocado(str(self.refresh['jti'])))
+
+    def test_revocacion_anunciada_al_confirmar(self):
+        """
+        Verifica que la revocación se anuncie de nuevo al confirmar la transacción.
+        """
+        from .utils.revocacion import ESPACIO_REVOCADOS
+        from .utils.versiones import obtener_version
+
+        antes = obtener_version(ESPACIO_REVOCADOS, 'filtro')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.refresh.blacklist()
+            sin_confirmar = obtener_version(ESPACIO_REVOCADOS, 'filtro')
+        self.assertNotEqual(sin_confirmar, antes)
+        self.assertNotEqual(obtener_version(ESPACIO_REVOCADOS, 'filtro'), sin_confirmar)
+
+    def test_reconstruccion_tras_purga_sin_ventana(self):
+        """
+        Verifica que mientras se reconstruye el filtro tras una purga los
+        tokens revocados sigan apareciendo como revocados.
+        """
+        from unittest import mock
+        from .utils.revocacion import anunciar_purga, registro
+
+        jti = str(self.refresh['jti'])
+        self.refresh.blacklist()
+        registro.sincronizar(forzar=True)
+        anunciar_purga()
+
+        vistos = []
+        agregado = registro._agregado
+
+        def agregar_y_consultar(copia, valor):
+            filtro, jtis = registro._copia
+            vistos.append(jti in filtro and jti in jtis)
+            return agregado(copia, valor)
+
+        with mock.patch.object(registro, '_agregado', side_effect=agregar_y_consultar):
+            registro.sincronizar()
+        self.assertEqual(vistos, [True])
+        self.assertTrue(registro.esta_revocado(jti))
+
+    def test_renovacion_sin_consultar_lista_negra(self):
+        """
+        Verifica que renovar un token vigente no consulte BlacklistedToken.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .utils.revocacion import registro
+
+        registro.sincronizar(forzar=True)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(self.url, {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('blacklistedtoken' in c['sql'] for c in consultas.captured_queries))
+
+    def test_purgar_tokens_expirados(self):
+        """
+        Verifica que la purga elimine solo los tokens expirados.
+        """
+        from io import StringIO
+        from django.core.management import call_command
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+        OutstandingToken.objects.create(
+            jti='expirado', token='x', user=self.usuario,
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        salida = StringIO()
+        call_command('purgar_tokens_expirados', lote=1, stdout=salida)
+        self.assertIn('1 tokens expirados', salida.getvalue())
+        self.assertTrue(OutstandingToken.objects.filter(jti=self.refresh['jti']).exists())
+
+
+class BandejaCorreosTests(TestCase):
+    """
+    Suite de pruebas para la bandeja de salida de correos.
+
+    Esta clase contiene pruebas para:
+    - Envío de los correos pendientes por el trabajador
+    - Reintento con espera exponencial tras un fallo
+    - Apertura del interruptor de circuito
+    """
+    def _encolar(self, cantidad):
+        from .utils.correos import encolar_correos
+        encolar_correos([
+            {'asunto': f'Asunto {i}', 'mensaje': 'Mensaje', 'destinatario': f'destino{i}@test.com'}
+            for i in range(cantidad)
+        ])
+
+    def test_procesar_correos(self):
+        """
+        Verifica que el trabajador envíe los correos y los marque como enviados.
+        """
+        from io import StringIO
+        from django.core import mail
+        from django.core.management import call_command
+
+        self._encolar(3)
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('procesar_correos', una_vez=True, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(CorreoPendiente.objects.filter(estado='enviado').count(), 3)
+
+    def test_reintento_con_espera(self):
+        """
+        Verifica que un envío fallido se reprograme en el futuro.
+        """
+        from unittest import mock
+        from .utils.correos import InterruptorCircuito, procesar_lote
+
+        self._encolar(1)
+        with mock.patch('api_app.utils.correos.EmailMessage.send', side_effect=OSError('SMTP caído')):
+            self.assertEqual(procesar_lote(InterruptorCircuito()), (0, 1))
+        correo = CorreoPendiente.objects.get()
+        self.assertEqual(correo.estado, 'pendiente')
+        self.assertEqual(correo.intentos, 1)
+        self.assertGreater(correo.proximo_intento, timezone.now())
+        self.assertEqual(correo.ultimo_error, 'SMTP caído')
+
+    def test_interruptor_circuito(self):
+        """
+        Verifica que tras varios fallos seguidos se dejen de intentar envíos.
+        """
+        from unittest import mock
+        from .utils.correos import InterruptorCircuito, procesar_lote
+
+        self._encolar(4)
+        interruptor = InterruptorCircuito(umbral=2, enfriamiento=60)
+        with mock.patch('api_app.utils.correos.EmailMessage.send', side_effect=OSError('SMTP caído')) as enviar:
+            self.assertEqual(procesar_lote(interruptor), (0, 2))
+            self.assertTrue(interruptor.abierto)
+            self.assertEqual(procesar_lote(interruptor), (0, 0))
+        self.assertEqual(enviar.call_count, 2)
+        self.assertEqual(CorreoPendiente.objects.filter(intentos=0).count(), 2)
+
+
+@override_settings(
+    LIMITE_TASA_ACTIVO=True,
+    LIMITE_TASA_ALMACEN='api_app.utils.limite_tasa.AlmacenMemoria',
+    LIMITE_TASA_OPCIONES={},
+)
+class LimiteTasaTests(TestCase):
+    """
+    Suite de pruebas para el límite de tasa por token bucket.
+
+    Esta clase contiene pruebas para:
+    - Respuesta 429 con Retry-After al agotar el bucket por IP
+    - Bucket por correo compartido entre distintas IPs
+    - IP del cliente a través de proxies confiables
+    - Recarga de tokens en el almacén SQLite
+    """
+    def setUp(self):
+        from .utils.limite_tasa import obtener_almacen
+        cache.clear()
+        obtener_almacen().limpiar()
+        self.client = APIClient()
+        self.url = reverse('token_obtain_pair')
+
+    def _login(self, correo, ip):
+        return self.client.post(
+            self.url, {'correo_electronico': correo, 'password': 'incorrecta'},
+            format='json', REMOTE_ADDR=ip,
+        )
+
+    @override_settings(LIMITES_TASA_VISTAS={'CustomTokenObtainPairView': [('ip', 2, 60)]})
+    def test_limite_por_ip(self):
+        """
+        Verifica que al agotar el bucket de una IP se responda 429 con Retry-After.
+        """
+        self.assertEqual(self._login('a@test.com', '10.0.0.1').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._login('b@test.com', '10.0.0.1').status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self._login('c@test.com', '10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # El bucket se recarga a un token cada 30 s; parte de ese tiempo ya transcurrió
+        self.assertIn(int(response['Retry-After']), range(1, 31))
+        # Otra IP tiene su propio bucket
+        self.assertEqual(self._login('c@test.com', '10.0.0.2').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(LIMITES_TASA_VISTAS={'CustomTokenObtainPairView': [('correo', 1, 60)]})
+    def test_limite_por_correo(self):
+        """
+        Verifica que el bucket por correo se comparta entre IPs distintas.
+        """
+        self.assertEqual(self._login('A@test.com', '10.0.0.1').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._login('a@test.com', '10.0.0.2').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self._login('b@test.com', '10.0.0.2').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_ip_cliente_ignora_x_forwarded_for_falsificado(self):
+        """
+        Verifica que la IP se tome de X-Forwarded-For solo a través de los
+        proxies configurados, contando desde la derecha.
+        """
+        from django.test import RequestFactory
+        from .utils.limite_tasa import ip_cliente
+
+        request = RequestFactory().get(
+            '/', REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='1.2.3.4, 200.1.1.1, 10.0.0.8',
+        )
+        self.assertEqual(ip_cliente(request), '10.0.0.9')
+        with override_settings(PROXIES_CONFIABLES=2):
+            self.assertEqual(ip_cliente(request), '200.1.1.1')
+        with override_settings(PROXIES_CONFIABLES=4):
+            self.assertEqual(ip_cliente(request), '10.0.0.9')
+
+    def test_almacen_sqlite(self):
+        """
+        Verifica el consumo y la recarga de tokens en el almacén SQLite.
+        """
+        import tempfile
+        from unittest import mock
+        from .utils.limite_tasa import AlmacenSQLite
+
+        with tempfile.TemporaryDirectory() as directorio:
+            almacen = AlmacenSQLite(f'{directorio}/buckets.sqlite3')
+            with mock.patch('api_app.utils.limite_tasa.time.time', return_value=1000.0):
+                self.assertEqual(almacen.consumir('clave', 2, 1), (True, 0.0))
+                self.assertEqual(almacen.consumir('clave', 2, 1), (True, 0.0))
+                self.assertEqual(almacen.consumir('clave', 2, 1), (False, 1.0))
+            with mock.patch('api_app.utils.limite_tasa.time.time', return_value=1001.5):
+                self.assertEqual(almacen.consumir('clave', 2, 1), (True, 0.0))
+                permitido, espera = almacen.consumir('clave', 2, 1)
+            self.assertFalse(permitido)
+            self.assertAlmostEqual(espera, 0.5)
+
+
+class RestriccionesModeloTests(TestCase):
+    """
+    Suite de pruebas para el guardado basado en restricciones de la base de datos.
+
+    Esta clase contiene pruebas para:
+    - Traducción de duplicados a errores por campo
+    - Validación de los campos en memoria
+    - Restricción de rango en las calificaciones
+    - Consultas del guardado fuera de una transacción
+    """
+    def setUp(self):
+        self.vehiculo = Vehiculo.objects.create(placa='RST-001', empresa=1)
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico='restricciones@test.com', contrasena='clave123', nombre='Restricciones'
+        )
+
+    def test_duplicados(self):
+        """
+        Verifica que un duplicado produzca el mensaje por campo y no invalide la transacción.
+        """
+        from django.core.exceptions import ValidationError
+
+        with self.assertRaises(ValidationError) as contexto:
+            Vehiculo.objects.create(placa='RST-001', empresa=2)
+        self.assertEqual(contexto.exception.message_dict, {'placa': ['Esta placa ya está registrada']})
+
+        with self.assertRaises(ValidationError) as contexto:
+            Usuario.objects.create_user(correo_electronico='restricciones@test.com', nombre='Otro')
+        self.assertEqual(
+            contexto.exception.message_dict,
+            {'correo_electronico': ['Este correo electrónico ya está registrado']},
+        )
+
+        Conductor.objects.create(id_vehiculos=self.vehiculo, nombre='Uno', licencia_conduccion=123)
+        with self.assertRaises(ValidationError) as contexto:
+            Conductor.objects.create(id_vehiculos=self.vehiculo, nombre='Dos', licencia_conduccion=123)
+        self.assertIn('licencia_conduccion', contexto.exception.message_dict)
+        self.assertEqual(Vehiculo.objects.count(), 1)
+
+    def test_validacion_de_campos_sin_consultas(self):
+        """
+        Verifica que el guardado siga validando los campos en memoria, sin consultar.
+        """
+        from django.core.exceptions import ValidationError
+
+        with self.assertNumQueries(0), self.assertRaises(ValidationError) as contexto:
+            Usuario(correo_electronico='no-es-correo', nombre='Sin formato', password='x').save()
+        self.assertIn('correo_electronico', contexto.exception.message_dict)
+
+        with self.assertNumQueries(0), self.assertRaises(ValidationError) as contexto:
+            Vehiculo(placa='X' * 50, empresa=1).save()
+        self.assertIn('placa', contexto.exception.message_dict)
+
+    def test_rango_calificacion(self):
+        """
+        Verifica que la base de datos rechace calificaciones fuera de 1 a 5.
+        """
+        from django.core.exceptions import ValidationError
+
+        ruta = Ruta.objects.create(
+            id_vehiculos=self.vehiculo, nombre_ruta='Ruta', origen='A', destino='B', horario=time(8, 0)
+        )
+        with self.assertRaises(ValidationError) as contexto:
+            Calificacion.objects.create(id_ruta=ruta, id_usuario=self.usuario, calificacion=6, comentario='')
+        self.assertEqual(
+            contexto.exception.message_dict, {'calificacion': ['La calificación debe estar entre 1 y 5']}
+        )
+
+    def test_una_consulta_por_insercion(self):
+        """
+        Verifica que fuera de una transacción el guardado sea un único INSERT,
+        más el ajuste de los contadores de la empresa.
+        """
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with mock.patch('api_app.models.connections') as conexiones:
+            conexiones.__getitem__.return_value.in_atomic_block = False
+            with CaptureQueriesContext(connection) as consultas:
+                Vehiculo.objects.create(placa='RST-002', empresa=self.vehiculo.empresa)
+        sentencias = [
+            consulta['sql'].split()[0] for consulta in consultas.captured_queries
+            if consulta['sql'] not in ('BEGIN', 'COMMIT')
+        ]
+        self.assertEqual(sentencias, ['INSERT', 'UPDATE'])
+
+
+class ImportacionUsuariosTests(TestCase):
+    """
+    Suite de pruebas para la importación masiva de usuarios.
+
+    Esta clase contiene pruebas para:
+    - Importación desde CSV con resultados por fila
+    - Importación desde NDJSON por comando
+    - Errores de integridad reportados por fila
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = Usuario.objects.create_superuser(
+            correo_electronico='admin@test.com', contrasena='admin123', nombre='Admin'
+        )
+        self.client.force_authenticate(user=self.superuser)
+        self.rol, _ = Rol.objects.get_or_create(nombre='Pasajero', defaults={'descripcion': 'Pasajero'})
+
+    def test_importar_csv(self):
+        """
+        Verifica la importación CSV con filas válidas, duplicadas e inválidas.
+        """
+        contenido = (
+            'correo_electronico,nombre,contrasena\n'
+            'uno@empresa.com,Uno,clave-uno\n'
+            'admin@test.com,Repetido,clave\n'
+            'no-es-correo,Malo,clave\n'
+            'dos@empresa.com,Dos,clave-dos\n'
+            'uno@empresa.com,Uno otra vez,clave\n'
+        ).encode('utf-8')
+        archivo = SimpleUploadedFile('usuarios.csv', contenido, content_type='text/csv')
+        response = self.client.post(reverse('usuario-importar'), {'archivo': archivo}, format='multipart')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['resumen'], {'creados': 2, 'errores': 3})
+        estados = [(r['fila'], r['estado']) for r in response.data['resultados']]
+        self.assertEqual(estados, [(2, 'creado'), (3, 'error'), (4, 'error'), (5, 'creado'), (6, 'error')])
+        self.assertIn('correo_electronico', response.data['resultados'][1]['errores'])
+        usuario = Usuario.objects.get(correo_electronico='uno@empresa.com')
+        self.assertEqual(usuario.rol, self.rol)
+        self.assertTrue(usuario.check_password('clave-uno'))
+
+    def test_importar_ndjson_por_comando(self):
+        """
+        Verifica el comando de importación con un archivo NDJSON.
+        """
+        import json
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as archivo:
+            archivo.write(json.dumps({'correo_electronico': 'tres@empresa.com', 'nombre': 'Tres', 'contrasena': 'x'}) + '\n')
+            archivo.write('{no es json}\n')
+            archivo.write(json.dumps({'correo_electronico': 'cuatro@empresa.com', 'nombre': 'Cuatro'}) + '\n')
+            archivo.write(json.dumps(
+                {'correo_electronico': 'cinco@empresa.com', 'nombre': 'Cinco', 'contrasena': 'x', 'rol': 5}
+            ) + '\n')
+        salida = StringIO()
+        call_command('importar_usuarios', archivo.name, procesos=2, lote=2, stdout=salida)
+
+        lineas = salida.getvalue().splitlines()
+        resultados = [json.loads(linea) for linea in lineas[:-1]]
+        self.assertEqual([r['estado'] for r in resultados], ['creado', 'error', 'error', 'error'])
+        self.assertIn('contrasena', resultados[2]['errores'])
+        self.assertIn('rol', resultados[3]['errores'])
+        self.assertIn('1 usuarios creados', lineas[-1])
+        self.assertTrue(Usuario.objects.filter(correo_electronico='tres@empresa.com').exists())
+
+    def test_error_de_integridad_por_fila(self):
+        """
+        Verifica que un error de integridad no traducido (p. ej. el rol
+        eliminado durante la importación) se reporte solo en su fila.
+        """
+        from unittest import mock
+        from django.db import IntegrityError
+        from .utils.importacion_usuarios import ImportadorUsuarios
+
+        guardar = Usuario.save
+
+        def guardar_o_fallar(usuario, *args, **kwargs):
+            if usuario.correo_electronico == 'dos@empresa.com':
+                raise IntegrityError('FOREIGN KEY constraint failed')
+            return guardar(usuario, *args, **kwargs)
+
+        filas = [
+            (1, {'correo_electronico': 'uno@empresa.com', 'nombre': 'Uno', 'contrasena': 'x'}),
+            (2, {'correo_electronico': 'dos@empresa.com', 'nombre': 'Dos', 'contrasena': 'x'}),
+        ]
+        with mock.patch.object(Usuario.objects, 'bulk_create', side_effect=IntegrityError), \
+                mock.patch.object(Usuario, 'save', guardar_o_fallar):
+            with ImportadorUsuarios() as importador:
+                resultados = list(importador.importar(filas))
+
+        self.assertEqual([r['estado'] for r in resultados], ['creado', 'error'])
+        self.assertIn('__all__', resultados[1]['errores'])
+
+
+class PaginacionTests(TestCase):
+    """
+    Suite de pruebas para la paginación de los listados.
+
+    Esta clase contiene pruebas para:
+    - Paginación por cursor estable ante inserciones
+    - Cursor por llave compuesta con empates en el primer campo
+    - Paginación por desplazamiento con ?offset=
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = Usuario.objects.create_superuser(
+            correo_electronico='admin@test.com', contrasena='admin123', nombre='Admin'
+        )
+        self.client.force_authenticate(user=self.superuser)
+        self.url = reverse('pqrs-admin-list')
+        for i in range(5):
+            PQRS.objects.create(
+                id_usuario=self.superuser, tipo='peticion', asunto=f'PQRS {i}', descripcion='Descripción'
+            )
+
+    def test_cursor_estable_con_inserciones(self):
+        """
+        Verifica que las páginas siguientes no repitan filas tras una inserción.
+        """
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        vistos = [pqrs['asunto'] for pqrs in response.data['results']]
+        self.assertEqual(vistos, ['PQRS 4', 'PQRS 3'])
+
+        PQRS.objects.create(id_usuario=self.superuser, tipo='queja', asunto='Nueva', descripcion='Descripción')
+        siguiente = response.data['next']
+        while siguiente:
+            response = self.client.get(siguiente)
+            vistos += [pqrs['asunto'] for pqrs in response.data['results']]
+            siguiente = response.data['next']
+        self.assertEqual(vistos, ['PQRS 4', 'PQRS 3', 'PQRS 2', 'PQRS 1', 'PQRS 0'])
+
+    def test_cursor_con_empates_en_el_primer_campo(self):
+        """
+        Verifica que las filas con el mismo valor en el primer campo del orden
+        se paginen por la llave compuesta, sin desplazamientos, en ambos sentidos.
+        """
+        from unittest import mock
+        from .pagination import PaginacionCursor
+
+        PQRS.objects.update(fecha_creacion=timezone.now())
+        with mock.patch.object(PaginacionCursor, 'offset_cutoff', 0):
+            response = self.client.get(self.url, {'page_size': 2})
+            vistos = [pqrs['asunto'] for pqrs in response.data['results']]
+            while response.data['next']:
+                response = self.client.get(response.data['next'])
+                vistos += [pqrs['asunto'] for pqrs in response.data['results']]
+            self.assertEqual(vistos, ['PQRS 4', 'PQRS 3', 'PQRS 2', 'PQRS 1', 'PQRS 0'])
+
+            response = self.client.get(response.data['previous'])
+            self.assertEqual([pqrs['asunto'] for pqrs in response.data['results']], ['PQRS 2', 'PQRS 1'])
+
+    def test_modo_desplazamiento(self):
+        """
+        Verifica la paginación por desplazamiento para clientes que la necesitan.
+        """
+        response = self.client.get(self.url, {'offset': 2, 'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([pqrs['asunto'] for pqrs in response.data['results']], ['PQRS 2', 'PQRS 1'])
+
+
+class CamposDinamicosTests(TestCase):
+    """
+    Suite de pruebas para ?fields= y ?expand= en los serializadores.
+
+    Esta clase contiene pruebas para:
+    - Omisión de los detalles anidados salvo que se expandan
+    - Selección de campos y columnas consultadas
+    - Expansión anidada sin consultas por fila
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico='viajero@test.com', contrasena='clave123', nombre='Viajero'
+        )
+        self.client.force_authenticate(user=self.usuario)
+        vehiculo = Vehiculo.objects.create(placa='CMP-001', empresa=1)
+        self.conductor = Conductor.objects.create(id_vehiculos=vehiculo, nombre='Conductor', licencia_conduccion=1)
+        ruta = Ruta.objects.create(
+            id_vehiculos=vehiculo, nombre_ruta='Ruta', origen='Ubate', destino='Zipaquira', horario=time(8, 0)
+        )
+        self.viajes = [
+            Viaje.objects.create(id_ruta=ruta, id_usuario=self.usuario, estado='completado', precio_final=1000)
+            for _ in range(3)
+        ]
+
+    def _consulta_principal(self, consultas):
+        return next(c['sql'] for c in consultas.captured_queries if 'FROM "Viajes"' in c['sql'])
+
+    def test_expansion_opcional(self):
+        """
+        Verifica que ruta_detalle solo se incluya con ?expand=.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        response = self.client.get(reverse('viaje-list'))
+        self.assertNotIn('ruta_detalle', response.data['results'][0])
+        self.assertEqual(response.data['results'][0]['usuario_nombre'], 'Viajero')
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('viaje-list'), {'expand': 'ruta_detalle'})
+        self.assertEqual(response.data['results'][0]['ruta_detalle']['origen'], 'Ubate')
+        self.assertIn('JOIN "Rutas"', self._consulta_principal(consultas))
+        self.assertEqual(len([c for c in consultas.captured_queries if 'FROM "Rutas"' in c['sql']]), 0)
+
+    def test_seleccion_de_campos(self):
+        """
+        Verifica que ?fields= limite la respuesta y las columnas consultadas.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('viaje-list'), {'fields': 'id_viaje,estado,ruta_detalle.origen'})
+        self.assertEqual(
+            response.data['results'][0],
+            {'id_viaje': self.viajes[-1].id_viaje, 'estado': 'completado', 'ruta_detalle': {'origen': 'Ubate'}},
+        )
+        sql = self._consulta_principal(consultas)
+        self.assertNotIn('precio_final', sql)
+        self.assertNotIn('nombre_ruta', sql)
+        self.assertNotIn('JOIN "Usuarios"', sql)
+
+    def test_expansion_anidada(self):
+        """
+        Verifica la expansión de detalles anidados con un número fijo de consultas.
+        """
+        for viaje in self.viajes:
+            CalificacionConductor.objects.create(
+                id_viaje=viaje, id_usuario=self.usuario, id_conductor=self.conductor, calificacion=5, comentario=''
+            )
+        url = reverse('calificacion-conductor-list')
+        response = self.client.get(url)
+        self.assertNotIn('viaje_detalle', response.data['results'][0])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'expand': 'viaje_detalle.ruta_detalle'})
+        detalle = response.data['results'][0]['viaje_detalle']
+        self.assertEqual(detalle['ruta_detalle']['destino'], 'Zipaquira')
+        self.assertNotIn('calificacion_detalle', detalle)
+
+
+class PresupuestoConsultasTests(TestCase):
+    """
+    Suite de pruebas para el presupuesto de consultas por vista.
+
+    Esta clase contiene pruebas para:
+    - Listados sin consultas por fila
+    - Falla de la prueba al exceder el presupuesto
+    - Detección de consultas repetidas
+    - Registro en el log en modo de muestreo
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = Usuario.objects.create_superuser(
+            correo_electronico='admin@test.com', contrasena='admin123', nombre='Admin'
+        )
+        self.client.force_authenticate(user=self.superuser)
+        rol = Rol.objects.get_or_create(nombre='Pasajero', defaults={'descripcion': 'Pasajero'})[0]
+        for i in range(5):
+            Usuario.objects.create_user(
+                correo_electronico=f'usuario{i}@test.com', contrasena='clave', nombre=f'Usuario {i}', rol=rol
+            )
+
+    def test_listado_sin_n_mas_uno(self):
+        """
+        Verifica que el listado de usuarios resuelva el rol sin una consulta por fila.
+        """
+        from .utils.presupuesto_consultas import registrar_consultas
+
+        with registrar_consultas() as registro:
+            response = self.client.get(reverse('usuario-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][1]['rol_nombre'], 'Pasajero')
+        self.assertEqual(registro.total, 1)
+        self.assertEqual(registro.repetidas(2), [])
+
+    def test_presupuesto_excedido(self):
+        """
+        Verifica que exceder el presupuesto de la vista haga fallar la prueba.
+        """
+        from unittest import mock
+        from .utils.presupuesto_consultas import PresupuestoConsultasExcedido
+        from .views import UsuarioList
+
+        with mock.patch.object(UsuarioList, 'presupuesto_consultas', {'GET': 0}):
+            with self.assertRaisesMessage(PresupuestoConsultasExcedido, 'GET UsuarioList excedió su presupuesto de 0'):
+                self.client.get(reverse('usuario-list'))
+
+    def test_consultas_repetidas(self):
+        """
+        Verifica que un patrón N+1 se detecte como la misma forma de consulta repetida.
+        """
+        from .utils.presupuesto_consultas import registrar_consultas
+
+        with registrar_consultas() as registro:
+            nombres = [usuario.rol.nombre for usuario in Usuario.objects.filter(rol__isnull=False)]
+        self.assertEqual(len(nombres), 5)
+        repetidas = registro.repetidas(5)
+        self.assertEqual(len(repetidas), 1)
+        self.assertIn('FROM "Roles"', repetidas[0][0])
+        self.assertEqual(repetidas[0][1], 5)
+
+    @override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=False, PRESUPUESTO_CONSULTAS_MUESTREO=1.0)
+    def test_registro_en_muestreo(self):
+        """
+        Verifica que fuera del modo estricto los excesos se registren en el log.
+        """
+        from unittest import mock
+        from .views import UsuarioList
+
+        with mock.patch.object(UsuarioList, 'presupuesto_consultas', {'GET': 0}):
+            with self.assertLogs('api_app.consultas', level='WARNING') as registros:
+                response = self.client.get(reverse('usuario-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('excedió su presupuesto', registros.output[0])
+
+
+class DisponibilidadEmpresaTests(TestCase):
+    """
+    Suite de pruebas para los contadores de flota por empresa.
+
+    Esta clase contiene pruebas para:
+    - Ajuste de los contadores al crear, modificar y eliminar registros
+    - Reconciliación de desviaciones
+    - Lectura de los contadores desde el dashboard
+    """
+    def setUp(self):
+        self.vehiculo = Vehiculo.objects.create(placa='DSP001', empresa=1, disponibilidad=True)
+        self.conductor = Conductor.objects.create(id_vehiculos=self.vehiculo, nombre='Conductor', licencia_conduccion=700001)
+        self.ruta = Ruta.objects.create(
+            id_vehiculos=self.vehiculo, nombre_ruta='Ruta', origen='A', destino='B', horario=time(8, 0)
+        )
+
+    def contadores(self, id_empresa):
+        return DisponibilidadEmpresa.objects.values(
+            'total_vehiculos', 'vehiculos_disponibles', 'total_conductores', 'total_rutas'
+        ).get(id_empresa=id_empresa)
+
+    def test_contadores_al_crear(self):
+        """
+        Verifica que crear vehículos, conductores y rutas actualice los contadores.
+        """
+        Vehiculo.objects.create(placa='DSP002', empresa=1, disponibilidad=False)
+        self.assertEqual(self.contadores(1), {
+            'total_vehiculos': 2, 'vehiculos_disponibles': 1, 'total_conductores': 1, 'total_rutas': 1,
+        })
+
+    def test_contadores_al_modificar(self):
+        """
+        Verifica los ajustes al cambiar disponibilidad, vehículo asignado y empresa.
+        """
+        vehiculo = Vehiculo.objects.get(pk=self.vehiculo.pk)
+        vehiculo.disponibilidad = False
+        vehiculo.save()
+        self.assertEqual(self.contadores(1)['vehiculos_disponibles'], 0)
+
+        otro = Vehiculo.objects.create(placa='DSP002', empresa=2, disponibilidad=True)
+        conductor = Conductor.objects.get(pk=self.conductor.pk)
+        conductor.id_vehiculos = otro
+        conductor.save()
+        self.assertEqual(self.contadores(1)['total_conductores'], 0)
+        self.assertEqual(self.contadores(2)['total_conductores'], 1)
+
+        otro.empresa = 1
+        otro.save()
+        self.assertEqual(self.contadores(1), {
+            'total_vehiculos': 2, 'vehiculos_disponibles': 1, 'total_conductores': 1, 'total_rutas': 1,
+        })
+        self.assertEqual(self.contadores(2)['total_vehiculos'], 0)
+
+    def test_contadores_al_eliminar_en_cascada(self):
+        """
+        Verifica que eliminar un vehículo descuente también sus conductores y rutas.
+        """
+        self.vehiculo.delete()
+        self.assertEqual(self.contadores(1), {
+            'total_vehiculos': 0, 'vehiculos_disponibles': 0, 'total_conductores': 0, 'total_rutas': 0,
+        })
+
+    def test_reconciliar(self):
+        """
+        Verifica que el comando corrija los cambios hechos sin señales.
+        """
+        from io import StringIO
+        from django.core.management import call_command
+
+        Vehiculo.objects.filter(pk=self.vehiculo.pk).update(disponibilidad=False)
+        salida = StringIO()
+        call_command('reconciliar_disponibilidad', stdout=salida)
+        self.assertIn('vehiculos_disponibles: 1 -> 0', salida.getvalue())
+        self.assertIn('1 empresas corregidas', salida.getvalue())
+        self.assertEqual(self.contadores(1)['vehiculos_disponibles'], 0)
+
+    def test_dashboard_lee_contadores(self):
+        """
+        Verifica que el dashboard tome los contadores de la fila de la empresa.
+        """
+        client = APIClient()
+        client.force_authenticate(user=Usuario.objects.create_superuser(
+            correo_electronico='admin@test.com', contrasena='admin123', nombre='Admin'
+        ))
+        DisponibilidadEmpresa.objects.filter(id_empresa=1).update(total_vehiculos=7)
+        response = client.get(reverse('dashboard-empresa'), {'empresa_id': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['estadisticas_generales']['total_vehiculos'], 7)
+        self.assertEqual(response.data['estadisticas_generales']['total_conductores'], 1)
+
+
+class VencimientoDocumentoTests(TestCase):
+    """
+    Suite de pruebas para el calendario de vencimientos de conductores.
+
+    Esta clase contiene pruebas para:
+    - Mantenimiento del calendario al guardar conductores
+    - Endpoint de documentos por vencer agrupados por plazo
+    - Resumen diario por empresa en la bandeja de salida
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = Usuario.objects.create_superuser(
+            correo_electronico='admin@test.com', contrasena='admin123', nombre='Admin'
+        )
+        self.client.force_authenticate(user=self.superuser)
+        self.hoy = timezone.localdate()
+        self.vehiculo = Vehiculo.objects.create(placa='VEN001', empresa=1)
+        otro = Vehiculo.objects.create(placa='VEN002', empresa=2)
+        self.conductor = Conductor.objects.create(
+            id_vehiculos=self.vehiculo, nombre='Ana', licencia_conduccion=800001,
+            fecha_vencimiento_licencia=self.hoy + timedelta(days=5),
+            fecha_vencimiento_soat=self.hoy + timedelta(days=20),
+            fecha_vencimiento_tecnomecanica=self.hoy + timedelta(days=200),
+        )
+        Conductor.objects.create(
+            id_vehiculos=otro, nombre='Luis', licencia_conduccion=800002,
+            fecha_vencimiento_soat=self.hoy + timedelta(days=45),
+        )
+
+    def test_calendario_al_guardar(self):
+        """
+        Verifica que el calendario refleje las fechas actuales del conductor.
+        """
+        self.assertEqual(VencimientoDocumento.objects.filter(id_conductor=self.conductor).count(), 3)
+
+        self.conductor.fecha_vencimiento_soat = None
+        self.conductor.fecha_vencimiento_licencia = self.hoy + timedelta(days=40)
+        self.conductor.save()
+        self.assertEqual(
+            dict(VencimientoDocumento.objects.filter(id_conductor=self.conductor).values_list('documento', 'fecha_vencimiento')),
+            {'licencia': self.hoy + timedelta(days=40), 'tecnomecanica': self.hoy + timedelta(days=200)},
+        )
+
+        self.conductor.delete()
+        self.assertFalse(VencimientoDocumento.objects.filter(id_conductor_id=self.conductor.pk).exists())
+
+    def test_por_vencer(self):
+        """
+        Verifica los vencimientos agrupados por plazo y el filtro por empresa.
+        """
+        response = self.client.get(reverse('conductor-por-vencer'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        plazos = response.data['plazos']
+        self.assertEqual([item['documento'] for item in plazos['7']], ['licencia'])
+        self.assertEqual(plazos['7'][0]['dias_restantes'], 5)
+        self.assertEqual([item['documento'] for item in plazos['30']], ['soat'])
+        self.assertEqual([item['conductor_nombre'] for item in plazos['60']], ['Luis'])
+
+        response = self.client.get(reverse('conductor-por-vencer'), {'dias': 30, 'empresa_id': 2})
+        self.assertEqual(response.data['plazos'], {'7': [], '30': []})
+
+        response = self.client.get(reverse('conductor-por-vencer'), {'dias': 90})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_resumen_por_empresa(self):
+        """
+        Verifica que el resumen encole un correo por empresa y destinatario.
+        """
+        from io import StringIO
+        from django.core.management import call_command
+
+        salida = StringIO()
+        call_command(
+            'enviar_resumen_vencimientos', destinatarios=['flota@test.com', 'gerencia@test.com'], stdout=salida
+        )
+        self.assertIn('4 resúmenes encolados', salida.getvalue())
+        correo = CorreoPendiente.objects.get(destinatario='flota@test.com', asunto__endswith='Empresa 1')
+        self.assertIn('Hasta 7 días:\n- Ana: Licencia de conducción', correo.mensaje)
+        self.assertNotIn('Tecnomecánica', correo.mensaje)
+
+
+class ImportacionFlotaTests(TestCase):
+    """
+    Suite de pruebas para la importación masiva de vehículos y conductores.
+
+    Esta clase contiene pruebas para:
+    - Importación de vehículos con su conductor en la misma fila
+    - Importación de conductores sobre vehículos existentes
+    - Contadores y calendario de vencimientos de las filas insertadas
+    - Reintento fila por fila cuando falla el lote
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = Usuario.objects.create_superuser(
+            correo_electronico='admin@test.com', contrasena='admin123', nombre='Admin'
+        )
+        self.client.force_authenticate(user=self.superuser)
+        self.vehiculo = Vehiculo.objects.create(placa='FLT000', empresa=1)
+        Conductor.objects.create(id_vehiculos=self.vehiculo, nombre='Existente', licencia_conduccion=900000)
+
+    def importar(self, nombre_url, nombre_archivo, contenido):
+        archivo = SimpleUploadedFile(nombre_archivo, contenido.encode('utf-8'))
+        return self.client.post(reverse(nombre_url), {'archivo': archivo}, format='multipart')
+
+    def test_importar_vehiculos_con_conductor(self):
+        """
+        Verifica la importación de vehículos y conductores con filas válidas e inválidas.
+        """
+        vencimiento = timezone.localdate() + timedelta(days=10)
+        contenido = (
+            'placa,empresa,disponibilidad,nombre_conductor,licencia_conduccion,fecha_vencimiento_soat\n'
+            f'FLT001,1,sí,Ana,900001,{vencimiento.isoformat()}\n'
+            'FLT002,2,no,,,\n'
+            'FLT000,1,,,,\n'
+            'FLT003,x,,,,\n'
+            'FLT004,1,,Beto,900000,\n'
+            'FLT001,1,,,,\n'
+        )
+        response = self.importar('vehiculo-importar', 'flota.csv', contenido)
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['resumen'], {'creados': 2, 'errores': 4})
+        resultados = response.data['resultados']
+        self.assertEqual([r['estado'] for r in resultados], ['creado', 'creado', 'error', 'error', 'error', 'error'])
+        self.assertEqual(resultados[2]['errores'], {'placa': ['Esta placa ya está registrada']})
+        self.assertIn('empresa', resultados[3]['errores'])
+        self.assertEqual(resultados[4]['errores'], {'licencia_conduccion': ['Esta licencia ya está registrada']})
+        self.assertEqual(resultados[5]['errores'], {'placa': ['La placa está repetida en el archivo']})
+
+        conductor = Conductor.objects.get(pk=resultados[0]['id_conductor'])
+        self.assertEqual(conductor.id_vehiculos_id, resultados[0]['id_vehiculos'])
+        self.assertFalse(Vehiculo.objects.get(placa='FLT002').disponibilidad)
+        self.assertTrue(VencimientoDocumento.objects.filter(
+            id_conductor=conductor, documento='soat', fecha_vencimiento=vencimiento
+        ).exists())
+        self.assertEqual(
+            DisponibilidadEmpresa.objects.values_list('total_vehiculos', 'vehiculos_disponibles', 'total_conductores').get(id_empresa=1),
+            (2, 2, 2),
+        )
+        self.assertEqual(DisponibilidadEmpresa.objects.get(id_empresa=2).vehiculos_disponibles, 0)
+
+    def test_importar_conductores_ndjson(self):
+        """
+        Verifica la importación de conductores resolviendo las placas por lote.
+        """
+        contenido = (
+            '{"nombre": "Carla", "licencia_conduccion": 900010, "placa": "FLT000"}\n'
+            '{"nombre": "Dario", "licencia_conduccion": 900011, "placa": "NOEXISTE"}\n'
+            '{"nombre": "Elena", "licencia_conduccion": "abc", "placa": "FLT000"}\n'
+        )
+        from .utils.presupuesto_consultas import registrar_consultas
+
+        with registrar_consultas() as registro:
+            response = self.importar('conductor-importar', 'conductores.ndjson', contenido)
+        # Placas, licencias, INSERT de conductores y ajuste de contadores
+        self.assertEqual(registro.total, 4)
+
+        self.assertEqual(response.status_code, 207)
+        resultados = response.data['resultados']
+        self.assertEqual([r['estado'] for r in resultados], ['creado', 'error', 'error'])
+        self.assertEqual(resultados[1]['errores'], {'placa': ['El vehículo con placa NOEXISTE no existe']})
+        self.assertEqual(Conductor.objects.get(licencia_conduccion=900010).id_vehiculos, self.vehiculo)
+        self.assertEqual(DisponibilidadEmpresa.objects.get(id_empresa=1).total_conductores, 2)
+
+    def test_reintento_fila_por_fila(self):
+        """
+        Verifica que si el lote falla en la base de datos cada fila se reporte por separado.
+        """
+        from unittest import mock
+
+        filtrar = Vehiculo.objects.filter
+
+        def sin_placas_registradas(*args, **kwargs):
+            # Simula una placa registrada por otro proceso entre la consulta y el INSERT
+            if 'placa__in' in kwargs:
+                return filtrar(pk__in=[])
+            return filtrar(*args, **kwargs)
+
+        with mock.patch.object(Vehiculo.objects, 'filter', side_effect=sin_placas_registradas):
+            response = self.importar('vehiculo-importar', 'flota.csv', 'placa,empresa\nFLT000,1\nFLT005,1\n')
+
+        self.assertEqual(response.status_code, 207)
+        resultados = response.data['resultados']
+        self.assertEqual(resultados[0]['errores'], {'placa': ['Esta placa ya está registrada']})
+        self.assertEqual(resultados[1]['estado'], 'creado')
+        self.assertEqual(DisponibilidadEmpresa.objects.get(id_empresa=1).total_vehiculos, 2)
+
+
+class TelemetriaTests(TestCase):
+    """
+    Suite de pruebas para la telemetría GPS de los vehículos.
+
+    Esta clase contiene pruebas para:
+    - Recepción de posiciones por lotes y su validación
+    - Segmentos con columnas empaquetadas
+    - Búfer circular y caché de la última posición
+    - Kilómetros recorridos a partir de los segmentos
+    """
+    def setUp(self):
+        from .utils import telemetria
+
+        cache.clear()
+        telemetria.reiniciar()
+        self.client = APIClient()
+        self.superuser = Usuario.objects.create_superuser(
+            correo_electronico='admin@test.com', contrasena='admin123', nombre='Admin'
+        )
+        self.client.force_authenticate(user=self.superuser)
+        self.vehiculo = Vehiculo.objects.create(placa='GPS001', empresa=1)
+        self.inicio = timezone.now().replace(microsecond=0) - timedelta(minutes=10)
+
+    def posicion(self, segundos, latitud, longitud=-74.0, **extra):
+        return {
+            'id_vehiculos': self.vehiculo.pk,
+            'fecha': (self.inicio + timedelta(seconds=segundos)).isoformat(),
+            'latitud': latitud,
+            'longitud': longitud,
+            **extra,
+        }
+
+    def test_recibir_posiciones(self):
+        """
+        Verifica que las posiciones válidas se guarden en un segmento y las inválidas se reporten.
+        """
+        posiciones = [
+            self.posicion(10, 4.61, velocidad=30),
+            self.posicion(0, 4.60, velocidad=25),
+            self.posicion(20, 95.0),
+            {**self.posicion(30, 4.62), 'id_vehiculos': 99999},
+            self.posicion(40, 4.63),
+        ]
+        response = self.client.post(reverse('telemetria'), {'posiciones': posiciones}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['aceptadas'], 3)
+        self.assertEqual([rechazo['indice'] for rechazo in response.data['rechazadas']], [2, 3])
+
+        segmento = SegmentoTelemetria.objects.get(id_vehiculos=self.vehiculo)
+        self.assertEqual(segmento.cantidad, 3)
+        self.assertEqual(len(bytes(segmento.tiempos)), 24)
+        self.assertEqual(len(bytes(segmento.latitudes)), 12)
+        self.assertEqual(segmento.inicio, self.inicio)
+        tiempos = [posicion[0] for posicion in segmento.posiciones()]
+        self.assertEqual(tiempos, sorted(tiempos))
+        self.assertAlmostEqual(segmento.posiciones()[1][3], 30.0)
+        self.assertAlmostEqual(segmento.distancia_km, 3 * 1.112, places=1)
+
+    def test_lote_con_vehiculo_eliminado(self):
+        """
+        Verifica que las posiciones de un vehículo eliminado tras validarlas
+        no impidan guardar las de los demás.
+        """
+        from .utils import telemetria
+
+        eliminado = Vehiculo.objects.create(placa='GPS003', empresa=1)
+        posiciones, _ = telemetria.validar_posiciones([
+            self.posicion(0, 4.60), {**self.posicion(0, 4.60), 'id_vehiculos': eliminado.pk},
+        ])
+        eliminado.delete()
+
+        with self.assertLogs('api_app.utils.telemetria', 'WARNING'):
+            telemetria.obtener_escritor().escribir_lote([posiciones])
+        self.assertEqual(
+            list(SegmentoTelemetria.objects.values_list('id_vehiculos', flat=True)), [self.vehiculo.pk]
+        )
+        self.assertEqual(telemetria.vehiculos_existentes({eliminado.pk}), set())
+
+    def test_ultima_posicion(self):
+        """
+        Verifica la última posición desde la caché, sin retroceder con posiciones atrasadas.
+        """
+        self.client.post(reverse('telemetria'), [self.posicion(0, 4.60), self.posicion(60, 4.70)], format='json')
+        self.client.post(reverse('telemetria'), [self.posicion(30, 4.65)], format='json')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('vehiculo-posicion', args=[self.vehiculo.pk]), {'recientes': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertAlmostEqual(response.data['latitud'], 4.70, places=4)
+        self.assertIsNone(response.data['velocidad'])
+        self.assertEqual(len(response.data['recientes']), 2)
+
+        cache.clear()
+        response = self.client.get(reverse('vehiculo-posicion', args=[self.vehiculo.pk]))
+        self.assertEqual(response.data['fecha'], self.inicio + timedelta(seconds=60))
+
+        otro = Vehiculo.objects.create(placa='GPS002', empresa=1)
+        response = self.client.get(reverse('vehiculo-posicion', args=[otro.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_ultima_posicion_entre_procesos(self):
+        """
+        Verifica que una posición atrasada recibida por otro proceso no
+        reemplace la última posición publicada.
+        """
+        from .utils.telemetria import PREFIJO_ULTIMA, BufferTelemetria
+
+        inicio = int(self.inicio.timestamp() * 1000)
+        BufferTelemetria(10).agregar([(self.vehiculo.pk, inicio + 60000, 4.70, -74.0, 30.0)])
+        BufferTelemetria(10).agregar([(self.vehiculo.pk, inicio, 4.60, -74.0, 25.0)])
+
+        self.assertEqual(cache.get(f'{PREFIJO_ULTIMA}{self.vehiculo.pk}')[0], inicio + 60000)
+
+    def test_anillo_posiciones(self):
+        """
+        Verifica que el búfer circular conserve solo las posiciones más recientes en orden.
+        """
+        from .utils.telemetria import AnilloPosiciones
+
+        anillo = AnilloPosiciones(3)
+        for tiempo in range(5):
+            anillo.agregar(tiempo, 1.0, 2.0, 3.0)
+        self.assertEqual([posicion[0] for posicion in anillo.ultimas()], [2, 3, 4])
+        self.assertEqual([posicion[0] for posicion in anillo.ultimas(2)], [3, 4])
+        self.assertEqual(anillo.ultimo_tiempo, 4)
+
+    def test_kilometros_recorridos(self):
+        """
+        Verifica la suma de los segmentos y de los tramos entre segmentos consecutivos.
+        """
+        from .utils import kilometraje
+
+        self.client.post(reverse('telemetria'), [self.posicion(0, 4.60), self.posicion(10, 4.61)], format='json')
+        self.client.post(reverse('telemetria'), [self.posicion(20, 4.62), self.posicion(30, 4.63)], format='json')
+        self.assertEqual(SegmentoTelemetria.objects.count(), 2)
+
+        kilometros = kilometraje.kilometros_por_vehiculo(
+            [self.vehiculo.pk], self.inicio - timedelta(hours=1), self.inicio + timedelta(hours=1)
+        )
+        self.assertAlmostEqual(kilometros[self.vehiculo.pk], float(kilometraje.haversine_km(4.60, -74.0, 4.63, -74.0)), places=2)
+
+        # Los puntos fuera del periodo no cuentan aunque su segmento sí lo cruce
+        kilometros = kilometraje.kilometros_por_vehiculo(
+            [self.vehiculo.pk], self.inicio + timedelta(seconds=5), self.inicio + timedelta(hours=1)
+        )
+        self.assertAlmostEqual(kilometros[self.vehiculo.pk], float(kilometraje.haversine_km(4.61, -74.0, 4.63, -74.0)), places=2)
+
+    def test_kilometros_con_segmentos_solapados(self):
+        """
+        Verifica que los puntos de segmentos solapados en el tiempo se unan en orden cronológico.
+        """
+        from .utils import kilometraje
+
+        self.client.post(reverse('telemetria'), [self.posicion(0, 4.60), self.posicion(20, 4.62)], format='json')
+        # Posición atrasada recibida en una solicitud posterior
+        self.client.post(reverse('telemetria'), [self.posicion(10, 4.61)], format='json')
+        self.assertEqual(SegmentoTelemetria.objects.count(), 2)
+
+        kilometros = kilometraje.kilometros_por_vehiculo(
+            [self.vehiculo.pk], self.inicio - timedelta(hours=1), self.inicio + timedelta(hours=1)
+        )
+        self.assertAlmostEqual(kilometros[self.vehiculo.pk], float(kilometraje.haversine_km(4.60, -74.0, 4.62, -74.0)), places=2)
+
+
+class KilometrajeTests(TestCase):
+    """
+    Suite de pruebas para el cálculo de kilómetros recorridos.
+
+    Esta clase contiene pruebas para:
+    - Haversine vectorizado y distancia de las rutas
+    - Kilómetros por empresa desde la telemetría o las rutas de los viajes
+    - Estadísticas de empresa y cálculo histórico por lotes
+    """
+    def setUp(self):
+        from .utils import telemetria
+
+        telemetria.reiniciar()
+        self.client = APIClient()
+        self.superuser = Usuario.objects.create_superuser(
+            correo_electronico='admin@test.com', contrasena='admin123', nombre='Admin'
+        )
+        self.client.force_authenticate(user=self.superuser)
+        self.vehiculo = Vehiculo.objects.create(placa='KM001', empresa=7)
+        # Bogotá -> Medellín
+        self.ruta = Ruta.objects.create(
+            id_vehiculos=self.vehiculo, nombre_ruta='Bogotá - Medellín', origen='Bogotá', destino='Medellín',
+            horario='08:00', latitud_origen=4.711, longitud_origen=-74.0721,
+            latitud_destino=6.2442, longitud_destino=-75.5812,
+        )
+
+    def crear_viaje(self, fecha, estado='completado'):
+        viaje = Viaje.objects.create(id_ruta=self.ruta, id_usuario=self.superuser, precio_final=1000, estado=estado)
+        Viaje.objects.filter(pk=viaje.pk).update(fecha_viaje=timezone.make_aware(datetime.combine(fecha, time(12))))
+        return viaje
+
+    def test_distancia_rutas(self):
+        """
+        Verifica el haversine vectorizado y la distancia guardada en las rutas.
+        """
+        from .utils import kilometraje
+
+        self.assertAlmostEqual(self.ruta.distancia_km, 240.0, delta=2)
+        distancias = kilometraje.haversine_km([0.0, 0.0], [0.0, 0.0], [0.0, 1.0], [0.0, 0.0])
+        self.assertEqual(distancias.shape, (2,))
+        self.assertAlmostEqual(distancias[1], 111.19, places=1)
+
+        sin_coordenadas = Ruta.objects.create(
+            id_vehiculos=self.vehiculo, nombre_ruta='Centro', origen='A', destino='B', horario='09:00',
+        )
+        self.assertIsNone(sin_coordenadas.distancia_km)
+        self.assertEqual(kilometraje.distancias_rutas([self.ruta, sin_coordenadas])[1], None)
+
+    def test_estadistica_con_kilometros_de_rutas(self):
+        """
+        Verifica que las estadísticas usen la distancia de las rutas si no hay telemetría.
+        """
+        ayer = timezone.localdate() - timedelta(days=1)
+        self.crear_viaje(ayer)
+        self.crear_viaje(ayer)
+        self.crear_viaje(ayer, estado='cancelado')
+
+        response = self.client.post(reverse('estadistica-empresa-list'), {'id_empresa': 7, 'fecha': ayer}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['fecha'], ayer.isoformat())
+        self.assertEqual(response.data['total_viajes'], 3)
+        self.assertAlmostEqual(float(response.data['kilometros_recorridos']), 2 * self.ruta.distancia_km, places=1)
+
+    def test_calcular_kilometraje_historico(self):
+        """
+        Verifica el cálculo histórico por lotes sin tocar las demás métricas.
+        """
+        from io import StringIO
+        from django.core.management import call_command
+
+        dias = [timezone.localdate() - timedelta(days=n) for n in (3, 2)]
+        for dia in dias:
+            self.crear_viaje(dia)
+        EstadisticaEmpresa.objects.create(id_empresa=7, fecha=dias[0], total_viajes=1)
+
+        call_command('calcular_kilometraje', desde=str(dias[0]), hasta=str(dias[-1]), dias_por_lote=1, procesos=1, stdout=StringIO())
+
+        estadisticas = list(EstadisticaEmpresa.objects.filter(id_empresa=7).order_by('fecha'))
+        self.assertEqual([estadistica.fecha for estadistica in estadisticas], dias)
+        self.assertEqual(estadisticas[0].total_viajes, 1)
+        for estadistica in estadisticas:
+            self.assertAlmostEqual(float(estadistica.kilometros_recorridos), self.ruta.distancia_km, places=1)
+
+
+class BusquedaRutasTests(TestCase):
+    """
+    Suite de pruebas para la búsqueda de rutas por origen y destino.
+
+    Esta clase contiene pruebas para:
+    - Normalización sin tildes ni mayúsculas
+    - Orden por relevancia y consultas cortas
+    - Actualización del índice al guardar y eliminar rutas
+    - Guardados revertidos sin efecto en el índice
+    """
+    def setUp(self):
+        from .utils import busqueda_rutas
+
+        busqueda_rutas.reiniciar()
+        self.client = APIClient()
+        self.superuser = Usuario.objects.create_superuser(
+            correo_electronico='admin@test.com', contrasena='admin123', nombre='Admin'
+        )
+        self.client.force_authenticate(user=self.superuser)
+        vehiculo = Vehiculo.objects.create(placa='BUS001', empresa=1)
+        self.rutas = {
+            nombre: Ruta.objects.create(
+                id_vehiculos=vehiculo, nombre_ruta=nombre, origen=origen, destino=destino, horario=time(8, 0)
+            )
+            for nombre, origen, destino in (
+                ('R1', 'Bogotá D.C. Norte', 'Tunja'),
+                ('R2', 'Bogotá', 'Medellín'),
+                ('R3', 'Zipaquirá', 'Bogotá'),
+                ('R4', 'Ubaté', 'Cali'),
+            )
+        }
+
+    def buscar(self, **filtros):
+        response = self.client.get(reverse('ruta-list'), filtros)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [ruta['nombre_ruta'] for ruta in response.data['results']]
+
+    def test_busqueda_sin_tildes_por_relevancia(self):
+        """
+        Verifica que la búsqueda ignore tildes y mayúsculas y ordene por relevancia.
+        """
+        from .utils.busqueda_rutas import normalizar
+
+        self.assertEqual(normalizar('Bogotá D.C.'), 'bogota d c')
+        self.assertEqual(self.buscar(origen='bogota'), ['R2', 'R1'])
+        self.assertEqual(self.buscar(origen='BOGOTÁ', destino='tunja'), ['R1'])
+        self.assertEqual(self.buscar(destino='medell'), ['R2'])
+        self.assertEqual(self.buscar(origen='zi'), ['R3'])
+        self.assertEqual(self.buscar(origen='ta'), [])
+        self.assertEqual(self.buscar(origen='cartagena'), [])
+        self.assertEqual(len(self.buscar()), 4)
+
+    def test_indice_incremental(self):
+        """
+        Verifica que el índice refleje las rutas guardadas y eliminadas después de cargarse.
+        """
+        self.assertEqual(self.buscar(origen='ubate'), ['R4'])
+
+        ruta = self.rutas['R4']
+        with self.captureOnCommitCallbacks(execute=True):
+            ruta.origen = 'Chía'
+            ruta.save()
+            self.rutas['R2'].delete()
+            Ruta.objects.create(
+                id_vehiculos=ruta.id_vehiculos, nombre_ruta='R5', origen='Bogotá', destino='Chía', horario=time(9, 0)
+            )
+
+        # Sin coincidencias en el índice ya cargado no se consulta la base de datos
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buscar(origen='ubate'), [])
+        self.assertEqual(self.buscar(origen='chia'), ['R4'])
+        self.assertEqual(self.buscar(origen='bogota'), ['R5', 'R1'])
+
+    def test_indice_sin_cambios_revertidos(self):
+        """
+        Verifica que un guardado revertido no modifique el índice en memoria.
+        """
+        from django.db import transaction
+
+        self.assertEqual(self.buscar(origen='ubate'), ['R4'])
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                ruta = self.rutas['R4']
+                ruta.origen = 'Chía'
+                ruta.save()
+                raise RuntimeError
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buscar(origen='chia'), [])
+        self.assertEqual(self.buscar(origen='ubate'), ['R4'])
+
+
+class AutocompletadoRutasTests(TestCase):
+    """
+    Suite de pruebas para el autocompletado de lugares de rutas.
+
+    Esta clase contiene pruebas para:
+    - Sugerencias por prefijo ordenadas por popularidad
+    - Validación del límite de sugerencias
+    - Actualización del trie al guardar y eliminar rutas
+    - Reconstrucción del trie tras cambios de otros procesos
+    """
+    def setUp(self):
+        from .utils import autocompletado
+
+        cache.clear()
+        autocompletado.reiniciar()
+        self.client = APIClient()
+        vehiculo = Vehiculo.objects.create(placa='AUT001', empresa=1)
+        self.rutas = {
+            nombre: Ruta.objects.create(
+                id_vehiculos=vehiculo, nombre_ruta=nombre, origen=origen, destino=destino, horario=time(8, 0)
+            )
+            for nombre, origen, destino in (
+                ('R1', 'Bogotá', 'Tunja'),
+                ('R2', 'Bogotá', 'Medellín'),
+                ('R3', 'bogota', 'Bosa'),
+                ('R4', 'Medellín', 'Bogotá'),
+            )
+        }
+
+    def sugerir(self, **parametros):
+        response = self.client.get(reverse('ruta-autocompletar'), parametros)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(sugerencia['texto'], sugerencia['rutas']) for sugerencia in response.data['sugerencias']]
+
+    def test_sugerencias_por_popularidad(self):
+        """
+        Verifica las sugerencias por prefijo sin tildes, con la grafía más usada.
+        """
+        self.assertEqual(self.sugerir(q='bo'), [('Bogotá', 4), ('Bosa', 1)])
+        self.assertEqual(self.sugerir(q='BOG'), [('Bogotá', 4)])
+        self.assertEqual(self.sugerir(q='medellin'), [('Medellín', 2)])
+        self.assertEqual(self.sugerir(limite=2), [('Bogotá', 4), ('Medellín', 2)])
+        self.assertEqual(self.sugerir(q='cali'), [])
+
+        for limite in ('0', '11', 'x'):
+            response = self.client.get(reverse('ruta-autocompletar'), {'q': 'bo', 'limite': limite})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_trie_incremental(self):
+        """
+        Verifica que el trie refleje las rutas guardadas y eliminadas sin
+        reconstruirse, y que se reconstruya si otro proceso cambió rutas.
+        """
+        from .utils import autocompletado
+
+        self.assertEqual(self.sugerir(q='bo'), [('Bogotá', 4), ('Bosa', 1)])
+
+        ruta = self.rutas['R4']
+        ruta.destino = 'Cali'
+        with self.captureOnCommitCallbacks(execute=True):
+            ruta.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rutas['R3'].delete()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.sugerir(q='bo'), [('Bogotá', 2)])
+        self.assertEqual(self.sugerir(q='ca'), [('Cali', 1)])
+
+        # Otro proceso guarda una ruta: su cambio no llega a este trie, pero la versión sí
+        Ruta.objects.filter(pk=self.rutas['R1'].pk).update(origen='Bosa')
+        cache.incr(autocompletado.CLAVE_VERSION)
+        self.assertEqual(self.sugerir(q='bo'), [('Bogotá', 1), ('Bosa', 1)])
+
+    def test_poda_del_trie(self):
+        """
+        Verifica que los lugares sin rutas se poden del trie.
+        """
+        from .utils.autocompletado import TrieLugares
+
+        trie = TrieLugares(limite=3)
+        trie.agregar('Chía')
+        trie.agregar('Chocontá')
+        self.assertEqual(trie.sugerir('ch', 3), [('Chocontá', 1), ('Chía', 1)])
+        trie.agregar('Chía', -1)
+        trie.agregar('Chocontá', -1)
+        self.assertEqual(trie.sugerir('', 3), [])
+        self.assertEqual(trie._raiz.hijos, {})
+
+
+class ProximasSalidasTests(TestCase):
+    """
+    Suite de pruebas para el tablero de próximas salidas.
+
+    Esta clase contiene pruebas para:
+    - Búsqueda por hora con continuación al día siguiente
+    - Validación de los parámetros
+    - Invalidación del índice de horarios al modificar rutas
+    """
+    def setUp(self):
+        from .utils import horarios
+
+        cache.clear()
+        horarios.reiniciar()
+        self.client = APIClient()
+        self.vehiculo = Vehiculo.objects.create(placa='SAL001', empresa=1)
+        for nombre, origen, horario in (
+            ('B1', 'Bogotá', time(9, 0)),
+            ('B2', 'Bogotá', time(6, 0)),
+            ('B3', 'bogota', time(7, 40)),
+            ('B4', 'Bogotá', time(22, 0)),
+            ('B5', 'Bogotá', time(7, 30)),
+            ('C1', 'Chía', time(7, 45)),
+        ):
+            Ruta.objects.create(
+                id_vehiculos=self.vehiculo, nombre_ruta=nombre, origen=origen, destino='Tunja', horario=horario
+            )
+
+    def salidas(self, **parametros):
+        response = self.client.get(reverse('ruta-proximas-salidas'), parametros)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(salida['nombre_ruta'], salida['dia_siguiente']) for salida in response.data['salidas']]
+
+    def test_proximas_salidas(self):
+        """
+        Verifica el orden de las salidas desde la hora dada y el paso al día siguiente.
+        """
+        self.assertEqual(
+            self.salidas(origen='BOGOTA', despues='07:40', limite=3),
+            [('B3', False), ('B1', False), ('B4', False)],
+        )
+        self.assertEqual(
+            self.salidas(origen='Bogotá', despues='07:41', limite=5),
+            [('B1', False), ('B4', False), ('B2', True), ('B5', True), ('B3', True)],
+        )
+        self.assertEqual(self.salidas(origen='chia', despues='23:00'), [('C1', True)])
+        self.assertEqual(self.salidas(origen='Cali', despues='07:00'), [])
+
+        for parametros in ({}, {'origen': 'Bogotá', 'despues': '7h'}, {'origen': 'Bogotá', 'limite': 0}):
+            response = self.client.get(reverse('ruta-proximas-salidas'), parametros)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalidacion_al_modificar_rutas(self):
+        """
+        Verifica que el índice se reutilice y se reconstruya solo cuando cambian las rutas.
+        """
+        with self.assertNumQueries(1):
+            self.salidas(origen='Bogotá', despues='07:00', limite=1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.salidas(origen='Bogotá', despues='07:00', limite=1), [('B5', False)])
+
+        ruta = Ruta.objects.get(nombre_ruta='C1')
+        ruta.origen = 'Bogotá'
+        ruta.horario = time(7, 0)
+        ruta.save()
+
+        self.assertEqual(self.salidas(origen='Bogotá', despues='07:00', limite=1), [('C1', False)])
+        self.assertEqual(self.salidas(origen='Chía', despues='07:00'), [])
+
+
+class PlanificadorViajesTests(TestCase):
+    """
+    Suite de pruebas para el planificador de viajes con transbordos.
+
+    Esta clase contiene pruebas para:
+    - Itinerario de llegada más temprana con tiempo mínimo de transbordo
+    - Límite de transbordos y validación de parámetros
+    - Actualización de la red en memoria al modificar rutas
+    """
+    def setUp(self):
+        from .utils import planificador
+
+        cache.clear()
+        planificador.reiniciar()
+        self.client = APIClient()
+        vehiculo = Vehiculo.objects.create(placa='PLA001', empresa=1)
+        self.rutas = {
+            nombre: Ruta.objects.create(
+                id_vehiculos=vehiculo, nombre_ruta=nombre, origen=origen, destino=destino,
+                horario=horario, duracion_minutos=duracion,
+            )
+            for nombre, origen, destino, horario, duracion in (
+                ('A1', 'Bogotá', 'Chía', time(7, 0), 40),
+                ('A2', 'Chía', 'Zipaquirá', time(7, 50), 30),
+                ('A3', 'Chía', 'Zipaquirá', time(7, 42), 20),
+                ('D1', 'Bogotá', 'Zipaquirá', time(7, 10), 90),
+                ('Z1', 'Zipaquirá', 'Ubaté', time(8, 30), 60),
+                ('S1', 'Bogotá', 'Ubaté', time(7, 5), None),
+            )
+        }
+
+    def planificar(self, **parametros):
+        response = self.client.get(reverse('ruta-planificar'), parametros)
+        if response.status_code == status.HTTP_404_NOT_FOUND:
+            return None
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [tramo['nombre_ruta'] for tramo in response.data['tramos']], response.data['llegada']
+
+    def test_itinerario_mas_temprano(self):
+        """
+        Verifica el itinerario con transbordos, el tiempo mínimo entre tramos y el límite de transbordos.
+        """
+        self.assertEqual(self.planificar(origen='bogota', destino='ZIPAQUIRA', despues='06:30'), (['A1', 'A2'], time(8, 20)))
+        self.assertEqual(
+            self.planificar(origen='Bogotá', destino='Zipaquirá', despues='06:30', max_transbordos=0),
+            (['D1'], time(8, 40)),
+        )
+        self.assertEqual(self.planificar(origen='Bogotá', destino='Zipaquirá', despues='07:01'), (['D1'], time(8, 40)))
+        self.assertEqual(self.planificar(origen='Bogotá', destino='Ubaté', despues='06:30'), (['A1', 'A2', 'Z1'], time(9, 30)))
+        self.assertIsNone(self.planificar(origen='Bogotá', destino='Ubaté', despues='06:30', max_transbordos=1))
+        self.assertIsNone(self.planificar(origen='Ubaté', destino='Bogotá', despues='06:30'))
+
+        for parametros in ({'origen': 'Bogotá'}, {'origen': 'Bogotá', 'destino': 'Chía', 'max_transbordos': 9}):
+            response = self.client.get(reverse('ruta-planificar'), parametros)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_red_incremental(self):
+        """
+        Verifica que los cambios de rutas se apliquen a la red sin reconstruirla.
+        """
+        from .utils import planificador
+
+        with self.assertNumQueries(1):
+            self.planificar(origen='Bogotá', destino='Zipaquirá', despues='06:30')
+
+        directa = self.rutas['D1']
+        directa.duracion_minutos = 30
+        with self.captureOnCommitCallbacks(execute=True):
+            directa.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rutas['A1'].delete()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.planificar(origen='Bogotá', destino='Zipaquirá', despues='06:30'), (['D1'], time(7, 40)))
+            self.assertEqual(self.planificar(origen='Bogotá', destino='Chía', despues='06:30'), None)
+            self.assertEqual(self.planificar(origen='Bogotá', destino='Ubaté', despues='06:30'), (['D1', 'Z1'], time(9, 30)))
+
+        # Un cambio hecho por otro proceso obliga a reconstruir la red
+        cache.incr(planificador.CLAVE_VERSION)
+        with self.assertNumQueries(1):
+            self.planificar(origen='Bogotá', destino='Zipaquirá', despues='06:30')
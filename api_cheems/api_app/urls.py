@@ -6,20 +6,30 @@ Este archivo define todas las rutas de la API REST, organizadas por funcionalida
 1. Autenticación y Usuarios:
    - /usuarios/ - Lista y creación de usuarios
    - /usuarios/<id>/ - Operaciones CRUD sobre un usuario específico
+   - /usuarios/importar/ - Registro masivo de usuarios desde CSV o NDJSON
    - /auth/recuperar-contrasena/ - Recuperación de contraseña
    - /auth/restablecer-contrasena/ - Restablecimiento de contraseña
+   - /.well-known/jwks.json - Claves públicas para verificar los tokens
 
 2. Vehículos:
    - /vehiculos/ - Lista y creación de vehículos
    - /vehiculos/<id>/ - Operaciones CRUD sobre un vehículo específico
+   - /vehiculos/importar/ - Registro masivo de vehículos y sus conductores desde CSV o NDJSON
+   - /vehiculos/<id>/posicion/ - Última posición GPS de un vehículo
+   - /telemetria/ - Recepción de posiciones GPS por lotes
 
 3. Conductores:
    - /conductores/ - Lista y creación de conductores
    - /conductores/<id>/ - Operaciones CRUD sobre un conductor específico
+   - /conductores/por-vencer/ - Documentos de conductores próximos a vencer
+   - /conductores/importar/ - Registro masivo de conductores desde CSV o NDJSON
 
 4. Rutas:
    - /rutas/ - Lista y creación de rutas
    - /rutas/<id>/ - Operaciones CRUD sobre una ruta específica
+   - /rutas/autocompletar/ - Sugerencias de orígenes y destinos por prefijo
+   - /rutas/proximas-salidas/ - Próximas salidas desde un origen
+   - /rutas/planificar/ - Itinerario con transbordos entre dos lugares
 
 5. Calificaciones:
    - /calificaciones/ - Lista y creación de calificaciones
@@ -38,9 +48,9 @@ from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     UsuarioList, UsuarioDetail,
-    VehiculoList, VehiculoDetail,
-    ConductorList, ConductorDetail,
-    RutaList, RutaDetail,
+    VehiculoList, VehiculoDetail, TelemetriaView, PosicionVehiculoView,
+    ConductorList, ConductorDetail, ConductorPorVencerView,
+    RutaList, RutaDetail, AutocompletarRutasView, ProximasSalidasView, PlanificarViajeView,
     CalificacionList, CalificacionDetail,
     RecuperarContrasenaView, RestablecerContrasenaView,
     CustomTokenObtainPairView, RolList, RolDetail,
@@ -51,7 +61,8 @@ from .views import (
     DashboardEmpresaView, EstadisticaEmpresaView,
     VersionSistemaList, VersionSistemaDetail,
     PQRSList, PQRSDetail, PQRSAdminList,
-    RegistroUsuarioView, UsuarioActualView
+    RegistroUsuarioView, UsuarioActualView, JWKSView, ImportarUsuariosView,
+    ImportarVehiculosView, ImportarConductoresView
 )
 
 # Definición de las rutas URL de la API
@@ -59,12 +70,14 @@ urlpatterns = [
     # Rutas para autenticación
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('.well-known/jwks.json', JWKSView.as_view(), name='jwks'),
     path('registro/', RegistroUsuarioView.as_view(), name='registro'),
     path('usuarios/me/', UsuarioActualView.as_view(), name='usuario-actual'),
     
     # Rutas para usuarios
     path('usuarios/', UsuarioList.as_view(), name='usuario-list'),
     path('usuarios/<int:pk>/', UsuarioDetail.as_view(), name='usuario-detail'),
+    path('usuarios/importar/', ImportarUsuariosView.as_view(), name='usuario-importar'),
     
     # Rutas para roles
     path('roles/', RolList.as_view(), name='rol-list'),
@@ -81,14 +94,22 @@ urlpatterns = [
     # Rutas para vehículos
     path('vehiculos/', VehiculoList.as_view(), name='vehiculo-list'),
     path('vehiculos/<int:pk>/', VehiculoDetail.as_view(), name='vehiculo-detail'),
+    path('vehiculos/importar/', ImportarVehiculosView.as_view(), name='vehiculo-importar'),
+    path('vehiculos/<int:pk>/posicion/', PosicionVehiculoView.as_view(), name='vehiculo-posicion'),
+    path('telemetria/', TelemetriaView.as_view(), name='telemetria'),
     
     # Rutas para conductores
     path('conductores/', ConductorList.as_view(), name='conductor-list'),
     path('conductores/<int:pk>/', ConductorDetail.as_view(), name='conductor-detail'),
+    path('conductores/por-vencer/', ConductorPorVencerView.as_view(), name='conductor-por-vencer'),
+    path('conductores/importar/', ImportarConductoresView.as_view(), name='conductor-importar'),
     
     # Rutas para rutas
     path('rutas/', RutaList.as_view(), name='ruta-list'),
     path('rutas/<int:pk>/', RutaDetail.as_view(), name='ruta-detail'),
+    path('rutas/autocompletar/', AutocompletarRutasView.as_view(), name='ruta-autocompletar'),
+    path('rutas/proximas-salidas/', ProximasSalidasView.as_view(), name='ruta-proximas-salidas'),
+    path('rutas/planificar/', PlanificarViajeView.as_view(), name='ruta-planificar'),
     path('rutas/importar/', ImportarRutasView.as_view(), name='ruta-importar'),
     path('rutas/plantilla/', DescargarPlantillaRutasView.as_view(), name='ruta-plantilla'),
     
@@ -0,0 +1,83 @@
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .escritor_lotes import EscritorPorLotes
+
+_CAMPOS_FECHA = ('fecha_intento', 'fecha_desbloqueo')
+
+
+class EscritorAuditoriaLogin(EscritorPorLotes):
+    """
+    Escritor por lotes para los registros de IntentoLogin.
+
+    Cada intento se acumula en memoria y se inserta con un único bulk_create
+    por lote, en lugar de un INSERT y un UPDATE por request.
+    """
+
+    def escribir_lote(self, lote):
+        from ..models import IntentoLogin
+        IntentoLogin.objects.bulk_create([IntentoLogin(**campos) for campos in lote])
+
+    def serializar(self, registro):
+        dato = dict(registro)
+        for campo in _CAMPOS_FECHA:
+            if dato.get(campo) is not None:
+                dato[campo] = dato[campo].isoformat()
+        return dato
+
+    def deserializar(self, dato):
+        for campo in _CAMPOS_FECHA:
+            if dato.get(campo):
+                dato[campo] = parse_datetime(dato[campo])
+        return dato
+
+
+_escritor = None
+_lock = threading.Lock()
+
+
+def obtener_escritor():
+    """
+    Retorna el escritor de auditoría del proceso, creándolo con la
+    configuración LOGIN_AUDITORIA_* de settings en el primer uso.
+    """
+    global _escritor
+    if _escritor is None:
+        with _lock:
+            if _escritor is None:
+                _escritor = EscritorAuditoriaLogin(
+                    'auditoria-login',
+                    tamano_lote=getattr(settings, 'LOGIN_AUDITORIA_LOTE', 100),
+                    intervalo=getattr(settings, 'LOGIN_AUDITORIA_INTERVALO', 2.0),
+                    max_cola=getattr(settings, 'LOGIN_AUDITORIA_MAX_COLA', 10000),
+                    archivo_respaldo=getattr(settings, 'LOGIN_AUDITORIA_RESPALDO', None),
+                    sincrono=getattr(settings, 'LOGIN_AUDITORIA_SINCRONA', False),
+                )
+    return _escritor
+
+
+def registrar_intento(correo_electronico, ip_address, exito, bloqueado=False, fecha_desbloqueo=None):
+    """
+    Registra un intento de inicio de sesión en la tabla de auditoría.
+
+    El registro se encola en el escritor por lotes del proceso; la fecha del
+    intento se toma aquí para que no dependa del momento de la escritura.
+
+    Args:
+        correo_electronico (str): Correo utilizado en el intento
+        ip_address (str): Dirección IP del cliente
+        exito (bool): Indica si el intento fue exitoso
+        bloqueado (bool): Indica si el intento provocó un bloqueo
+        fecha_desbloqueo (datetime): Fecha en que vence el bloqueo
+    """
+    obtener_escritor().registrar({
+        'correo_electronico': correo_electronico or '',
+        'fecha_intento': timezone.now(),
+        'ip_address': ip_address,
+        'exito': exito,
+        'bloqueado': bloqueado,
+        'fecha_desbloqueo': fecha_desbloqueo,
+    })
@@ -0,0 +1,216 @@
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .busqueda_rutas import CAMPOS, normalizar
+from .versiones import version_contador
+
+CLAVE_VERSION = 'autocompletado:version'
+
+
+class _Nodo:
+    """Nodo del trie: hijos por carácter, popularidad del lugar y sugerencias en caché."""
+    __slots__ = ('hijos', 'cuenta', 'grafias', 'mejores')
+
+    def __init__(self):
+        self.hijos = {}
+        self.cuenta = 0
+        self.grafias = None
+        self.mejores = None
+
+
+class TrieLugares:
+    """
+    Trie de los lugares (orígenes y destinos) de las rutas, indexados por su
+    texto normalizado.
+
+    Cada nodo terminal cuenta cuántos extremos de ruta tienen ese lugar y
+    las grafías originales con que se escribió, para mostrar la más usada
+    ('Bogotá' en lugar de 'bogota'). Cada nodo guarda en caché sus mejores
+    sugerencias; al cambiar un lugar solo se invalidan los nodos de su
+    camino, así que las consultas repetidas de un prefijo no recorren el
+    subárbol. No es seguro entre hilos por sí mismo; AutocompletadoRutas
+    lo protege.
+
+    Atributos:
+        limite: Número máximo de sugerencias que se guardan por nodo
+    """
+
+    def __init__(self, limite=10):
+        self.limite = limite
+        self._raiz = _Nodo()
+
+    def agregar(self, texto, cantidad=1):
+        """Suma `cantidad` (puede ser negativa) a la popularidad del lugar."""
+        clave = normalizar(texto)
+        if not clave:
+            return
+        camino = [self._raiz]
+        for caracter in clave:
+            camino.append(camino[-1].hijos.setdefault(caracter, _Nodo()))
+        terminal = camino[-1]
+        terminal.cuenta += cantidad
+        terminal.grafias = terminal.grafias or Counter()
+        terminal.grafias[texto] += cantidad
+        terminal.grafias += Counter()  # Descarta las grafías que quedaron en cero
+        for nodo in camino:
+            nodo.mejores = None
+        # Poda los nodos que quedaron sin lugares ni hijos
+        for caracter, padre, nodo in zip(reversed(clave), reversed(camino[:-1]), reversed(camino[1:])):
+            if nodo.cuenta > 0 or nodo.hijos:
+                break
+            del padre.hijos[caracter]
+
+    def sugerir(self, prefijo, cantidad):
+        """
+        Retorna los lugares más populares que empiezan por el prefijo.
+
+        Args:
+            prefijo (str): Texto escrito por el usuario, sin normalizar
+            cantidad (int): Número de sugerencias, como máximo `limite`
+
+        Returns:
+            list: Tuplas (texto, popularidad) de mayor a menor popularidad
+        """
+        nodo = self._raiz
+        for caracter in normalizar(prefijo):
+            nodo = nodo.hijos.get(caracter)
+            if nodo is None:
+                return []
+        if nodo.mejores is None:
+            nodo.mejores = self._mejores(nodo)
+        return nodo.mejores[:cantidad]
+
+    def _mejores(self, nodo):
+        lugares = []
+        pendientes = [nodo]
+        while pendientes:
+            actual = pendientes.pop()
+            if actual.cuenta > 0:
+                lugares.append((actual.grafias.most_common(1)[0][0], actual.cuenta))
+            pendientes.extend(actual.hijos.values())
+        return sorted(lugares, key=lambda lugar: (-lugar[1], lugar[0]))[:self.limite]
+
+
+class AutocompletadoRutas:
+    """
+    Autocompletado de lugares de las rutas, mantenido en memoria del proceso.
+
+    El trie se construye con una sola lectura de las rutas y queda marcado
+    con la versión de CLAVE_VERSION que refleja. Para restar el lugar
+    anterior de una ruta modificada se recuerdan los lugares indexados de
+    cada ruta.
+
+    Atributos:
+        version: Versión de CLAVE_VERSION que refleja el trie
+    """
+
+    def __init__(self, filas=(), limite=10, version=None):
+        """
+        Args:
+            filas: Tuplas (id_ruta, origen, destino)
+            limite (int): Número máximo de sugerencias por prefijo
+            version: Versión de los datos leídos
+        """
+        self.version = version
+        self._trie = TrieLugares(limite)
+        self._lugares = {}
+        self._lock = threading.Lock()
+        for id_ruta, *lugares in filas:
+            self._registrar(id_ruta, tuple(lugares))
+
+    def _registrar(self, id_ruta, lugares):
+        for lugar in self._lugares.pop(id_ruta, ()):
+            self._trie.agregar(lugar, -1)
+        for lugar in lugares:
+            self._trie.agregar(lugar)
+        if lugares:
+            self._lugares[id_ruta] = lugares
+
+    def actualizar(self, id_ruta, lugares=()):
+        """Reemplaza los lugares de una ruta; sin lugares, la quita."""
+        with self._lock:
+            self._registrar(id_ruta, lugares)
+
+    def sugerir(self, prefijo, cantidad):
+        """Retorna hasta `cantidad` tuplas (texto, popularidad) para el prefijo."""
+        with self._lock:
+            return self._trie.sugerir(prefijo, cantidad)
+
+
+_autocompletado = None
+_autocompletado_lock = threading.Lock()
+
+
+def version_actual():
+    """Retorna la versión vigente del autocompletado en la caché compartida (ver version_contador)."""
+    return version_contador(CLAVE_VERSION)
+
+
+def obtener_autocompletado():
+    """
+    Retorna el autocompletado del proceso, reconstruyéndolo con una consulta
+    si otro proceso modificó rutas desde que se construyó.
+    """
+    global _autocompletado
+    version = version_actual()
+    autocompletado = _autocompletado
+    if autocompletado is not None and autocompletado.version == version:
+        return autocompletado
+    from ..models import Ruta
+
+    with _autocompletado_lock:
+        if _autocompletado is None or _autocompletado.version != version:
+            _autocompletado = AutocompletadoRutas(
+                Ruta.objects.values_list('pk', *CAMPOS).iterator(),
+                getattr(settings, 'AUTOCOMPLETADO_LIMITE', 10),
+                version,
+            )
+        return _autocompletado
+
+
+def aplicar_cambio(id_ruta, lugares=()):
+    """
+    Aplica al trie del proceso el cambio de una ruta e incrementa la versión.
+
+    Si el trie del proceso estaba al día (su versión es la anterior al
+    incremento) se modifica en su lugar; si otro proceso cambió rutas
+    mientras tanto, se descarta y se reconstruye en la próxima consulta.
+
+    Args:
+        id_ruta: ID de la ruta modificada
+        lugares: Origen y destino de la ruta guardada, o vacío si se eliminó
+    """
+    global _autocompletado
+    with _autocompletado_lock:
+        try:
+            version = cache.incr(CLAVE_VERSION)
+        except ValueError:
+            _autocompletado = None
+            return
+        if _autocompletado is None or _autocompletado.version != version - 1:
+            _autocompletado = None
+            return
+        _autocompletado.actualizar(id_ruta, lugares)
+        _autocompletado.version = version
+
+
+def reiniciar():
+    """Descarta el trie del proceso; la próxima consulta lo vuelve a construir."""
+    global _autocompletado
+    with _autocompletado_lock:
+        _autocompletado = None
+
+
+def indexar(ruta):
+    """Programa la actualización del trie con una ruta guardada, al confirmar la transacción."""
+    lugares = tuple(getattr(ruta, campo) for campo in CAMPOS)
+    transaction.on_commit(lambda: aplicar_cambio(ruta.pk, lugares))
+
+
+def desindexar(id_ruta):
+    """Programa la eliminación de los lugares de una ruta del trie, al confirmar la transacción."""
+    transaction.on_commit(lambda: aplicar_cambio(id_ruta))
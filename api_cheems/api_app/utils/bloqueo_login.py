@@ -0,0 +1,173 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _config(nombre, defecto):
+    """Lee un parámetro de bloqueo desde settings con un valor por defecto."""
+    return getattr(settings, nombre, defecto)
+
+
+def _ventana_segundos():
+    return int(_config('LOGIN_VENTANA_MINUTOS', 30)) * 60
+
+
+def _bloqueo_segundos():
+    return int(_config('LOGIN_BLOQUEO_MINUTOS', 30)) * 60
+
+
+def limite_intentos(tipo):
+    """
+    Retorna el número máximo de fallos permitidos para el tipo de clave.
+
+    Args:
+        tipo (str): 'correo' o 'ip'
+
+    Returns:
+        int: Número de fallos que provoca el bloqueo
+    """
+    if tipo == 'ip':
+        return int(_config('LOGIN_MAX_INTENTOS_IP', 20))
+    return int(_config('LOGIN_MAX_INTENTOS', 5))
+
+
+def mensaje_bloqueo(tipo, segundos_restantes=None):
+    """
+    Retorna el mensaje para el usuario de un bloqueo por correo o por IP.
+
+    Args:
+        tipo (str): 'correo' o 'ip'
+        segundos_restantes (int): Tiempo que le queda a un bloqueo vigente;
+            None para un bloqueo recién aplicado, que dura LOGIN_BLOQUEO_MINUTOS
+
+    Returns:
+        str: Mensaje con los minutos de espera
+    """
+    if segundos_restantes is None:
+        minutos = math.ceil(_bloqueo_segundos() / 60)
+        if tipo == 'ip':
+            return f'Demasiados intentos fallidos desde esta IP. IP bloqueada por {minutos} minutos.'
+        return f'Cuenta bloqueada por {minutos} minutos debido a múltiples intentos fallidos.'
+    minutos = max(1, math.ceil(segundos_restantes / 60))
+    if tipo == 'ip':
+        return f'Demasiados intentos fallidos desde esta IP. Intente nuevamente en {minutos} minutos.'
+    return f'Cuenta bloqueada. Intente nuevamente en {minutos} minutos.'
+
+
+def _clave(tipo, valor):
+    """
+    Construye la clave de caché para un correo o una IP.
+
+    El valor se normaliza y se resume con SHA-256 para que la clave tenga
+    longitud fija y no exponga correos en el backend de caché.
+    """
+    resumen = hashlib.sha256(str(valor or '').strip().lower().encode('utf-8')).hexdigest()[:32]
+    return f'login:{tipo}:{resumen}'
+
+
+def tiempo_bloqueo_restante(correo_electronico, ip_address):
+    """
+    Verifica si el correo o la IP están bloqueados.
+
+    Ambas claves se consultan en una sola operación contra la caché.
+
+    Args:
+        correo_electronico (str): Correo utilizado en el intento
+        ip_address (str): Dirección IP del cliente
+
+    Returns:
+        tuple: (tipo, segundos_restantes) del bloqueo más largo, o (None, 0)
+    """
+    claves = {
+        _clave('correo', correo_electronico) + ':bloqueo': 'correo',
+        _clave('ip', ip_address) + ':bloqueo': 'ip',
+    }
+    ahora = time.time()
+    resultado = (None, 0)
+    for clave, desbloqueo in cache.get_many(list(claves)).items():
+        restante = int(desbloqueo - ahora)
+        if restante > resultado[1]:
+            resultado = (claves[clave], restante)
+    return resultado
+
+
+def _incrementar(clave, ventana):
+    """
+    Incrementa atómicamente el contador de la ventana actual.
+
+    `cache.add` solo crea la clave si no existe y `cache.incr` es atómico en
+    los backends compartidos (Redis, Memcached), por lo que varios procesos
+    pueden contar sobre la misma clave sin condiciones de carrera.
+    """
+    cache.add(clave, 0, timeout=ventana * 2)
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # La clave expiró entre add() e incr()
+        cache.add(clave, 1, timeout=ventana * 2)
+        return 1
+
+
+def _registrar_fallo_clave(tipo, valor):
+    """
+    Registra un fallo en la ventana deslizante de una clave.
+
+    Usa el algoritmo de contador de ventana deslizante: se guarda un contador
+    por ventana fija y la estimación pondera la ventana anterior según la
+    fracción de tiempo que aún se solapa con la ventana actual.
+
+    Returns:
+        tuple: (fallos_estimados, bloqueado)
+    """
+    ventana = _ventana_segundos()
+    ahora = time.time()
+    indice = int(ahora // ventana)
+    base = _clave(tipo, valor)
+
+    actual = _incrementar(f'{base}:{indice}', ventana)
+    previo = cache.get(f'{base}:{indice - 1}', 0)
+    peso = 1 - (ahora - indice * ventana) / ventana
+    fallos = int(previo * peso + actual)
+
+    bloqueado = fallos >= limite_intentos(tipo)
+    if bloqueado:
+        # add() no extiende un bloqueo vigente si varios procesos llegan a la vez
+        cache.add(f'{base}:bloqueo', ahora + _bloqueo_segundos(), timeout=_bloqueo_segundos())
+    return fallos, bloqueado
+
+
+def registrar_fallo(correo_electronico, ip_address):
+    """
+    Registra un intento fallido para el correo y para la IP.
+
+    Args:
+        correo_electronico (str): Correo utilizado en el intento
+        ip_address (str): Dirección IP del cliente
+
+    Returns:
+        dict: Fallos estimados y estado de bloqueo por correo y por IP
+    """
+    fallos_correo, bloqueo_correo = _registrar_fallo_clave('correo', correo_electronico)
+    fallos_ip, bloqueo_ip = _registrar_fallo_clave('ip', ip_address)
+    return {
+        'fallos_correo': fallos_correo,
+        'fallos_ip': fallos_ip,
+        'bloqueado_correo': bloqueo_correo,
+        'bloqueado_ip': bloqueo_ip,
+    }
+
+
+def limpiar_fallos(correo_electronico):
+    """
+    Reinicia los contadores de fallos del correo tras un inicio de sesión exitoso.
+
+    Los contadores por IP se conservan para no facilitar ataques que alternan
+    una cuenta válida con cuentas ajenas desde la misma dirección.
+    """
+    ventana = _ventana_segundos()
+    indice = int(time.time() // ventana)
+    base = _clave('correo', correo_electronico)
+    cache.delete_many([f'{base}:{indice}', f'{base}:{indice - 1}'])
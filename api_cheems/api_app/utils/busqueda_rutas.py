@@ -0,0 +1,271 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.db import connections, transaction
+from django.db.models import Case, FloatField, Func, Q, Value, When
+
+from .particiones import es_postgresql
+
+CAMPOS = ('origen', 'destino')
+# Consultas más cortas que un trigrama se buscan como prefijo de palabra
+LONGITUD_TRIGRAMA = 3
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """
+    Normaliza un texto para la búsqueda: minúsculas, sin tildes y con los
+    signos de puntuación convertidos en un solo espacio.
+
+    'Bogotá D.C.' -> 'bogota d c'
+    """
+    sin_tildes = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return _NO_ALFANUMERICO.sub(' ', sin_tildes.lower()).strip()
+
+
+def trigramas_palabras(texto):
+    """
+    Trigramas de un texto normalizado calculados como pg_trgm: cada palabra
+    se rellena con dos espacios al inicio y uno al final.
+    """
+    trigramas = set()
+    for palabra in texto.split():
+        relleno = f'  {palabra} '
+        trigramas.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return trigramas
+
+
+def similitud(trigramas_a, trigramas_b):
+    """Proporción de trigramas compartidos, igual que similarity() de pg_trgm."""
+    if not trigramas_a or not trigramas_b:
+        return 0.0
+    return len(trigramas_a & trigramas_b) / len(trigramas_a | trigramas_b)
+
+
+class SimilitudTrigramas(Func):
+    """similarity(campo, texto) de la extensión pg_trgm de PostgreSQL."""
+    function = 'SIMILARITY'
+    output_field = FloatField()
+
+
+class IndiceInvertido:
+    """
+    Índice invertido en memoria sobre un campo de texto normalizado.
+
+    Mantiene dos listas de documentos:
+
+    - Por palabra, para las consultas cortas, que se buscan como prefijo de
+      alguna palabra.
+    - Por trigrama del texto completo, para las consultas de tres o más
+      caracteres: los candidatos son los documentos que tienen todos los
+      trigramas de la consulta y luego se confirma que la contengan.
+
+    No es seguro entre hilos por sí mismo; IndiceRutas lo protege.
+    """
+
+    def __init__(self):
+        self._textos = {}
+        self._trigramas_palabras = {}
+        self._por_palabra = defaultdict(set)
+        self._por_trigrama = defaultdict(set)
+
+    def __len__(self):
+        return len(self._textos)
+
+    def agregar(self, id_documento, texto):
+        """Indexa (o reindexa) el texto normalizado de un documento."""
+        self.eliminar(id_documento)
+        self._textos[id_documento] = texto
+        self._trigramas_palabras[id_documento] = trigramas_palabras(texto)
+        for palabra in set(texto.split()):
+            self._por_palabra[palabra].add(id_documento)
+        for trigrama in self._trigramas_texto(texto):
+            self._por_trigrama[trigrama].add(id_documento)
+
+    def eliminar(self, id_documento):
+        """Quita un documento del índice; no hace nada si no estaba."""
+        texto = self._textos.pop(id_documento, None)
+        if texto is None:
+            return
+        del self._trigramas_palabras[id_documento]
+        for clave, indice in ((set(texto.split()), self._por_palabra), (self._trigramas_texto(texto), self._por_trigrama)):
+            for termino in clave:
+                documentos = indice[termino]
+                documentos.discard(id_documento)
+                if not documentos:
+                    del indice[termino]
+
+    def buscar(self, consulta):
+        """
+        Busca una consulta ya normalizada.
+
+        Returns:
+            dict: ID del documento -> relevancia entre 0 y 1
+        """
+        if len(consulta) < LONGITUD_TRIGRAMA:
+            candidatos = set().union(*(
+                documentos for palabra, documentos in self._por_palabra.items() if palabra.startswith(consulta)
+            ))
+        else:
+            listas = sorted((self._por_trigrama.get(trigrama, set()) for trigrama in self._trigramas_texto(consulta)), key=len)
+            candidatos = {id_documento for id_documento in set.intersection(*listas) if consulta in self._textos[id_documento]}
+        trigramas_consulta = trigramas_palabras(consulta)
+        return {
+            id_documento: similitud(trigramas_consulta, self._trigramas_palabras[id_documento])
+            for id_documento in candidatos
+        }
+
+    @staticmethod
+    def _trigramas_texto(texto):
+        return {texto[i:i + LONGITUD_TRIGRAMA] for i in range(len(texto) - LONGITUD_TRIGRAMA + 1)}
+
+
+class IndiceRutas:
+    """
+    Índice en memoria del origen y el destino de las rutas, usado cuando la
+    base de datos no es PostgreSQL.
+
+    Se carga completo en la primera búsqueda y después se actualiza con las
+    señales de guardado y borrado de Ruta. Cada proceso tiene su propia
+    copia, así que solo ve los cambios hechos por ese proceso: es adecuado
+    para desarrollo con SQLite, no para varios procesos en producción.
+    """
+
+    def __init__(self):
+        self._indices = {campo: IndiceInvertido() for campo in CAMPOS}
+        self._cargado = False
+        self._lock = threading.Lock()
+
+    def _cargar(self):
+        from ..models import Ruta
+
+        for id_ruta, *textos in Ruta.objects.values_list('pk', *(f'{campo}_normalizado' for campo in CAMPOS)):
+            for campo, texto in zip(CAMPOS, textos):
+                self._indices[campo].agregar(id_ruta, texto)
+        self._cargado = True
+
+    def actualizar(self, id_ruta, textos):
+        """Reindexa una ruta guardada, con sus textos normalizados por campo, si el índice ya está cargado."""
+        with self._lock:
+            if self._cargado:
+                for campo in CAMPOS:
+                    self._indices[campo].agregar(id_ruta, textos[campo])
+
+    def eliminar(self, id_ruta):
+        """Quita una ruta eliminada si el índice ya está cargado."""
+        with self._lock:
+            if self._cargado:
+                for indice in self._indices.values():
+                    indice.eliminar(id_ruta)
+
+    def buscar(self, **consultas):
+        """
+        Busca rutas por los campos dados, ya normalizados.
+
+        Returns:
+            dict: ID de la ruta -> relevancia sumada de todos los campos
+        """
+        with self._lock:
+            if not self._cargado:
+                self._cargar()
+            resultado = None
+            for campo, consulta in consultas.items():
+                encontrados = self._indices[campo].buscar(consulta)
+                if resultado is None:
+                    resultado = encontrados
+                else:
+                    resultado = {
+                        id_ruta: relevancia + encontrados[id_ruta]
+                        for id_ruta, relevancia in resultado.items() if id_ruta in encontrados
+                    }
+            return resultado or {}
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def obtener_indice():
+    """Retorna el índice en memoria de rutas del proceso, creándolo si no existe."""
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                _indice = IndiceRutas()
+    return _indice
+
+
+def reiniciar():
+    """Descarta el índice en memoria; la próxima búsqueda lo vuelve a cargar."""
+    global _indice
+    with _indice_lock:
+        _indice = None
+
+
+def _aplicar_cambio(id_ruta, textos=None):
+    """Aplica al índice del proceso, si existe, el guardado (con textos) o la eliminación de una ruta."""
+    indice = _indice
+    if indice is None:
+        return
+    if textos is None:
+        indice.eliminar(id_ruta)
+    else:
+        indice.actualizar(id_ruta, textos)
+
+
+def indexar(ruta):
+    """Programa la actualización del índice en memoria con una ruta guardada, al confirmar la transacción."""
+    textos = {campo: getattr(ruta, f'{campo}_normalizado') for campo in CAMPOS}
+    transaction.on_commit(lambda: _aplicar_cambio(ruta.pk, textos))
+
+
+def desindexar(id_ruta):
+    """Programa la eliminación de una ruta del índice en memoria, al confirmar la transacción."""
+    transaction.on_commit(lambda: _aplicar_cambio(id_ruta))
+
+
+def buscar(queryset, **textos):
+    """
+    Filtra y ordena por relevancia un QuerySet de rutas.
+
+    Cada texto se normaliza y se busca dentro del campo normalizado
+    correspondiente; las consultas de menos de tres caracteres se buscan como
+    prefijo de palabra. En PostgreSQL el filtro usa los índices GIN de
+    pg_trgm y la relevancia es similarity(); en otros motores los
+    candidatos y la relevancia salen del índice en memoria.
+
+    Args:
+        queryset: QuerySet de Ruta
+        **textos: Campo de CAMPOS -> texto buscado; los vacíos se ignoran
+
+    Returns:
+        QuerySet: Rutas que coinciden, anotadas con `relevancia` y ordenadas
+            de mayor a menor relevancia
+    """
+    consultas = {campo: normalizar(texto) for campo, texto in textos.items() if texto}
+    consultas = {campo: consulta for campo, consulta in consultas.items() if consulta}
+    if not consultas:
+        return queryset
+
+    if es_postgresql(connections[queryset.db]):
+        filtro = Q()
+        relevancia = Value(0.0)
+        for campo, consulta in consultas.items():
+            columna = f'{campo}_normalizado'
+            if len(consulta) < LONGITUD_TRIGRAMA:
+                filtro &= Q(**{f'{columna}__regex': rf'(^| ){re.escape(consulta)}'})
+            else:
+                filtro &= Q(**{f'{columna}__contains': consulta})
+            relevancia = relevancia + SimilitudTrigramas(columna, Value(consulta))
+        return queryset.filter(filtro).annotate(relevancia=relevancia).order_by('-relevancia', 'pk')
+
+    encontrados = obtener_indice().buscar(**consultas)
+    if not encontrados:
+        return queryset.none()
+    return queryset.filter(pk__in=list(encontrados)).annotate(relevancia=Case(
+        *(When(pk=id_ruta, then=Value(relevancia)) for id_ruta, relevancia in encontrados.items()),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )).order_by('-relevancia', 'pk')
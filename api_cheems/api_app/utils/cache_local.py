@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """
+    Caché en memoria del proceso, acotada por número de elementos y por
+    tiempo de vida.
+
+    Al superar `max_elementos` se descarta el elemento usado hace más tiempo.
+    Es segura entre hilos; cada proceso del servidor tiene su propia copia.
+
+    Atributos:
+        max_elementos: Número máximo de elementos almacenados
+        ttl: Segundos que un elemento se considera vigente
+    """
+
+    def __init__(self, max_elementos=1024, ttl=60):
+        self.max_elementos = max_elementos
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Retorna el valor vigente de la clave, o None si no existe o expiró."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            vence, valor = entrada
+            if vence < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        """Guarda un valor y descarta los elementos menos usados si hace falta."""
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_elementos:
+                self._datos.popitem(last=False)
+
+    def descartar(self, predicado):
+        """Elimina las entradas cuya clave cumple el predicado."""
+        with self._lock:
+            for clave in [c for c in self._datos if predicado(c)]:
+                del self._datos[clave]
+
+    def limpiar(self):
+        """Elimina todas las entradas."""
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
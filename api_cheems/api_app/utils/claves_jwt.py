@@ -0,0 +1,258 @@
+import secrets
+import threading
+from datetime import timedelta
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+
+from .versiones import incrementar_version, obtener_version
+
+ESPACIO_CLAVES = 'claves_jwt'
+
+
+def generar_par_claves(algoritmo):
+    """
+    Genera un par de claves para el algoritmo indicado.
+
+    Args:
+        algoritmo (str): 'RS256' (RSA de 2048 bits) o 'EdDSA' (Ed25519)
+
+    Returns:
+        tuple: (clave_privada_pem, clave_publica_pem)
+
+    Raises:
+        ValueError: Si el algoritmo no está soportado
+    """
+    if algoritmo == 'RS256':
+        privada = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algoritmo == 'EdDSA':
+        privada = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f'Algoritmo no soportado: {algoritmo}')
+
+    pem_privada = privada.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode('ascii')
+    pem_publica = privada.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode('ascii')
+    return pem_privada, pem_publica
+
+
+def rotar_claves(algoritmo='RS256', retencion=None):
+    """
+    Crea una nueva clave activa y pasa la anterior a solo verificación.
+
+    Las claves en verificación retiradas hace más de `retencion` se marcan
+    como retiradas y dejan de publicarse en el JWKS.
+
+    Args:
+        algoritmo (str): Algoritmo de la nueva clave
+        retencion (timedelta): Tiempo que una clave sigue verificando tras
+            dejar de firmar; debe cubrir la vida del refresh token
+
+    Returns:
+        tuple: (nueva_clave, numero_de_claves_retiradas)
+    """
+    from ..models import ClaveFirma
+
+    privada, publica = generar_par_claves(algoritmo)
+    ahora = timezone.now()
+    with transaction.atomic():
+        ClaveFirma.objects.filter(estado='activa').update(estado='verificacion', fecha_retiro=ahora)
+        retiradas = 0
+        if retencion is not None:
+            retiradas = ClaveFirma.objects.filter(
+                estado='verificacion', fecha_retiro__lt=ahora - retencion
+            ).update(estado='retirada')
+        nueva = ClaveFirma.objects.create(
+            kid=secrets.token_urlsafe(12),
+            algoritmo=algoritmo,
+            clave_privada=privada,
+            clave_publica=publica,
+        )
+        # Los demás procesos recargan sus claves cuando la rotación queda confirmada
+        transaction.on_commit(lambda: incrementar_version(ESPACIO_CLAVES))
+    invalidar_conjunto_local()
+    return nueva, retiradas
+
+
+class ConjuntoClaves:
+    """
+    Claves de firma cargadas y ya deserializadas para una versión dada.
+
+    Atributos:
+        firma: Tupla (kid, algoritmo, clave_privada) de la clave activa, o None
+        verificacion: Diccionario kid -> (algoritmo, clave_publica)
+        jwks: Representación JWKS de las claves públicas publicadas
+        limite_sin_kid: Momento a partir del cual se rechazan los tokens sin
+            kid (HS256), o None si se siguen aceptando
+    """
+
+    def __init__(self, claves, primera_creacion=None):
+        """
+        Args:
+            claves: Claves activas y en verificación, de la más reciente a la más antigua
+            primera_creacion (datetime): Creación de la primera clave registrada,
+                incluidas las retiradas
+        """
+        self.firma = None
+        self.verificacion = {}
+        self.jwks = {'keys': []}
+        for clave in claves:
+            publica = serialization.load_pem_public_key(clave.clave_publica.encode('ascii'))
+            self.verificacion[clave.kid] = (clave.algoritmo, publica)
+            self.jwks['keys'].append(self._jwk(clave, publica))
+            if clave.estado == 'activa' and self.firma is None:
+                privada = serialization.load_pem_private_key(clave.clave_privada.encode('ascii'), password=None)
+                self.firma = (clave.kid, clave.algoritmo, privada)
+
+        # Mientras se firme con una clave asimétrica, los tokens HS256 solo son
+        # válidos durante la vida de los emitidos antes de la primera clave
+        self.limite_sin_kid = None
+        if self.firma is not None and primera_creacion is not None:
+            from rest_framework_simplejwt.settings import api_settings
+            vida = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+            self.limite_sin_kid = primera_creacion + vida
+
+    @staticmethod
+    def _jwk(clave, publica):
+        if clave.algoritmo == 'RS256':
+            jwk = RSAAlgorithm.to_jwk(publica, as_dict=True)
+        else:
+            jwk = OKPAlgorithm.to_jwk(publica, as_dict=True)
+        jwk.update({'kid': clave.kid, 'alg': clave.algoritmo, 'use': 'sig'})
+        return jwk
+
+
+_conjunto = (None, None)
+_lock = threading.Lock()
+
+
+def invalidar_conjunto_local():
+    """Obliga a este proceso a recargar las claves en el siguiente uso."""
+    global _conjunto
+    _conjunto = (None, None)
+
+
+def obtener_conjunto():
+    """
+    Retorna las claves vigentes (activa y en verificación) del proceso.
+
+    Deserializar claves PEM es costoso, así que el conjunto se conserva en
+    memoria y solo se recarga cuando cambia su versión en la caché
+    compartida, es decir, tras una rotación en cualquier proceso.
+    """
+    global _conjunto
+    from ..models import ClaveFirma
+
+    version = obtener_version(ESPACIO_CLAVES, 'conjunto')
+    if _conjunto[0] != version:
+        with _lock:
+            if _conjunto[0] != version:
+                claves = ClaveFirma.objects.filter(estado__in=['activa', 'verificacion']).order_by('-fecha_creacion')
+                primera = ClaveFirma.objects.order_by('fecha_creacion').values_list('fecha_creacion', flat=True).first()
+                _conjunto = (version, ConjuntoClaves(list(claves), primera))
+    return _conjunto[1]
+
+
+class TokenBackendRotativo(TokenBackend):
+    """
+    Backend de tokens que firma con la clave asimétrica activa (RS256 o
+    EdDSA) e incluye su kid en el encabezado.
+
+    Los tokens con kid se verifican con la clave pública correspondiente,
+    por lo que un token firmado antes de una rotación sigue siendo válido
+    mientras su clave esté en verificación. Si no hay clave activa se firma
+    y verifica con la configuración HS256 de SIMPLE_JWT. Los tokens sin kid
+    (emitidos antes de activar la rotación) se verifican con HS256 solo
+    hasta que vencen los emitidos antes de la primera clave; después se
+    rechazan, para que JWT_SECRET_KEY deje de servir para emitir tokens.
+    """
+
+    def encode(self, payload):
+        conjunto = obtener_conjunto()
+        if conjunto.firma is None:
+            return super().encode(payload)
+
+        kid, algoritmo, privada = conjunto.firma
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(
+            jwt_payload, privada, algorithm=algoritmo,
+            headers={'kid': kid}, json_encoder=self.json_encoder,
+        )
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_('Token is invalid')) from ex
+        conjunto = obtener_conjunto()
+        if kid is None:
+            if conjunto.limite_sin_kid is not None and timezone.now() >= conjunto.limite_sin_kid:
+                raise TokenBackendError(_('Token is invalid'))
+            return super().decode(token, verify=verify)
+
+        clave = conjunto.verificacion.get(kid)
+        if clave is None:
+            raise TokenBackendError(_('Token is invalid'))
+        algoritmo, publica = clave
+        try:
+            return jwt.decode(
+                token,
+                publica,
+                algorithms=[algoritmo],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={
+                    'verify_aud': self.audience is not None,
+                    'verify_signature': verify,
+                },
+            )
+        except jwt.ExpiredSignatureError as ex:
+            raise TokenBackendExpiredToken(_('Token is expired')) from ex
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_('Token is invalid')) from ex
+
+
+def instalar_backend():
+    """
+    Reemplaza el backend de simplejwt por TokenBackendRotativo.
+
+    simplejwt no permite configurar la clase del backend, así que se asigna
+    en el atributo de clase que todos sus tokens consultan.
+    """
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import Token
+
+    Token._token_backend = TokenBackendRotativo(
+        api_settings.ALGORITHM,
+        api_settings.SIGNING_KEY,
+        api_settings.VERIFYING_KEY,
+        api_settings.AUDIENCE,
+        api_settings.ISSUER,
+        api_settings.JWK_URL,
+        api_settings.LEEWAY,
+        api_settings.JSON_ENCODER,
+    )
+
+
+def retencion_por_defecto():
+    """Retorna la vida del refresh token, tiempo mínimo que una clave debe seguir verificando."""
+    from rest_framework_simplejwt.settings import api_settings
+    return api_settings.REFRESH_TOKEN_LIFETIME or timedelta(days=1)
@@ -0,0 +1,210 @@
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def encolar_correo(asunto, mensaje, destinatario, remitente=None):
+    """
+    Registra un correo en la bandeja de salida.
+
+    Debe llamarse dentro de la transacción de la operación que origina el
+    correo: si esta se revierte, el correo tampoco se envía.
+
+    Args:
+        asunto (str): Asunto del correo
+        mensaje (str): Cuerpo en texto plano
+        destinatario (str): Correo electrónico del destinatario
+        remitente (str): Remitente; por defecto DEFAULT_FROM_EMAIL
+
+    Returns:
+        CorreoPendiente: El correo registrado
+    """
+    from ..models import CorreoPendiente
+    return CorreoPendiente.objects.create(
+        asunto=asunto,
+        mensaje=mensaje,
+        destinatario=destinatario,
+        remitente=remitente or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def encolar_correos(correos):
+    """
+    Registra varios correos con un solo INSERT.
+
+    Args:
+        correos (iterable): Diccionarios con asunto, mensaje, destinatario y
+            opcionalmente remitente
+
+    Returns:
+        list: Correos registrados
+    """
+    from ..models import CorreoPendiente
+    return CorreoPendiente.objects.bulk_create([
+        CorreoPendiente(
+            asunto=correo['asunto'],
+            mensaje=correo['mensaje'],
+            destinatario=correo['destinatario'],
+            remitente=correo.get('remitente') or settings.DEFAULT_FROM_EMAIL,
+        )
+        for correo in correos
+    ])
+
+
+class InterruptorCircuito:
+    """
+    Interruptor de circuito para el servidor de correo.
+
+    Tras `umbral` fallos consecutivos el circuito se abre y no se intentan
+    envíos durante `enfriamiento` segundos; después se permite un intento
+    de prueba (semiabierto) y el circuito se cierra si tiene éxito.
+    """
+
+    def __init__(self, umbral=5, enfriamiento=60):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self.fallos = 0
+        self.abierto_hasta = 0.0
+
+    @property
+    def abierto(self):
+        return time.monotonic() < self.abierto_hasta
+
+    def registrar_exito(self):
+        self.fallos = 0
+        self.abierto_hasta = 0.0
+
+    def registrar_fallo(self):
+        self.fallos += 1
+        if self.fallos >= self.umbral:
+            self.abierto_hasta = time.monotonic() + self.enfriamiento
+            logger.warning('Circuito de correo abierto por %s segundos', self.enfriamiento)
+
+
+def calcular_espera(intentos, base=None, maximo=None):
+    """
+    Retorna los segundos de espera antes del siguiente intento.
+
+    Crece exponencialmente con el número de intentos, con un máximo y una
+    variación aleatoria para que los reintentos no coincidan.
+    """
+    base = base if base is not None else getattr(settings, 'CORREOS_ESPERA_BASE', 30)
+    maximo = maximo if maximo is not None else getattr(settings, 'CORREOS_ESPERA_MAXIMA', 3600)
+    espera = min(maximo, base * (2 ** max(0, intentos - 1)))
+    return espera * random.uniform(0.8, 1.2)
+
+
+def reclamar_lote(tamano, arrendamiento):
+    """
+    Reserva un lote de correos listos para enviar.
+
+    Los correos reservados se marcan con un próximo intento igual al fin del
+    arrendamiento, de modo que otro trabajador no los tome mientras se
+    envían; si el trabajador se detiene, vuelven a estar disponibles al
+    vencer el arrendamiento. En PostgreSQL las filas bloqueadas por otro
+    trabajador se omiten (SKIP LOCKED).
+
+    Returns:
+        list: Correos reservados
+    """
+    from ..models import CorreoPendiente
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        correos = list(
+            CorreoPendiente.objects.select_for_update(skip_locked=True)
+            .filter(estado='pendiente', proximo_intento__lte=ahora)
+            .order_by('proximo_intento')[:tamano]
+        )
+        if correos:
+            CorreoPendiente.objects.filter(pk__in=[c.pk for c in correos]).update(
+                proximo_intento=ahora + timedelta(seconds=arrendamiento)
+            )
+    return correos
+
+
+def procesar_lote(interruptor, tamano=50, arrendamiento=300):
+    """
+    Envía un lote de correos pendientes usando una sola conexión SMTP.
+
+    Args:
+        interruptor (InterruptorCircuito): Estado del circuito del servidor de correo
+        tamano (int): Número máximo de correos del lote
+        arrendamiento (int): Segundos que un correo queda reservado
+
+    Returns:
+        tuple: (enviados, fallidos) en este lote
+    """
+    from ..models import CorreoPendiente
+
+    if interruptor.abierto:
+        return 0, 0
+    correos = reclamar_lote(tamano, arrendamiento)
+    if not correos:
+        return 0, 0
+
+    max_intentos = getattr(settings, 'CORREOS_MAX_INTENTOS', 8)
+    enviados = fallidos = 0
+    conexion = get_connection()
+    try:
+        conexion.open()
+    except Exception as error:
+        logger.exception('No fue posible conectar con el servidor de correo')
+        interruptor.registrar_fallo()
+        _reprogramar(correos, str(error), max_intentos)
+        return 0, len(correos)
+
+    try:
+        for posicion, correo in enumerate(correos):
+            if interruptor.abierto:
+                # Los correos restantes se liberan sin contar un intento
+                CorreoPendiente.objects.filter(pk__in=[c.pk for c in correos[posicion:]]).update(
+                    proximo_intento=timezone.now()
+                )
+                break
+            try:
+                EmailMessage(
+                    subject=correo.asunto,
+                    body=correo.mensaje,
+                    from_email=correo.remitente,
+                    to=[correo.destinatario],
+                    connection=conexion,
+                ).send()
+            except Exception as error:
+                logger.warning('Error al enviar el correo %s: %s', correo.pk, error)
+                interruptor.registrar_fallo()
+                _reprogramar([correo], str(error), max_intentos)
+                fallidos += 1
+            else:
+                interruptor.registrar_exito()
+                CorreoPendiente.objects.filter(pk=correo.pk).update(
+                    estado='enviado', fecha_envio=timezone.now(),
+                    intentos=correo.intentos + 1, ultimo_error='',
+                )
+                enviados += 1
+    finally:
+        conexion.close()
+    return enviados, fallidos
+
+
+def _reprogramar(correos, error, max_intentos):
+    """Programa el siguiente intento con espera exponencial o marca el correo como fallido."""
+    from ..models import CorreoPendiente
+
+    ahora = timezone.now()
+    for correo in correos:
+        intentos = correo.intentos + 1
+        campos = {'intentos': intentos, 'ultimo_error': error[:2000]}
+        if intentos >= max_intentos:
+            campos['estado'] = 'fallido'
+        else:
+            campos['proximo_intento'] = ahora + timedelta(seconds=calcular_espera(intentos))
+        CorreoPendiente.objects.filter(pk=correo.pk).update(**campos)
@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Subquery
+from django.utils import timezone
+
+CONTADORES = ('total_vehiculos', 'vehiculos_disponibles', 'total_conductores', 'total_rutas')
+
+
+def _sumar(filas, cambios):
+    """Aplica los cambios a las filas con UPDATE ... SET campo = campo + n; retorna las filas afectadas."""
+    return filas.update(
+        fecha_actualizacion=timezone.now(),
+        **{campo: F(campo) + valor for campo, valor in cambios.items()},
+    )
+
+
+def ajustar(id_empresa, **cambios):
+    """
+    Suma los cambios a los contadores de una empresa.
+
+    El incremento lo hace la base de datos, así que dos ajustes concurrentes
+    no se pisan. Si la empresa aún no tiene fila se crea con los valores
+    reales (ver recalcular).
+
+    Args:
+        id_empresa: ID de la empresa
+        **cambios: Contador -> cantidad a sumar (puede ser negativa)
+    """
+    from ..models import DisponibilidadEmpresa
+
+    cambios = {campo: valor for campo, valor in cambios.items() if valor}
+    if not cambios or id_empresa is None:
+        return
+    if not _sumar(DisponibilidadEmpresa.objects.filter(id_empresa=id_empresa), cambios):
+        recalcular([id_empresa])
+
+
+def ajustar_por_vehiculo(id_vehiculo, **cambios):
+    """
+    Suma los cambios a los contadores de la empresa dueña de un vehículo.
+
+    La empresa se resuelve con una subconsulta dentro del mismo UPDATE, sin
+    cargar el vehículo.
+
+    Args:
+        id_vehiculo: ID del vehículo
+        **cambios: Contador -> cantidad a sumar (puede ser negativa)
+    """
+    from ..models import DisponibilidadEmpresa, Vehiculo
+
+    cambios = {campo: valor for campo, valor in cambios.items() if valor}
+    if not cambios or id_vehiculo is None:
+        return
+    empresa = Vehiculo.objects.filter(pk=id_vehiculo).values('empresa')[:1]
+    if not _sumar(DisponibilidadEmpresa.objects.filter(id_empresa=Subquery(empresa)), cambios):
+        recalcular(list(empresa.values_list('empresa', flat=True)))
+
+
+def recalcular(empresas=None):
+    """
+    Recalcula los contadores a partir de la flota y corrige las filas.
+
+    Las filas existentes se bloquean antes de contar, de modo que los ajustes
+    concurrentes esperan y se aplican sobre los valores corregidos.
+
+    Args:
+        empresas: IDs de las empresas a recalcular; None recalcula todas
+
+    Returns:
+        list: Tuplas (id_empresa, {contador: (anterior, actual)}) de las
+            empresas cuyos contadores cambiaron
+    """
+    from ..models import Conductor, DisponibilidadEmpresa, Ruta, Vehiculo
+
+    filas = DisponibilidadEmpresa.objects.all()
+    vehiculos = Vehiculo.objects.all()
+    conductores = Conductor.objects.all()
+    rutas = Ruta.objects.all()
+    if empresas is not None:
+        empresas = set(empresas)
+        filas = filas.filter(id_empresa__in=empresas)
+        vehiculos = vehiculos.filter(empresa__in=empresas)
+        conductores = conductores.filter(id_vehiculos__empresa__in=empresas)
+        rutas = rutas.filter(id_vehiculos__empresa__in=empresas)
+
+    with transaction.atomic(savepoint=False):
+        anteriores = {
+            fila['id_empresa']: fila
+            for fila in filas.select_for_update().values('id_empresa', *CONTADORES)
+        }
+        actuales = {
+            id_empresa: dict.fromkeys(CONTADORES, 0)
+            for id_empresa in set(anteriores) | (empresas or set())
+        }
+        for fila in vehiculos.values('empresa').annotate(
+            total=Count('pk'), disponibles=Count('pk', filter=Q(disponibilidad=True)),
+        ).order_by():
+            contadores = actuales.setdefault(fila['empresa'], dict.fromkeys(CONTADORES, 0))
+            contadores['total_vehiculos'] = fila['total']
+            contadores['vehiculos_disponibles'] = fila['disponibles']
+        for consulta, contador in ((conductores, 'total_conductores'), (rutas, 'total_rutas')):
+            for fila in consulta.values('id_vehiculos__empresa').annotate(total=Count('pk')).order_by():
+                actuales[fila['id_vehiculos__empresa']][contador] = fila['total']
+
+        diferencias = []
+        for id_empresa, contadores in sorted(actuales.items()):
+            anterior = anteriores.get(id_empresa, dict.fromkeys(CONTADORES, None))
+            cambios = {
+                campo: (anterior[campo], valor)
+                for campo, valor in contadores.items() if anterior[campo] != valor
+            }
+            if cambios:
+                diferencias.append((id_empresa, cambios))
+
+        cambiadas = {id_empresa for id_empresa, _ in diferencias}
+        DisponibilidadEmpresa.objects.bulk_create(
+            [
+                DisponibilidadEmpresa(id_empresa=id_empresa, fecha_actualizacion=timezone.now(), **contadores)
+                for id_empresa, contadores in actuales.items() if id_empresa in cambiadas
+            ],
+            update_conflicts=True,
+            unique_fields=['id_empresa'],
+            update_fields=[*CONTADORES, 'fecha_actualizacion'],
+        )
+    return diferencias
@@ -0,0 +1,197 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class EscritorPorLotes(ABC):
+    """
+    Escritor diferido que agrupa registros en memoria y los persiste por lotes.
+
+    Los registros se encolan en una cola acotada y un hilo en segundo plano
+    los escribe cuando se alcanza el tamaño de lote o transcurre el intervalo
+    configurado. Si la escritura falla, o la cola está llena, los registros
+    se agregan a un archivo de respaldo (JSON por línea) que puede
+    reprocesarse después con `reprocesar_respaldo`. Al terminar el proceso se
+    vacía la cola pendiente.
+
+    Las subclases implementan `escribir_lote` y, si sus registros no son
+    serializables a JSON, `serializar` / `deserializar`.
+
+    Atributos:
+        nombre: Nombre usado en el hilo y en los mensajes de log
+        tamano_lote: Número de registros que dispara una escritura
+        intervalo: Segundos máximos que un registro espera en la cola
+        archivo_respaldo: Ruta del archivo de respaldo (None para descartar)
+        sincrono: Si es True, cada registro se escribe en el hilo que lo recibe
+    """
+
+    def __init__(self, nombre, tamano_lote=100, intervalo=2.0, max_cola=10000,
+                 archivo_respaldo=None, sincrono=False):
+        self.nombre = nombre
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.archivo_respaldo = str(archivo_respaldo) if archivo_respaldo else None
+        self.sincrono = sincrono
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._atexit_registrado = False
+        self._lock_hilo = threading.Lock()
+        self._lock_vaciado = threading.Lock()
+        self._lock_respaldo = threading.Lock()
+
+    @abstractmethod
+    def escribir_lote(self, lote):
+        """Persiste una lista de registros."""
+
+    def serializar(self, registro):
+        """Convierte un registro en un valor serializable a JSON."""
+        return registro
+
+    def deserializar(self, dato):
+        """Reconstruye un registro leído del archivo de respaldo."""
+        return dato
+
+    def registrar(self, registro):
+        """
+        Encola un registro para su escritura diferida.
+
+        Nunca bloquea al llamador: si la cola está llena el registro se envía
+        directamente al archivo de respaldo.
+        """
+        if self.sincrono:
+            self._escribir([registro])
+            return
+
+        self._asegurar_hilo()
+        try:
+            self._cola.put_nowait(registro)
+        except queue.Full:
+            logger.warning('Cola de %s llena; registro enviado al respaldo', self.nombre)
+            self._respaldar([registro])
+            return
+        if self._cola.qsize() >= self.tamano_lote:
+            self._despertar.set()
+
+    def pendientes(self):
+        """Retorna el número aproximado de registros en cola."""
+        return self._cola.qsize()
+
+    def vaciar(self):
+        """Escribe todos los registros pendientes en lotes de `tamano_lote`."""
+        with self._lock_vaciado:
+            while True:
+                lote = []
+                while len(lote) < self.tamano_lote:
+                    try:
+                        lote.append(self._cola.get_nowait())
+                    except queue.Empty:
+                        break
+                if not lote:
+                    return
+                self._escribir(lote)
+
+    def detener(self, timeout=10):
+        """Detiene el hilo de fondo después de vaciar la cola."""
+        self._detener.set()
+        self._despertar.set()
+        hilo = self._hilo
+        if hilo is not None and hilo.is_alive():
+            hilo.join(timeout)
+        self.vaciar()
+
+    def reprocesar_respaldo(self):
+        """
+        Reintenta escribir los registros del archivo de respaldo.
+
+        El archivo se renombra a `.procesando` antes de leerlo para no perder
+        registros que lleguen mientras se reprocesa. Si ya existe un
+        `.procesando`, quedó de una ejecución interrumpida y se reprocesa
+        primero, en lugar de sobrescribirlo. Los lotes que vuelvan a fallar
+        se agregan de nuevo al respaldo. No debe ejecutarse en paralelo sobre
+        el mismo archivo.
+
+        Returns:
+            int: Número de registros leídos del respaldo
+        """
+        if not self.archivo_respaldo:
+            return 0
+
+        procesando = f'{self.archivo_respaldo}.procesando'
+        total = 0
+        if os.path.exists(procesando):
+            total += self._reprocesar_archivo(procesando)
+        with self._lock_respaldo:
+            if not os.path.exists(self.archivo_respaldo):
+                return total
+            os.replace(self.archivo_respaldo, procesando)
+        return total + self._reprocesar_archivo(procesando)
+
+    def _reprocesar_archivo(self, ruta):
+        """Escribe por lotes los registros de un archivo de respaldo y lo elimina."""
+        total = 0
+        lote = []
+        with open(ruta, encoding='utf-8') as archivo:
+            for linea in archivo:
+                if not linea.strip():
+                    continue
+                lote.append(self.deserializar(json.loads(linea)))
+                total += 1
+                if len(lote) >= self.tamano_lote:
+                    self._escribir(lote)
+                    lote = []
+        if lote:
+            self._escribir(lote)
+        os.remove(ruta)
+        return total
+
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock_hilo:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name=f'escritor-{self.nombre}', daemon=True)
+            self._hilo.start()
+            if not self._atexit_registrado:
+                # El hilo se reinicia si se detuvo; el vaciado al salir se registra una sola vez
+                atexit.register(self.detener)
+                self._atexit_registrado = True
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            # Solo en el hilo propio: descarta conexiones caídas o vencidas
+            close_old_connections()
+            self.vaciar()
+        close_old_connections()
+
+    def _escribir(self, lote):
+        try:
+            self.escribir_lote(lote)
+        except Exception:
+            logger.exception('Error al escribir un lote de %s (%d registros)', self.nombre, len(lote))
+            self._respaldar(lote)
+
+    def _respaldar(self, lote):
+        if not self.archivo_respaldo:
+            logger.error('Se descartan %d registros de %s sin archivo de respaldo', len(lote), self.nombre)
+            return
+        lineas = ''.join(json.dumps(self.serializar(r), ensure_ascii=False) + '\n' for r in lote)
+        with self._lock_respaldo:
+            os.makedirs(os.path.dirname(self.archivo_respaldo) or '.', exist_ok=True)
+            with open(self.archivo_respaldo, 'a', encoding='utf-8') as archivo:
+                archivo.write(lineas)
+                archivo.flush()
+                os.fsync(archivo.fileno())
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, get_hashers, make_password
+
+_executor = None
+_lock = threading.Lock()
+
+
+def hilos_configurados():
+    """Tamaño del pool de hashing: settings.HASH_MAX_HILOS o, por defecto, el número de CPUs con un máximo de 4."""
+    return getattr(settings, 'HASH_MAX_HILOS', None) or min(4, os.cpu_count() or 1)
+
+
+def obtener_executor():
+    """
+    Retorna el pool de hilos del proceso dedicado al hashing de contraseñas.
+
+    El tamaño lo da hilos_configurados(). Un pool acotado limita cuántos
+    hashes se calculan a la vez, de modo que una ráfaga de inicios de sesión
+    no consume todos los núcleos del servidor.
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=hilos_configurados(), thread_name_prefix='hashing')
+    return _executor
+
+
+def _verificar(contrasena, codificada):
+    """
+    Verifica una contraseña e indica si su hash debe actualizarse.
+
+    Returns:
+        tuple: (es_valida, requiere_actualizar)
+    """
+    actualizar = []
+    valida = check_password(contrasena, codificada, setter=lambda _: actualizar.append(True))
+    return valida, bool(actualizar)
+
+
+def generar_hash(contrasena):
+    """
+    Genera el hash de una contraseña en el pool de hashing.
+
+    PBKDF2 (hashlib) libera el GIL mientras calcula, por lo que varios hashes
+    del pool avanzan en paralelo sin bloquear al resto de hilos del proceso.
+
+    Args:
+        contrasena (str): Contraseña en texto plano, o None para una contraseña inutilizable
+
+    Returns:
+        str: Contraseña codificada con el hasher preferido
+    """
+    return obtener_executor().submit(make_password, contrasena).result()
+
+
+def verificar_contrasena(contrasena, codificada):
+    """
+    Verifica una contraseña contra su hash en el pool de hashing.
+
+    Returns:
+        tuple: (es_valida, requiere_actualizar). requiere_actualizar es True
+        cuando el hash usa un hasher distinto al preferido o menos iteraciones
+    """
+    return obtener_executor().submit(_verificar, contrasena, codificada).result()
+
+
+async def agenerar_hash(contrasena):
+    """Versión asíncrona de generar_hash para vistas ASGI."""
+    return await asyncio.wrap_future(obtener_executor().submit(make_password, contrasena))
+
+
+async def averificar_contrasena(contrasena, codificada):
+    """Versión asíncrona de verificar_contrasena para vistas ASGI."""
+    return await asyncio.wrap_future(obtener_executor().submit(_verificar, contrasena, codificada))
+
+
+def medir_hasher(hasher, segundos=1.0, hilos=1):
+    """
+    Mide cuántos hashes por segundo calcula un hasher en este equipo.
+
+    Args:
+        hasher: Instancia de hasher de django.contrib.auth.hashers
+        segundos (float): Duración aproximada de la medición
+        hilos (int): Hashes calculados en paralelo
+
+    Returns:
+        dict: hashes, segundos, hashes_por_segundo y ms_por_hash
+    """
+    sal = hasher.salt()
+    detener = time.perf_counter() + segundos
+    inicio = time.perf_counter()
+
+    def trabajar():
+        cuenta = 0
+        while time.perf_counter() < detener:
+            hasher.encode('contrasena-de-prueba', sal)
+            cuenta += 1
+        return cuenta
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        total = sum(f.result() for f in [pool.submit(trabajar) for _ in range(hilos)])
+    transcurrido = time.perf_counter() - inicio
+    return {
+        'hashes': total,
+        'segundos': transcurrido,
+        'hashes_por_segundo': total / transcurrido if transcurrido else 0.0,
+        'ms_por_hash': transcurrido * 1000 * hilos / total if total else None,
+    }
+
+
+def medir_hashers_configurados(segundos=1.0, hilos=1):
+    """
+    Mide cada hasher de settings.PASSWORD_HASHERS.
+
+    Los hashers cuya librería no está instalada (bcrypt, argon2) se reportan
+    con el error en lugar de medirse.
+
+    Returns:
+        list: Un dict por hasher con algorithm, preferido y la medición o el error
+    """
+    preferido = get_hasher('default').algorithm
+    resultados = []
+    for hasher in get_hashers():
+        resultado = {'algorithm': hasher.algorithm, 'preferido': hasher.algorithm == preferido}
+        try:
+            resultado.update(medir_hasher(hasher, segundos, hilos))
+        except (ValueError, ImportError) as error:
+            resultado['error'] = str(error)
+        resultados.append(resultado)
+    return resultados
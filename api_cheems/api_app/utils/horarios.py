@@ -0,0 +1,158 @@
+import threading
+import uuid
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import time
+from itertools import chain, islice
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .busqueda_rutas import normalizar
+
+CLAVE_VERSION = 'horarios:version'
+SEGUNDOS_DIA = 24 * 3600
+
+
+def segundos_del_dia(hora):
+    """Convierte un time a segundos desde la medianoche."""
+    return hora.hour * 3600 + hora.minute * 60 + hora.second
+
+
+def hora_desde_segundos(segundos):
+    """Convierte segundos desde la medianoche a un time; los que pasan de un día continúan en el siguiente."""
+    segundos %= SEGUNDOS_DIA
+    return time(segundos // 3600, segundos % 3600 // 60, segundos % 60)
+
+
+class IndiceSalidas:
+    """
+    Horarios de salida de las rutas agrupados por origen normalizado.
+
+    Cada origen tiene un array de segundos desde la medianoche ordenado una
+    sola vez al construir el índice, y un array paralelo con los IDs de las
+    rutas. La próxima salida se ubica por bisección y las siguientes se leen
+    en orden, así que una consulta solo reserva memoria para las salidas que
+    retorna.
+
+    Atributos:
+        version: Versión de CLAVE_VERSION con la que se construyó
+    """
+
+    def __init__(self, filas, version=None):
+        """
+        Args:
+            filas: Tuplas (id_ruta, nombre_ruta, origen, origen_normalizado, destino, horario)
+            version: Versión de los datos leídos
+        """
+        self.version = version
+        self._detalle = {}
+        por_origen = defaultdict(list)
+        for id_ruta, nombre_ruta, origen, origen_normalizado, destino, horario in filas:
+            self._detalle[id_ruta] = (nombre_ruta, origen, destino, horario)
+            por_origen[origen_normalizado].append((segundos_del_dia(horario), id_ruta))
+
+        self._salidas = {}
+        for origen_normalizado, salidas in por_origen.items():
+            salidas.sort()
+            self._salidas[origen_normalizado] = (
+                array('l', (segundos for segundos, _ in salidas)),
+                array('q', (id_ruta for _, id_ruta in salidas)),
+            )
+
+    def proximas(self, origen, despues, limite):
+        """
+        Retorna las próximas salidas desde un origen a partir de una hora.
+
+        Si quedan menos de `limite` salidas en el día se continúa con las
+        primeras del día siguiente.
+
+        Args:
+            origen (str): Origen, sin normalizar
+            despues (time): Hora desde la que se buscan salidas (incluida)
+            limite (int): Número máximo de salidas
+
+        Returns:
+            list: Diccionarios con id_ruta, nombre_ruta, origen, destino,
+                horario y dia_siguiente
+        """
+        salidas = self._salidas.get(normalizar(origen))
+        if salidas is None:
+            return []
+        segundos, rutas = salidas
+        inicio = bisect_left(segundos, segundos_del_dia(despues))
+        posiciones = chain(range(inicio, len(rutas)), range(inicio))
+        resultado = []
+        for posicion in islice(posiciones, limite):
+            nombre_ruta, origen_ruta, destino, horario = self._detalle[rutas[posicion]]
+            resultado.append({
+                'id_ruta': rutas[posicion],
+                'nombre_ruta': nombre_ruta,
+                'origen': origen_ruta,
+                'destino': destino,
+                'horario': horario,
+                'dia_siguiente': posicion < inicio,
+            })
+        return resultado
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def version_actual():
+    """Retorna la versión vigente de los horarios en la caché compartida, creándola si falta."""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex, None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def _nueva_version():
+    cache.set(CLAVE_VERSION, uuid.uuid4().hex, None)
+
+
+def invalidar():
+    """
+    Marca como vencidos los índices de horarios de todos los procesos.
+
+    La versión cambia de inmediato y otra vez al confirmar la transacción,
+    para que un índice reconstruido con datos previos a la confirmación no
+    quede marcado como vigente. La versión es un valor aleatorio y no un
+    contador, así que si la caché la descarta ningún proceso confunde su
+    índice con uno vigente.
+    """
+    _nueva_version()
+    transaction.on_commit(_nueva_version)
+
+
+def obtener_indice():
+    """
+    Retorna el índice de salidas del proceso, reconstruyéndolo con una
+    consulta si la versión de la caché cambió desde que se construyó.
+    """
+    global _indice
+    version = version_actual()
+    indice = _indice
+    if indice is not None and indice.version == version:
+        return indice
+    from ..models import Ruta
+
+    with _indice_lock:
+        if _indice is None or _indice.version != version:
+            _indice = IndiceSalidas(
+                Ruta.objects.values_list(
+                    'pk', 'nombre_ruta', 'origen', 'origen_normalizado', 'destino', 'horario',
+                ).iterator(),
+                version,
+            )
+        return _indice
+
+
+def reiniciar():
+    """Descarta el índice del proceso; la próxima consulta lo vuelve a construir."""
+    global _indice
+    with _indice_lock:
+        _indice = None
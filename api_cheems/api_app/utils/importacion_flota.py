@@ -0,0 +1,376 @@
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from datetime import date
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import disponibilidad, vencimientos
+
+VERDADEROS = {'1', 'true', 'si', 'sí', 'verdadero'}
+FALSOS = {'0', 'false', 'no', 'falso'}
+
+
+def _texto(datos, campo):
+    """Valor de la columna como texto sin espacios; vacío si falta."""
+    valor = datos.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+def _booleano(valor, por_defecto=True):
+    """Interpreta sí/no, true/false o 1/0 (texto o JSON); None si no es válido."""
+    if isinstance(valor, bool):
+        return valor
+    valor = '' if valor is None else str(valor).strip().lower()
+    if not valor:
+        return por_defecto
+    if valor in VERDADEROS:
+        return True
+    if valor in FALSOS:
+        return False
+    return None
+
+
+def _entero_positivo(valor):
+    """Convierte el valor a entero positivo; None si no es válido."""
+    try:
+        numero = int(str(valor).strip())
+    except ValueError:
+        return None
+    return numero if numero > 0 else None
+
+
+class _ImportadorFlota(ABC):
+    """
+    Base de los importadores de vehículos y conductores.
+
+    Las filas se procesan por lotes. Cada lote se valida en memoria, consulta
+    de una vez las placas y licencias que ya existen y se inserta con
+    bulk_create en una transacción. Si la inserción falla porque otro proceso
+    registró una placa o licencia entre la consulta y el INSERT, el lote se
+    reintenta fila por fila para reportar cuál falló.
+
+    bulk_create no envía señales, así que tras cada lote se ajustan
+    DisponibilidadEmpresa y el calendario de vencimientos de las filas
+    insertadas.
+
+    Atributos:
+        tamano_lote: Filas validadas e insertadas por transacción
+    """
+
+    def __init__(self, tamano_lote=None):
+        self.tamano_lote = tamano_lote or getattr(settings, 'IMPORTACION_FLOTA_LOTE', 500)
+        self._placas = set()
+        self._licencias = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+    def importar(self, filas):
+        """
+        Importa las filas y produce el resultado de cada una.
+
+        Args:
+            filas: Iterable de (numero_de_fila, datos) como el de leer_filas
+
+        Yields:
+            dict: fila, estado ('creado' o 'error') y los IDs creados o errores
+        """
+        filas = iter(filas)
+        while True:
+            lote = list(islice(filas, self.tamano_lote))
+            if not lote:
+                return
+            yield from self._importar_lote(lote)
+
+    @abstractmethod
+    def _importar_lote(self, lote):
+        """Valida e inserta un lote; retorna el resultado de cada fila en orden."""
+
+    def _validar_conductor(self, datos, columna_nombre, errores):
+        """
+        Valida en memoria las columnas de un conductor y agrega los errores.
+
+        Returns:
+            dict: Campos del conductor, o None si la fila no trae conductor
+        """
+        from ..models import VencimientoDocumento
+
+        nombre = _texto(datos, columna_nombre)
+        licencia = _texto(datos, 'licencia_conduccion')
+        if not nombre and not licencia:
+            return None
+        conductor = {'nombre': nombre, 'licencia_conduccion': _entero_positivo(licencia)}
+        if not nombre:
+            errores[columna_nombre] = ['El nombre del conductor es requerido']
+        elif len(nombre) > 100:
+            errores[columna_nombre] = ['El nombre no puede superar 100 caracteres']
+        if conductor['licencia_conduccion'] is None:
+            errores['licencia_conduccion'] = ['La licencia de conducción debe ser un número entero positivo']
+        elif conductor['licencia_conduccion'] in self._licencias:
+            errores['licencia_conduccion'] = ['La licencia de conducción está repetida en el archivo']
+        for campo in VencimientoDocumento.CAMPOS_CONDUCTOR.values():
+            valor = _texto(datos, campo)
+            try:
+                conductor[campo] = date.fromisoformat(valor) if valor else None
+            except ValueError:
+                errores[campo] = ['La fecha debe tener el formato AAAA-MM-DD']
+        return conductor
+
+    @staticmethod
+    def _licencias_registradas(conductores):
+        """Licencias de la lista que ya existen, con una sola consulta."""
+        from ..models import Conductor
+
+        licencias = [conductor['licencia_conduccion'] for conductor in conductores]
+        if not licencias:
+            return set()
+        return set(Conductor.objects.filter(
+            licencia_conduccion__in=licencias
+        ).values_list('licencia_conduccion', flat=True))
+
+    @staticmethod
+    def _asignar_llaves(modelo, objetos, campo):
+        """Completa las llaves de bulk_create cuando el backend no las retorna (MySQL)."""
+        if objetos and objetos[0].pk is None:
+            ids = dict(modelo.objects.filter(
+                **{f'{campo}__in': [getattr(objeto, campo) for objeto in objetos]}
+            ).values_list(campo, 'pk'))
+            for objeto in objetos:
+                objeto.pk = ids.get(getattr(objeto, campo))
+
+    @staticmethod
+    def _actualizar_derivados(vehiculos, conductores, empresa_por_vehiculo):
+        """Ajusta los contadores por empresa y el calendario de las filas insertadas."""
+        cambios = defaultdict(Counter)
+        for vehiculo in vehiculos:
+            cambios[vehiculo.empresa]['total_vehiculos'] += 1
+            cambios[vehiculo.empresa]['vehiculos_disponibles'] += int(vehiculo.disponibilidad)
+        for conductor in conductores:
+            cambios[empresa_por_vehiculo[conductor.id_vehiculos_id]]['total_conductores'] += 1
+        for id_empresa, contadores in cambios.items():
+            disponibilidad.ajustar(id_empresa, **contadores)
+        vencimientos.registrar_nuevos(conductores)
+
+    @staticmethod
+    def _guardar_fila(vehiculo=None, conductor=None):
+        """
+        Guarda una fila con save(), que envía las señales, en su propia transacción.
+
+        Returns:
+            dict: Errores por campo; vacío si la fila se guardó
+        """
+        try:
+            with transaction.atomic():
+                # Descarta las llaves que haya asignado el bulk_create revertido
+                if vehiculo is not None:
+                    vehiculo.pk = None
+                    vehiculo._state.adding = True
+                    vehiculo.save()
+                if conductor is not None:
+                    conductor.pk = None
+                    conductor._state.adding = True
+                    if vehiculo is not None:
+                        conductor.id_vehiculos = vehiculo
+                    conductor.save()
+        except ValidationError as error:
+            return error.message_dict
+        except IntegrityError as error:
+            return {'__all__': [str(error)]}
+        return {}
+
+
+class ImportadorVehiculos(_ImportadorFlota):
+    """
+    Importa vehículos y, en la misma fila, el conductor asignado.
+
+    Columnas: placa, empresa, disponibilidad (opcional, por defecto sí) y,
+    opcionalmente, nombre_conductor, licencia_conduccion y las fechas de
+    vencimiento del conductor (AAAA-MM-DD). Los vehículos se insertan
+    primero y sus llaves se asignan a los conductores antes de insertarlos,
+    todo en la misma transacción.
+    """
+
+    def _importar_lote(self, lote):
+        from ..models import Conductor, Vehiculo
+
+        resultados = {}
+        candidatos = []
+        for numero, datos in lote:
+            placa = _texto(datos, 'placa') if isinstance(datos, dict) else None
+            resultados[numero] = {'fila': numero, 'placa': placa}
+            errores, vehiculo, conductor = self._validar(datos)
+            if errores:
+                resultados[numero].update(estado='error', errores=errores)
+            else:
+                candidatos.append((numero, vehiculo, conductor))
+
+        placas = set(Vehiculo.objects.filter(
+            placa__in=[vehiculo['placa'] for _, vehiculo, _ in candidatos]
+        ).values_list('placa', flat=True))
+        licencias = self._licencias_registradas([conductor for _, _, conductor in candidatos if conductor])
+        validos = []
+        for numero, vehiculo, conductor in candidatos:
+            errores = {}
+            if vehiculo['placa'] in placas:
+                errores['placa'] = ['Esta placa ya está registrada']
+            if conductor and conductor['licencia_conduccion'] in licencias:
+                errores['licencia_conduccion'] = ['Esta licencia ya está registrada']
+            if errores:
+                resultados[numero].update(estado='error', errores=errores)
+            else:
+                validos.append((numero, Vehiculo(**vehiculo), Conductor(**conductor) if conductor else None))
+
+        vehiculos = [vehiculo for _, vehiculo, _ in validos]
+        try:
+            with transaction.atomic():
+                Vehiculo.objects.bulk_create(vehiculos)
+                self._asignar_llaves(Vehiculo, vehiculos, 'placa')
+                conductores = []
+                for _, vehiculo, conductor in validos:
+                    if conductor is not None:
+                        conductor.id_vehiculos = vehiculo
+                        conductores.append(conductor)
+                Conductor.objects.bulk_create(conductores)
+                self._asignar_llaves(Conductor, conductores, 'licencia_conduccion')
+                self._actualizar_derivados(
+                    vehiculos, conductores, {vehiculo.pk: vehiculo.empresa for vehiculo in vehiculos}
+                )
+        except IntegrityError:
+            for numero, vehiculo, conductor in validos:
+                errores = self._guardar_fila(vehiculo, conductor)
+                self._reportar(resultados[numero], errores, vehiculo, conductor)
+        else:
+            for numero, vehiculo, conductor in validos:
+                self._reportar(resultados[numero], {}, vehiculo, conductor)
+        return [resultados[numero] for numero, _ in lote]
+
+    @staticmethod
+    def _reportar(resultado, errores, vehiculo, conductor):
+        if errores:
+            resultado.update(estado='error', errores=errores)
+            return
+        resultado.update(estado='creado', id_vehiculos=vehiculo.pk)
+        if conductor is not None:
+            resultado['id_conductor'] = conductor.pk
+
+    def _validar(self, datos):
+        """
+        Valida y normaliza una fila en memoria, sin consultas.
+
+        Returns:
+            tuple: (errores por campo, campos del vehículo, campos del conductor o None)
+        """
+        if not isinstance(datos, dict):
+            return {'__all__': [datos]}, None, None
+        errores = {}
+        vehiculo = {
+            'placa': _texto(datos, 'placa'),
+            'empresa': _entero_positivo(_texto(datos, 'empresa')),
+            'disponibilidad': _booleano(datos.get('disponibilidad')),
+        }
+        if not vehiculo['placa']:
+            errores['placa'] = ['La placa es requerida']
+        elif len(vehiculo['placa']) > 20:
+            errores['placa'] = ['La placa no puede superar 20 caracteres']
+        elif vehiculo['placa'] in self._placas:
+            errores['placa'] = ['La placa está repetida en el archivo']
+        if vehiculo['empresa'] is None:
+            errores['empresa'] = ['La empresa debe ser un número entero positivo']
+        if vehiculo['disponibilidad'] is None:
+            errores['disponibilidad'] = ['La disponibilidad debe ser sí o no']
+        conductor = self._validar_conductor(datos, 'nombre_conductor', errores)
+        if not errores:
+            self._placas.add(vehiculo['placa'])
+            if conductor:
+                self._licencias.add(conductor['licencia_conduccion'])
+        return errores, vehiculo, conductor
+
+
+class ImportadorConductores(_ImportadorFlota):
+    """
+    Importa conductores asignados a vehículos existentes.
+
+    Columnas: nombre, licencia_conduccion, placa del vehículo asignado y,
+    opcionalmente, las fechas de vencimiento (AAAA-MM-DD). Las placas de
+    cada lote se resuelven con una sola consulta.
+    """
+
+    def _importar_lote(self, lote):
+        from ..models import Conductor, Vehiculo
+
+        resultados = {}
+        candidatos = []
+        for numero, datos in lote:
+            licencia = _texto(datos, 'licencia_conduccion') if isinstance(datos, dict) else None
+            resultados[numero] = {'fila': numero, 'licencia_conduccion': licencia}
+            errores, placa, conductor = self._validar(datos)
+            if errores:
+                resultados[numero].update(estado='error', errores=errores)
+            else:
+                candidatos.append((numero, placa, conductor))
+
+        vehiculos = {
+            placa: (id_vehiculos, empresa)
+            for placa, id_vehiculos, empresa in Vehiculo.objects.filter(
+                placa__in=[placa for _, placa, _ in candidatos]
+            ).values_list('placa', 'id_vehiculos', 'empresa')
+        }
+        licencias = self._licencias_registradas([conductor for _, _, conductor in candidatos])
+        validos = []
+        for numero, placa, conductor in candidatos:
+            errores = {}
+            if placa not in vehiculos:
+                errores['placa'] = [f'El vehículo con placa {placa} no existe']
+            if conductor['licencia_conduccion'] in licencias:
+                errores['licencia_conduccion'] = ['Esta licencia ya está registrada']
+            if errores:
+                resultados[numero].update(estado='error', errores=errores)
+            else:
+                validos.append((numero, Conductor(id_vehiculos_id=vehiculos[placa][0], **conductor)))
+
+        conductores = [conductor for _, conductor in validos]
+        try:
+            with transaction.atomic():
+                Conductor.objects.bulk_create(conductores)
+                self._asignar_llaves(Conductor, conductores, 'licencia_conduccion')
+                self._actualizar_derivados(
+                    [], conductores, {id_vehiculos: empresa for id_vehiculos, empresa in vehiculos.values()}
+                )
+        except IntegrityError:
+            for numero, conductor in validos:
+                errores = self._guardar_fila(conductor=conductor)
+                if errores:
+                    resultados[numero].update(estado='error', errores=errores)
+                else:
+                    resultados[numero].update(estado='creado', id_conductor=conductor.pk)
+        else:
+            for numero, conductor in validos:
+                resultados[numero].update(estado='creado', id_conductor=conductor.pk)
+        return [resultados[numero] for numero, _ in lote]
+
+    def _validar(self, datos):
+        """
+        Valida y normaliza una fila en memoria, sin consultas.
+
+        Returns:
+            tuple: (errores por campo, placa del vehículo, campos del conductor)
+        """
+        if not isinstance(datos, dict):
+            return {'__all__': [datos]}, None, None
+        errores = {}
+        placa = _texto(datos, 'placa')
+        if not placa:
+            errores['placa'] = ['La placa del vehículo es requerida']
+        conductor = self._validar_conductor(datos, 'nombre', errores)
+        if conductor is None:
+            errores['nombre'] = ['El nombre del conductor es requerido']
+            errores['licencia_conduccion'] = ['La licencia de conducción es requerida']
+        elif not errores:
+            self._licencias.add(conductor['licencia_conduccion'])
+        return errores, placa, conductor
@@ -0,0 +1,257 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from . import hashing
+
+
+def leer_filas(archivo, formato):
+    """
+    Lee un archivo CSV o NDJSON fila por fila sin cargarlo completo en memoria.
+
+    Args:
+        archivo: Archivo binario (UploadedFile o archivo abierto en modo 'rb')
+        formato (str): 'csv' o 'ndjson'
+
+    Yields:
+        tuple: (numero_de_fila, datos), donde datos es un diccionario o, si la
+        línea no pudo interpretarse, el mensaje de error
+    """
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='' if formato == 'csv' else None)
+    if formato == 'csv':
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            yield lector.line_num, fila
+    elif formato == 'ndjson':
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                datos = json.loads(linea)
+            except ValueError as error:
+                yield numero, f'JSON inválido: {error}'
+                continue
+            yield numero, datos if isinstance(datos, dict) else 'Cada línea debe ser un objeto JSON'
+    else:
+        raise ValueError(f'Formato no soportado: {formato}')
+
+
+def formato_por_nombre(nombre):
+    """Retorna 'csv' o 'ndjson' según la extensión del archivo, o None."""
+    nombre = nombre.lower()
+    if nombre.endswith('.csv'):
+        return 'csv'
+    if nombre.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def _inicializar_proceso(modulo_settings):
+    """Configura Django en los procesos del pool cuando el sistema no usa fork."""
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', modulo_settings)
+    if not settings.configured:
+        django.setup()
+
+
+class ImportadorUsuarios:
+    """
+    Importa usuarios por lotes.
+
+    Para cada lote:
+    1. Valida las filas en memoria (campos requeridos, formato del correo,
+       rol existente y correos repetidos dentro del archivo)
+    2. Busca con una sola consulta los correos que ya están registrados
+    3. Calcula los hashes de las contraseñas en paralelo: en el pool de
+       hilos de utils.hashing o, desde un comando, en un pool de procesos
+    4. Inserta el lote con bulk_create dentro de una transacción
+
+    Si el bulk_create falla porque otro proceso registró uno de los correos
+    entre la consulta y la inserción, el lote se reintenta fila por fila
+    para reportar cuál falló.
+
+    Atributos:
+        tamano_lote: Filas validadas e insertadas por transacción
+        procesos: Procesos del pool de hashing; con 1 (por defecto) se usa el
+            pool de hilos de utils.hashing. Solo los comandos deben pedir más:
+            crear un pool de procesos dentro de una solicitud bifurca un
+            worker con hilos en ejecución
+        rol_por_defecto: Nombre del rol para las filas sin columna rol
+    """
+
+    def __init__(self, tamano_lote=None, procesos=1, rol_por_defecto='Pasajero'):
+        from ..models import Rol
+        self.tamano_lote = tamano_lote or getattr(settings, 'IMPORTACION_USUARIOS_LOTE', 500)
+        self.procesos = procesos
+        self.rol_por_defecto = rol_por_defecto
+        self.roles = {rol.nombre.lower(): rol for rol in Rol.objects.all()}
+        self._vistos = set()
+        self._pool = None
+
+    def __enter__(self):
+        if self.procesos > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.procesos,
+                initializer=_inicializar_proceso,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'api_cheems.settings'),),
+            )
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def importar(self, filas):
+        """
+        Importa las filas y produce el resultado de cada una.
+
+        Args:
+            filas: Iterable de (numero_de_fila, datos) como el de leer_filas
+
+        Yields:
+            dict: fila, correo_electronico, estado ('creado' o 'error') y
+            id_usuario o errores
+        """
+        filas = iter(filas)
+        while True:
+            lote = list(islice(filas, self.tamano_lote))
+            if not lote:
+                return
+            yield from self._importar_lote(lote)
+
+    def _importar_lote(self, lote):
+        from ..models import Usuario
+
+        resultados = {}
+        candidatos = []
+        for numero, datos in lote:
+            errores = self._validar(datos)
+            correo = datos.get('correo_electronico') if isinstance(datos, dict) else None
+            resultados[numero] = {'fila': numero, 'correo_electronico': correo}
+            if errores:
+                resultados[numero].update(estado='error', errores=errores)
+            else:
+                candidatos.append((numero, datos))
+
+        registrados = set(Usuario.objects.filter(
+            correo_electronico__in=[datos['correo_electronico'] for _, datos in candidatos]
+        ).values_list('correo_electronico', flat=True))
+        validos = []
+        for numero, datos in candidatos:
+            if datos['correo_electronico'] in registrados:
+                resultados[numero].update(
+                    estado='error',
+                    errores={'correo_electronico': ['Este correo electrónico ya está registrado']},
+                )
+            else:
+                validos.append((numero, datos))
+
+        hashes = self._hashear([datos['contrasena'] for _, datos in validos])
+        usuarios = [
+            Usuario(
+                correo_electronico=datos['correo_electronico'],
+                nombre=datos['nombre'],
+                password=codificada,
+                rol=self.roles.get((datos.get('rol') or self.rol_por_defecto or '').lower()),
+            )
+            for (_, datos), codificada in zip(validos, hashes)
+        ]
+
+        try:
+            with transaction.atomic():
+                Usuario.objects.bulk_create(usuarios)
+        except IntegrityError:
+            self._insertar_uno_a_uno(validos, usuarios, resultados)
+        else:
+            if usuarios and usuarios[0].pk is None:
+                # El backend no retorna las llaves de bulk_create (MySQL): se consultan
+                ids = dict(Usuario.objects.filter(
+                    correo_electronico__in=[u.correo_electronico for u in usuarios]
+                ).values_list('correo_electronico', 'id_usuario'))
+                for usuario in usuarios:
+                    usuario.pk = ids.get(usuario.correo_electronico)
+            for (numero, _), usuario in zip(validos, usuarios):
+                resultados[numero].update(estado='creado', id_usuario=usuario.pk)
+        return [resultados[numero] for numero, _ in lote]
+
+    def _insertar_uno_a_uno(self, validos, usuarios, resultados):
+        for (numero, _), usuario in zip(validos, usuarios):
+            try:
+                with transaction.atomic():
+                    usuario.save()
+            except ValidationError as error:
+                resultados[numero].update(estado='error', errores=error.message_dict)
+            except IntegrityError as error:
+                resultados[numero].update(estado='error', errores={'__all__': [str(error)]})
+            else:
+                resultados[numero].update(estado='creado', id_usuario=usuario.pk)
+
+    def _validar(self, datos):
+        """
+        Valida y normaliza una fila en memoria, sin consultas.
+
+        Returns:
+            dict: Errores por campo; vacío si la fila es válida
+        """
+        from ..models import Usuario
+
+        if not isinstance(datos, dict):
+            return {'__all__': [datos]}
+        errores = {}
+        for campo, mensaje in (
+            ('correo_electronico', 'El correo electrónico es requerido'),
+            ('nombre', 'El nombre es requerido'),
+            ('contrasena', 'La contraseña es requerida'),
+        ):
+            valor = datos.get(campo)
+            if not isinstance(valor, str) or not valor.strip():
+                errores[campo] = [mensaje]
+        if errores:
+            return errores
+
+        correo = Usuario.objects.normalize_email(datos['correo_electronico'].strip())
+        datos['correo_electronico'] = correo
+        datos['nombre'] = datos['nombre'].strip()
+        try:
+            validate_email(correo)
+        except ValidationError:
+            errores['correo_electronico'] = ['Introduzca una dirección de correo electrónico válida']
+        if len(datos['nombre']) > 100:
+            errores['nombre'] = ['El nombre no puede superar 100 caracteres']
+        rol = datos.get('rol') or self.rol_por_defecto
+        if rol and not isinstance(rol, str):
+            errores['rol'] = ['El rol debe ser un texto']
+        elif rol and rol.lower() not in self.roles:
+            errores['rol'] = [f'El rol {rol} no existe']
+        if not errores:
+            if correo in self._vistos:
+                errores['correo_electronico'] = ['El correo electrónico está repetido en el archivo']
+            self._vistos.add(correo)
+        return errores
+
+    def _hashear(self, contrasenas):
+        if not contrasenas:
+            return []
+        if self._pool is None:
+            # PBKDF2 libera el GIL: los hilos del pool acotado calculan en paralelo
+            return list(hashing.obtener_executor().map(make_password, contrasenas))
+        bloque = max(1, len(contrasenas) // (self.procesos * 4))
+        return list(self._pool.map(make_password, contrasenas, chunksize=bloque))
+
+
+def resumir(resultados):
+    """Cuenta los resultados por estado."""
+    resumen = {'creados': 0, 'errores': 0}
+    for resultado in resultados:
+        resumen['creados' if resultado['estado'] == 'creado' else 'errores'] += 1
+    return resumen
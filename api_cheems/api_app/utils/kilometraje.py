@@ -0,0 +1,173 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db.models import Sum
+from django.utils import timezone
+
+from .telemetria import ms_desde_fecha
+
+RADIO_TIERRA_KM = 6371.0088
+
+# Tipos de NumPy equivalentes a las columnas empaquetadas de SegmentoTelemetria
+DTYPE_TIEMPO = np.dtype('<i8')
+DTYPE_VALOR = np.dtype('<f4')
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Distancia en kilómetros entre pares de puntos, elemento a elemento.
+
+    Acepta escalares o arrays del mismo tamaño y calcula todas las
+    distancias con operaciones vectorizadas de NumPy.
+
+    Returns:
+        numpy.ndarray: Distancias en kilómetros
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(valor, dtype=np.float64)) for valor in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def longitud_km(latitudes, longitudes):
+    """Longitud en kilómetros del recorrido que une los puntos en orden."""
+    latitudes, longitudes = np.asarray(latitudes), np.asarray(longitudes)
+    return float(haversine_km(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:]).sum())
+
+
+def limites_dia(fecha):
+    """Retorna el inicio del día local y el del día siguiente como datetimes con zona horaria."""
+    inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+    return inicio, inicio + timedelta(days=1)
+
+
+def kilometros_por_vehiculo(vehiculos, desde, hasta):
+    """
+    Calcula los kilómetros recorridos por cada vehículo según la telemetría.
+
+    Las columnas empaquetadas de todos los segmentos se leen como un único
+    array por columna, se descartan los puntos fuera del periodo y las
+    distancias entre puntos consecutivos del mismo vehículo se calculan y
+    suman sin recorrer los puntos en Python. Los puntos se ordenan por
+    vehículo y tiempo, porque las posiciones atrasadas llegan en segmentos
+    posteriores que se solapan en el tiempo con los anteriores; los tramos
+    entre segmentos consecutivos quedan incluidos.
+
+    Args:
+        vehiculos: IDs o QuerySet de vehículos
+        desde (datetime): Inicio del periodo
+        hasta (datetime): Fin del periodo (excluido)
+
+    Returns:
+        dict: ID del vehículo -> kilómetros, solo para vehículos con posiciones
+    """
+    from ..models import SegmentoTelemetria
+
+    segmentos = list(
+        SegmentoTelemetria.objects.filter(
+            id_vehiculos__in=vehiculos, inicio__lt=hasta, fin__gte=desde,
+        ).order_by('id_vehiculos', 'inicio').values_list('id_vehiculos', 'cantidad', 'tiempos', 'latitudes', 'longitudes')
+    )
+    if not segmentos:
+        return {}
+
+    ids, cantidades, tiempos, latitudes, longitudes = zip(*segmentos)
+    vehiculo = np.repeat(np.asarray(ids, dtype=np.int64), cantidades)
+    tiempos = np.frombuffer(b''.join(map(bytes, tiempos)), dtype=DTYPE_TIEMPO)
+    latitudes = np.frombuffer(b''.join(map(bytes, latitudes)), dtype=DTYPE_VALOR)
+    longitudes = np.frombuffer(b''.join(map(bytes, longitudes)), dtype=DTYPE_VALOR)
+
+    dentro = (tiempos >= ms_desde_fecha(desde)) & (tiempos < ms_desde_fecha(hasta))
+    vehiculo, tiempos = vehiculo[dentro], tiempos[dentro]
+    orden = np.lexsort((tiempos, vehiculo))
+    vehiculo, latitudes, longitudes = vehiculo[orden], latitudes[dentro][orden], longitudes[dentro][orden]
+
+    distancias = haversine_km(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:])
+    mismo_vehiculo = vehiculo[:-1] == vehiculo[1:]
+    unicos, indices = np.unique(vehiculo, return_inverse=True)
+    totales = np.bincount(indices[:-1][mismo_vehiculo], weights=distancias[mismo_vehiculo], minlength=len(unicos))
+    return dict(zip(unicos.tolist(), totales.tolist()))
+
+
+def distancias_rutas(rutas):
+    """
+    Calcula la distancia en línea recta de varias rutas en una sola operación.
+
+    Args:
+        rutas (list): Rutas con latitud y longitud de origen y destino
+
+    Returns:
+        list: Kilómetros de cada ruta en el mismo orden, o None si le faltan coordenadas
+    """
+    coordenadas = np.array(
+        [(ruta.latitud_origen, ruta.longitud_origen, ruta.latitud_destino, ruta.longitud_destino) for ruta in rutas],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    distancias = haversine_km(*coordenadas.T)
+    return [None if np.isnan(distancia) else round(float(distancia), 3) for distancia in distancias]
+
+
+def kilometros_empresas(fecha, empresas=None):
+    """
+    Calcula los kilómetros recorridos por empresa en un día.
+
+    Cada vehículo aporta los kilómetros de su telemetría. Los vehículos sin
+    posiciones en el día aportan la distancia de las rutas de sus viajes
+    completados.
+
+    Args:
+        fecha (date): Día a calcular
+        empresas: IDs de las empresas; None calcula todas
+
+    Returns:
+        dict: ID de la empresa -> kilómetros, solo para empresas con recorridos
+    """
+    from ..models import Vehiculo, Viaje
+
+    vehiculos = Vehiculo.objects.all()
+    if empresas is not None:
+        vehiculos = vehiculos.filter(empresa__in=empresas)
+    empresa_de = dict(vehiculos.values_list('pk', 'empresa'))
+    desde, hasta = limites_dia(fecha)
+
+    por_vehiculo = kilometros_por_vehiculo(list(empresa_de), desde, hasta)
+    viajes = Viaje.objects.filter(
+        id_ruta__id_vehiculos__in=list(empresa_de), estado='completado', fecha_viaje__gte=desde, fecha_viaje__lt=hasta,
+    ).exclude(id_ruta__id_vehiculos__in=list(por_vehiculo))
+    for fila in viajes.values('id_ruta__id_vehiculos').annotate(total=Sum('id_ruta__distancia_km')).order_by():
+        if fila['total']:
+            por_vehiculo[fila['id_ruta__id_vehiculos']] = fila['total']
+
+    totales = defaultdict(float)
+    for id_vehiculo, kilometros in por_vehiculo.items():
+        totales[empresa_de[id_vehiculo]] += kilometros
+    return dict(totales)
+
+
+def guardar_kilometros(fecha, empresas=None):
+    """
+    Escribe los kilómetros del día en EstadisticaEmpresa.
+
+    Las estadísticas existentes solo actualizan kilometros_recorridos; las
+    empresas sin estadística del día reciben una nueva fila.
+
+    Args:
+        fecha (date): Día a calcular
+        empresas: IDs de las empresas; None calcula todas
+
+    Returns:
+        dict: ID de la empresa -> kilómetros guardados
+    """
+    from ..models import EstadisticaEmpresa
+
+    totales = {id_empresa: round(kilometros, 2) for id_empresa, kilometros in kilometros_empresas(fecha, empresas).items()}
+    EstadisticaEmpresa.objects.bulk_create(
+        [
+            EstadisticaEmpresa(id_empresa=id_empresa, fecha=fecha, kilometros_recorridos=kilometros)
+            for id_empresa, kilometros in totales.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['id_empresa', 'fecha'],
+        update_fields=['kilometros_recorridos'],
+    )
+    return totales
@@ -0,0 +1,212 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def _recargar(tokens, actualizado, capacidad, tasa, ahora):
+    """Retorna los tokens disponibles tras recargar el bucket hasta `ahora`."""
+    return min(capacidad, tokens + max(0.0, ahora - actualizado) * tasa)
+
+
+def _consumir(estado, capacidad, tasa, costo, ahora):
+    """
+    Aplica el algoritmo de token bucket sobre el estado de un bucket.
+
+    Args:
+        estado (tuple): (tokens, actualizado) guardados, o None si el bucket es nuevo
+        capacidad (float): Tokens máximos del bucket (ráfaga permitida)
+        tasa (float): Tokens que se recuperan por segundo
+        costo (float): Tokens que consume la solicitud
+        ahora (float): Marca de tiempo actual
+
+    Returns:
+        tuple: (permitido, segundos_de_espera, tokens_restantes, expira), donde
+        expira es el momento en que el bucket vuelve a estar lleno y puede
+        descartarse sin cambiar el resultado de futuras consultas
+    """
+    tokens = capacidad if estado is None else _recargar(estado[0], estado[1], capacidad, tasa, ahora)
+    if tokens >= costo:
+        tokens -= costo
+        espera = 0.0
+    else:
+        espera = (costo - tokens) / tasa
+    expira = ahora + (capacidad - tokens) / tasa
+    return espera == 0.0, espera, tokens, expira
+
+
+class AlmacenMemoria:
+    """
+    Almacén de buckets en la memoria del proceso.
+
+    Adecuado para un solo proceso (desarrollo, pruebas). Los buckets llenos
+    se descartan periódicamente para que la memoria no crezca con cada IP
+    o correo distinto.
+    """
+
+    def __init__(self, purgar_cada=1000):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._purgar_cada = purgar_cada
+        self._operaciones = 0
+
+    def consumir(self, clave, capacidad, tasa, costo=1):
+        ahora = time.time()
+        with self._lock:
+            permitido, espera, tokens, expira = _consumir(self._buckets.get(clave), capacidad, tasa, costo, ahora)
+            self._buckets[clave] = (tokens, ahora, expira)
+            self._operaciones += 1
+            if self._operaciones >= self._purgar_cada:
+                self._operaciones = 0
+                self._buckets = {c: b for c, b in self._buckets.items() if b[2] > ahora}
+        return permitido, espera
+
+    def limpiar(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class AlmacenSQLite:
+    """
+    Almacén de buckets en un archivo SQLite compartido.
+
+    Todos los procesos de un mismo servidor comparten los buckets a través
+    del archivo. Cada consumo se hace dentro de una transacción
+    BEGIN IMMEDIATE, que toma el bloqueo de escritura antes de leer, de modo
+    que dos procesos no pueden gastar el mismo token.
+    """
+
+    def __init__(self, ruta, purgar_cada=1000):
+        self.ruta = str(ruta)
+        self._local = threading.local()
+        self._purgar_cada = purgar_cada
+        self._operaciones = 0
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with self._conexion() as conexion:
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'clave TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'actualizado REAL NOT NULL, expira REAL NOT NULL)'
+            )
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None, check_same_thread=False)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def consumir(self, clave, capacidad, tasa, costo=1):
+        conexion = self._conexion()
+        ahora = time.time()
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            fila = conexion.execute('SELECT tokens, actualizado FROM buckets WHERE clave = ?', (clave,)).fetchone()
+            permitido, espera, tokens, expira = _consumir(fila, capacidad, tasa, costo, ahora)
+            conexion.execute(
+                'INSERT OR REPLACE INTO buckets (clave, tokens, actualizado, expira) VALUES (?, ?, ?, ?)',
+                (clave, tokens, ahora, expira),
+            )
+            self._operaciones += 1
+            if self._operaciones >= self._purgar_cada:
+                self._operaciones = 0
+                conexion.execute('DELETE FROM buckets WHERE expira <= ?', (ahora,))
+            conexion.execute('COMMIT')
+        except Exception:
+            conexion.execute('ROLLBACK')
+            raise
+        return permitido, espera
+
+    def limpiar(self):
+        self._conexion().execute('DELETE FROM buckets')
+
+
+_almacen = (None, None)
+_lock = threading.Lock()
+
+
+def obtener_almacen():
+    """
+    Retorna el almacén de buckets configurado en settings.LIMITE_TASA_ALMACEN.
+
+    El almacén se crea una vez por proceso y se reutiliza mientras la
+    configuración no cambie.
+    """
+    global _almacen
+    ruta_clase = getattr(settings, 'LIMITE_TASA_ALMACEN', 'api_app.utils.limite_tasa.AlmacenMemoria')
+    opciones = getattr(settings, 'LIMITE_TASA_OPCIONES', {})
+    configuracion = (ruta_clase, json.dumps(opciones, sort_keys=True, default=str))
+    if _almacen[0] != configuracion:
+        with _lock:
+            if _almacen[0] != configuracion:
+                _almacen = (configuracion, import_string(ruta_clase)(**opciones))
+    return _almacen[1]
+
+
+def ip_cliente(request):
+    """
+    Obtiene la dirección IP del cliente.
+
+    El encabezado X-Forwarded-For lo puede escribir el propio cliente, así
+    que solo se usa si PROXIES_CONFIABLES indica cuántos proxies propios
+    hay delante de la aplicación: cada uno agrega la dirección de la que
+    recibió la solicitud, de modo que el cliente es la entrada que está
+    PROXIES_CONFIABLES posiciones desde la derecha. Sin proxies
+    configurados, o si el encabezado trae menos entradas, se usa
+    REMOTE_ADDR.
+
+    Args:
+        request: Objeto HttpRequest
+
+    Returns:
+        str: Dirección IP del cliente
+    """
+    proxies = getattr(settings, 'PROXIES_CONFIABLES', 0)
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies > 0 and x_forwarded_for:
+        direcciones = [direccion.strip() for direccion in x_forwarded_for.split(',')]
+        if len(direcciones) >= proxies:
+            return direcciones[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def correo_en_cuerpo(request, max_bytes=4096):
+    """
+    Extrae el correo electrónico del cuerpo de la solicitud sin pasar por
+    los parsers de DRF.
+
+    Solo se leen cuerpos JSON o de formulario pequeños; el cuerpo leído queda
+    en caché en el request y la vista lo vuelve a usar al parsearlo.
+
+    Returns:
+        str: Correo normalizado, o None si no viene o el cuerpo no es apto
+    """
+    try:
+        longitud = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return None
+    if not 0 < longitud <= max_bytes:
+        return None
+
+    tipo = request.content_type or ''
+    if tipo == 'application/json':
+        try:
+            datos = json.loads(request.body)
+        except ValueError:
+            return None
+        correo = datos.get('correo_electronico') if isinstance(datos, dict) else None
+    elif tipo == 'application/x-www-form-urlencoded':
+        correo = request.POST.get('correo_electronico')
+    else:
+        return None
+    if not isinstance(correo, str) or not correo.strip():
+        return None
+    return correo.strip().lower()
@@ -0,0 +1,257 @@
+import datetime
+import re
+
+from django.db import connection as conexion_defecto
+
+_PATRON_PARTICION = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def es_postgresql(conexion=None):
+    """Indica si la conexión usa PostgreSQL, único motor con particionamiento nativo."""
+    return (conexion or conexion_defecto).vendor == 'postgresql'
+
+
+def inicio_mes(fecha):
+    """Retorna el primer día del mes de la fecha dada."""
+    return datetime.date(fecha.year, fecha.month, 1)
+
+
+def sumar_meses(fecha, meses):
+    """Retorna el primer día del mes que está `meses` después de la fecha dada."""
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    return datetime.date(indice // 12, indice % 12 + 1, 1)
+
+
+def nombre_particion(tabla, mes):
+    """Retorna el nombre de la partición mensual de una tabla (Tabla_pAAAA_MM)."""
+    return f'{tabla}_p{mes.year:04d}_{mes.month:02d}'
+
+
+def esta_particionada(conexion, tabla):
+    """
+    Verifica si una tabla de PostgreSQL está particionada.
+
+    Returns:
+        bool: False también para cualquier motor distinto de PostgreSQL
+    """
+    if not es_postgresql(conexion):
+        return False
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table pt '
+            'JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s',
+            [tabla],
+        )
+        return cursor.fetchone() is not None
+
+
+def listar_particiones(conexion, tabla):
+    """
+    Lista las particiones mensuales de una tabla.
+
+    Returns:
+        list: Tuplas (nombre, primer_dia_del_mes) ordenadas por mes
+    """
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s',
+            [tabla],
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+
+    particiones = []
+    for nombre in nombres:
+        coincidencia = _PATRON_PARTICION.search(nombre)
+        if coincidencia:
+            anio, mes = int(coincidencia.group(1)), int(coincidencia.group(2))
+            particiones.append((nombre, datetime.date(anio, mes, 1)))
+    return sorted(particiones, key=lambda particion: particion[1])
+
+
+def crear_particion(conexion, tabla, columna, mes):
+    """
+    Crea la partición mensual de `mes` si aún no existe.
+
+    Las filas de ese rango que hubieran caído en la partición por defecto se
+    mueven a la nueva tabla antes de adjuntarla, porque PostgreSQL rechaza
+    ATTACH PARTITION si la partición por defecto contiene filas del rango.
+
+    Returns:
+        bool: True si la partición se creó
+    """
+    nombre = nombre_particion(tabla, mes)
+    if any(existente == nombre for existente, _ in listar_particiones(conexion, tabla)):
+        return False
+
+    q = conexion.ops.quote_name
+    desde = f"{mes.isoformat()} 00:00:00+00"
+    hasta = f"{sumar_meses(mes, 1).isoformat()} 00:00:00+00"
+    with conexion.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {q(nombre)} (LIKE {q(tabla)} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH movidas AS (DELETE FROM {q(tabla + "_default")} '
+            f'WHERE {q(columna)} >= %s AND {q(columna)} < %s RETURNING *) '
+            f'INSERT INTO {q(nombre)} SELECT * FROM movidas',
+            [desde, hasta],
+        )
+        cursor.execute(
+            f'ALTER TABLE {q(tabla)} ATTACH PARTITION {q(nombre)} '
+            f"FOR VALUES FROM ('{desde}') TO ('{hasta}')"
+        )
+    return True
+
+
+def asegurar_particiones(conexion, tabla, columna, desde, meses_adelante):
+    """
+    Crea las particiones desde el mes de `desde` hasta `meses_adelante` meses
+    después del mes actual.
+
+    Returns:
+        int: Número de particiones creadas
+    """
+    mes = inicio_mes(desde)
+    ultimo = sumar_meses(inicio_mes(datetime.date.today()), meses_adelante)
+    creadas = 0
+    while mes <= ultimo:
+        creadas += crear_particion(conexion, tabla, columna, mes)
+        mes = sumar_meses(mes, 1)
+    return creadas
+
+
+def eliminar_particion(conexion, tabla, nombre):
+    """Separa y elimina una partición completa sin recorrer sus filas."""
+    q = conexion.ops.quote_name
+    with conexion.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {q(tabla)} DETACH PARTITION {q(nombre)}')
+        cursor.execute(f'DROP TABLE {q(nombre)}')
+
+
+def borrar_por_lotes(conexion, tabla, columna, llave, limite, lote, pausa=None):
+    """
+    Borra las filas anteriores a `limite` en lotes acotados.
+
+    Cada lote es un DELETE independiente sobre como máximo `lote` filas, de
+    modo que los bloqueos y el volumen de WAL por sentencia quedan acotados.
+
+    Args:
+        limite (datetime): Se borran las filas con `columna` anterior a esta fecha
+        lote (int): Máximo de filas por sentencia
+        pausa (callable): Función opcional invocada entre lotes (p. ej. time.sleep)
+
+    Returns:
+        int: Número total de filas borradas
+    """
+    q = conexion.ops.quote_name
+    sql = (
+        f'DELETE FROM {q(tabla)} WHERE {q(columna)} < %s AND {q(llave)} IN ('
+        f'SELECT {q(llave)} FROM {q(tabla)} WHERE {q(columna)} < %s LIMIT %s)'
+    )
+    total = 0
+    while True:
+        with conexion.cursor() as cursor:
+            cursor.execute(sql, [limite, limite, lote])
+            borradas = cursor.rowcount
+        total += borradas
+        if borradas < lote:
+            return total
+        if pausa:
+            pausa()
+
+
+def _liberar_llave_primaria(cursor, conexion, tabla):
+    """
+    Renombra la restricción de llave primaria de una tabla para que su nombre
+    (p. ej. Tabla_pkey) quede libre para la tabla que la reemplaza.
+
+    Returns:
+        str: Nombre original de la restricción
+    """
+    q = conexion.ops.quote_name
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+        [q(tabla)],
+    )
+    fila = cursor.fetchone()
+    if not fila:
+        return f'{tabla}_pkey'
+    cursor.execute(f'ALTER TABLE {q(tabla)} RENAME CONSTRAINT {q(fila[0])} TO {q(tabla + "_pkey")}')
+    return fila[0]
+
+
+def convertir_a_particionada(schema_editor, tabla, columna, llave, indices=(), meses_adelante=2):
+    """
+    Convierte una tabla existente de PostgreSQL en una tabla particionada por
+    rango mensual de `columna`, conservando sus filas.
+
+    La llave primaria pasa a ser (llave, columna), como exige PostgreSQL, y se
+    agrega una partición por defecto para que ninguna inserción falle si aún
+    no existe la partición del mes. En otros motores no hace nada.
+
+    Args:
+        indices (iterable): Tuplas (nombre, sql_columnas) de los índices a
+            recrear sobre la tabla particionada
+    """
+    conexion = schema_editor.connection
+    if not es_postgresql(conexion) or esta_particionada(conexion, tabla):
+        return
+
+    q = conexion.ops.quote_name
+    legado = f'{tabla}_legado'
+    with conexion.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {q(tabla)} RENAME TO {q(legado)}')
+        nombre_llave = _liberar_llave_primaria(cursor, conexion, legado)
+        cursor.execute(
+            f'CREATE TABLE {q(tabla)} (LIKE {q(legado)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            f'PARTITION BY RANGE ({q(columna)})'
+        )
+        cursor.execute(
+            f'ALTER TABLE {q(tabla)} ADD CONSTRAINT {q(nombre_llave)} '
+            f'PRIMARY KEY ({q(llave)}, {q(columna)})'
+        )
+        cursor.execute(f'CREATE TABLE {q(tabla + "_default")} PARTITION OF {q(tabla)} DEFAULT')
+        cursor.execute(f'SELECT MIN({q(columna)}) FROM {q(legado)}')
+        minimo = cursor.fetchone()[0]
+
+    asegurar_particiones(conexion, tabla, columna, minimo or datetime.date.today(), meses_adelante)
+
+    with conexion.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {q(tabla)} SELECT * FROM {q(legado)}')
+        cursor.execute(f'DROP TABLE {q(legado)}')
+        for nombre, columnas in indices:
+            cursor.execute(f'CREATE INDEX {q(nombre)} ON {q(tabla)} ({columnas})')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+            f"COALESCE((SELECT MAX({q(llave)}) FROM {q(tabla)}), 0) + 1, false)",
+            [q(tabla), llave],
+        )
+
+
+def revertir_particionada(schema_editor, tabla, columna, llave, indices=()):
+    """
+    Devuelve una tabla particionada a una tabla simple con la llave primaria
+    original. En otros motores no hace nada.
+    """
+    conexion = schema_editor.connection
+    if not esta_particionada(conexion, tabla):
+        return
+
+    q = conexion.ops.quote_name
+    particionada = f'{tabla}_particionada'
+    with conexion.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {q(tabla)} RENAME TO {q(particionada)}')
+        nombre_llave = _liberar_llave_primaria(cursor, conexion, particionada)
+        cursor.execute(
+            f'CREATE TABLE {q(tabla)} (LIKE {q(particionada)} INCLUDING DEFAULTS INCLUDING IDENTITY)'
+        )
+        cursor.execute(f'ALTER TABLE {q(tabla)} ADD CONSTRAINT {q(nombre_llave)} PRIMARY KEY ({q(llave)})')
+        cursor.execute(f'INSERT INTO {q(tabla)} SELECT * FROM {q(particionada)}')
+        cursor.execute(f'DROP TABLE {q(particionada)} CASCADE')
+        for nombre, columnas in indices:
+            cursor.execute(f'CREATE INDEX {q(nombre)} ON {q(tabla)} ({columnas})')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+            f"COALESCE((SELECT MAX({q(llave)}) FROM {q(tabla)}), 0) + 1, false)",
+            [q(tabla), llave],
+        )
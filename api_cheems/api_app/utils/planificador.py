@@ -0,0 +1,274 @@
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .busqueda_rutas import normalizar
+from .horarios import SEGUNDOS_DIA, hora_desde_segundos, segundos_del_dia
+from .versiones import version_contador
+
+CLAVE_VERSION = 'planificador:version'
+CAMPOS = ('pk', 'nombre_ruta', 'origen', 'origen_normalizado', 'destino', 'destino_normalizado',
+          'horario', 'duracion_minutos', 'distancia_km')
+INFINITO = 2 ** 62
+
+
+def duracion_segundos(duracion_minutos, distancia_km):
+    """
+    Duración de una ruta en segundos: la registrada o, si falta, la estimada
+    con distancia_km a PLANIFICADOR_VELOCIDAD_KMH.
+
+    Returns:
+        int: Segundos, o None si la ruta no tiene ninguno de los dos datos
+    """
+    if duracion_minutos is not None:
+        return duracion_minutos * 60
+    if distancia_km is not None:
+        return math.ceil(distancia_km / settings.PLANIFICADOR_VELOCIDAD_KMH * 3600)
+    return None
+
+
+class RedRutas:
+    """
+    Red de rutas como conexiones de un día ordenadas por hora de salida.
+
+    Cada ruta es una conexión de su origen a su destino que sale a su
+    horario y llega tras su duración. Las conexiones se guardan en arrays
+    paralelos (salida, llegada, parada de origen, parada de destino, ruta)
+    ordenados por salida, y las paradas son los lugares normalizados. Las
+    rutas sin duración conocida no forman parte de la red.
+
+    No es segura entre hilos por sí misma; obtener_red() y aplicar_cambio()
+    la protegen.
+
+    Atributos:
+        version: Versión de CLAVE_VERSION que refleja la red
+    """
+
+    def __init__(self, filas=(), version=None):
+        self.version = version
+        self._paradas = {}
+        self._nombres_paradas = []
+        self._rutas = {}
+        self.salidas = array('l')
+        self.llegadas = array('l')
+        self.desde = array('l')
+        self.hasta = array('l')
+        self.ids = array('q')
+
+        conexiones = []
+        for fila in filas:
+            conexion = self._conexion(fila)
+            if conexion is not None:
+                conexiones.append(conexion)
+        conexiones.sort()
+        for salida, id_ruta, llegada, desde, hasta in conexiones:
+            self._anexar(len(self.ids), salida, id_ruta, llegada, desde, hasta)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _parada(self, normalizado, nombre):
+        indice = self._paradas.get(normalizado)
+        if indice is None:
+            indice = self._paradas[normalizado] = len(self._nombres_paradas)
+            self._nombres_paradas.append(nombre)
+        return indice
+
+    def _conexion(self, fila):
+        """Convierte una fila de CAMPOS en (salida, id, llegada, desde, hasta) y registra la ruta."""
+        id_ruta, nombre_ruta, origen, origen_normalizado, destino, destino_normalizado, horario, duracion, distancia = fila
+        self._rutas.pop(id_ruta, None)
+        segundos = duracion_segundos(duracion, distancia)
+        if segundos is None or not origen_normalizado or not destino_normalizado or origen_normalizado == destino_normalizado:
+            return None
+        salida = segundos_del_dia(horario)
+        self._rutas[id_ruta] = (nombre_ruta, salida)
+        return (
+            salida, id_ruta, salida + segundos,
+            self._parada(origen_normalizado, origen), self._parada(destino_normalizado, destino),
+        )
+
+    def _anexar(self, posicion, salida, id_ruta, llegada, desde, hasta):
+        for columna, valor in (
+            (self.salidas, salida), (self.ids, id_ruta), (self.llegadas, llegada), (self.desde, desde), (self.hasta, hasta),
+        ):
+            columna.insert(posicion, valor)
+
+    def quitar(self, id_ruta):
+        """Quita la conexión de una ruta; no hace nada si no estaba en la red."""
+        ruta = self._rutas.pop(id_ruta, None)
+        if ruta is None:
+            return
+        _, salida = ruta
+        posicion = bisect_left(self.salidas, salida)
+        while self.ids[posicion] != id_ruta:
+            posicion += 1
+        for columna in (self.salidas, self.ids, self.llegadas, self.desde, self.hasta):
+            del columna[posicion]
+
+    def actualizar(self, fila):
+        """Reemplaza la conexión de una ruta con los valores de una fila de CAMPOS."""
+        self.quitar(fila[0])
+        conexion = self._conexion(fila)
+        if conexion is not None:
+            self._anexar(bisect_right(self.salidas, conexion[0]), *conexion)
+
+    def planificar(self, origen, destino, despues, max_transbordos, transbordo):
+        """
+        Busca el itinerario que llega antes del origen al destino.
+
+        Recorre una sola vez las conexiones que salen desde `despues`, en
+        orden de salida, guardando la llegada más temprana a cada parada con
+        1, 2, ... max_transbordos + 1 tramos. Entre dos tramos se exigen
+        `transbordo` segundos. Se detiene en la primera conexión que sale
+        después de la mejor llegada al destino. Entre itinerarios que llegan
+        a la misma hora se prefiere el de menos tramos.
+
+        Args:
+            origen (str): Lugar de partida, sin normalizar
+            destino (str): Lugar de llegada, sin normalizar
+            despues (time): Hora desde la que se puede salir
+            max_transbordos (int): Número máximo de cambios de ruta
+            transbordo (int): Segundos mínimos entre la llegada de un tramo
+                y la salida del siguiente
+
+        Returns:
+            list: Tramos del itinerario (id_ruta, nombre_ruta, origen,
+                destino, salida, llegada y llegada_dia_siguiente), o None si
+                no hay itinerario en el día
+        """
+        inicio_parada = self._paradas.get(normalizar(origen))
+        fin_parada = self._paradas.get(normalizar(destino))
+        if inicio_parada is None or fin_parada is None or inicio_parada == fin_parada:
+            return None
+
+        tramos = max_transbordos + 1
+        paradas = len(self._nombres_paradas)
+        llegada = [array('q', [INFINITO]) * paradas for _ in range(tramos + 1)]
+        llegada[0][inicio_parada] = segundos_del_dia(despues) - transbordo
+        conexion_de = [{} for _ in range(tramos + 1)]
+        mejor = INFINITO
+
+        salidas, llegadas, desde, hasta = self.salidas, self.llegadas, self.desde, self.hasta
+        for posicion in range(bisect_left(salidas, segundos_del_dia(despues)), len(salidas)):
+            salida = salidas[posicion]
+            if salida > mejor:
+                break
+            parada_desde, parada_hasta, llegada_conexion = desde[posicion], hasta[posicion], llegadas[posicion]
+            for tramo in range(tramos, 0, -1):
+                if llegada[tramo - 1][parada_desde] + transbordo <= salida and llegada_conexion < llegada[tramo][parada_hasta]:
+                    llegada[tramo][parada_hasta] = llegada_conexion
+                    conexion_de[tramo][parada_hasta] = posicion
+                    if parada_hasta == fin_parada:
+                        mejor = min(mejor, llegada_conexion)
+
+        if mejor == INFINITO:
+            return None
+        tramo = min(range(1, tramos + 1), key=lambda cantidad: (llegada[cantidad][fin_parada], cantidad))
+        itinerario = []
+        parada = fin_parada
+        while tramo > 0:
+            posicion = conexion_de[tramo][parada]
+            itinerario.append({
+                'id_ruta': self.ids[posicion],
+                'nombre_ruta': self._rutas[self.ids[posicion]][0],
+                'origen': self._nombres_paradas[desde[posicion]],
+                'destino': self._nombres_paradas[hasta[posicion]],
+                'salida': hora_desde_segundos(salidas[posicion]),
+                'llegada': hora_desde_segundos(llegadas[posicion]),
+                'llegada_dia_siguiente': llegadas[posicion] >= SEGUNDOS_DIA,
+            })
+            parada = desde[posicion]
+            tramo -= 1
+        itinerario.reverse()
+        return itinerario
+
+
+_red = None
+_red_lock = threading.Lock()
+
+
+def version_actual():
+    """Retorna la versión vigente de la red en la caché compartida (ver version_contador)."""
+    return version_contador(CLAVE_VERSION)
+
+
+def obtener_red():
+    """
+    Retorna la red del proceso, reconstruyéndola con una consulta si otro
+    proceso la modificó desde que se construyó.
+    """
+    global _red
+    version = version_actual()
+    red = _red
+    if red is not None and red.version == version:
+        return red
+    from ..models import Ruta
+
+    with _red_lock:
+        if _red is None or _red.version != version:
+            _red = RedRutas(Ruta.objects.values_list(*CAMPOS).iterator(), version)
+        return _red
+
+
+def aplicar_cambio(id_ruta, fila=None):
+    """
+    Aplica a la red del proceso el cambio de una ruta e incrementa la versión.
+
+    Si la red del proceso estaba al día (su versión es la anterior al
+    incremento) se modifica en su lugar; si otro proceso cambió rutas
+    mientras tanto, se descarta y se reconstruye en la próxima consulta.
+
+    Args:
+        id_ruta: ID de la ruta modificada
+        fila: Valores de CAMPOS de la ruta guardada, o None si se eliminó
+    """
+    global _red
+    with _red_lock:
+        try:
+            version = cache.incr(CLAVE_VERSION)
+        except ValueError:
+            _red = None
+            return
+        if _red is None or _red.version != version - 1:
+            _red = None
+            return
+        if fila is None:
+            _red.quitar(id_ruta)
+        else:
+            _red.actualizar(fila)
+        _red.version = version
+
+
+def registrar_cambio(ruta):
+    """Programa la actualización de la red con una ruta guardada, al confirmar la transacción."""
+    fila = tuple(
+        ruta.pk if campo == 'pk' else ruta._meta.get_field(campo).to_python(getattr(ruta, campo))
+        for campo in CAMPOS
+    )
+    transaction.on_commit(lambda: aplicar_cambio(ruta.pk, fila))
+
+
+def registrar_baja(id_ruta):
+    """Programa la eliminación de una ruta de la red, al confirmar la transacción."""
+    transaction.on_commit(lambda: aplicar_cambio(id_ruta))
+
+
+def invalidar():
+    """Marca la red de todos los procesos como vencida, p. ej. tras un bulk_update de rutas."""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        pass
+
+
+def reiniciar():
+    """Descarta la red del proceso; la próxima consulta la vuelve a construir."""
+    global _red
+    with _red_lock:
+        _red = None
@@ -0,0 +1,106 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+_NUMEROS = re.compile(r'\b\d+\b')
+_LISTAS_IN = re.compile(r'IN \((?:%s, )*%s\)')
+_CONTROL_TRANSACCION = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT')
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Una vista ejecutó más consultas que su presupuesto declarado."""
+
+
+def normalizar(sql):
+    """
+    Retorna la forma de una consulta: el SQL sin literales numéricos y con
+    las listas IN de cualquier longitud reducidas a una sola.
+
+    Dos consultas con la misma forma solo difieren en sus parámetros, que es
+    lo que ocurre en un patrón N+1.
+    """
+    return _NUMEROS.sub('?', _LISTAS_IN.sub('IN (...)', sql))
+
+
+class RegistroConsultas:
+    """
+    Envoltorio de ejecución (connection.execute_wrapper) que registra la
+    forma y la duración de cada consulta.
+
+    Atributos:
+        consultas: Lista de tuplas (forma, segundos)
+    """
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((normalizar(sql), time.perf_counter() - inicio))
+
+    @property
+    def total(self):
+        """Número de consultas ejecutadas, sin contar el control de transacciones."""
+        return sum(1 for forma, _ in self.consultas if not forma.startswith(_CONTROL_TRANSACCION))
+
+    @property
+    def tiempo(self):
+        """Segundos acumulados en la base de datos."""
+        return sum(duracion for _, duracion in self.consultas)
+
+    def repetidas(self, umbral):
+        """
+        Retorna las formas de consulta ejecutadas al menos `umbral` veces.
+
+        Returns:
+            list: Tuplas (forma, veces) de la más repetida a la menos repetida
+        """
+        conteo = Counter(forma for forma, _ in self.consultas if not forma.startswith(_CONTROL_TRANSACCION))
+        return [(forma, veces) for forma, veces in conteo.most_common() if veces >= umbral]
+
+
+@contextmanager
+def registrar_consultas():
+    """
+    Registra las consultas de todas las conexiones dentro del bloque.
+
+    Ejemplo:
+        with registrar_consultas() as registro:
+            client.get(url)
+        assert not registro.repetidas(3)
+    """
+    registro = RegistroConsultas()
+    with ExitStack() as pila:
+        for alias in connections:
+            pila.enter_context(connections[alias].execute_wrapper(registro))
+        yield registro
+
+
+def presupuesto_de(vista, metodo):
+    """
+    Retorna el presupuesto de consultas de una clase de vista para un método.
+
+    La vista lo declara en `presupuesto_consultas`: un entero que aplica a
+    todos los métodos o un diccionario método -> entero.
+
+    Returns:
+        int: Consultas permitidas, o None si la vista no declara presupuesto
+    """
+    presupuesto = getattr(vista, 'presupuesto_consultas', None)
+    if isinstance(presupuesto, dict):
+        return presupuesto.get(metodo)
+    return presupuesto
+
+
+def describir(registro, umbral_repeticiones, limite=3):
+    """Resume en texto el total, el tiempo y las consultas más repetidas de un registro."""
+    partes = [f'{registro.total} consultas en {registro.tiempo * 1000:.1f} ms']
+    for forma, veces in registro.repetidas(umbral_repeticiones)[:limite]:
+        partes.append(f'{veces}x {forma[:200]}')
+    return '; '.join(partes)
@@ -0,0 +1,190 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .versiones import incrementar_version, obtener_version
+
+ESPACIO_REVOCADOS = 'tokens_revocados'
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sobre un bytearray.
+
+    Responde "definitivamente no está" o "posiblemente está" con una tasa de
+    falsos positivos acotada para la capacidad indicada; nunca da falsos
+    negativos. Las posiciones se derivan de un único resumen blake2b con
+    doble hashing (h1 + i * h2).
+
+    Atributos:
+        bits: Tamaño del filtro en bits
+        funciones: Número de posiciones marcadas por elemento
+    """
+
+    def __init__(self, capacidad, tasa_error=0.001):
+        capacidad = max(1, capacidad)
+        self.bits = max(8, int(-capacidad * math.log(tasa_error) / (math.log(2) ** 2)))
+        self.funciones = max(1, round(self.bits / capacidad * math.log(2)))
+        self._datos = bytearray((self.bits + 7) // 8)
+
+    def _posiciones(self, valor):
+        resumen = hashlib.blake2b(valor.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(resumen[:8], 'little')
+        h2 = int.from_bytes(resumen[8:], 'little') | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.funciones))
+
+    def agregar(self, valor):
+        for posicion in self._posiciones(valor):
+            self._datos[posicion >> 3] |= 1 << (posicion & 7)
+
+    def __contains__(self, valor):
+        return all(self._datos[p >> 3] & (1 << (p & 7)) for p in self._posiciones(valor))
+
+
+class RegistroRevocados:
+    """
+    Copia en memoria del proceso de los JTI presentes en BlacklistedToken.
+
+    La consulta pasa primero por el filtro de Bloom: si el JTI no está en el
+    filtro, el token no está revocado y no se consulta la base de datos. Si
+    el filtro responde "posiblemente", se confirma contra el conjunto exacto.
+
+    La copia se sincroniza de forma incremental (las filas con id mayor al
+    último leído) cuando vence el intervalo configurado o cuando otro
+    proceso anuncia una revocación en la caché compartida. Las transacciones
+    pueden confirmarse en distinto orden que sus ids, así que los ids
+    saltados dentro de la ventana configurada se recuerdan como pendientes
+    y se vuelven a consultar en cada sincronización. Una purga de tokens
+    expirados incrementa la versión general y provoca una reconstrucción
+    completa.
+    """
+
+    def __init__(self, capacidad=100000, tasa_error=0.001, intervalo=30, tamano_lote=5000, ventana=1000):
+        self.capacidad = capacidad
+        self.tasa_error = tasa_error
+        self.intervalo = intervalo
+        self.tamano_lote = tamano_lote
+        self.ventana = ventana
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta la copia local; la siguiente consulta la reconstruye."""
+        with self._lock:
+            self._copia = self._copia_vacia()
+            self._ultimo_id = 0
+            self._pendientes = set()
+            self._version = None
+            self._proxima_sincronizacion = 0.0
+
+    def _copia_vacia(self):
+        return FiltroBloom(self.capacidad, self.tasa_error), set()
+
+    def agregar(self, jti):
+        """Registra localmente un JTI revocado en este proceso."""
+        with self._lock:
+            self._copia = self._agregado(self._copia, jti)
+
+    def _agregado(self, copia, jti):
+        """Agrega un JTI a una copia (filtro, conjunto) y la retorna, reemplazada si creció."""
+        filtro, jtis = copia
+        jtis.add(jti)
+        if len(jtis) <= self.capacidad:
+            filtro.agregar(jti)
+            return copia
+        # Se superó la capacidad prevista: se duplica para mantener la tasa de error
+        self.capacidad *= 2
+        filtro = FiltroBloom(self.capacidad, self.tasa_error)
+        for existente in jtis:
+            filtro.agregar(existente)
+        return filtro, jtis
+
+    def esta_revocado(self, jti):
+        """
+        Indica si un JTI está en la lista negra.
+
+        Se lee sin el lock: el filtro y el conjunto se reemplazan juntos en
+        una sola asignación, así que nunca se consulta una copia a medio
+        construir.
+
+        Args:
+            jti (str): Identificador del token
+
+        Returns:
+            bool: True si el token fue revocado
+        """
+        self.sincronizar()
+        filtro, jtis = self._copia
+        if jti not in filtro:
+            return False
+        return jti in jtis
+
+    def sincronizar(self, forzar=False):
+        """Trae de la base de datos las revocaciones nuevas si corresponde."""
+        version = obtener_version(ESPACIO_REVOCADOS, 'filtro')
+        if not forzar and version == self._version and time.monotonic() < self._proxima_sincronizacion:
+            return
+
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        with self._lock:
+            if self._version is not None and version[0] != self._version[0]:
+                # Hubo una purga: los JTI eliminados no pueden quitarse del filtro,
+                # así que se construye una copia nueva y se reemplaza al terminar
+                copia, ultimo_id, pendientes = self._copia_vacia(), 0, set()
+            else:
+                copia, ultimo_id, pendientes = self._copia, self._ultimo_id, set(self._pendientes)
+            while True:
+                condicion = Q(id__gt=ultimo_id)
+                if pendientes:
+                    condicion |= Q(id__in=pendientes)
+                filas = list(
+                    BlacklistedToken.objects.filter(condicion)
+                    .order_by('id')
+                    .values_list('id', 'token__jti')[:self.tamano_lote]
+                )
+                for id_revocado, jti in filas:
+                    copia = self._agregado(copia, jti)
+                    if id_revocado > ultimo_id:
+                        # Los ids saltados pueden pertenecer a transacciones aún sin confirmar
+                        pendientes.update(range(max(ultimo_id + 1, id_revocado - self.ventana), id_revocado))
+                        ultimo_id = id_revocado
+                    else:
+                        pendientes.discard(id_revocado)
+                if len(filas) < self.tamano_lote:
+                    break
+            self._copia = copia
+            self._ultimo_id = ultimo_id
+            self._pendientes = {i for i in pendientes if i > ultimo_id - self.ventana}
+            self._version = version
+            self._proxima_sincronizacion = time.monotonic() + self.intervalo
+
+
+registro = RegistroRevocados(
+    capacidad=getattr(settings, 'REVOCACION_CAPACIDAD', 100000),
+    tasa_error=getattr(settings, 'REVOCACION_TASA_ERROR', 0.001),
+    intervalo=getattr(settings, 'REVOCACION_INTERVALO_SINCRONIZACION', 30),
+    ventana=getattr(settings, 'REVOCACION_VENTANA_PENDIENTES', 1000),
+)
+
+
+def anunciar_revocacion(jti):
+    """
+    Agrega el JTI localmente y avisa a los demás procesos que sincronicen.
+
+    El aviso se repite al confirmar la transacción, porque los procesos que
+    sincronizaron con el primero todavía no veían la fila.
+    """
+    registro.agregar(jti)
+    incrementar_version(ESPACIO_REVOCADOS, 'filtro')
+    transaction.on_commit(lambda: incrementar_version(ESPACIO_REVOCADOS, 'filtro'))
+
+
+def anunciar_purga():
+    """Avisa a todos los procesos que reconstruyan su filtro tras una purga."""
+    incrementar_version(ESPACIO_REVOCADOS)
@@ -0,0 +1,370 @@
+import logging
+import math
+import sys
+import threading
+from array import array
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .escritor_lotes import EscritorPorLotes
+
+logger = logging.getLogger(__name__)
+
+# Formato de las columnas empaquetadas: tiempos en milisegundos desde la época
+# (int64) y coordenadas y velocidad en float32, siempre little-endian
+TIPO_TIEMPO = 'q'
+TIPO_VALOR = 'f'
+PREFIJO_ULTIMA = 'telemetria:ultima:'
+
+
+def empaquetar(tipo, valores):
+    """Empaqueta una secuencia de números en bytes little-endian del tipo de array dado."""
+    columna = array(tipo, valores)
+    if sys.byteorder == 'big':
+        columna.byteswap()
+    return columna.tobytes()
+
+
+def desempaquetar(tipo, datos):
+    """Reconstruye el array empaquetado con empaquetar()."""
+    columna = array(tipo)
+    columna.frombytes(bytes(datos))
+    if sys.byteorder == 'big':
+        columna.byteswap()
+    return columna
+
+
+def fecha_desde_ms(milisegundos):
+    """Convierte milisegundos desde la época a un datetime en UTC."""
+    return datetime.fromtimestamp(milisegundos / 1000, tz=dt_timezone.utc)
+
+
+def ms_desde_fecha(fecha):
+    """Convierte un datetime con zona horaria a milisegundos desde la época."""
+    return int(fecha.timestamp() * 1000)
+
+
+class AnilloPosiciones:
+    """
+    Búfer circular de las últimas posiciones de un vehículo.
+
+    Guarda tiempos, latitudes, longitudes y velocidades en arrays
+    preasignados; al llenarse, cada posición nueva reemplaza a la más
+    antigua sin asignar memoria.
+
+    Atributos:
+        capacidad: Número máximo de posiciones que conserva
+    """
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._tiempos = array(TIPO_TIEMPO, bytes(8 * capacidad))
+        self._latitudes = array(TIPO_VALOR, bytes(4 * capacidad))
+        self._longitudes = array(TIPO_VALOR, bytes(4 * capacidad))
+        self._velocidades = array(TIPO_VALOR, bytes(4 * capacidad))
+        self._siguiente = 0
+        self._tamano = 0
+
+    def __len__(self):
+        return self._tamano
+
+    @property
+    def ultimo_tiempo(self):
+        """Tiempo de la posición más reciente, o None si está vacío."""
+        return self._tiempos[self._siguiente - 1] if self._tamano else None
+
+    def agregar(self, tiempo, latitud, longitud, velocidad):
+        i = self._siguiente
+        self._tiempos[i] = tiempo
+        self._latitudes[i] = latitud
+        self._longitudes[i] = longitud
+        self._velocidades[i] = velocidad
+        self._siguiente = (i + 1) % self.capacidad
+        self._tamano = min(self._tamano + 1, self.capacidad)
+
+    def ultimas(self, cantidad=None):
+        """
+        Retorna las últimas posiciones, de la más antigua a la más reciente.
+
+        Returns:
+            list: Tuplas (tiempo_ms, latitud, longitud, velocidad)
+        """
+        cantidad = self._tamano if cantidad is None else min(cantidad, self._tamano)
+        inicio = (self._siguiente - cantidad) % self.capacidad
+        return [
+            (self._tiempos[i], self._latitudes[i], self._longitudes[i], self._velocidades[i])
+            for i in ((inicio + k) % self.capacidad for k in range(cantidad))
+        ]
+
+
+class BufferTelemetria:
+    """
+    Posiciones recientes de cada vehículo en la memoria del proceso.
+
+    Mantiene un AnilloPosiciones por vehículo y publica la última posición
+    de cada uno en la caché de Django, compartida entre procesos. Las
+    posiciones que llegan con un tiempo anterior a la última conocida (la
+    del anillo del proceso o la publicada por otro proceso) se guardan en la
+    base de datos pero no reemplazan la última posición.
+    """
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._anillos = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, posiciones):
+        """
+        Agrega posiciones (id_vehiculos, tiempo_ms, latitud, longitud, velocidad)
+        y actualiza la caché de últimas posiciones con una lectura y una
+        escritura.
+        """
+        ultimas = {}
+        with self._lock:
+            for id_vehiculos, tiempo, latitud, longitud, velocidad in posiciones:
+                anillo = self._anillos.get(id_vehiculos)
+                if anillo is None:
+                    anillo = self._anillos[id_vehiculos] = AnilloPosiciones(self.capacidad)
+                elif anillo.ultimo_tiempo is not None and anillo.ultimo_tiempo > tiempo:
+                    continue
+                anillo.agregar(tiempo, latitud, longitud, velocidad)
+                ultimas[id_vehiculos] = (tiempo, latitud, longitud, velocidad)
+        if not ultimas:
+            return
+        claves = {f'{PREFIJO_ULTIMA}{id_vehiculos}': posicion for id_vehiculos, posicion in ultimas.items()}
+        # Otro proceso pudo haber publicado una posición más reciente que este no ha visto
+        publicadas = cache.get_many(list(claves))
+        claves = {
+            clave: posicion for clave, posicion in claves.items()
+            if clave not in publicadas or publicadas[clave][0] <= posicion[0]
+        }
+        if claves:
+            cache.set_many(claves, getattr(settings, 'TELEMETRIA_ULTIMA_TTL', 3600))
+
+    def recientes(self, id_vehiculos, cantidad=None):
+        """Últimas posiciones recibidas por este proceso para el vehículo."""
+        with self._lock:
+            anillo = self._anillos.get(id_vehiculos)
+            return anillo.ultimas(cantidad) if anillo is not None else []
+
+    def limpiar(self):
+        with self._lock:
+            self._anillos.clear()
+
+
+class EscritorTelemetria(EscritorPorLotes):
+    """
+    Escritor por lotes de posiciones GPS.
+
+    Cada registro es la lista de posiciones de una solicitud. Al escribir un
+    lote se agrupan por vehículo y se insertan, con un único bulk_create,
+    como SegmentoTelemetria con sus columnas empaquetadas. Las posiciones de
+    vehículos eliminados después de validarlas se descartan, para que no
+    hagan fallar (ni manden al respaldo) las del resto del lote.
+    """
+
+    def escribir_lote(self, lote):
+        from ..models import SegmentoTelemetria, Vehiculo
+
+        por_vehiculo = defaultdict(list)
+        for posiciones in lote:
+            for id_vehiculos, *posicion in posiciones:
+                por_vehiculo[id_vehiculos].append(posicion)
+
+        existentes = set(Vehiculo.objects.filter(pk__in=list(por_vehiculo)).values_list('pk', flat=True))
+        for id_vehiculos in set(por_vehiculo) - existentes:
+            logger.warning(
+                'Se descartan %d posiciones del vehículo eliminado %s',
+                len(por_vehiculo.pop(id_vehiculos)), id_vehiculos,
+            )
+            olvidar_vehiculo(id_vehiculos)
+        SegmentoTelemetria.objects.bulk_create([
+            SegmentoTelemetria.desde_posiciones(id_vehiculos, posiciones)
+            for id_vehiculos, posiciones in por_vehiculo.items()
+        ])
+
+    def serializar(self, registro):
+        # NaN (velocidad desconocida) no es JSON estándar
+        return [[None if isinstance(v, float) and math.isnan(v) else v for v in p] for p in registro]
+
+    def deserializar(self, dato):
+        return [tuple(math.nan if v is None else v for v in p) for p in dato]
+
+
+def _numero(valor):
+    """Convierte a float los números JSON (no booleanos); None en otro caso."""
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return None
+    return float(valor)
+
+
+def _tiempo_ms(valor):
+    """Milisegundos desde la época de una fecha ISO 8601 o de un número de milisegundos; None si no es válida."""
+    if isinstance(valor, str):
+        fecha = parse_datetime(valor)
+        if fecha is None:
+            return None
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return ms_desde_fecha(fecha)
+    numero = _numero(valor)
+    return int(numero) if numero is not None and numero >= 0 else None
+
+
+def validar_posiciones(datos, ahora_ms=None):
+    """
+    Valida en memoria una lista de posiciones recibidas por la API.
+
+    Cada posición es un objeto con id_vehiculos, fecha (ISO 8601 o
+    milisegundos desde la época), latitud, longitud y, opcionalmente,
+    velocidad en km/h. Se rechazan las posiciones con más de
+    TELEMETRIA_MAX_ADELANTO segundos en el futuro y las de vehículos que no
+    existen (ver vehiculos_existentes).
+
+    Returns:
+        tuple: (posiciones válidas como tuplas (id_vehiculos, tiempo_ms,
+            latitud, longitud, velocidad), lista de {indice, error})
+    """
+    ahora_ms = ahora_ms or ms_desde_fecha(timezone.now())
+    limite_ms = ahora_ms + getattr(settings, 'TELEMETRIA_MAX_ADELANTO', 300) * 1000
+    validas = []
+    rechazadas = []
+    for indice, dato in enumerate(datos):
+        if not isinstance(dato, dict):
+            rechazadas.append({'indice': indice, 'error': 'Cada posición debe ser un objeto'})
+            continue
+        id_vehiculos = dato.get('id_vehiculos')
+        tiempo = _tiempo_ms(dato.get('fecha'))
+        latitud = _numero(dato.get('latitud'))
+        longitud = _numero(dato.get('longitud'))
+        velocidad = _numero(dato.get('velocidad')) if dato.get('velocidad') is not None else math.nan
+        if isinstance(id_vehiculos, bool) or not isinstance(id_vehiculos, int):
+            error = 'id_vehiculos debe ser un número entero'
+        elif tiempo is None:
+            error = 'La fecha debe ser ISO 8601 o milisegundos desde la época'
+        elif tiempo > limite_ms:
+            error = 'La fecha está en el futuro'
+        elif latitud is None or not -90 <= latitud <= 90:
+            error = 'La latitud debe estar entre -90 y 90'
+        elif longitud is None or not -180 <= longitud <= 180:
+            error = 'La longitud debe estar entre -180 y 180'
+        elif velocidad is None or velocidad < 0:
+            error = 'La velocidad debe ser un número no negativo'
+        else:
+            validas.append((indice, (id_vehiculos, tiempo, latitud, longitud, velocidad)))
+            continue
+        rechazadas.append({'indice': indice, 'error': error})
+
+    existentes = vehiculos_existentes({posicion[0] for _, posicion in validas})
+    posiciones = []
+    for indice, posicion in validas:
+        if posicion[0] in existentes:
+            posiciones.append(posicion)
+        else:
+            rechazadas.append({'indice': indice, 'error': f'El vehículo {posicion[0]} no existe'})
+    rechazadas.sort(key=lambda rechazo: rechazo['indice'])
+    return posiciones, rechazadas
+
+
+_vehiculos_conocidos = set()
+
+
+def vehiculos_existentes(ids):
+    """
+    Retorna cuáles de los IDs corresponden a vehículos existentes.
+
+    Los IDs ya confirmados se recuerdan en el proceso, así que en régimen
+    normal no se consulta la base de datos.
+    """
+    from ..models import Vehiculo
+
+    desconocidos = set(ids) - _vehiculos_conocidos
+    if desconocidos:
+        _vehiculos_conocidos.update(Vehiculo.objects.filter(pk__in=desconocidos).values_list('pk', flat=True))
+    return set(ids) & _vehiculos_conocidos
+
+
+def olvidar_vehiculo(id_vehiculos):
+    """Descarta un vehículo eliminado de los IDs confirmados del proceso."""
+    _vehiculos_conocidos.discard(id_vehiculos)
+
+
+def reiniciar():
+    """Vacía el búfer de posiciones y los vehículos confirmados del proceso."""
+    _vehiculos_conocidos.clear()
+    obtener_buffer().limpiar()
+
+
+_buffer = None
+_escritor = None
+_lock = threading.Lock()
+
+
+def obtener_buffer():
+    """Retorna el búfer de posiciones recientes del proceso."""
+    global _buffer
+    if _buffer is None:
+        with _lock:
+            if _buffer is None:
+                _buffer = BufferTelemetria(getattr(settings, 'TELEMETRIA_ANILLO', 256))
+    return _buffer
+
+
+def obtener_escritor():
+    """
+    Retorna el escritor de telemetría del proceso, creándolo con la
+    configuración TELEMETRIA_* de settings en el primer uso.
+    """
+    global _escritor
+    if _escritor is None:
+        with _lock:
+            if _escritor is None:
+                _escritor = EscritorTelemetria(
+                    'telemetria',
+                    tamano_lote=getattr(settings, 'TELEMETRIA_LOTE', 50),
+                    intervalo=getattr(settings, 'TELEMETRIA_INTERVALO', 1.0),
+                    max_cola=getattr(settings, 'TELEMETRIA_MAX_COLA', 10000),
+                    archivo_respaldo=getattr(settings, 'TELEMETRIA_RESPALDO', None),
+                    sincrono=getattr(settings, 'TELEMETRIA_SINCRONA', False),
+                )
+    return _escritor
+
+
+def registrar_posiciones(posiciones):
+    """
+    Recibe un lote de posiciones validadas.
+
+    Actualiza en el momento el búfer y la caché de últimas posiciones y deja
+    la inserción en la base de datos al escritor en segundo plano.
+
+    Args:
+        posiciones (list): Tuplas (id_vehiculos, tiempo_ms, latitud, longitud, velocidad)
+    """
+    if not posiciones:
+        return
+    obtener_buffer().agregar(posiciones)
+    obtener_escritor().registrar(posiciones)
+
+
+def ultima_posicion(id_vehiculos):
+    """
+    Retorna la última posición conocida del vehículo.
+
+    Se busca en la caché compartida y, si no está, en el último segmento
+    guardado.
+
+    Returns:
+        tuple: (tiempo_ms, latitud, longitud, velocidad), o None
+    """
+    from ..models import SegmentoTelemetria
+
+    posicion = cache.get(f'{PREFIJO_ULTIMA}{id_vehiculos}')
+    if posicion is not None:
+        return tuple(posicion)
+    segmento = SegmentoTelemetria.objects.filter(id_vehiculos=id_vehiculos).order_by('-fin').first()
+    return segmento.posiciones()[-1] if segmento is not None else None
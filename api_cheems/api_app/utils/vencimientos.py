@@ -0,0 +1,153 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+PLAZOS = (7, 30, 60)
+
+
+def sincronizar(conductor, creado=False, update_fields=None):
+    """
+    Actualiza el calendario de vencimientos con las fechas del conductor.
+
+    Las fechas presentes se escriben con un único INSERT ... ON CONFLICT y
+    las que quedaron vacías se eliminan. Si el guardado indicó
+    update_fields y ninguno es una fecha de vencimiento, no se consulta.
+
+    Args:
+        conductor (Conductor): Conductor recién guardado
+        creado (bool): Si el conductor se acaba de crear
+        update_fields: Campos guardados, o None si se guardaron todos
+    """
+    from ..models import VencimientoDocumento
+
+    campos = VencimientoDocumento.CAMPOS_CONDUCTOR
+    if update_fields is not None and not set(update_fields) & set(campos.values()):
+        return
+    fechas = {documento: getattr(conductor, campo) for documento, campo in campos.items()}
+    vigentes = [
+        VencimientoDocumento(id_conductor=conductor, documento=documento, fecha_vencimiento=fecha)
+        for documento, fecha in fechas.items() if fecha
+    ]
+    if vigentes:
+        VencimientoDocumento.objects.bulk_create(
+            vigentes,
+            update_conflicts=True,
+            unique_fields=['id_conductor', 'documento'],
+            update_fields=['fecha_vencimiento'],
+        )
+    sin_fecha = [documento for documento, fecha in fechas.items() if not fecha]
+    if sin_fecha and not creado:
+        VencimientoDocumento.objects.filter(id_conductor=conductor, documento__in=sin_fecha).delete()
+
+
+def registrar_nuevos(conductores):
+    """
+    Crea las filas del calendario de conductores insertados con bulk_create,
+    que no envía señales.
+
+    Args:
+        conductores (list): Conductores recién creados, con llave primaria
+    """
+    from ..models import VencimientoDocumento
+
+    VencimientoDocumento.objects.bulk_create([
+        VencimientoDocumento(id_conductor=conductor, documento=documento, fecha_vencimiento=getattr(conductor, campo))
+        for conductor in conductores
+        for documento, campo in VencimientoDocumento.CAMPOS_CONDUCTOR.items()
+        if getattr(conductor, campo)
+    ])
+
+
+def por_vencer(dias, id_empresa=None, hoy=None):
+    """
+    Retorna los documentos que vencen entre hoy y dentro de `dias` días.
+
+    La consulta es un rango sobre el índice de fechas del calendario.
+
+    Args:
+        dias (int): Días hacia adelante a consultar
+        id_empresa (int): Limita a los conductores de los vehículos de la empresa
+        hoy (date): Fecha de referencia; por defecto la fecha local
+
+    Returns:
+        QuerySet: Vencimientos ordenados por fecha, con conductor y vehículo
+    """
+    from ..models import VencimientoDocumento
+
+    hoy = hoy or timezone.localdate()
+    vencimientos = VencimientoDocumento.objects.filter(
+        fecha_vencimiento__range=(hoy, hoy + timedelta(days=dias)),
+    ).select_related('id_conductor__id_vehiculos').order_by('fecha_vencimiento', 'id_conductor', 'documento')
+    if id_empresa is not None:
+        vencimientos = vencimientos.filter(id_conductor__id_vehiculos__empresa=id_empresa)
+    return vencimientos
+
+
+def agrupar_por_plazo(vencimientos, hoy, plazos=PLAZOS):
+    """
+    Reparte los vencimientos en el menor plazo que los contiene.
+
+    Con los plazos (7, 30, 60), un documento que vence en 12 días queda en
+    el grupo 30 y no se repite en el 60.
+
+    Returns:
+        dict: Plazo -> lista de vencimientos, con todos los plazos presentes
+    """
+    grupos = {plazo: [] for plazo in plazos}
+    for vencimiento in vencimientos:
+        indice = bisect_left(plazos, (vencimiento.fecha_vencimiento - hoy).days)
+        if indice < len(plazos):
+            grupos[plazos[indice]].append(vencimiento)
+    return grupos
+
+
+def plazos_hasta(dias):
+    """Retorna los plazos de PLAZOS que no superan `dias`."""
+    return tuple(plazo for plazo in PLAZOS if plazo <= dias)
+
+
+def correos_resumen(destinatarios, dias=PLAZOS[-1], hoy=None):
+    """
+    Arma un resumen por empresa de los documentos por vencer.
+
+    Cada empresa con vencimientos en el periodo genera un correo por
+    destinatario, listo para encolar_correos().
+
+    Args:
+        destinatarios (list): Correos que reciben los resúmenes
+        dias (int): Días hacia adelante a incluir, uno de PLAZOS
+        hoy (date): Fecha de referencia; por defecto la fecha local
+
+    Returns:
+        list: Diccionarios con asunto, mensaje y destinatario
+    """
+    hoy = hoy or timezone.localdate()
+    por_empresa = defaultdict(list)
+    for vencimiento in por_vencer(dias, hoy=hoy):
+        por_empresa[vencimiento.id_conductor.id_vehiculos.empresa].append(vencimiento)
+
+    correos = []
+    for id_empresa, vencimientos in sorted(por_empresa.items()):
+        lineas = [f'Documentos de conductores de la empresa {id_empresa} que vencen en los próximos {dias} días:', '']
+        for plazo, grupo in agrupar_por_plazo(vencimientos, hoy, plazos_hasta(dias)).items():
+            if not grupo:
+                continue
+            lineas.append(f'Hasta {plazo} días:')
+            lineas.extend(
+                f'- {vencimiento.id_conductor.nombre}: {vencimiento.get_documento_display()} '
+                f'vence el {vencimiento.fecha_vencimiento:%d/%m/%Y}'
+                for vencimiento in grupo
+            )
+            lineas.append('')
+        mensaje = '\n'.join(lineas).rstrip()
+        correos.extend(
+            {
+                'asunto': f'Documentos por vencer - Empresa {id_empresa}',
+                'mensaje': mensaje,
+                'destinatario': destinatario,
+            }
+            for destinatario in destinatarios
+        )
+    return correos
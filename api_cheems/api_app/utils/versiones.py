@@ -0,0 +1,76 @@
+import random
+
+from django.core.cache import cache
+
+
+def _clave(espacio, identificador=None):
+    if identificador is None:
+        return f'version:{espacio}'
+    return f'version:{espacio}:{identificador}'
+
+
+def _semilla():
+    return random.getrandbits(62)
+
+
+def obtener_version(espacio, identificador):
+    """
+    Retorna la versión vigente de un objeto en la caché compartida.
+
+    La versión combina un contador del espacio completo (que invalida todos
+    sus objetos a la vez) y un contador propio del objeto. Ambos se leen en
+    una sola operación contra la caché. Los contadores que faltan (caché
+    vaciada o clave desalojada) se crean con un valor aleatorio, de modo que
+    la versión nueva no coincide con ninguna leída antes de perderlos.
+
+    Args:
+        espacio (str): Tipo de objeto versionado (p. ej. 'usuario')
+        identificador: Identificador del objeto dentro del espacio
+
+    Returns:
+        tuple: (version_espacio, version_objeto)
+    """
+    general, propia = _clave(espacio), _clave(espacio, identificador)
+    valores = cache.get_many([general, propia])
+    faltantes = [clave for clave in (general, propia) if clave not in valores]
+    if faltantes:
+        for clave in faltantes:
+            cache.add(clave, _semilla(), timeout=None)
+        valores.update(cache.get_many(faltantes))
+    return valores[general], valores[propia]
+
+
+def incrementar_version(espacio, identificador=None):
+    """
+    Incrementa la versión de un objeto, o la de todo el espacio si no se
+    indica identificador, para que las cachés locales de cada proceso
+    descarten sus copias en la siguiente lectura.
+
+    Returns:
+        int: Nueva versión
+    """
+    clave = _clave(espacio, identificador)
+    cache.add(clave, _semilla(), timeout=None)
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # La clave fue desalojada entre add() e incr()
+        version = _semilla()
+        cache.set(clave, version, timeout=None)
+        return version
+
+
+def version_contador(clave):
+    """
+    Retorna el contador de versión guardado en `clave` de la caché
+    compartida, creándolo si falta.
+
+    El contador empieza en un valor aleatorio, así que si la caché lo
+    descarta y se vuelve a crear no coincide con el de ninguna copia
+    construida antes. Los cambios lo incrementan con cache.incr().
+    """
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _semilla(), None)
+        version = cache.get(clave)
+    return version
@@ -2,20 +2,29 @@ from django.shortcuts import render
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
 from rest_framework import generics, status, serializers
-from .models import Usuario, Vehiculo, Conductor, Ruta, Calificacion, Zona, Tarifa, Rol, Viaje, RutaFavorita, CalificacionConductor, EstadisticaEmpresa, VersionSistema, IntentoLogin, PQRS
-from .serializers import (UsuarioSerializer,VehiculoSerializer, ConductorSerializer, RutaSerializer,CalificacionSerializer, CustomTokenObtainPairSerializer, RolSerializer, ZonaSerializer, TarifaSerializer, ViajeSerializer, RutaFavoritaSerializer, CalificacionConductorSerializer, EstadisticaEmpresaSerializer, VersionSistemaSerializer, PQRSSerializer)
-from django.core.mail import send_mail
+from .models import Usuario, Vehiculo, Conductor, Ruta, Calificacion, Zona, Tarifa, Rol, Viaje, RutaFavorita, CalificacionConductor, EstadisticaEmpresa, DisponibilidadEmpresa, VersionSistema, PQRS
+from .serializers import (UsuarioSerializer,VehiculoSerializer, ConductorSerializer, VencimientoDocumentoSerializer, RutaSerializer,CalificacionSerializer, CustomTokenObtainPairSerializer, RolSerializer, ZonaSerializer, TarifaSerializer, ViajeSerializer, RutaFavoritaSerializer, CalificacionConductorSerializer, EstadisticaEmpresaSerializer, VersionSistemaSerializer, PQRSSerializer)
 from django.conf import settings
 from .models import Usuario
 from .utils.token import generar_token, verificar_token 
+from .utils import autocompletado, bloqueo_login, busqueda_rutas, horarios, kilometraje, planificador, telemetria, vencimientos
+from .utils.auditoria_login import registrar_intento
+from .utils.claves_jwt import obtener_conjunto
+from .utils.correos import encolar_correo
+from .utils.importacion_flota import ImportadorConductores, ImportadorVehiculos
+from .utils.importacion_usuarios import ImportadorUsuarios, formato_por_nombre, leer_filas, resumir
+from .utils.limite_tasa import ip_cliente
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.contrib.auth.hashers import make_password
-from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from .authentication import JWTAutenticacionPorClaims
+from .permissions import EsStaff
 from rest_framework_simplejwt.views import TokenObtainPairView
 import csv
 import io
+import math
+from abc import ABC, abstractmethod
 from datetime import datetime
 from django.db import transaction
 from django.http import HttpResponse
@@ -34,7 +43,9 @@ class UsuarioList(generics.ListCreateAPIView):
     """
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
+    authentication_classes = [JWTAutenticacionPorClaims]
     permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 2}
 
 class UsuarioDetail(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -49,6 +60,7 @@ class UsuarioDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
+    authentication_classes = [JWTAutenticacionPorClaims]
     permission_classes = [IsAuthenticated]
 
 class VehiculoList(generics.ListCreateAPIView):
@@ -63,7 +75,9 @@ class VehiculoList(generics.ListCreateAPIView):
     """
     queryset = Vehiculo.objects.all()
     serializer_class = VehiculoSerializer
+    authentication_classes = [JWTAutenticacionPorClaims]
     permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 2}
 
 class VehiculoDetail(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -78,8 +92,107 @@ class VehiculoDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Vehiculo.objects.all()
     serializer_class = VehiculoSerializer
+    authentication_classes = [JWTAutenticacionPorClaims]
     permission_classes = [IsAuthenticated]
 
+class TelemetriaView(APIView):
+    """
+    Vista para recibir posiciones GPS de los vehículos.
+
+    Esta vista permite:
+    - POST: Registrar un lote de posiciones, como lista JSON o en el campo
+      posiciones. Cada posición tiene id_vehiculos, fecha (ISO 8601 o
+      milisegundos desde la época), latitud, longitud y, opcionalmente,
+      velocidad en km/h
+
+    Las posiciones válidas actualizan al instante la última posición de cada
+    vehículo y se insertan en segundo plano, agrupadas por vehículo, como
+    segmentos empaquetados (ver utils.telemetria). Responde 202 con las
+    posiciones aceptadas y el motivo de cada rechazo.
+
+    Requiere autenticación para acceder.
+    """
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated]
+    # Validación de vehículos; con TELEMETRIA_SINCRONA, además la comprobación
+    # y la inserción del lote
+    presupuesto_consultas = {'POST': 3}
+
+    def post(self, request):
+        """
+        Método para registrar un lote de posiciones.
+
+        Returns:
+            Response: Número de posiciones aceptadas y posiciones rechazadas
+        """
+        datos = request.data.get('posiciones') if isinstance(request.data, dict) else request.data
+        if not isinstance(datos, list):
+            return Response(
+                {'error': 'Se requiere una lista de posiciones'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        maximo = getattr(settings, 'TELEMETRIA_MAX_POSICIONES', 5000)
+        if len(datos) > maximo:
+            return Response(
+                {'error': f'Se admiten como máximo {maximo} posiciones por solicitud'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        posiciones, rechazadas = telemetria.validar_posiciones(datos)
+        telemetria.registrar_posiciones(posiciones)
+        return Response(
+            {'aceptadas': len(posiciones), 'rechazadas': rechazadas},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+class PosicionVehiculoView(APIView):
+    """
+    Vista para consultar la última posición de un vehículo.
+
+    Esta vista permite:
+    - GET: Obtener la última posición conocida y, con ?recientes=N, las
+      últimas N posiciones recibidas por este proceso
+
+    Requiere autenticación para acceder.
+    """
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 1}
+
+    @staticmethod
+    def _formatear(posicion):
+        tiempo, latitud, longitud, velocidad = posicion
+        return {
+            'fecha': telemetria.fecha_desde_ms(tiempo),
+            'latitud': latitud,
+            'longitud': longitud,
+            'velocidad': None if math.isnan(velocidad) else velocidad,
+        }
+
+    def get(self, request, pk):
+        """
+        Método para obtener la posición del vehículo.
+
+        Returns:
+            Response: Última posición y posiciones recientes
+        """
+        posicion = telemetria.ultima_posicion(pk)
+        if posicion is None:
+            return Response(
+                {'error': 'No hay posiciones registradas para el vehículo'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            cantidad = int(request.query_params.get('recientes', 0))
+        except ValueError:
+            cantidad = 0
+        recientes = telemetria.obtener_buffer().recientes(pk, cantidad) if cantidad > 0 else []
+        return Response({
+            'id_vehiculos': pk,
+            **self._formatear(posicion),
+            'recientes': [self._formatear(reciente) for reciente in recientes],
+        })
+
 class ConductorList(generics.ListCreateAPIView):
     """
     Vista para manejar la lista de conductores y su creación.
@@ -92,7 +205,9 @@ class ConductorList(generics.ListCreateAPIView):
     """
     queryset = Conductor.objects.all()
     serializer_class = ConductorSerializer
+    authentication_classes = [JWTAutenticacionPorClaims]
     permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 2}
 
 class ConductorDetail(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -107,7 +222,62 @@ class ConductorDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Conductor.objects.all()
     serializer_class = ConductorSerializer
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated]
+
+class ConductorPorVencerView(APIView):
+    """
+    Vista para consultar los documentos de conductores próximos a vencer.
+
+    Esta vista permite:
+    - GET: Obtener los vencimientos de licencia, SOAT y tecnomecánica de los
+      próximos ?dias= días (7, 30 o 60; por defecto 60), agrupados por plazo
+
+    Características especiales:
+    - Filtrado opcional por empresa con ?empresa_id=
+    - Cada documento aparece solo en el menor plazo que lo contiene
+    - Consulta por rango sobre el calendario indexado de vencimientos
+
+    Requiere autenticación para acceder.
+    """
+    authentication_classes = [JWTAutenticacionPorClaims]
     permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 2}
+
+    def get(self, request):
+        """
+        Método para obtener los vencimientos agrupados por plazo.
+
+        Returns:
+            Response: Fecha de corte y vencimientos por plazo
+        """
+        try:
+            dias = int(request.query_params.get('dias', vencimientos.PLAZOS[-1]))
+            empresa_id = request.query_params.get('empresa_id')
+            empresa_id = int(empresa_id) if empresa_id else None
+        except ValueError:
+            return Response(
+                {'error': 'Los parámetros dias y empresa_id deben ser números enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if dias not in vencimientos.PLAZOS:
+            return Response(
+                {'error': f'El parámetro dias debe ser uno de {", ".join(map(str, vencimientos.PLAZOS))}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        hoy = timezone.localdate()
+        grupos = vencimientos.agrupar_por_plazo(
+            vencimientos.por_vencer(dias, id_empresa=empresa_id, hoy=hoy), hoy, vencimientos.plazos_hasta(dias)
+        )
+        contexto = {'request': request, 'hoy': hoy}
+        return Response({
+            'fecha_corte': hoy,
+            'plazos': {
+                str(plazo): VencimientoDocumentoSerializer(grupo, many=True, context=contexto).data
+                for plazo, grupo in grupos.items()
+            },
+        })
 
 class RutaList(generics.ListCreateAPIView):
     """
@@ -118,32 +288,220 @@ class RutaList(generics.ListCreateAPIView):
     - POST: Crear una nueva ruta
     
     Características especiales:
-    - Permite filtrar rutas por origen y destino
+    - Permite buscar rutas por origen y destino sin distinguir tildes ni
+      mayúsculas, ordenadas por relevancia
     - Utiliza select_related para optimizar las consultas a la base de datos
     """
     serializer_class = RutaSerializer
+    # En motores distintos de PostgreSQL la primera búsqueda del proceso carga el índice en memoria
+    presupuesto_consultas = {'GET': 3}
 
     def get_queryset(self):
         """
         Método para obtener y filtrar las rutas.
         
         Filtros disponibles:
-        - origen: Filtra rutas que contengan el texto especificado en el origen
-        - destino: Filtra rutas que contengan el texto especificado en el destino
+        - origen: Busca el texto en el origen ('bogota' encuentra 'Bogotá')
+        - destino: Busca el texto en el destino
+        
+        Con algún filtro, los resultados se ordenan de mayor a menor relevancia
+        (ver utils.busqueda_rutas).
         
         Returns:
             QuerySet: Conjunto de rutas filtradas según los parámetros
         """
         queryset = Ruta.objects.all().select_related('id_vehiculos') 
-        origen = self.request.query_params.get('origen')
-        destino = self.request.query_params.get('destino')
+        return busqueda_rutas.buscar(
+            queryset,
+            origen=self.request.query_params.get('origen'),
+            destino=self.request.query_params.get('destino'),
+        )
 
-        if origen:
-            queryset = queryset.filter(origen__icontains=origen)
-        if destino:
-            queryset = queryset.filter(destino__icontains=destino)
+class AutocompletarRutasView(APIView):
+    """
+    Vista para sugerir orígenes y destinos mientras el usuario escribe.
 
-        return queryset
+    Esta vista permite:
+    - GET: Obtener los lugares más populares que empiezan por ?q=, sin
+      distinguir tildes ni mayúsculas
+
+    Características especiales:
+    - ?limite= fija el número de sugerencias (por defecto y como máximo
+      AUTOCOMPLETADO_LIMITE)
+    - Responde desde un trie en memoria, sin consultar la base de datos
+      salvo para construirlo cuando otro proceso cambió las rutas
+    """
+    presupuesto_consultas = {'GET': 1}
+
+    def get(self, request):
+        """
+        Método para obtener las sugerencias de un prefijo.
+
+        Returns:
+            Response: Prefijo consultado y sugerencias con su número de rutas
+        """
+        maximo = settings.AUTOCOMPLETADO_LIMITE
+        try:
+            limite = int(request.query_params.get('limite', maximo))
+        except ValueError:
+            return Response(
+                {'error': 'El parámetro limite debe ser un número entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= limite <= maximo:
+            return Response(
+                {'error': f'El parámetro limite debe estar entre 1 y {maximo}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        q = request.query_params.get('q', '')
+        return Response({
+            'q': q,
+            'sugerencias': [
+                {'texto': texto, 'rutas': cantidad}
+                for texto, cantidad in autocompletado.obtener_autocompletado().sugerir(q, limite)
+            ],
+        })
+
+class ProximasSalidasView(APIView):
+    """
+    Vista para consultar las próximas salidas desde un origen.
+
+    Esta vista permite:
+    - GET: Obtener las salidas desde ?origen= a partir de ?despues= (HH:MM;
+      por defecto la hora local actual), sin distinguir tildes ni mayúsculas
+
+    Características especiales:
+    - ?limite= fija el número de salidas (por defecto y como máximo
+      PROXIMAS_SALIDAS_LIMITE); si el día no alcanza, continúa con las
+      primeras salidas del día siguiente
+    - Responde desde un índice de horarios ordenado por origen, que se
+      reconstruye solo cuando cambia alguna ruta
+    """
+    presupuesto_consultas = {'GET': 1}
+
+    def get(self, request):
+        """
+        Método para obtener las próximas salidas de un origen.
+
+        Returns:
+            Response: Origen, hora de referencia y salidas en orden
+        """
+        origen = request.query_params.get('origen', '').strip()
+        if not origen:
+            return Response(
+                {'error': 'El parámetro origen es requerido'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        maximo = settings.PROXIMAS_SALIDAS_LIMITE
+        try:
+            limite = int(request.query_params.get('limite', maximo))
+        except ValueError:
+            return Response(
+                {'error': 'El parámetro limite debe ser un número entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= limite <= maximo:
+            return Response(
+                {'error': f'El parámetro limite debe estar entre 1 y {maximo}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        despues = request.query_params.get('despues')
+        if despues:
+            try:
+                despues = datetime.strptime(despues, '%H:%M').time()
+            except ValueError:
+                return Response(
+                    {'error': f'Formato de hora inválido: {despues}. Use HH:MM'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            despues = timezone.localtime().time().replace(microsecond=0)
+
+        return Response({
+            'origen': origen,
+            'despues': despues,
+            'salidas': horarios.obtener_indice().proximas(origen, despues, limite),
+        })
+
+class PlanificarViajeView(APIView):
+    """
+    Vista para planificar un viaje entre dos lugares, con transbordos.
+
+    Esta vista permite:
+    - GET: Obtener el itinerario que llega más temprano de ?origen= a
+      ?destino=, saliendo desde ?despues= (HH:MM; por defecto la hora local
+      actual), sin distinguir tildes ni mayúsculas
+
+    Características especiales:
+    - ?max_transbordos= limita los cambios de ruta (por defecto y como
+      máximo PLANIFICADOR_MAX_TRANSBORDOS)
+    - Entre tramos se dejan al menos PLANIFICADOR_TRANSBORDO_MINUTOS
+    - Busca sobre la red de rutas en memoria (ver utils.planificador), sin
+      consultar la base de datos salvo para construirla
+    """
+    presupuesto_consultas = {'GET': 1}
+
+    def get(self, request):
+        """
+        Método para obtener el itinerario entre dos lugares.
+
+        Returns:
+            Response: Llegada, número de transbordos y tramos del itinerario,
+                o 404 si no hay itinerario en el día
+        """
+        origen = request.query_params.get('origen', '').strip()
+        destino = request.query_params.get('destino', '').strip()
+        if not origen or not destino:
+            return Response(
+                {'error': 'Los parámetros origen y destino son requeridos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        maximo = settings.PLANIFICADOR_MAX_TRANSBORDOS
+        try:
+            max_transbordos = int(request.query_params.get('max_transbordos', maximo))
+        except ValueError:
+            return Response(
+                {'error': 'El parámetro max_transbordos debe ser un número entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= max_transbordos <= maximo:
+            return Response(
+                {'error': f'El parámetro max_transbordos debe estar entre 0 y {maximo}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        despues = request.query_params.get('despues')
+        if despues:
+            try:
+                despues = datetime.strptime(despues, '%H:%M').time()
+            except ValueError:
+                return Response(
+                    {'error': f'Formato de hora inválido: {despues}. Use HH:MM'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            despues = timezone.localtime().time().replace(microsecond=0)
+
+        tramos = planificador.obtener_red().planificar(
+            origen, destino, despues, max_transbordos, settings.PLANIFICADOR_TRANSBORDO_MINUTOS * 60
+        )
+        if tramos is None:
+            return Response(
+                {'error': f'No hay viajes de {origen} a {destino} después de las {despues:%H:%M}'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({
+            'origen': origen,
+            'destino': destino,
+            'despues': despues,
+            'llegada': tramos[-1]['llegada'],
+            'transbordos': len(tramos) - 1,
+            'tramos': tramos,
+        })
 
 class RutaDetail(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -158,6 +516,7 @@ class RutaDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Ruta.objects.all()
     serializer_class = RutaSerializer
+    authentication_classes = [JWTAutenticacionPorClaims]
     permission_classes = [IsAuthenticated]
 
 class CalificacionList(generics.ListCreateAPIView):
@@ -174,7 +533,9 @@ class CalificacionList(generics.ListCreateAPIView):
     """
     queryset = Calificacion.objects.all()
     serializer_class = CalificacionSerializer
+    authentication_classes = [JWTAutenticacionPorClaims]
     permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 2}
 
     def get_queryset(self):
         """
@@ -209,8 +570,151 @@ class CalificacionDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Calificacion.objects.all()
     serializer_class = CalificacionSerializer
+    authentication_classes = [JWTAutenticacionPorClaims]
     permission_classes = [IsAuthenticated]
 
+class ImportacionArchivoView(ABC, APIView):
+    """
+    Base de las vistas de importación masiva desde un archivo CSV o NDJSON.
+
+    La solicitud trae el archivo en el campo 'archivo'. Las subclases definen
+    `entidad` (en plural, para el mensaje) y crear_importador(), que retorna
+    un importador usable como contexto y con un método importar() que
+    produce el resultado de cada fila (ver utils.importacion_usuarios y
+    utils.importacion_flota).
+
+    Respuestas:
+    - 200: Todas las filas se importaron
+    - 207: Se importaron algunas filas
+    - 400: No se importó ninguna fila
+
+    Requiere autenticación y permisos de administrador para acceder.
+    """
+    permission_classes = [IsAuthenticated, EsStaff]
+    entidad = 'registros'
+
+    @abstractmethod
+    def crear_importador(self, request):
+        """Retorna el importador de la entidad para la solicitud."""
+
+    def post(self, request):
+        """
+        Método para procesar la importación.
+
+        Args:
+            request: Objeto Request con el archivo
+
+        Returns:
+            Response: Resumen y resultado de cada fila
+        """
+        if 'archivo' not in request.FILES:
+            return Response(
+                {'error': 'No se proporcionó ningún archivo'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        archivo = request.FILES['archivo']
+        formato = formato_por_nombre(archivo.name)
+        if formato is None:
+            return Response(
+                {'error': 'El archivo debe ser de tipo CSV o NDJSON'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with self.crear_importador(request) as importador:
+            resultados = list(importador.importar(leer_filas(archivo.file, formato)))
+        resumen = resumir(resultados)
+
+        if resumen['creados'] and resumen['errores']:
+            codigo = 207  # 207 Multi-Status
+        elif resumen['creados']:
+            codigo = status.HTTP_200_OK
+        else:
+            codigo = status.HTTP_400_BAD_REQUEST
+        return Response({
+            'mensaje': f"Se importaron {resumen['creados']} {self.entidad}; {resumen['errores']} filas con errores",
+            'resumen': resumen,
+            'resultados': resultados,
+        }, status=codigo)
+
+class ImportarUsuariosView(ImportacionArchivoView):
+    """
+    Vista para el registro masivo de usuarios desde un archivo.
+
+    Esta vista permite:
+    - POST: Importar usuarios desde un archivo CSV o NDJSON (.ndjson, .jsonl)
+
+    Cada fila debe tener:
+    - correo_electronico: Correo electrónico del usuario
+    - nombre: Nombre completo
+    - contrasena: Contraseña en texto plano
+    - rol (opcional): Nombre del rol; por defecto el enviado en el campo rol
+      de la solicitud, o Pasajero
+
+    El archivo se lee por lotes: cada lote se valida con una sola consulta,
+    las contraseñas se procesan en el pool de hilos de hashing y los
+    usuarios se insertan con bulk_create en una transacción por lote (ver
+    utils.importacion_usuarios). Un lote con errores no revierte los demás.
+
+    Requiere autenticación y permisos de administrador para acceder.
+    """
+    entidad = 'usuarios'
+
+    def crear_importador(self, request):
+        return ImportadorUsuarios(rol_por_defecto=request.data.get('rol') or 'Pasajero')
+
+class ImportarVehiculosView(ImportacionArchivoView):
+    """
+    Vista para el registro masivo de vehículos desde un archivo.
+
+    Esta vista permite:
+    - POST: Importar vehículos, y opcionalmente su conductor, desde un
+      archivo CSV o NDJSON (.ndjson, .jsonl)
+
+    Cada fila debe tener:
+    - placa: Placa del vehículo
+    - empresa: ID de la empresa
+    - disponibilidad (opcional): sí/no, por defecto sí
+    - nombre_conductor y licencia_conduccion (opcionales): Conductor asignado
+    - fecha_vencimiento_licencia, fecha_vencimiento_soat y
+      fecha_vencimiento_tecnomecanica (opcionales): Fechas AAAA-MM-DD
+
+    Cada lote resuelve las placas y licencias existentes con una consulta y
+    inserta vehículos y conductores con bulk_create en una transacción (ver
+    utils.importacion_flota).
+
+    Requiere autenticación y permisos de administrador para acceder.
+    """
+    entidad = 'vehículos'
+
+    def crear_importador(self, request):
+        return ImportadorVehiculos()
+
+class ImportarConductoresView(ImportacionArchivoView):
+    """
+    Vista para el registro masivo de conductores desde un archivo.
+
+    Esta vista permite:
+    - POST: Importar conductores desde un archivo CSV o NDJSON (.ndjson, .jsonl)
+
+    Cada fila debe tener:
+    - nombre: Nombre completo del conductor
+    - licencia_conduccion: Número de licencia de conducción
+    - placa: Placa de un vehículo existente
+    - fecha_vencimiento_licencia, fecha_vencimiento_soat y
+      fecha_vencimiento_tecnomecanica (opcionales): Fechas AAAA-MM-DD
+
+    Cada lote resuelve las placas y licencias existentes con una consulta e
+    inserta los conductores con bulk_create en una transacción (ver
+    utils.importacion_flota).
+
+    Requiere autenticación y permisos de administrador para acceder.
+    """
+    entidad = 'conductores'
+
+    def crear_importador(self, request):
+        return ImportadorConductores()
+
 # Esta es la vista para que el usuario pueda recuperar contraseña
 class RecuperarContrasenaView(APIView):
     """
@@ -227,7 +731,10 @@ class RecuperarContrasenaView(APIView):
     Respuestas:
     - 200: Correo enviado exitosamente
     - 404: Usuario no encontrado
+    - 429: Demasiadas solicitudes
     """
+    limites_tasa = [('ip', 5, 900), ('correo', 3, 900)]
+
     def post(self, request):
         """
         Método para procesar la solicitud de recuperación de contraseña.
@@ -243,12 +750,10 @@ class RecuperarContrasenaView(APIView):
             usuario = Usuario.objects.get(correo_electronico=email)
             token = generar_token(email)
             link = f"http://localhost:8000/api/auth/restablecer-contrasena/?token={token}"
-            send_mail(
-                subject="Recupera tu contraseña",
-                message=f"Haz clic en el siguiente enlace para restablecer tu contraseña: {link}",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=False
+            encolar_correo(
+                asunto="Recupera tu contraseña",
+                mensaje=f"Haz clic en el siguiente enlace para restablecer tu contraseña: {link}",
+                destinatario=email
             )
             return Response({'confirmación': 'Correo enviado con instrucciones'}, status=status.HTTP_200_OK)
         except Usuario.DoesNotExist:
@@ -285,12 +790,14 @@ class RestablecerContrasenaView(APIView):
         token = request.query_params.get('token')
         nueva_contrasena = request.data.get('nueva_contrasena')
 
-        email = verificar_token(token)
-        if email:
+        try:
+            email = verificar_token(token).get('user_id')
+        except Exception:
+            email = None
+        if email and nueva_contrasena:
             try:
                 usuario = Usuario.objects.get(correo_electronico=email)
-                usuario.contrasena = make_password(nueva_contrasena)
-                usuario.save()
+                usuario.cambiar_contrasena(nueva_contrasena)
                 return Response({'confirmación': 'Su contraseña actualizada correctamente'}, status=status.HTTP_200_OK)
             except Usuario.DoesNotExist:
                 return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
@@ -301,12 +808,19 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     Vista personalizada para la autenticación con control de intentos fallidos.
     
     Características:
-    - Bloquea la cuenta después de 5 intentos fallidos
-    - Registra cada intento de inicio de sesión
+    - Bloquea la cuenta después de 5 intentos fallidos en 30 minutos
+    - Bloquea la IP después de 20 intentos fallidos en 30 minutos
     - Implementa un tiempo de espera de 30 minutos
+    - Registra cada intento de inicio de sesión de forma asíncrona
     - Registra la IP del usuario
+    
+    La decisión de bloqueo se toma con contadores de ventana deslizante en la
+    caché compartida (ver utils.bloqueo_login); IntentoLogin es solo auditoría.
+    Antes de llegar al hasher, LimiteTasaMiddleware limita la tasa de
+    solicitudes por IP, por correo y para la ruta completa.
     """
     serializer_class = CustomTokenObtainPairSerializer
+    limites_tasa = [('ip', 30, 60), ('correo', 10, 60), ('ruta', 300, 60)]
 
     def post(self, request, *args, **kwargs):
         """
@@ -321,52 +835,42 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         correo_electronico = request.data.get('correo_electronico')
         ip_address = self.get_client_ip(request)
 
-        # Verificar si la cuenta está bloqueada
-        intentos_recientes = IntentoLogin.objects.filter(
-            correo_electronico=correo_electronico,
-            fecha_intento__gte=timezone.now() - timezone.timedelta(minutes=30)
-        ).order_by('-fecha_intento')
-
-        if intentos_recientes.exists():
-            ultimo_intento = intentos_recientes.first()
-            if ultimo_intento.bloqueado:
-                if ultimo_intento.fecha_desbloqueo and ultimo_intento.fecha_desbloqueo > timezone.now():
-                    tiempo_restante = ultimo_intento.fecha_desbloqueo - timezone.now()
-                    minutos = int(tiempo_restante.total_seconds() / 60)
-                    return Response({
-                        'error': f'Cuenta bloqueada. Intente nuevamente en {minutos} minutos.'
-                    }, status=status.HTTP_403_FORBIDDEN)
-
-        # Registrar el intento actual
-        intento = IntentoLogin.objects.create(
-            correo_electronico=correo_electronico,
-            ip_address=ip_address
-        )
+        # Verificar si la cuenta o la IP están bloqueadas
+        tipo_bloqueo, segundos_restantes = bloqueo_login.tiempo_bloqueo_restante(correo_electronico, ip_address)
+        if tipo_bloqueo:
+            return Response(
+                {'error': bloqueo_login.mensaje_bloqueo(tipo_bloqueo, segundos_restantes)},
+                status=status.HTTP_403_FORBIDDEN,
+            )
 
         try:
             response = super().post(request, *args, **kwargs)
-            intento.exito = True
-            intento.save()
-            return response
         except Exception as e:
-            # Contar intentos fallidos en los últimos 30 minutos
-            intentos_fallidos = intentos_recientes.filter(exito=False).count()
-            
-            if intentos_fallidos >= 4:  # 4 intentos anteriores + el actual = 5
-                # Bloquear la cuenta por 30 minutos
-                intento.bloqueado = True
-                intento.fecha_desbloqueo = timezone.now() + timezone.timedelta(minutes=30)
-                intento.save()
+            estado = bloqueo_login.registrar_fallo(correo_electronico, ip_address)
+
+            if estado['bloqueado_correo'] or estado['bloqueado_ip']:
+                # Bloquear la cuenta o la IP por LOGIN_BLOQUEO_MINUTOS
+                registrar_intento(
+                    correo_electronico, ip_address, exito=False, bloqueado=True,
+                    fecha_desbloqueo=timezone.now() + timezone.timedelta(
+                        minutes=getattr(settings, 'LOGIN_BLOQUEO_MINUTOS', 30)
+                    )
+                )
+                tipo_bloqueo = 'correo' if estado['bloqueado_correo'] else 'ip'
                 return Response({
-                    'error': 'Cuenta bloqueada por 30 minutos debido a múltiples intentos fallidos.'
+                    'error': bloqueo_login.mensaje_bloqueo(tipo_bloqueo)
                 }, status=status.HTTP_403_FORBIDDEN)
-            
-            intento.save()
+
+            registrar_intento(correo_electronico, ip_address, exito=False)
             return Response({
                 'error': 'Credenciales inválidas',
-                'intentos_restantes': 5 - (intentos_fallidos + 1)
+                'intentos_restantes': bloqueo_login.limite_intentos('correo') - estado['fallos_correo']
             }, status=status.HTTP_401_UNAUTHORIZED)
 
+        bloqueo_login.limpiar_fallos(correo_electronico)
+        registrar_intento(correo_electronico, ip_address, exito=True)
+        return response
+
     def get_client_ip(self, request):
         """
         Obtiene la dirección IP del cliente.
@@ -377,12 +881,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         Returns:
             str: Dirección IP del cliente
         """
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return ip_cliente(request)
 
 class RolList(generics.ListCreateAPIView):
     """
@@ -396,7 +895,9 @@ class RolList(generics.ListCreateAPIView):
     """
     queryset = Rol.objects.all()
     serializer_class = RolSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
+    presupuesto_consultas = {'GET': 2}
 
 class RolDetail(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -411,7 +912,8 @@ class RolDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Rol.objects.all()
     serializer_class = RolSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
 
 class ZonaList(generics.ListCreateAPIView):
     """
@@ -425,7 +927,9 @@ class ZonaList(generics.ListCreateAPIView):
     """
     queryset = Zona.objects.all()
     serializer_class = ZonaSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
+    presupuesto_consultas = {'GET': 2}
 
 class ZonaDetail(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -440,7 +944,8 @@ class ZonaDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Zona.objects.all()
     serializer_class = ZonaSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
 
 class TarifaList(generics.ListCreateAPIView):
     """
@@ -455,7 +960,9 @@ class TarifaList(generics.ListCreateAPIView):
     - Requiere autenticación y permisos de administrador
     """
     serializer_class = TarifaSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
+    presupuesto_consultas = {'GET': 2}
 
     def get_queryset(self):
         """
@@ -505,7 +1012,8 @@ class TarifaDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Tarifa.objects.all()
     serializer_class = TarifaSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
 
     def perform_update(self, serializer):
         """
@@ -532,7 +1040,7 @@ class ImportarRutasView(APIView):
     
     Requiere autenticación y permisos de administrador para acceder.
     """
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    permission_classes = [IsAuthenticated, EsStaff]
 
     def post(self, request):
         """
@@ -637,7 +1145,8 @@ class DescargarPlantillaRutasView(APIView):
     
     Requiere autenticación y permisos de administrador para acceder.
     """
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
 
     def get(self, request):
         """
@@ -680,6 +1189,7 @@ class ViajeList(generics.ListCreateAPIView):
     """
     serializer_class = ViajeSerializer
     permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 2}
 
     def get_queryset(self):
         """
@@ -772,6 +1282,7 @@ class RutaFavoritaList(generics.ListCreateAPIView):
     """
     serializer_class = RutaFavoritaSerializer
     permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 2}
 
     def get_queryset(self):
         """
@@ -831,6 +1342,7 @@ class CalificacionConductorList(generics.ListCreateAPIView):
     """
     serializer_class = CalificacionConductorSerializer
     permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 2}
 
     def get_queryset(self):
         """
@@ -911,7 +1423,8 @@ class DashboardEmpresaView(APIView):
     
     Requiere autenticación y permisos de administrador.
     """
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
 
     def get(self, request):
         """
@@ -942,10 +1455,11 @@ class DashboardEmpresaView(APIView):
                 id_ruta__id_vehiculos__in=vehiculos
             ).order_by('-fecha_viaje')[:10]  # Últimos 10 viajes
 
-            # Calcular métricas
-            total_vehiculos = vehiculos.count()
-            total_conductores = conductores.count()
-            vehiculos_disponibles = vehiculos.filter(disponibilidad=True).count()
+            # Contadores de la flota, mantenidos por las señales de los modelos
+            flota = DisponibilidadEmpresa.objects.filter(id_empresa=empresa_id).first()
+            total_vehiculos = flota.total_vehiculos if flota else 0
+            total_conductores = flota.total_conductores if flota else 0
+            vehiculos_disponibles = flota.vehiculos_disponibles if flota else 0
             
             # Calcular ingresos y calificaciones
             ingresos_mes = sum(est.ingresos_totales for est in estadisticas)
@@ -987,7 +1501,9 @@ class EstadisticaEmpresaView(generics.ListCreateAPIView):
     - Validación de datos
     """
     serializer_class = EstadisticaEmpresaSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
+    presupuesto_consultas = {'GET': 2}
 
     def get_queryset(self):
         """
@@ -1024,7 +1540,7 @@ class EstadisticaEmpresaView(generics.ListCreateAPIView):
         """
         # Calcular métricas automáticamente
         empresa_id = serializer.validated_data['id_empresa']
-        fecha = serializer.validated_data['fecha']
+        fecha = serializer.validated_data.get('fecha') or timezone.localdate()
 
         # Obtener vehículos de la empresa
         vehiculos = Vehiculo.objects.filter(empresa=empresa_id)
@@ -1047,6 +1563,9 @@ class EstadisticaEmpresaView(generics.ListCreateAPIView):
         )
         calificacion_promedio = sum(cal.calificacion for cal in calificaciones) / len(calificaciones) if calificaciones else 0
 
+        # Kilómetros del día según la telemetría GPS o las rutas de los viajes
+        kilometros_recorridos = kilometraje.kilometros_empresas(fecha, [empresa_id]).get(empresa_id, 0)
+
         # Guardar estadísticas
         serializer.save(
             total_viajes=total_viajes,
@@ -1054,8 +1573,9 @@ class EstadisticaEmpresaView(generics.ListCreateAPIView):
             viajes_cancelados=viajes_cancelados,
             ingresos_totales=ingresos_totales,
             calificacion_promedio=calificacion_promedio,
+            fecha=fecha,
             pasajeros_transportados=viajes_completados,  # Un pasajero por viaje completado
-            kilometros_recorridos=0  # Este valor debería calcularse basado en las rutas
+            kilometros_recorridos=round(kilometros_recorridos, 2)
         )
 
 class VersionSistemaList(generics.ListCreateAPIView):
@@ -1072,7 +1592,9 @@ class VersionSistemaList(generics.ListCreateAPIView):
     - Validación de formato de versión
     """
     serializer_class = VersionSistemaSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
+    presupuesto_consultas = {'GET': 2}
 
     def get_queryset(self):
         """
@@ -1119,7 +1641,8 @@ class VersionSistemaDetail(generics.RetrieveUpdateDestroyAPIView):
     - Mantiene un registro de cambios
     """
     serializer_class = VersionSistemaSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
     queryset = VersionSistema.objects.all()
 
     def perform_update(self, serializer):
@@ -1170,6 +1693,7 @@ class PQRSList(generics.ListCreateAPIView):
     """
     serializer_class = PQRSSerializer
     permission_classes = [IsAuthenticated]
+    presupuesto_consultas = {'GET': 2}
 
     def get_queryset(self):
         """
@@ -1202,13 +1726,13 @@ class PQRSList(generics.ListCreateAPIView):
         Args:
             serializer: Serializador con los datos de la PQRS
         """
-        pqrs = serializer.save(id_usuario=self.request.user)
-        
-        # Enviar correo de acuse de recibo
-        try:
-            send_mail(
-                subject=f"Acuse de recibo - {pqrs.get_tipo_display()} #{pqrs.id_pqrs}",
-                message=f"""
+        with transaction.atomic():
+            pqrs = serializer.save(id_usuario=self.request.user)
+
+            # Encolar el correo de acuse de recibo en la misma transacción
+            encolar_correo(
+                asunto=f"Acuse de recibo - {pqrs.get_tipo_display()} #{pqrs.id_pqrs}",
+                mensaje=f"""
                 Estimado/a {self.request.user.nombre},
 
                 Hemos recibido su {pqrs.get_tipo_display().lower()} con el siguiente detalle:
@@ -1223,13 +1747,8 @@ class PQRSList(generics.ListCreateAPIView):
                 Atentamente,
                 Equipo de Soporte
                 """,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[self.request.user.correo_electronico],
-                fail_silently=False
+                destinatario=self.request.user.correo_electronico
             )
-        except Exception as e:
-            # Registrar el error pero no interrumpir la creación de la PQRS
-            print(f"Error al enviar correo de acuse: {str(e)}")
 
 class PQRSDetail(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -1275,18 +1794,18 @@ class PQRSDetail(generics.RetrieveUpdateDestroyAPIView):
         if instance.estado == 'resuelto':
             raise serializers.ValidationError("No se puede modificar una PQRS resuelta")
         
-        # Actualizar la PQRS
-        pqrs = serializer.save(
-            respondido_por=self.request.user,
-            fecha_respuesta=timezone.now(),
-            estado='resuelto'
-        )
-        
-        # Enviar correo de respuesta
-        try:
-            send_mail(
-                subject=f"Respuesta a su {pqrs.get_tipo_display()} #{pqrs.id_pqrs}",
-                message=f"""
+        with transaction.atomic():
+            # Actualizar la PQRS
+            pqrs = serializer.save(
+                respondido_por=self.request.user,
+                fecha_respuesta=timezone.now(),
+                estado='resuelto'
+            )
+
+            # Encolar el correo de respuesta en la misma transacción
+            encolar_correo(
+                asunto=f"Respuesta a su {pqrs.get_tipo_display()} #{pqrs.id_pqrs}",
+                mensaje=f"""
                 Estimado/a {pqrs.id_usuario.nombre},
 
                 Hemos respondido a su {pqrs.get_tipo_display().lower()}:
@@ -1300,13 +1819,8 @@ class PQRSDetail(generics.RetrieveUpdateDestroyAPIView):
                 Atentamente,
                 Equipo de Soporte
                 """,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[pqrs.id_usuario.correo_electronico],
-                fail_silently=False
+                destinatario=pqrs.id_usuario.correo_electronico
             )
-        except Exception as e:
-            # Registrar el error pero no interrumpir la actualización
-            print(f"Error al enviar correo de respuesta: {str(e)}")
 
     def perform_destroy(self, instance):
         """
@@ -1329,7 +1843,9 @@ class PQRSAdminList(generics.ListAPIView):
     Solo accesible para administradores.
     """
     serializer_class = PQRSSerializer
-    permission_classes = [IsAuthenticated, IsAdminUser]
+    authentication_classes = [JWTAutenticacionPorClaims]
+    permission_classes = [IsAuthenticated, EsStaff]
+    presupuesto_consultas = {'GET': 3}
 
     def get_queryset(self):
         queryset = PQRS.objects.all().select_related('id_usuario', 'respondido_por')
@@ -1347,9 +1863,11 @@ class PQRSAdminList(generics.ListAPIView):
 class RegistroUsuarioView(APIView):
     """
     Vista para el registro de nuevos usuarios.
-    No requiere autenticación.
+    No requiere autenticación; la tasa de registros se limita por IP y para
+    la ruta completa.
     """
     permission_classes = [AllowAny]
+    limites_tasa = [('ip', 5, 3600), ('ruta', 100, 60)]
 
     def post(self, request):
         serializer = UsuarioSerializer(data=request.data)
@@ -1383,4 +1901,28 @@ class UsuarioActualView(APIView):
 
     def get(self, request):
         serializer = UsuarioSerializer(request.user)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+class JWKSView(APIView):
+    """
+    Vista que publica las claves públicas de firma de tokens en formato JWKS.
+
+    Permite que otros servicios y gateways verifiquen los tokens localmente.
+    La respuesta se sirve desde las claves ya cargadas en el proceso y se
+    marca como cacheable para los clientes.
+    No requiere autenticación.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        """
+        Método para obtener las claves públicas vigentes.
+
+        Returns:
+            Response: Conjunto JWKS con las claves activas y en verificación
+        """
+        response = Response(obtener_conjunto().jwks)
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'JWKS_MAX_AGE', 300)}"
+        return response
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import sys
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -31,14 +32,33 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG', 'True') == 'True'
 
+# Indica si el proceso actual ejecuta la suite de pruebas (manage.py test)
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 #Configuraciones de correo en Django para enviar los tokens
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Backend usado por el trabajador procesar_correos. Para pruebas locales puede
+# usarse django.core.mail.backends.filebased.EmailBackend con EMAIL_FILE_PATH
+# o django.core.mail.backends.locmem.EmailBackend.
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', str(BASE_DIR / 'var' / 'correos'))
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
-DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
+# Bandeja de salida de correos (modelo CorreoPendiente, comando procesar_correos)
+CORREOS_LOTE = int(os.getenv('CORREOS_LOTE', 50))
+CORREOS_MAX_INTENTOS = int(os.getenv('CORREOS_MAX_INTENTOS', 8))
+CORREOS_ESPERA_BASE = int(os.getenv('CORREOS_ESPERA_BASE', 30))
+CORREOS_ESPERA_MAXIMA = int(os.getenv('CORREOS_ESPERA_MAXIMA', 3600))
+CORREOS_UMBRAL_CIRCUITO = int(os.getenv('CORREOS_UMBRAL_CIRCUITO', 5))
+CORREOS_ENFRIAMIENTO_CIRCUITO = int(os.getenv('CORREOS_ENFRIAMIENTO_CIRCUITO', 60))
+
+# Destinatarios del resumen diario de documentos por vencer (comando
+# enviar_resumen_vencimientos), separados por comas. Vacío: el staff activo
+VENCIMIENTOS_DESTINATARIOS = [correo for correo in os.getenv('VENCIMIENTOS_DESTINATARIOS', '').split(',') if correo]
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
 
@@ -63,10 +83,24 @@ INSTALLED_APPS = [
     'django_extensions',
 ]
 
+# Caché por proceso de los usuarios autenticados con JWT (ver api_app.authentication)
+AUTH_CACHE_USUARIOS_MAX = int(os.getenv('AUTH_CACHE_USUARIOS_MAX', 1024))
+AUTH_CACHE_USUARIOS_TTL = int(os.getenv('AUTH_CACHE_USUARIOS_TTL', 60))
+
+# Autenticación por correo electrónico con una sola consulta (ver api_app.backends)
+AUTHENTICATION_BACKENDS = [
+    'api_app.backends.CorreoElectronicoBackend',
+]
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'api_app.authentication.JWTAuthenticationCacheada',
+    ),
+    # Paginación por cursor en todos los listados; ?offset= activa la paginación por desplazamiento
+    'DEFAULT_PAGINATION_CLASS': 'api_app.pagination.PaginacionHibrida',
+    'PAGE_SIZE': int(os.getenv('PAGE_SIZE', 50)),
+    # Ajusta joins y columnas de la consulta a ?fields= y ?expand=
+    'DEFAULT_FILTER_BACKENDS': ('api_app.filters.CamposSolicitadosFilter',),
 }
 
 MIDDLEWARE = [
@@ -74,8 +108,10 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'api_app.middleware.PresupuestoConsultasMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api_app.middleware.LimiteTasaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -116,9 +152,33 @@ DATABASES = {
 }
 
 
+# Caché compartida
+# Con CACHE_URL (redis://...) los contadores de bloqueo de login se comparten entre
+# todos los procesos; sin ella, y siempre en pruebas, se usa memoria local.
+
+if os.getenv('CACHE_URL') and not TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'api-cheems',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# Hilos del pool que calcula y verifica hashes de contraseña (ver utils.hashing).
+# Ajustar junto con las iteraciones usando el comando benchmark_hashers.
+HASH_MAX_HILOS = int(os.getenv('HASH_MAX_HILOS', 0)) or None
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -158,6 +218,19 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Configuración de JWT
+# Los tokens se firman con la clave asimétrica activa (modelo ClaveFirma, comando
+# rotar_claves_jwt). ALGORITHM y SIGNING_KEY se usan solo mientras no haya claves
+# registradas y para verificar tokens HS256 emitidos antes de la rotación.
+JWKS_MAX_AGE = int(os.getenv('JWKS_MAX_AGE', 300))
+
+# Filtro en memoria de tokens revocados (ver utils.revocacion): capacidad prevista,
+# tasa de falsos positivos, segundos entre sincronizaciones con BlacklistedToken y
+# cantidad de ids saltados que se vuelven a consultar por si se confirman tarde
+REVOCACION_CAPACIDAD = int(os.getenv('REVOCACION_CAPACIDAD', 100000))
+REVOCACION_TASA_ERROR = float(os.getenv('REVOCACION_TASA_ERROR', 0.001))
+REVOCACION_INTERVALO_SINCRONIZACION = int(os.getenv('REVOCACION_INTERVALO_SINCRONIZACION', 30))
+REVOCACION_VENTANA_PENDIENTES = int(os.getenv('REVOCACION_VENTANA_PENDIENTES', 1000))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME', 60))),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_LIFETIME', 1))),
@@ -176,8 +249,90 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
+    'TOKEN_REFRESH_SERIALIZER': 'api_app.serializers.TokenRefreshConFiltroSerializer',
 }
 
+# Importación masiva de usuarios: filas por transacción y procesos que calculan
+# los hashes de contraseña en el comando importar_usuarios (por defecto, uno por
+# CPU). La API usa el pool de hilos de hashing (HASH_MAX_HILOS).
+IMPORTACION_USUARIOS_LOTE = int(os.getenv('IMPORTACION_USUARIOS_LOTE', 500))
+IMPORTACION_USUARIOS_PROCESOS = int(os.getenv('IMPORTACION_USUARIOS_PROCESOS', 0)) or None
+
+# Importación masiva de vehículos y conductores: filas por transacción
+IMPORTACION_FLOTA_LOTE = int(os.getenv('IMPORTACION_FLOTA_LOTE', 500))
+
+# Telemetría GPS (utils.telemetria): las posiciones se insertan por lotes en
+# segundo plano como SegmentoTelemetria. En pruebas se escriben en el request.
+TELEMETRIA_SINCRONA = TESTING
+TELEMETRIA_LOTE = int(os.getenv('TELEMETRIA_LOTE', 50))
+TELEMETRIA_INTERVALO = float(os.getenv('TELEMETRIA_INTERVALO', 1))
+TELEMETRIA_MAX_COLA = int(os.getenv('TELEMETRIA_MAX_COLA', 10000))
+TELEMETRIA_RESPALDO = os.getenv(
+    'TELEMETRIA_RESPALDO', str(BASE_DIR / 'var' / 'telemetria_pendiente.jsonl')
+)
+# Posiciones por solicitud, posiciones recientes por vehículo en memoria,
+# vigencia en caché de la última posición y segundos admitidos en el futuro
+TELEMETRIA_MAX_POSICIONES = int(os.getenv('TELEMETRIA_MAX_POSICIONES', 5000))
+TELEMETRIA_ANILLO = int(os.getenv('TELEMETRIA_ANILLO', 256))
+TELEMETRIA_ULTIMA_TTL = int(os.getenv('TELEMETRIA_ULTIMA_TTL', 3600))
+TELEMETRIA_MAX_ADELANTO = int(os.getenv('TELEMETRIA_MAX_ADELANTO', 300))
+
+# Máximo de sugerencias del autocompletado de lugares de rutas (ver api_app.utils.autocompletado)
+AUTOCOMPLETADO_LIMITE = int(os.getenv('AUTOCOMPLETADO_LIMITE', 10))
+
+# Máximo de salidas por consulta del tablero de próximas salidas (ver api_app.utils.horarios)
+PROXIMAS_SALIDAS_LIMITE = int(os.getenv('PROXIMAS_SALIDAS_LIMITE', 20))
+
+# Planificador de viajes con transbordos (ver api_app.utils.planificador): máximo de
+# transbordos, minutos mínimos entre tramos y velocidad para estimar la duración
+# de las rutas sin duracion_minutos
+PLANIFICADOR_MAX_TRANSBORDOS = int(os.getenv('PLANIFICADOR_MAX_TRANSBORDOS', 3))
+PLANIFICADOR_TRANSBORDO_MINUTOS = int(os.getenv('PLANIFICADOR_TRANSBORDO_MINUTOS', 5))
+PLANIFICADOR_VELOCIDAD_KMH = float(os.getenv('PLANIFICADOR_VELOCIDAD_KMH', 40))
+
+# Configuración de bloqueo de inicio de sesión
+LOGIN_MAX_INTENTOS = int(os.getenv('LOGIN_MAX_INTENTOS', 5))
+LOGIN_MAX_INTENTOS_IP = int(os.getenv('LOGIN_MAX_INTENTOS_IP', 20))
+LOGIN_VENTANA_MINUTOS = int(os.getenv('LOGIN_VENTANA_MINUTOS', 30))
+LOGIN_BLOQUEO_MINUTOS = int(os.getenv('LOGIN_BLOQUEO_MINUTOS', 30))
+# En pruebas la auditoría de intentos se escribe en el mismo hilo del request
+LOGIN_AUDITORIA_SINCRONA = TESTING
+# Escritura por lotes de IntentoLogin: tamaño de lote, segundos máximos de espera,
+# capacidad de la cola y archivo de respaldo si la base de datos no está disponible
+LOGIN_AUDITORIA_LOTE = int(os.getenv('LOGIN_AUDITORIA_LOTE', 100))
+LOGIN_AUDITORIA_INTERVALO = float(os.getenv('LOGIN_AUDITORIA_INTERVALO', 2))
+LOGIN_AUDITORIA_MAX_COLA = int(os.getenv('LOGIN_AUDITORIA_MAX_COLA', 10000))
+LOGIN_AUDITORIA_RESPALDO = os.getenv(
+    'LOGIN_AUDITORIA_RESPALDO', str(BASE_DIR / 'var' / 'intentos_login_pendientes.jsonl')
+)
+# Días de intentos que conserva el comando purgar_intentos_login
+LOGIN_AUDITORIA_RETENCION_DIAS = int(os.getenv('LOGIN_AUDITORIA_RETENCION_DIAS', 90))
+
+# Límite de tasa (api_app.middleware.LimiteTasaMiddleware). Los límites de cada
+# vista se declaran en su atributo limites_tasa y pueden reemplazarse aquí por
+# nombre de clase. El almacén SQLite comparte los buckets entre los procesos
+# del servidor; el de memoria solo sirve para un proceso.
+LIMITE_TASA_ACTIVO = os.getenv('LIMITE_TASA_ACTIVO', 'True') == 'True' and not TESTING
+LIMITE_TASA_ALMACEN = os.getenv('LIMITE_TASA_ALMACEN', 'api_app.utils.limite_tasa.AlmacenSQLite')
+LIMITE_TASA_OPCIONES = (
+    {'ruta': os.getenv('LIMITE_TASA_SQLITE', str(BASE_DIR / 'var' / 'limite_tasa.sqlite3'))}
+    if LIMITE_TASA_ALMACEN.endswith('AlmacenSQLite') else {}
+)
+# Proxies inversos propios delante de la aplicación; solo con un valor mayor
+# que cero se toma la IP del cliente de X-Forwarded-For (ver ip_cliente)
+PROXIES_CONFIABLES = int(os.getenv('PROXIES_CONFIABLES', 0))
+# Tamaño máximo del cuerpo que se lee para extraer el correo de la solicitud
+LIMITE_TASA_MAX_CUERPO = int(os.getenv('LIMITE_TASA_MAX_CUERPO', 4096))
+LIMITES_TASA_VISTAS = {}
+
+# Presupuesto de consultas por vista (api_app.middleware.PresupuestoConsultasMiddleware).
+# En pruebas se mide cada solicitud y exceder el presupuesto hace fallar la prueba;
+# fuera de ellas se mide una muestra y los excesos se registran en el log.
+PRESUPUESTO_CONSULTAS_ESTRICTO = TESTING
+PRESUPUESTO_CONSULTAS_MUESTREO = float(os.getenv('PRESUPUESTO_CONSULTAS_MUESTREO', 0.01))
+# Veces que una misma forma de consulta debe repetirse para reportarse como N+1
+PRESUPUESTO_CONSULTAS_REPETICIONES = int(os.getenv('PRESUPUESTO_CONSULTAS_REPETICIONES', 5))
+
 # Configuración de CORS
 CORS_ALLOW_CREDENTIALS = True
 CORS_ORIGIN_WHITELIST = [